@@ -8,13 +8,21 @@ from mmcv.runner import DistSamplerSeedHook, Runner, obj_from_dict
 
 from mmdet import datasets
 from mmdet.core import (CocoDistEvalmAPHook, CocoDistEvalRecallHook,
-                        DistEvalmAPHook, DistOptimizerHook, Fp16OptimizerHook)
-from mmdet.datasets import DATASETS, build_dataloader
+                        DeviceLogBuffer, DistEvalmAPHook, DistOptimizerHook,
+                        Fp16OptimizerHook, ProfilerHook, SyncCounterHook)
+from mmdet.datasets import (DATASETS, DataWaitHook, ImageCacheHook,
+                            build_dataloader, has_image_cache)
 from mmdet.models import RPN
 from .env import get_root_logger
 
 
-def parse_losses(losses):
+def parse_losses(losses, sync=True):
+    """Sum up the losses and collect the variables to log.
+
+    With ``sync=False`` the log variables are left as detached tensors on
+    the device, to be copied to the host by :class:`DeviceLogBuffer` at the
+    logging interval, instead of syncing for each of them every iteration.
+    """
     log_vars = OrderedDict()
     for loss_name, loss_value in losses.items():
         if isinstance(loss_value, torch.Tensor):
@@ -29,14 +37,17 @@ def parse_losses(losses):
 
     log_vars['loss'] = loss
     for name in log_vars:
-        log_vars[name] = log_vars[name].item()
+        if sync:
+            log_vars[name] = log_vars[name].item()
+        else:
+            log_vars[name] = log_vars[name].detach()
 
     return loss, log_vars
 
 
 def batch_processor(model, data, train_mode):
     losses = model(**data)
-    loss, log_vars = parse_losses(losses)
+    loss, log_vars = parse_losses(losses, sync=False)
 
     outputs = dict(
         loss=loss, log_vars=log_vars, num_samples=len(data['img'].data))
@@ -139,8 +150,11 @@ def _dist_train(model, dataset, cfg, validate=False):
     dataset = dataset if isinstance(dataset, (list, tuple)) else [dataset]
     data_loaders = [
         build_dataloader(
-            ds, cfg.data.imgs_per_gpu, cfg.data.workers_per_gpu, dist=True)
-        for ds in dataset
+            ds,
+            cfg.data.imgs_per_gpu,
+            cfg.data.workers_per_gpu,
+            dist=True,
+            **cfg.data.get('loader_cfg', {})) for ds in dataset
     ]
     # put model on gpus
     model = MMDistributedDataParallel(model.cuda())
@@ -149,6 +163,7 @@ def _dist_train(model, dataset, cfg, validate=False):
     optimizer = build_optimizer(model, cfg.optimizer)
     runner = Runner(model, batch_processor, optimizer, cfg.work_dir,
                     cfg.log_level)
+    runner.log_buffer = DeviceLogBuffer()
 
     # fp16 setting
     fp16_cfg = cfg.get('fp16', None)
@@ -161,7 +176,17 @@ def _dist_train(model, dataset, cfg, validate=False):
     # register hooks
     runner.register_training_hooks(cfg.lr_config, optimizer_config,
                                    cfg.checkpoint_config, cfg.log_config)
+    if cfg.log_config.get('count_syncs', False):
+        runner.register_hook(SyncCounterHook(), priority='LOWEST')
+    runner.register_hook(DataWaitHook())
+    if cfg.get('profiler', None) is not None:
+        # logged at the interval of the logger hooks, so registered before
+        profiler_cfg = dict(interval=cfg.log_config.interval)
+        profiler_cfg.update(cfg.profiler)
+        runner.register_hook(ProfilerHook(**profiler_cfg), priority='LOW')
     runner.register_hook(DistSamplerSeedHook())
+    if has_image_cache():
+        runner.register_hook(ImageCacheHook())
     # register eval hooks
     if validate:
         val_dataset_cfg = cfg.data.val
@@ -195,7 +220,8 @@ def _non_dist_train(model, dataset, cfg, validate=False):
             cfg.data.imgs_per_gpu,
             cfg.data.workers_per_gpu,
             cfg.gpus,
-            dist=False) for ds in dataset
+            dist=False,
+            **cfg.data.get('loader_cfg', {})) for ds in dataset
     ]
     # put model on gpus
     model = MMDataParallel(model, device_ids=range(cfg.gpus)).cuda()
@@ -204,6 +230,7 @@ def _non_dist_train(model, dataset, cfg, validate=False):
     optimizer = build_optimizer(model, cfg.optimizer)
     runner = Runner(model, batch_processor, optimizer, cfg.work_dir,
                     cfg.log_level)
+    runner.log_buffer = DeviceLogBuffer()
     # fp16 setting
     fp16_cfg = cfg.get('fp16', None)
     if fp16_cfg is not None:
@@ -213,6 +240,16 @@ def _non_dist_train(model, dataset, cfg, validate=False):
         optimizer_config = cfg.optimizer_config
     runner.register_training_hooks(cfg.lr_config, optimizer_config,
                                    cfg.checkpoint_config, cfg.log_config)
+    if cfg.log_config.get('count_syncs', False):
+        runner.register_hook(SyncCounterHook(), priority='LOWEST')
+    runner.register_hook(DataWaitHook())
+    if cfg.get('profiler', None) is not None:
+        # logged at the interval of the logger hooks, so registered before
+        profiler_cfg = dict(interval=cfg.log_config.interval)
+        profiler_cfg.update(cfg.profiler)
+        runner.register_hook(ProfilerHook(**profiler_cfg), priority='LOW')
+    if has_image_cache():
+        runner.register_hook(ImageCacheHook())
 
     if cfg.resume_from:
         runner.resume(cfg.resume_from)
@@ -1,10 +1,12 @@
 from .anchor_generator import AnchorGenerator
 from .anchor_target import anchor_inside_flags, anchor_target, anchor_target_mask
+from .grid_cache import GridCache, grid_cache, grid_cache_key
 from .guided_anchor_target import ga_loc_target, ga_shape_target
 from .point_generator import PointGenerator
 from .point_target import point_target
 
 __all__ = [
     'AnchorGenerator', 'anchor_target', 'anchor_inside_flags', 'ga_loc_target',
-    'ga_shape_target', 'PointGenerator', 'point_target', 'anchor_target_mask'
+    'ga_shape_target', 'PointGenerator', 'point_target', 'anchor_target_mask',
+    'GridCache', 'grid_cache', 'grid_cache_key'
 ]
@@ -1,5 +1,7 @@
 import torch
 
+from .grid_cache import grid_cache, grid_cache_key
+
 
 class AnchorGenerator(object):
 
@@ -10,6 +12,8 @@ class AnchorGenerator(object):
         self.scale_major = scale_major
         self.ctr = ctr
         self.base_anchors = self.gen_base_anchors()
+        # generators with the same base anchors share their cached grids
+        self._cache_id = tuple(self.base_anchors.view(-1).tolist())
 
     @property
     def num_base_anchors(self):
@@ -53,6 +57,12 @@ class AnchorGenerator(object):
             return yy, xx
 
     def grid_anchors(self, featmap_size, stride=16, device='cuda'):
+        key = grid_cache_key(
+            'anchors', featmap_size, stride, self._cache_id, device=device)
+        return grid_cache.get(
+            key, lambda: self._grid_anchors(featmap_size, stride, device))
+
+    def _grid_anchors(self, featmap_size, stride, device):
         base_anchors = self.base_anchors.to(device)
 
         feat_h, feat_w = featmap_size
@@ -72,6 +82,16 @@ class AnchorGenerator(object):
         return all_anchors
 
     def valid_flags(self, featmap_size, valid_size, device='cuda'):
+        key = grid_cache_key(
+            'anchor_flags',
+            featmap_size,
+            tuple(valid_size),
+            self.num_base_anchors,
+            device=device)
+        return grid_cache.get(
+            key, lambda: self._valid_flags(featmap_size, valid_size, device))
+
+    def _valid_flags(self, featmap_size, valid_size, device):
         feat_h, feat_w = featmap_size
         valid_h, valid_w = valid_size
         assert valid_h <= feat_h and valid_w <= feat_w
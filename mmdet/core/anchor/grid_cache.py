@@ -0,0 +1,72 @@
+import threading
+from collections import OrderedDict
+
+import torch
+
+
+class GridCache(object):
+    """A bounded LRU cache of anchor and point grids.
+
+    Grids only depend on the feature map size, stride, device and dtype (and
+    the base anchors), which take a handful of values in a whole run, so they
+    are built once and shared by all heads instead of rebuilt for every
+    level, image and iteration. Cached tensors are shared by the callers and
+    must not be modified in place. The cache can be used by several threads,
+    e.g. the replicas of a DataParallel model.
+
+    Args:
+        max_size (int): Maximum number of cached grids, 0 disables caching.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._grids = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build_fn):
+        """Return the grid of ``key``, built by ``build_fn()`` on misses."""
+        with self._lock:
+            grid = self._grids.get(key)
+            if grid is not None:
+                self.hits += 1
+                self._grids.move_to_end(key)
+                return grid
+            self.misses += 1
+        # built without the lock, a grid built by several threads at once is
+        # cached by the last of them
+        grid = build_fn()
+        if self.max_size > 0:
+            with self._lock:
+                self._grids[key] = grid
+                self._grids.move_to_end(key)
+                while len(self._grids) > self.max_size:
+                    self._grids.popitem(last=False)
+        return grid
+
+    def clear(self):
+        with self._lock:
+            self._grids.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._grids)
+
+
+# shared by all anchor and point generators
+grid_cache = GridCache()
+
+
+def grid_cache_key(name, featmap_size, *args, device='cuda'):
+    """Hashable cache key of a grid of a feature map on a device.
+
+    A CUDA device without an index is the current device, which differs
+    between e.g. the replicas of a DataParallel model.
+    """
+    featmap_size = tuple(int(size) for size in featmap_size)
+    device = torch.device(device)
+    if device.type == 'cuda' and device.index is None:
+        device = torch.device('cuda', torch.cuda.current_device())
+    return (name, featmap_size) + args + (device, )
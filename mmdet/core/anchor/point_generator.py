@@ -1,5 +1,7 @@
 import torch
 
+from .grid_cache import grid_cache, grid_cache_key
+
 
 class PointGenerator(object):
 
@@ -12,6 +14,11 @@ class PointGenerator(object):
             return yy, xx
 
     def grid_points(self, featmap_size, stride=16, device='cuda'):
+        key = grid_cache_key('points', featmap_size, stride, device=device)
+        return grid_cache.get(
+            key, lambda: self._grid_points(featmap_size, stride, device))
+
+    def _grid_points(self, featmap_size, stride, device):
         feat_h, feat_w = featmap_size
         shift_x = torch.arange(0., feat_w, device=device) * stride
         shift_y = torch.arange(0., feat_h, device=device) * stride
@@ -22,6 +29,12 @@ class PointGenerator(object):
         return all_points
 
     def valid_flags(self, featmap_size, valid_size, device='cuda'):
+        key = grid_cache_key(
+            'point_flags', featmap_size, tuple(valid_size), device=device)
+        return grid_cache.get(
+            key, lambda: self._valid_flags(featmap_size, valid_size, device))
+
+    def _valid_flags(self, featmap_size, valid_size, device):
         feat_h, feat_w = featmap_size
         valid_h, valid_w = valid_size
         assert valid_h <= feat_h and valid_w <= feat_w
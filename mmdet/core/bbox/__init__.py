@@ -1,6 +1,6 @@
 from .assigners import AssignResult, BaseAssigner, MaxIoUAssigner, MaxIoUUDAssigner
 from .bbox_target import bbox_target, soft_bbox_target
-from .geometry import bbox_overlaps, soft_overlaps
+from .geometry import bbox_overlaps, mask_overlaps, soft_overlaps
 from .samplers import (BaseSampler, CombinedSampler,
                        InstanceBalancedPosSampler, IoUBalancedNegSampler,
                        PseudoSampler, RandomSampler, SamplingResult)
@@ -18,5 +18,6 @@ __all__ = [
     'SamplingResult', 'build_assigner', 'build_sampler', 'assign_and_sample',
     'bbox2delta', 'delta2bbox', 'bbox_flip', 'bbox_mapping', 'soft_overlaps',
     'bbox_mapping_back', 'bbox2roi', 'roi2bbox', 'bbox2result',
-    'distance2bbox', 'bbox_target', 'assign_and_sample_mask','soft_bbox_target'
+    'distance2bbox', 'bbox_target', 'assign_and_sample_mask',
+    'soft_bbox_target', 'mask_overlaps'
 ]
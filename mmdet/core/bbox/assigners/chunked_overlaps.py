@@ -0,0 +1,141 @@
+import torch
+
+from ..geometry import bbox_overlaps
+
+# Number of bboxes whose overlaps with all gts are computed at once by the
+# max IoU assigners, which bounds the (k, n) overlaps and the (k, n, 2)
+# intermediates of bbox_overlaps on large anchor sets.
+MAX_IOU_CHUNK_SIZE = 65536
+
+
+def gt_overlaps_fn(gt_bboxes,
+                   bboxes,
+                   gt_bboxes_ignore=None,
+                   ignore_iof_thr=-1,
+                   ignore_wrt_candidates=True):
+    """Get a function computing the overlaps of gts with a chunk of bboxes.
+
+    The overlaps of bboxes ignored due to ``gt_bboxes_ignore`` are set to -1.
+
+    Returns:
+        callable: ``overlaps_fn(start, end)`` which returns the overlaps
+            between the gts and ``bboxes[start:end]``, of shape (k, end-start).
+    """
+    with_ignore = (
+        ignore_iof_thr > 0 and gt_bboxes_ignore is not None
+        and gt_bboxes_ignore.numel() > 0)
+
+    def overlaps_fn(start, end):
+        chunk = bboxes[start:end]
+        overlaps = bbox_overlaps(gt_bboxes, chunk)
+        if with_ignore:
+            if ignore_wrt_candidates:
+                ignore_overlaps = bbox_overlaps(
+                    chunk, gt_bboxes_ignore, mode='iof')
+                ignore_max_overlaps, _ = ignore_overlaps.max(dim=1)
+            else:
+                ignore_overlaps = bbox_overlaps(
+                    gt_bboxes_ignore, chunk, mode='iof')
+                ignore_max_overlaps, _ = ignore_overlaps.max(dim=0)
+            overlaps[:, ignore_max_overlaps > ignore_iof_thr] = -1
+        return overlaps
+
+    return overlaps_fn
+
+
+def max_overlaps_chunked(overlaps_fn,
+                         num_bboxes,
+                         chunk_size=MAX_IOU_CHUNK_SIZE,
+                         min_pos_iou=None):
+    """Reduce the overlaps of gts and bboxes computed chunk by chunk.
+
+    The overlaps of each chunk of bboxes are reduced to the max overlaps of
+    its bboxes and the running max overlaps of the gts, so only the overlaps
+    of a single chunk are kept in memory at a time.
+
+    Args:
+        overlaps_fn (callable): ``overlaps_fn(start, end)`` returns the
+            overlaps between all gts and the bboxes ``start:end``.
+        num_bboxes (int): Number of bboxes.
+        chunk_size (int): Number of bboxes of each chunk.
+        min_pos_iou (float, optional): If given, also collect the (gt, bbox)
+            pairs in which the bbox reaches the max overlap of the gt, for
+            gts whose max overlap is at least ``min_pos_iou``.
+
+    Returns:
+        tuple: ``(max_overlaps, argmax_overlaps, gt_max_overlaps,
+            gt_argmax_overlaps, gt_max_pairs)``, the same as ``max(dim=0)``
+            and ``max(dim=1)`` of the full overlaps, ``gt_max_pairs`` is a
+            (gt indices, bbox indices) tuple or None.
+    """
+    max_overlaps, argmax_overlaps = [], []
+    gt_max_overlaps, gt_argmax_overlaps = None, None
+    pair_gt_inds, pair_bbox_inds, pair_overlaps = [], [], []
+    for start in range(0, num_bboxes, chunk_size):
+        overlaps = overlaps_fn(start, min(start + chunk_size, num_bboxes))
+        chunk_max, chunk_argmax = overlaps.max(dim=0)
+        max_overlaps.append(chunk_max)
+        argmax_overlaps.append(chunk_argmax)
+
+        chunk_gt_max, chunk_gt_argmax = overlaps.max(dim=1)
+        chunk_gt_argmax += start
+        if gt_max_overlaps is None:
+            gt_max_overlaps, gt_argmax_overlaps = chunk_gt_max, chunk_gt_argmax
+        else:
+            # ties keep the earlier bbox, like max() of the full overlaps
+            better = chunk_gt_max > gt_max_overlaps
+            gt_max_overlaps = torch.where(better, chunk_gt_max,
+                                          gt_max_overlaps)
+            gt_argmax_overlaps = torch.where(better, chunk_gt_argmax,
+                                             gt_argmax_overlaps)
+
+        if min_pos_iou is not None:
+            is_max = (overlaps == chunk_gt_max[:, None]) & (
+                chunk_gt_max[:, None] >= min_pos_iou)
+            gt_inds, bbox_inds = is_max.nonzero().t()
+            pair_gt_inds.append(gt_inds)
+            pair_bbox_inds.append(bbox_inds + start)
+            pair_overlaps.append(chunk_gt_max[gt_inds])
+
+    max_overlaps = torch.cat(max_overlaps)
+    argmax_overlaps = torch.cat(argmax_overlaps)
+    gt_max_pairs = None
+    if min_pos_iou is not None:
+        gt_inds = torch.cat(pair_gt_inds)
+        # keep the pairs of the chunks that reach the max of all chunks
+        valid = torch.cat(pair_overlaps) == gt_max_overlaps[gt_inds]
+        gt_max_pairs = (gt_inds[valid], torch.cat(pair_bbox_inds)[valid])
+    return (max_overlaps, argmax_overlaps, gt_max_overlaps, gt_argmax_overlaps,
+            gt_max_pairs)
+
+
+def assign_gt_max(assigned_gt_inds, gt_max_overlaps, gt_argmax_overlaps,
+                  gt_max_pairs, min_pos_iou, gt_max_assign_all):
+    """Assign each gt to its nearest bboxes in place, for all gts at once.
+
+    The same as assigning the gts one by one in a loop, in which a bbox
+    nearest to several gts is assigned to the last of them.
+
+    Args:
+        assigned_gt_inds (Tensor): Assigned (1-based) gt of each bbox.
+        gt_max_overlaps (Tensor): Max overlap of each gt, shape (k, ).
+        gt_argmax_overlaps (Tensor): Index of the nearest bbox of each gt.
+        gt_max_pairs (tuple[Tensor]): (gt indices, bbox indices) of all
+            bboxes reaching the max overlap of a gt, see
+            :func:`max_overlaps_chunked`. Only used if ``gt_max_assign_all``.
+        min_pos_iou (float): Minimum max overlap of the gts to assign.
+        gt_max_assign_all (bool): Whether to assign all the nearest bboxes of
+            a gt or only the first of them.
+    """
+    if gt_max_assign_all:
+        gt_inds, bbox_inds = gt_max_pairs
+    else:
+        gt_inds = torch.nonzero(gt_max_overlaps >= min_pos_iou).view(-1)
+        bbox_inds = gt_argmax_overlaps[gt_inds]
+    if gt_inds.numel() == 0:
+        return
+    _, order = (bbox_inds * gt_max_overlaps.size(0) + gt_inds).sort()
+    gt_inds, bbox_inds = gt_inds[order], bbox_inds[order]
+    is_last = bbox_inds != torch.cat(
+        [bbox_inds[1:], bbox_inds.new_full((1, ), -1)])
+    assigned_gt_inds[bbox_inds[is_last]] = gt_inds[is_last] + 1
@@ -1,8 +1,9 @@
 import torch
 
-from ..geometry import bbox_overlaps
 from .assign_result import AssignResult
 from .base_assigner import BaseAssigner
+from .chunked_overlaps import (MAX_IOU_CHUNK_SIZE, assign_gt_max,
+                               gt_overlaps_fn, max_overlaps_chunked)
 
 
 class MaxIoUAssigner(BaseAssigner):
@@ -28,6 +29,8 @@ class MaxIoUAssigner(BaseAssigner):
             ignoring any bboxes.
         ignore_wrt_candidates (bool): Whether to compute the iof between
             `bboxes` and `gt_bboxes_ignore`, or the contrary.
+        chunk_size (int): Number of bboxes whose overlaps with the gts are
+            computed at once.
     """
 
     def __init__(self,
@@ -36,13 +39,15 @@ class MaxIoUAssigner(BaseAssigner):
                  min_pos_iou=.0,
                  gt_max_assign_all=True,
                  ignore_iof_thr=-1,
-                 ignore_wrt_candidates=True):
+                 ignore_wrt_candidates=True,
+                 chunk_size=MAX_IOU_CHUNK_SIZE):
         self.pos_iou_thr = pos_iou_thr
         self.neg_iou_thr = neg_iou_thr
         self.min_pos_iou = min_pos_iou
         self.gt_max_assign_all = gt_max_assign_all
         self.ignore_iof_thr = ignore_iof_thr
         self.ignore_wrt_candidates = ignore_wrt_candidates
+        self.chunk_size = chunk_size
 
     def assign(self, bboxes, gt_bboxes, gt_bboxes_ignore=None, gt_labels=None):
         """Assign gt to bboxes.
@@ -73,21 +78,13 @@ class MaxIoUAssigner(BaseAssigner):
         if bboxes.shape[0] == 0 or gt_bboxes.shape[0] == 0:
             raise ValueError('No gt or bboxes')
         bboxes = bboxes[:, :4]
-        overlaps = bbox_overlaps(gt_bboxes, bboxes)
-
-        if (self.ignore_iof_thr > 0) and (gt_bboxes_ignore is not None) and (
-                gt_bboxes_ignore.numel() > 0):
-            if self.ignore_wrt_candidates:
-                ignore_overlaps = bbox_overlaps(
-                    bboxes, gt_bboxes_ignore, mode='iof')
-                ignore_max_overlaps, _ = ignore_overlaps.max(dim=1)
-            else:
-                ignore_overlaps = bbox_overlaps(
-                    gt_bboxes_ignore, bboxes, mode='iof')
-                ignore_max_overlaps, _ = ignore_overlaps.max(dim=0)
-            overlaps[:, ignore_max_overlaps > self.ignore_iof_thr] = -1
-
-        assign_result = self.assign_wrt_overlaps(overlaps, gt_labels)
+        overlaps_fn = gt_overlaps_fn(gt_bboxes, bboxes, gt_bboxes_ignore,
+                                     self.ignore_iof_thr,
+                                     self.ignore_wrt_candidates)
+        overlap_maxima = max_overlaps_chunked(
+            overlaps_fn, bboxes.size(0), self.chunk_size,
+            self.min_pos_iou if self.gt_max_assign_all else None)
+        assign_result = self.assign_wrt_max_overlaps(overlap_maxima, gt_labels)
         return assign_result
 
     def assign_wrt_overlaps(self, overlaps, gt_labels=None):
@@ -103,20 +100,31 @@ class MaxIoUAssigner(BaseAssigner):
         """
         if overlaps.numel() == 0:
             raise ValueError('No gt or proposals')
+        overlap_maxima = max_overlaps_chunked(
+            lambda start, end: overlaps[:, start:end], overlaps.size(1),
+            overlaps.size(1),
+            self.min_pos_iou if self.gt_max_assign_all else None)
+        return self.assign_wrt_max_overlaps(overlap_maxima, gt_labels)
 
-        num_gts, num_bboxes = overlaps.size(0), overlaps.size(1)
+    def assign_wrt_max_overlaps(self, overlap_maxima, gt_labels=None):
+        """Assign w.r.t. the max overlaps of bboxes and gts.
 
-        # 1. assign -1 by default
-        assigned_gt_inds = overlaps.new_full((num_bboxes, ),
-                                             -1,
-                                             dtype=torch.long)
+        Args:
+            overlap_maxima (tuple): The max overlaps of bboxes and gts, see
+                :func:`max_overlaps_chunked`.
+            gt_labels (Tensor, optional): Labels of k gt_bboxes, shape (k, ).
+
+        Returns:
+            :obj:`AssignResult`: The assign result.
+        """
+        (max_overlaps, argmax_overlaps, gt_max_overlaps, gt_argmax_overlaps,
+         gt_max_pairs) = overlap_maxima
+        num_gts, num_bboxes = gt_max_overlaps.size(0), max_overlaps.size(0)
 
-        # for each anchor, which gt best overlaps with it
-        # for each anchor, the max iou of all gts
-        max_overlaps, argmax_overlaps = overlaps.max(dim=0)
-        # for each gt, which anchor best overlaps with it
-        # for each gt, the max iou of all proposals
-        gt_max_overlaps, gt_argmax_overlaps = overlaps.max(dim=1)
+        # 1. assign -1 by default
+        assigned_gt_inds = max_overlaps.new_full((num_bboxes, ),
+                                                 -1,
+                                                 dtype=torch.long)
 
         # 2. assign negative: below
         if isinstance(self.neg_iou_thr, float):
@@ -132,13 +140,8 @@ class MaxIoUAssigner(BaseAssigner):
         assigned_gt_inds[pos_inds] = argmax_overlaps[pos_inds] + 1
 
         # 4. assign fg: for each gt, proposals with highest IoU
-        for i in range(num_gts):
-            if gt_max_overlaps[i] >= self.min_pos_iou:
-                if self.gt_max_assign_all:
-                    max_iou_inds = overlaps[i, :] == gt_max_overlaps[i]
-                    assigned_gt_inds[max_iou_inds] = i + 1
-                else:
-                    assigned_gt_inds[gt_argmax_overlaps[i]] = i + 1
+        assign_gt_max(assigned_gt_inds, gt_max_overlaps, gt_argmax_overlaps,
+                      gt_max_pairs, self.min_pos_iou, self.gt_max_assign_all)
 
         if gt_labels is not None:
             assigned_labels = assigned_gt_inds.new_zeros((num_bboxes, ))
@@ -154,5 +157,4 @@ class MaxIoUAssigner(BaseAssigner):
         # return AssignResult(
         #     num_gts, assigned_gt_inds, max_overlaps, labels=assigned_labels)
         return AssignResult(
-            num_gts, assigned_gt_inds, argmax_overlaps, labels=assigned_labels
-        )
+            num_gts, assigned_gt_inds, argmax_overlaps, labels=assigned_labels)
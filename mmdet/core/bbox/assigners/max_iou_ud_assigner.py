@@ -1,9 +1,11 @@
 import torch
 import math
 
-from ..geometry import bbox_overlaps, soft_overlaps
+from ..geometry import soft_overlaps
 from .assign_result import AssignResult
 from .base_assigner import BaseAssigner
+from .chunked_overlaps import (MAX_IOU_CHUNK_SIZE, assign_gt_max,
+                               gt_overlaps_fn, max_overlaps_chunked)
 
 
 class MaxIoUUDAssigner(BaseAssigner):
@@ -29,6 +31,8 @@ class MaxIoUUDAssigner(BaseAssigner):
             ignoring any bboxes.
         ignore_wrt_candidates (bool): Whether to compute the iof between
             `bboxes` and `gt_bboxes_ignore`, or the contrary.
+        chunk_size (int): Number of bboxes whose overlaps with the gts are
+            computed at once.
     """
 
     def __init__(self,
@@ -39,7 +43,8 @@ class MaxIoUUDAssigner(BaseAssigner):
                  center_iou_thr=0.02,
                  gt_max_assign_all=True,
                  ignore_iof_thr=-1,
-                 ignore_wrt_candidates=True):
+                 ignore_wrt_candidates=True,
+                 chunk_size=MAX_IOU_CHUNK_SIZE):
         self.pos_iou_thr = pos_iou_thr
         self.neg_iou_thr = neg_iou_thr
         self.min_pos_iou = min_pos_iou
@@ -48,6 +53,7 @@ class MaxIoUUDAssigner(BaseAssigner):
         self.gt_max_assign_all = gt_max_assign_all
         self.ignore_iof_thr = ignore_iof_thr
         self.ignore_wrt_candidates = ignore_wrt_candidates
+        self.chunk_size = chunk_size
 
     def assign(self, bboxes, gt_bboxes, gt_bboxes_ignore=None, gt_labels=None):
         """Assign gt to bboxes.
@@ -78,57 +84,52 @@ class MaxIoUUDAssigner(BaseAssigner):
         if bboxes.shape[0] == 0 or gt_bboxes.shape[0] == 0:
             raise ValueError('No gt or bboxes')
         bboxes = bboxes[:, :4]
-        gt_bboxes_center = (gt_bboxes[:,0:2] + gt_bboxes[:,2:])/2.0
-        H_W = gt_bboxes[:,2:] - gt_bboxes[:,0:2]
-        x1_y1 = gt_bboxes_center - H_W * math.sqrt(self.area_ratio)/2.0
-        x2_y2 = gt_bboxes_center + H_W * math.sqrt(self.area_ratio)/2.0
-        gt_center_bboxes = torch.cat([x1_y1, x2_y2],dim=1)
-        overlaps = bbox_overlaps(gt_bboxes, bboxes)
-        overlaps_center = soft_overlaps(gt_center_bboxes, bboxes)
-
-        if (self.ignore_iof_thr > 0) and (gt_bboxes_ignore is not None) and (
-                gt_bboxes_ignore.numel() > 0):
-            if self.ignore_wrt_candidates:
-                ignore_overlaps = bbox_overlaps(
-                    bboxes, gt_bboxes_ignore, mode='iof')
-                ignore_max_overlaps, _ = ignore_overlaps.max(dim=1)
-            else:
-                ignore_overlaps = bbox_overlaps(
-                    gt_bboxes_ignore, bboxes, mode='iof')
-                ignore_max_overlaps, _ = ignore_overlaps.max(dim=0)
-            overlaps[:, ignore_max_overlaps > self.ignore_iof_thr] = -1
-
-        assign_result = self.assign_wrt_multi_overlaps(overlaps, overlaps_center, gt_labels)
+        gt_bboxes_center = (gt_bboxes[:, 0:2] + gt_bboxes[:, 2:]) / 2.0
+        H_W = gt_bboxes[:, 2:] - gt_bboxes[:, 0:2]
+        x1_y1 = gt_bboxes_center - H_W * math.sqrt(self.area_ratio) / 2.0
+        x2_y2 = gt_bboxes_center + H_W * math.sqrt(self.area_ratio) / 2.0
+        gt_center_bboxes = torch.cat([x1_y1, x2_y2], dim=1)
+        overlaps_fn = gt_overlaps_fn(gt_bboxes, bboxes, gt_bboxes_ignore,
+                                     self.ignore_iof_thr,
+                                     self.ignore_wrt_candidates)
+        overlap_maxima = max_overlaps_chunked(
+            overlaps_fn, bboxes.size(0), self.chunk_size,
+            self.min_pos_iou if self.gt_max_assign_all else None)
+        max_overlaps_center = torch.cat([
+            soft_overlaps(gt_center_bboxes,
+                          bboxes[start:start + self.chunk_size]).max(dim=0)[0]
+            for start in range(0, bboxes.size(0), self.chunk_size)
+        ])
+
+        assign_result = self.assign_wrt_multi_overlaps(overlap_maxima,
+                                                       max_overlaps_center,
+                                                       gt_labels)
         return assign_result
 
-    def assign_wrt_multi_overlaps(self, overlaps, overlaps_center, gt_labels=None):
-        """Assign w.r.t. the overlaps of bboxes with gts.
+    def assign_wrt_multi_overlaps(self,
+                                  overlap_maxima,
+                                  max_overlaps_center,
+                                  gt_labels=None):
+        """Assign w.r.t. the max overlaps of bboxes with gts.
 
         Args:
-            overlaps (Tensor): Overlaps between k gt_bboxes and n bboxes,
-                shape(k, n).
+            overlap_maxima (tuple): The max overlaps of bboxes and gts, see
+                :func:`max_overlaps_chunked`.
+            max_overlaps_center (Tensor): Max overlap of each bbox with the
+                center regions of the gts, shape (n, ).
             gt_labels (Tensor, optional): Labels of k gt_bboxes, shape (k, ).
 
         Returns:
             :obj:`AssignResult`: The assign result.
         """
-        if overlaps.numel() == 0:
-            raise ValueError('No gt or proposals')
-
-        num_gts, num_bboxes = overlaps.size(0), overlaps.size(1)
+        (max_overlaps, argmax_overlaps, gt_max_overlaps, gt_argmax_overlaps,
+         gt_max_pairs) = overlap_maxima
+        num_gts, num_bboxes = gt_max_overlaps.size(0), max_overlaps.size(0)
 
         # 1. assign -1 by default
-        assigned_gt_inds = overlaps.new_full((num_bboxes, ),
-                                             -1,
-                                             dtype=torch.long)
-
-        # for each anchor, which gt best overlaps with it
-        # for each anchor, the max iou of all gts
-        max_overlaps, argmax_overlaps = overlaps.max(dim=0)
-        max_overlaps_center, argmax_overlaps_center = overlaps_center.max(dim=0)
-        # for each gt, which anchor best overlaps with it
-        # for each gt, the max iou of all proposals
-        gt_max_overlaps, gt_argmax_overlaps = overlaps.max(dim=1)
+        assigned_gt_inds = max_overlaps.new_full((num_bboxes, ),
+                                                 -1,
+                                                 dtype=torch.long)
 
         # 2. assign negative: below
         if isinstance(self.neg_iou_thr, float):
@@ -138,9 +139,8 @@ class MaxIoUUDAssigner(BaseAssigner):
             assert len(self.neg_iou_thr) == 2
             assigned_gt_inds[(max_overlaps >= self.neg_iou_thr[0])
                              & (max_overlaps < self.neg_iou_thr[1])] = 0
-        print((assigned_gt_inds==0).sum())
-        print(((assigned_gt_inds==0) & (max_overlaps_center>=self.center_iou_thr)).sum())
-        ambiguous_inds = (assigned_gt_inds==0) & (max_overlaps_center>=self.center_iou_thr)
+        ambiguous_inds = (assigned_gt_inds == 0) & (
+            max_overlaps_center >= self.center_iou_thr)
         assigned_gt_inds[ambiguous_inds] = -2
         # ambiguous_inds_gt = argmax_overlaps[ambiguous_inds]
         # 3. assign positive: above positive IoU threshold
@@ -148,13 +148,8 @@ class MaxIoUUDAssigner(BaseAssigner):
         assigned_gt_inds[pos_inds] = argmax_overlaps[pos_inds] + 1
 
         # 4. assign fg: for each gt, proposals with highest IoU
-        for i in range(num_gts):
-            if gt_max_overlaps[i] >= self.min_pos_iou:
-                if self.gt_max_assign_all:
-                    max_iou_inds = overlaps[i, :] == gt_max_overlaps[i]
-                    assigned_gt_inds[max_iou_inds] = i + 1
-                else:
-                    assigned_gt_inds[gt_argmax_overlaps[i]] = i + 1
+        assign_gt_max(assigned_gt_inds, gt_max_overlaps, gt_argmax_overlaps,
+                      gt_max_pairs, self.min_pos_iou, self.gt_max_assign_all)
 
         if gt_labels is not None:
             assigned_labels = assigned_gt_inds.new_zeros((num_bboxes, ))
@@ -170,5 +165,8 @@ class MaxIoUUDAssigner(BaseAssigner):
         # return AssignResult(
         #     num_gts, assigned_gt_inds, max_overlaps, labels=assigned_labels)
         return AssignResult(
-            num_gts, assigned_gt_inds, argmax_overlaps, labels=assigned_labels,
+            num_gts,
+            assigned_gt_inds,
+            argmax_overlaps,
+            labels=assigned_labels,
         )
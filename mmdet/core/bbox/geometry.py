@@ -1,3 +1,4 @@
+import cv2
 import torch
 import numpy as np
 
@@ -36,7 +37,7 @@ def soft_overlaps(bboxes1, bboxes2, is_aligned=False):
 
         area2 = (bboxes2[:, 2] - bboxes2[:, 0] + 1) * (
                 bboxes2[:, 3] - bboxes2[:, 1] + 1)
-        area_ratio1 = overlap/area1
+        area_ratio1 = overlap/area1[:, None]
         area_ratio2 = overlap/area2
 
 
@@ -107,31 +108,64 @@ def bbox_overlaps(bboxes1, bboxes2, mode='iou', is_aligned=False):
 
 def mask_overlaps(pos_proposals, pos_assigned_gt_inds, gt_masks):
     """Compute area ratio of the gt mask inside the proposal and the gt
-    mask of the corresponding instance"""
+    mask of the corresponding instance.
+
+    An integral image (summed-area table) is computed once for each assigned
+    gt mask, over the region covered by its proposals, and the mask areas
+    inside all proposals are looked up at their 4 corners at once.
+
+    Args:
+        pos_proposals (Tensor): Proposals of shape (n, 4).
+        pos_assigned_gt_inds (Tensor): Assigned gt indices of the proposals.
+        gt_masks (ndarray): Binary gt masks of shape (k, h, w), of uint8 or
+            bool.
+
+    Returns:
+        Tensor: Area ratios of shape (n, ).
+    """
     if len(pos_proposals.size()) == 1:
         pos_proposals = pos_proposals[None, :]
     num_pos = pos_proposals.size(0)
-    if num_pos > 0:
-        area_ratios = []
-        proposals_np = pos_proposals.cpu().numpy()
-        pos_assigned_gt_inds = pos_assigned_gt_inds.cpu().numpy()
-        if len(proposals_np.shape) == 1:
-            proposals_np = proposals_np[None, :]
-        # compute mask areas of gt instances (batch processing for speedup)
-        gt_instance_mask_area = np.array([gt_mask.sum((-1, -2)) for gt_mask in gt_masks])
-        for i in range(num_pos):
-            ind = pos_assigned_gt_inds[i]
-            gt_mask = gt_masks[ind]
-
-            # crop the gt mask inside the proposal
-            x1, y1, x2, y2 = proposals_np[i, :].astype(np.int32)
-            gt_mask_in_proposal = gt_mask[y1:y2 + 1, x1:x2 + 1]
-
-            ratio = gt_mask_in_proposal.sum() / (
-                    gt_instance_mask_area[ind] + 1e-7)
-            area_ratios.append(ratio)
-        area_ratios = torch.from_numpy(np.stack(area_ratios)).float().to(
-            pos_proposals.device)
-    else:
-        area_ratios = pos_proposals.new_zeros((0,))
-    return area_ratios
\ No newline at end of file
+    if num_pos == 0:
+        return pos_proposals.new_zeros((0, ))
+    bboxes = pos_proposals[:, :4].cpu().numpy().astype(np.int32)
+    pos_assigned_gt_inds = pos_assigned_gt_inds.cpu().numpy()
+    img_h, img_w = gt_masks[0].shape
+    # crop the boxes like numpy slicing, as half-open ranges in the masks
+    x1 = np.clip(bboxes[:, 0], 0, img_w)
+    y1 = np.clip(bboxes[:, 1], 0, img_h)
+    x2 = np.minimum(np.maximum(bboxes[:, 2] + 1, x1), img_w)
+    y2 = np.minimum(np.maximum(bboxes[:, 3] + 1, y1), img_h)
+
+    integrals = []
+    offsets = np.zeros(num_pos, dtype=np.int64)
+    widths = np.zeros(num_pos, dtype=np.int64)
+    gt_areas = np.zeros(num_pos, dtype=np.float32)
+    num_pixels = 0
+    for gt_ind in np.unique(pos_assigned_gt_inds):
+        inds = np.flatnonzero(pos_assigned_gt_inds == gt_ind)
+        left, top = x1[inds].min(), y1[inds].min()
+        right, bottom = x2[inds].max(), y2[inds].max()
+        gt_mask = gt_masks[gt_ind]
+        # cv2.integral does not accept bool masks
+        crop = gt_mask[top:bottom, left:right].astype(np.uint8, copy=False)
+        integral = cv2.integral(np.ascontiguousarray(crop), sdepth=cv2.CV_32S)
+        integrals.append(integral.ravel())
+        # shift the boxes into the region of the integral image
+        x1[inds] -= left
+        x2[inds] -= left
+        y1[inds] -= top
+        y2[inds] -= top
+        offsets[inds] = num_pixels
+        widths[inds] = integral.shape[1]
+        gt_areas[inds] = np.count_nonzero(gt_mask)
+        num_pixels += integral.size
+    integrals = np.concatenate(integrals)
+
+    areas = (
+        integrals[offsets + y2 * widths + x2] -
+        integrals[offsets + y1 * widths + x2] -
+        integrals[offsets + y2 * widths + x1] +
+        integrals[offsets + y1 * widths + x1])
+    area_ratios = areas / (gt_areas + 1e-7)
+    return torch.from_numpy(area_ratios).float().to(pos_proposals.device)
@@ -4,7 +4,8 @@ from .class_names import (coco_classes, dataset_aliases, get_classes,
 from .coco_utils import coco_eval, fast_eval_recall, results2json
 from .eval_hooks import (CocoDistEvalmAPHook, CocoDistEvalRecallHook,
                          DistEvalHook, DistEvalmAPHook)
-from .mean_ap import average_precision, eval_map, print_map_summary
+from .mean_ap import (MeanAPEvaluator, average_precision, eval_map,
+                      print_map_summary)
 from .recall import (eval_recalls, plot_iou_recall, plot_num_recall,
                      print_recall_summary)
 
@@ -13,6 +14,6 @@ __all__ = [
     'coco_classes', 'dataset_aliases', 'get_classes', 'coco_eval',
     'fast_eval_recall', 'results2json', 'DistEvalHook', 'DistEvalmAPHook',
     'CocoDistEvalRecallHook', 'CocoDistEvalmAPHook', 'average_precision',
-    'eval_map', 'print_map_summary', 'eval_recalls', 'print_recall_summary',
-    'plot_num_recall', 'plot_iou_recall'
+    'eval_map', 'MeanAPEvaluator', 'print_map_summary', 'eval_recalls',
+    'print_recall_summary', 'plot_num_recall', 'plot_iou_recall'
 ]
@@ -1,14 +1,26 @@
 import numpy as np
 
 
-def bbox_overlaps(bboxes1, bboxes2, mode='iou'):
+def bbox_overlaps(bboxes1,
+                  bboxes2,
+                  mode='iou',
+                  dtype=np.float32,
+                  max_elems=2**16):
     """Calculate the ious between each bbox of bboxes1 and bboxes2.
 
+    The ious are computed by broadcasting blocks of rows of the smaller set
+    against the larger one, ``max_elems`` caps the size of the intermediate
+    arrays so that large (n, k) matrices neither blow up the memory nor fall
+    out of the cache.
+
     Args:
         bboxes1(ndarray): shape (n, 4)
         bboxes2(ndarray): shape (k, 4)
         mode(str): iou (intersection over union) or iof (intersection
             over foreground)
+        dtype(np.dtype): data type used for the computation and the ious,
+            e.g. np.float64 for higher precision
+        max_elems(int): max number of elements of an intermediate array
 
     Returns:
         ious(ndarray): shape (n, k)
@@ -16,34 +28,48 @@ def bbox_overlaps(bboxes1, bboxes2, mode='iou'):
 
     assert mode in ['iou', 'iof']
 
-    bboxes1 = bboxes1.astype(np.float32)
-    bboxes2 = bboxes2.astype(np.float32)
+    bboxes1 = bboxes1.astype(dtype)
+    bboxes2 = bboxes2.astype(dtype)
     rows = bboxes1.shape[0]
     cols = bboxes2.shape[0]
-    ious = np.zeros((rows, cols), dtype=np.float32)
     if rows * cols == 0:
-        return ious
-    exchange = False
-    if bboxes1.shape[0] > bboxes2.shape[0]:
-        bboxes1, bboxes2 = bboxes2, bboxes1
-        ious = np.zeros((cols, rows), dtype=np.float32)
-        exchange = True
+        return np.zeros((rows, cols), dtype=dtype)
     area1 = (bboxes1[:, 2] - bboxes1[:, 0] + 1) * (
         bboxes1[:, 3] - bboxes1[:, 1] + 1)
     area2 = (bboxes2[:, 2] - bboxes2[:, 0] + 1) * (
         bboxes2[:, 3] - bboxes2[:, 1] + 1)
-    for i in range(bboxes1.shape[0]):
-        x_start = np.maximum(bboxes1[i, 0], bboxes2[:, 0])
-        y_start = np.maximum(bboxes1[i, 1], bboxes2[:, 1])
-        x_end = np.minimum(bboxes1[i, 2], bboxes2[:, 2])
-        y_end = np.minimum(bboxes1[i, 3], bboxes2[:, 3])
-        overlap = np.maximum(x_end - x_start + 1, 0) * np.maximum(
-            y_end - y_start + 1, 0)
+    exchange = False
+    if rows > cols:
+        bboxes1, bboxes2 = bboxes2, bboxes1
+        area1, area2 = area2, area1
+        rows, cols = cols, rows
+        exchange = True
+    ious = np.zeros((rows, cols), dtype=dtype)
+    x1, y1, x2, y2 = [np.ascontiguousarray(bboxes2[:, i]) for i in range(4)]
+    block_rows = max(max_elems // cols, 1)
+    for start in range(0, rows, block_rows):
+        end = min(start + block_rows, rows)
+        block = bboxes1[start:end, None, :]
+        x_start = np.maximum(block[..., 0], x1)
+        y_start = np.maximum(block[..., 1], y1)
+        w = np.minimum(block[..., 2], x2)
+        h = np.minimum(block[..., 3], y2)
+        w -= x_start
+        w += 1
+        np.maximum(w, 0, out=w)
+        h -= y_start
+        h += 1
+        np.maximum(h, 0, out=h)
+        overlap = np.multiply(w, h, out=w)
         if mode == 'iou':
-            union = area1[i] + area2 - overlap
+            union = area1[start:end, None] + area2
+            union -= overlap
+        elif exchange:
+            # the foreground is always bboxes1, i.e. the columns here
+            union = area2
         else:
-            union = area1[i] if not exchange else area2
-        ious[i, :] = overlap / union
+            union = area1[start:end, None]
+        np.divide(overlap, union, out=ious[start:end])
     if exchange:
         ious = ious.T
     return ious
@@ -11,13 +11,22 @@ from pycocotools.cocoeval import COCOeval
 from torch.utils.data import Dataset
 
 from mmdet import datasets
+from ..utils import collect_results
 from .coco_utils import fast_eval_recall, results2json
 from .mean_ap import eval_map
 
 
 class DistEvalHook(Hook):
+    """Evaluate the model on a dataset with all ranks.
 
-    def __init__(self, dataset, interval=1):
+    Args:
+        dataset (Dataset | dict): The dataset or its config.
+        interval (int): Evaluation interval (by epochs).
+        tmpdir (str, optional): Directory shared by all ranks to collect the
+            results through files, they are gathered in memory by default.
+    """
+
+    def __init__(self, dataset, interval=1, tmpdir=None):
         if isinstance(dataset, Dataset):
             self.dataset = dataset
         elif isinstance(dataset, dict):
@@ -27,12 +36,13 @@ class DistEvalHook(Hook):
                 'dataset must be a Dataset object or a dict, not {}'.format(
                     type(dataset)))
         self.interval = interval
+        self.tmpdir = tmpdir
 
     def after_train_epoch(self, runner):
         if not self.every_n_epochs(runner, self.interval):
             return
         runner.model.eval()
-        results = [None for _ in range(len(self.dataset))]
+        results = []
         if runner.rank == 0:
             prog_bar = mmcv.ProgressBar(len(self.dataset))
         for idx in range(runner.rank, len(self.dataset), runner.world_size):
@@ -45,28 +55,19 @@ class DistEvalHook(Hook):
             with torch.no_grad():
                 result = runner.model(
                     return_loss=False, rescale=True, **data_gpu)
-            results[idx] = result
+            results.append(result)
 
             batch_size = runner.world_size
             if runner.rank == 0:
                 for _ in range(batch_size):
                     prog_bar.update()
 
+        # the images of a rank are sampled in the same way as the
+        # DistributedSampler without shuffling
+        results = collect_results(results, len(self.dataset), self.tmpdir)
         if runner.rank == 0:
             print('\n')
-            dist.barrier()
-            for i in range(1, runner.world_size):
-                tmp_file = osp.join(runner.work_dir, 'temp_{}.pkl'.format(i))
-                tmp_results = mmcv.load(tmp_file)
-                for idx in range(i, len(results), runner.world_size):
-                    results[idx] = tmp_results[idx]
-                os.remove(tmp_file)
             self.evaluate(runner, results)
-        else:
-            tmp_file = osp.join(runner.work_dir,
-                                'temp_{}.pkl'.format(runner.rank))
-            mmcv.dump(results, tmp_file)
-            dist.barrier()
         dist.barrier()
 
     def evaluate(self):
@@ -119,9 +120,10 @@ class CocoDistEvalRecallHook(DistEvalHook):
                  dataset,
                  interval=1,
                  proposal_nums=(100, 300, 1000),
-                 iou_thrs=np.arange(0.5, 0.96, 0.05)):
+                 iou_thrs=np.arange(0.5, 0.96, 0.05),
+                 tmpdir=None):
         super(CocoDistEvalRecallHook, self).__init__(
-            dataset, interval=interval)
+            dataset, interval=interval, tmpdir=tmpdir)
         self.proposal_nums = np.array(proposal_nums, dtype=np.int32)
         self.iou_thrs = np.array(iou_thrs, dtype=np.float32)
 
@@ -1,3 +1,5 @@
+from multiprocessing import Pool
+
 import mmcv
 import numpy as np
 from terminaltables import AsciiTable
@@ -32,8 +34,7 @@ def average_precision(recalls, precisions, mode='area'):
         ones = np.ones((num_scales, 1), dtype=recalls.dtype)
         mrec = np.hstack((zeros, recalls, ones))
         mpre = np.hstack((zeros, precisions, zeros))
-        for i in range(mpre.shape[1] - 1, 0, -1):
-            mpre[:, i - 1] = np.maximum(mpre[:, i - 1], mpre[:, i])
+        mpre = np.maximum.accumulate(mpre[:, ::-1], axis=1)[:, ::-1]
         for i in range(num_scales):
             ind = np.where(mrec[i, 1:] != mrec[i, :-1])[0]
             ap[i] = np.sum(
@@ -93,10 +94,17 @@ def tpfp_imagenet(det_bboxes,
     gt_h = gt_bboxes[:, 3] - gt_bboxes[:, 1] + 1
     iou_thrs = np.minimum((gt_w * gt_h) / ((gt_w + 10.0) * (gt_h + 10.0)),
                           default_iou_thr)
-    # sort all detections by scores in descending order
+    det_areas = (det_bboxes[:, 2] - det_bboxes[:, 0] + 1) * (
+        det_bboxes[:, 3] - det_bboxes[:, 1] + 1)
+    # gts that each det bbox may match, ious of other pairs are set to -1
+    ious[ious < iou_thrs] = -1
+    # sort all detections by scores in descending order, only those that may
+    # match a gt need to be checked one by one
     sort_inds = np.argsort(-det_bboxes[:, -1])
+    sort_inds = sort_inds[(ious[sort_inds] >= 0).any(axis=1)]
     for k, (min_area, max_area) in enumerate(area_ranges):
         gt_covered = np.zeros(num_gts, dtype=bool)
+        det_matched = np.zeros(num_dets, dtype=bool)
         # if no area range is specified, gt_area_ignore is all False
         if min_area is None:
             gt_area_ignore = np.zeros_like(gt_ignore, dtype=bool)
@@ -104,33 +112,27 @@ def tpfp_imagenet(det_bboxes,
             gt_areas = gt_w * gt_h
             gt_area_ignore = (gt_areas < min_area) | (gt_areas >= max_area)
         for i in sort_inds:
-            max_iou = -1
-            matched_gt = -1
-            # find best overlapped available gt
-            for j in range(num_gts):
-                # different from PASCAL VOC: allow finding other gts if the
-                # best overlaped ones are already matched by other det bboxes
-                if gt_covered[j]:
-                    continue
-                elif ious[i, j] >= iou_thrs[j] and ious[i, j] > max_iou:
-                    max_iou = ious[i, j]
-                    matched_gt = j
-            # there are 4 cases for a det bbox:
-            # 1. it matches a gt, tp = 1, fp = 0
-            # 2. it matches an ignored gt, tp = 0, fp = 0
-            # 3. it matches no gt and within area range, tp = 0, fp = 1
-            # 4. it matches no gt but is beyond area range, tp = 0, fp = 0
-            if matched_gt >= 0:
-                gt_covered[matched_gt] = 1
-                if not (gt_ignore[matched_gt] or gt_area_ignore[matched_gt]):
-                    tp[k, i] = 1
-            elif min_area is None:
-                fp[k, i] = 1
-            else:
-                bbox = det_bboxes[i, :4]
-                area = (bbox[2] - bbox[0] + 1) * (bbox[3] - bbox[1] + 1)
-                if area >= min_area and area < max_area:
-                    fp[k, i] = 1
+            # find best overlapped available gt, different from PASCAL VOC:
+            # allow finding other gts if the best overlaped ones are already
+            # matched by other det bboxes
+            det_ious = np.where(gt_covered, -1, ious[i])
+            matched_gt = det_ious.argmax()
+            if det_ious[matched_gt] < 0:
+                continue
+            gt_covered[matched_gt] = True
+            det_matched[i] = True
+            if not (gt_ignore[matched_gt] or gt_area_ignore[matched_gt]):
+                tp[k, i] = 1
+        # there are 4 cases for a det bbox:
+        # 1. it matches a gt, tp = 1, fp = 0
+        # 2. it matches an ignored gt, tp = 0, fp = 0
+        # 3. it matches no gt and within area range, tp = 0, fp = 1
+        # 4. it matches no gt but is beyond area range, tp = 0, fp = 0
+        if min_area is None:
+            fp[k, ~det_matched] = 1
+        else:
+            fp[k, ~det_matched & (det_areas >= min_area) &
+               (det_areas < max_area)] = 1
     return tp, fp
 
 
@@ -147,7 +149,6 @@ def tpfp_default(det_bboxes, gt_bboxes, gt_ignore, iou_thr, area_ranges=None):
         tuple: (tp, fp), two arrays whose elements are 0 and 1
     """
     num_dets = det_bboxes.shape[0]
-    num_gts = gt_bboxes.shape[0]
     if area_ranges is None:
         area_ranges = [(None, None)]
     num_scales = len(area_ranges)
@@ -169,9 +170,11 @@ def tpfp_default(det_bboxes, gt_bboxes, gt_ignore, iou_thr, area_ranges=None):
     ious = bbox_overlaps(det_bboxes, gt_bboxes)
     ious_max = ious.max(axis=1)
     ious_argmax = ious.argmax(axis=1)
+    det_areas = (det_bboxes[:, 2] - det_bboxes[:, 0] + 1) * (
+        det_bboxes[:, 3] - det_bboxes[:, 1] + 1)
     sort_inds = np.argsort(-det_bboxes[:, -1])
+    det_matched = ious_max >= iou_thr
     for k, (min_area, max_area) in enumerate(area_ranges):
-        gt_covered = np.zeros(num_gts, dtype=bool)
         # if no area range is specified, gt_area_ignore is all False
         if min_area is None:
             gt_area_ignore = np.zeros_like(gt_ignore, dtype=bool)
@@ -179,23 +182,22 @@ def tpfp_default(det_bboxes, gt_bboxes, gt_ignore, iou_thr, area_ranges=None):
             gt_areas = (gt_bboxes[:, 2] - gt_bboxes[:, 0] + 1) * (
                 gt_bboxes[:, 3] - gt_bboxes[:, 1] + 1)
             gt_area_ignore = (gt_areas < min_area) | (gt_areas >= max_area)
-        for i in sort_inds:
-            if ious_max[i] >= iou_thr:
-                matched_gt = ious_argmax[i]
-                if not (gt_ignore[matched_gt] or gt_area_ignore[matched_gt]):
-                    if not gt_covered[matched_gt]:
-                        gt_covered[matched_gt] = True
-                        tp[k, i] = 1
-                    else:
-                        fp[k, i] = 1
-                # otherwise ignore this detected bbox, tp = 0, fp = 0
-            elif min_area is None:
-                fp[k, i] = 1
-            else:
-                bbox = det_bboxes[i, :4]
-                area = (bbox[2] - bbox[0] + 1) * (bbox[3] - bbox[1] + 1)
-                if area >= min_area and area < max_area:
-                    fp[k, i] = 1
+        gt_valid = ~(gt_ignore.astype(bool) | gt_area_ignore)
+        # among det bboxes (in descending score order) matched to the same
+        # valid gt, the first one is tp and the others are fp, det bboxes
+        # matched to an ignored gt are neither tp nor fp
+        det_valid = det_matched & gt_valid[ious_argmax]
+        valid_inds = sort_inds[det_valid[sort_inds]]
+        _, first_inds = np.unique(ious_argmax[valid_inds], return_index=True)
+        fp[k, valid_inds] = 1
+        fp[k, valid_inds[first_inds]] = 0
+        tp[k, valid_inds[first_inds]] = 1
+        # det bboxes matched to no gt are fp if they are within area range
+        if min_area is None:
+            fp[k, ~det_matched] = 1
+        else:
+            fp[k, ~det_matched & (det_areas >= min_area) &
+               (det_areas < max_area)] = 1
     return tp, fp
 
 
@@ -217,6 +219,145 @@ def get_cls_results(det_results, gt_bboxes, gt_labels, gt_ignore, class_id):
     return cls_dets, cls_gts, cls_gt_ignore
 
 
+def get_cls_tpfp(cls_dets,
+                 cls_gts,
+                 cls_gt_ignore,
+                 iou_thr,
+                 area_ranges=None,
+                 dataset=None):
+    """Calculate tp and fp of a certain class on a list of images.
+
+    Args:
+        cls_dets (list): det bboxes of this class in each image.
+        cls_gts (list): gt bboxes of this class in each image.
+        cls_gt_ignore (list): gt ignore indicators of each image.
+        iou_thr (float): IoU threshold
+        area_ranges (list or None): gt bbox area ranges
+        dataset (None or str or list): see :func:`eval_map`.
+
+    Returns:
+        tuple: (tp, fp, scores, num_gts), tp and fp are of shape
+            (num_scales, num_dets) and ordered as the det bboxes of all
+            images concatenated, num_gts is the number of gts of each scale
+            (gts ignored or beyond scale are not counted).
+    """
+    tpfp_func = (tpfp_imagenet if dataset in ['det', 'vid'] else tpfp_default)
+    num_scales = len(area_ranges) if area_ranges is not None else 1
+    tp, fp = [], []
+    num_gts = np.zeros(num_scales, dtype=int)
+    for dets, gts, gt_ignore in zip(cls_dets, cls_gts, cls_gt_ignore):
+        tp_, fp_ = tpfp_func(dets, gts, gt_ignore, iou_thr, area_ranges)
+        tp.append(tp_)
+        fp.append(fp_)
+        if area_ranges is None:
+            num_gts[0] += np.sum(np.logical_not(gt_ignore))
+        else:
+            gt_areas = (gts[:, 2] - gts[:, 0] + 1) * (
+                gts[:, 3] - gts[:, 1] + 1)
+            for k, (min_area, max_area) in enumerate(area_ranges):
+                num_gts[k] += np.sum(
+                    np.logical_not(gt_ignore) & (gt_areas >= min_area)
+                    & (gt_areas < max_area))
+    scores = np.hstack([dets[:, -1] for dets in cls_dets])
+    return np.hstack(tp), np.hstack(fp), scores, num_gts
+
+
+def get_img_tpfp(det_result,
+                 gt_bboxes,
+                 gt_labels,
+                 gt_ignore=None,
+                 iou_thr=0.5,
+                 area_ranges=None,
+                 dataset=None):
+    """Calculate tp and fp of all classes on a single image.
+
+    Returns:
+        list: results of :func:`get_cls_tpfp` for each class.
+    """
+    if gt_labels.ndim > 1:
+        gt_labels = gt_labels[:, 0]
+    gt_ignore = [gt_ignore] if gt_ignore is not None else None
+    img_tpfp = []
+    for i in range(len(det_result)):
+        cls_dets, cls_gts, cls_gt_ignore = get_cls_results([det_result],
+                                                           [gt_bboxes],
+                                                           [gt_labels],
+                                                           gt_ignore, i)
+        img_tpfp.append(
+            get_cls_tpfp(cls_dets, cls_gts, cls_gt_ignore, iou_thr,
+                         area_ranges, dataset))
+    return img_tpfp
+
+
+def get_cls_eval_result(tp,
+                        fp,
+                        scores,
+                        num_gts,
+                        scale_ranges=None,
+                        dataset=None):
+    """Calculate recall, precision and AP of a certain class.
+
+    Args:
+        tp, fp, scores, num_gts: outputs of :func:`get_cls_tpfp`.
+        scale_ranges (list, optional): [(min1, max1), (min2, max2), ...]
+        dataset (None or str or list): see :func:`eval_map`.
+
+    Returns:
+        dict: num_gts, num_dets, recall, precision and ap of this class.
+    """
+    num_dets = scores.shape[0]
+    # sort all det bboxes by score, also sort tp and fp
+    sort_inds = np.argsort(-scores)
+    tp = tp[:, sort_inds]
+    fp = fp[:, sort_inds]
+    # calculate recall and precision with tp and fp
+    tp = np.cumsum(tp, axis=1)
+    fp = np.cumsum(fp, axis=1)
+    eps = np.finfo(np.float32).eps
+    recalls = tp / np.maximum(num_gts[:, np.newaxis], eps)
+    precisions = tp / np.maximum((tp + fp), eps)
+    # calculate AP
+    if scale_ranges is None:
+        recalls = recalls[0, :]
+        precisions = precisions[0, :]
+        num_gts = num_gts.item()
+    mode = 'area' if dataset != 'voc07' else '11points'
+    ap = average_precision(recalls, precisions, mode)
+    return {
+        'num_gts': num_gts,
+        'num_dets': num_dets,
+        'recall': recalls,
+        'precision': precisions,
+        'ap': ap
+    }
+
+
+def get_mean_ap(eval_results, scale_ranges=None):
+    """Average the APs of classes that have gts.
+
+    Returns:
+        float or list: mAP, or mAP of each scale if scale_ranges is given.
+    """
+    if scale_ranges is not None:
+        # shape (num_classes, num_scales)
+        all_ap = np.vstack([cls_result['ap'] for cls_result in eval_results])
+        all_num_gts = np.vstack(
+            [cls_result['num_gts'] for cls_result in eval_results])
+        mean_ap = []
+        for i in range(len(scale_ranges)):
+            if np.any(all_num_gts[:, i] > 0):
+                mean_ap.append(all_ap[all_num_gts[:, i] > 0, i].mean())
+            else:
+                mean_ap.append(0.0)
+    else:
+        aps = []
+        for cls_result in eval_results:
+            if cls_result['num_gts'] > 0:
+                aps.append(cls_result['ap'])
+        mean_ap = np.array(aps).mean().item() if aps else 0.0
+    return mean_ap
+
+
 def eval_map(det_results,
              gt_bboxes,
              gt_labels,
@@ -224,7 +365,8 @@ def eval_map(det_results,
              scale_ranges=None,
              iou_thr=0.5,
              dataset=None,
-             print_summary=True):
+             print_summary=True,
+             nproc=4):
     """Evaluate mAP of a dataset.
 
     Args:
@@ -239,6 +381,8 @@ def eval_map(det_results,
             are minor differences in metrics for different datsets, e.g.
             "voc07", "imagenet_det", etc.
         print_summary (bool): whether to print the mAP summary
+        nproc (int): number of processes that evaluate classes in parallel,
+            classes are evaluated in the current process if it is 1.
 
     Returns:
         tuple: (mAP, [dict, dict, ...])
@@ -250,86 +394,121 @@ def eval_map(det_results,
             assert len(gt_labels[i]) == len(gt_ignore[i])
     area_ranges = ([(rg[0]**2, rg[1]**2) for rg in scale_ranges]
                    if scale_ranges is not None else None)
-    num_scales = len(scale_ranges) if scale_ranges is not None else 1
-    eval_results = []
     num_classes = len(det_results[0])  # positive class num
     gt_labels = [
         label if label.ndim == 1 else label[:, 0] for label in gt_labels
     ]
-    for i in range(num_classes):
-        # get gt and det bboxes of this class
-        cls_dets, cls_gts, cls_gt_ignore = get_cls_results(
-            det_results, gt_bboxes, gt_labels, gt_ignore, i)
-        # calculate tp and fp for each image
-        tpfp_func = (
-            tpfp_imagenet if dataset in ['det', 'vid'] else tpfp_default)
-        tpfp = [
-            tpfp_func(cls_dets[j], cls_gts[j], cls_gt_ignore[j], iou_thr,
-                      area_ranges) for j in range(len(cls_dets))
-        ]
-        tp, fp = tuple(zip(*tpfp))
-        # calculate gt number of each scale, gts ignored or beyond scale
-        # are not counted
-        num_gts = np.zeros(num_scales, dtype=int)
-        for j, bbox in enumerate(cls_gts):
-            if area_ranges is None:
-                num_gts[0] += np.sum(np.logical_not(cls_gt_ignore[j]))
-            else:
-                gt_areas = (bbox[:, 2] - bbox[:, 0] + 1) * (
-                    bbox[:, 3] - bbox[:, 1] + 1)
-                for k, (min_area, max_area) in enumerate(area_ranges):
-                    num_gts[k] += np.sum(
-                        np.logical_not(cls_gt_ignore[j])
-                        & (gt_areas >= min_area) & (gt_areas < max_area))
-        # sort all det bboxes by score, also sort tp and fp
-        cls_dets = np.vstack(cls_dets)
-        num_dets = cls_dets.shape[0]
-        sort_inds = np.argsort(-cls_dets[:, -1])
-        tp = np.hstack(tp)[:, sort_inds]
-        fp = np.hstack(fp)[:, sort_inds]
-        # calculate recall and precision with tp and fp
-        tp = np.cumsum(tp, axis=1)
-        fp = np.cumsum(fp, axis=1)
-        eps = np.finfo(np.float32).eps
-        recalls = tp / np.maximum(num_gts[:, np.newaxis], eps)
-        precisions = tp / np.maximum((tp + fp), eps)
-        # calculate AP
-        if scale_ranges is None:
-            recalls = recalls[0, :]
-            precisions = precisions[0, :]
-            num_gts = num_gts.item()
-        mode = 'area' if dataset != 'voc07' else '11points'
-        ap = average_precision(recalls, precisions, mode)
-        eval_results.append({
-            'num_gts': num_gts,
-            'num_dets': num_dets,
-            'recall': recalls,
-            'precision': precisions,
-            'ap': ap
-        })
-    if scale_ranges is not None:
-        # shape (num_classes, num_scales)
-        all_ap = np.vstack([cls_result['ap'] for cls_result in eval_results])
-        all_num_gts = np.vstack(
-            [cls_result['num_gts'] for cls_result in eval_results])
-        mean_ap = []
-        for i in range(num_scales):
-            if np.any(all_num_gts[:, i] > 0):
-                mean_ap.append(all_ap[all_num_gts[:, i] > 0, i].mean())
-            else:
-                mean_ap.append(0.0)
+    # get gt and det bboxes of each class
+    cls_args = [
+        get_cls_results(det_results, gt_bboxes, gt_labels, gt_ignore, i) +
+        (iou_thr, area_ranges, dataset) for i in range(num_classes)
+    ]
+    # calculate tp and fp of each class
+    if nproc > 1 and num_classes > 1:
+        pool = Pool(min(nproc, num_classes))
+        cls_tpfps = pool.starmap(get_cls_tpfp, cls_args)
+        pool.close()
+        pool.join()
     else:
-        aps = []
-        for cls_result in eval_results:
-            if cls_result['num_gts'] > 0:
-                aps.append(cls_result['ap'])
-        mean_ap = np.array(aps).mean().item() if aps else 0.0
+        cls_tpfps = [get_cls_tpfp(*args) for args in cls_args]
+    eval_results = [
+        get_cls_eval_result(*cls_tpfp, scale_ranges, dataset)
+        for cls_tpfp in cls_tpfps
+    ]
+    mean_ap = get_mean_ap(eval_results, scale_ranges)
     if print_summary:
         print_map_summary(mean_ap, eval_results, dataset)
 
     return mean_ap, eval_results
 
 
+class MeanAPEvaluator(object):
+    """Evaluate mAP as the results of a dataset stream in.
+
+    Instead of keeping the results and annotations of the whole dataset as
+    :func:`eval_map` does, tp and fp of each image are calculated once it is
+    added, and only tp, fp and scores are kept. With ``nproc > 1`` they are
+    calculated by a pool of worker processes, which overlaps the evaluation
+    with the inference. The arguments are the same as :func:`eval_map`.
+
+    Example:
+        >>> evaluator = MeanAPEvaluator(len(dataset.CLASSES),
+        >>>                             dataset=dataset.CLASSES)
+        >>> for result, gt_bboxes, gt_labels in zip(results, gts, labels):
+        >>>     evaluator.add(result, gt_bboxes, gt_labels)
+        >>> mean_ap, eval_results = evaluator.evaluate()
+    """
+
+    def __init__(self,
+                 num_classes,
+                 scale_ranges=None,
+                 iou_thr=0.5,
+                 dataset=None,
+                 nproc=4):
+        self.num_classes = num_classes
+        self.scale_ranges = scale_ranges
+        self.area_ranges = ([(rg[0]**2, rg[1]**2) for rg in scale_ranges]
+                            if scale_ranges is not None else None)
+        self.iou_thr = iou_thr
+        self.dataset = dataset
+        self.pool = Pool(nproc) if nproc > 1 else None
+        self.img_tpfps = []
+
+    def __len__(self):
+        return len(self.img_tpfps)
+
+    def add(self, det_result, gt_bboxes, gt_labels, gt_ignore=None):
+        """Add the det result and annotations of an image.
+
+        Args:
+            det_result (list): det bboxes of each class, [cls1_det, ...]
+            gt_bboxes (ndarray): ground truth bboxes of shape (K, 4)
+            gt_labels (ndarray): ground truth labels of shape (K, )
+            gt_ignore (ndarray, optional): gt ignore indicators of shape (K, )
+        """
+        assert len(det_result) == self.num_classes
+        if gt_ignore is not None:
+            assert len(gt_ignore) == len(gt_labels)
+        args = (det_result, gt_bboxes, gt_labels, gt_ignore, self.iou_thr,
+                self.area_ranges, self.dataset)
+        if self.pool is None:
+            self.img_tpfps.append(get_img_tpfp(*args))
+        else:
+            self.img_tpfps.append(self.pool.apply_async(get_img_tpfp, args))
+
+    def evaluate(self, print_summary=True):
+        """Calculate mAP of all the images added so far.
+
+        The worker processes are shut down when their results are collected,
+        images added afterwards are evaluated in the current process.
+
+        Returns:
+            tuple: (mAP, [dict, dict, ...])
+        """
+        assert len(self) > 0, 'no image has been added'
+        if self.pool is not None:
+            self.img_tpfps = [
+                img_tpfp if isinstance(img_tpfp, list) else img_tpfp.get()
+                for img_tpfp in self.img_tpfps
+            ]
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        eval_results = []
+        for i in range(self.num_classes):
+            tp, fp, scores, num_gts = zip(
+                *[img_tpfp[i] for img_tpfp in self.img_tpfps])
+            eval_results.append(
+                get_cls_eval_result(
+                    np.hstack(tp), np.hstack(fp), np.hstack(scores),
+                    np.sum(num_gts, axis=0), self.scale_ranges, self.dataset))
+        mean_ap = get_mean_ap(eval_results, self.scale_ranges)
+        if print_summary:
+            print_map_summary(mean_ap, eval_results, self.dataset)
+
+        return mean_ap, eval_results
+
+
 def print_map_summary(mean_ap, results, dataset=None):
     """Print mAP and results of each class.
 
@@ -1,10 +1,13 @@
 import copy
+from collections import OrderedDict
 
 import torch
+import torch.distributed as dist
 import torch.nn as nn
-from mmcv.runner import OptimizerHook
+from mmcv.runner import OptimizerHook, get_dist_info
+from torch._utils import _flatten_dense_tensors, _unflatten_dense_tensors
 
-from ..utils.dist_utils import allreduce_grads
+from .loss_scaler import build_loss_scaler
 from .utils import cast_tensor_type
 
 
@@ -18,10 +21,22 @@ class Fp16OptimizerHook(OptimizerHook):
     3. Update fp32 weights.
     4. Copy updated parameters from fp32 weights to fp16 model.
 
+    The fp32 weights and their gradients are views of flat buffers, and the
+    parameters of the fp16 model are views of a flat buffer of each dtype
+    (the normalization layers stay in fp32), so that each copy, the
+    allreduce, the overflow check and the unscaling are single ops.
+
+    With a dynamic loss scale, iterations whose gradients overflow skip the
+    update, and the loss scale and whether the gradients overflowed are
+    added to the log buffer as ``loss_scale`` and ``grad_overflow``.
+
     Refer to https://arxiv.org/abs/1710.03740 for more details.
 
     Args:
-        loss_scale (float): Scale factor multiplied with loss.
+        loss_scale (float | str | dict): Scale factor multiplied with loss,
+            "dynamic" for a dynamic loss scale, or the args of a
+            :class:`LossScaler`, e.g. ``dict(mode='dynamic',
+            init_scale=512.)``.
     """
 
     def __init__(self,
@@ -33,28 +48,86 @@ class Fp16OptimizerHook(OptimizerHook):
         self.grad_clip = grad_clip
         self.coalesce = coalesce
         self.bucket_size_mb = bucket_size_mb
-        self.loss_scale = loss_scale
+        self.loss_scaler = build_loss_scaler(loss_scale)
         self.distributed = distributed
 
+    @property
+    def loss_scale(self):
+        return self.loss_scaler.loss_scale
+
     def before_run(self, runner):
         # keep a copy of fp32 weights
         runner.optimizer.param_groups = copy.deepcopy(
             runner.optimizer.param_groups)
         # convert model to fp16
         wrap_fp16_model(runner.model)
-
-    def copy_grads_to_fp32(self, fp16_net, fp32_weights):
+        self.fp32_weights = []
+        for param_group in runner.optimizer.param_groups:
+            self.fp32_weights += param_group['params']
+        self.fp16_params = list(runner.model.parameters())
+        assert len(self.fp16_params) == len(self.fp32_weights)
+        self._flatten_params()
+
+    def _flatten_params(self):
+        """Make the parameters and the fp32 grads views of flat buffers.
+
+        The fp16 model parameters are grouped by dtype, and the fp32 weights
+        are laid out in the same order so that the part of the fp32 buffer
+        of each group is contiguous.
+        """
+        groups = OrderedDict()
+        for i, param in enumerate(self.fp16_params):
+            groups.setdefault(param.dtype, []).append(i)
+        self.param_groups = list(groups.values())
+        order = [i for inds in self.param_groups for i in inds]
+
+        fp32_weights = [self.fp32_weights[i] for i in order]
+        self.flat_fp32 = _flatten_dense_tensors(
+            [param.data for param in fp32_weights]).float()
+        self.flat_fp32_grad = torch.zeros_like(self.flat_fp32)
+        self.fp32_grads = [None] * len(self.fp32_weights)
+        offset = 0
+        for i, param in zip(order, fp32_weights):
+            numel = param.numel()
+            param.data = self.flat_fp32[offset:offset + numel].view_as(param)
+            self.fp32_grads[i] = self.flat_fp32_grad[offset:offset +
+                                                     numel].view_as(param)
+            offset += numel
+
+        self.flat_fp16 = []
+        for inds in self.param_groups:
+            params = [self.fp16_params[i] for i in inds]
+            flat = _flatten_dense_tensors([param.data for param in params])
+            for param, view in zip(params,
+                                   _unflatten_dense_tensors(flat, params)):
+                param.data = view
+            self.flat_fp16.append(flat)
+
+    def copy_grads_to_fp32(self):
         """Copy gradients from fp16 model to fp32 weight copy."""
-        for fp32_param, fp16_param in zip(fp32_weights, fp16_net.parameters()):
-            if fp16_param.grad is not None:
-                if fp32_param.grad is None:
-                    fp32_param.grad = fp32_param.data.new(fp32_param.size())
-                fp32_param.grad.copy_(fp16_param.grad)
-
-    def copy_params_to_fp16(self, fp16_net, fp32_weights):
+        offset = 0
+        for inds in self.param_groups:
+            grads = []
+            for i in inds:
+                fp16_param = self.fp16_params[i]
+                fp32_param = self.fp32_weights[i]
+                if fp16_param.grad is None:
+                    # no gradient, so that the optimizer skips the weight
+                    grads.append(fp16_param.new_zeros(fp16_param.size()))
+                    fp32_param.grad = None
+                else:
+                    grads.append(fp16_param.grad.data)
+                    fp32_param.grad = self.fp32_grads[i]
+            flat = _flatten_dense_tensors(grads)
+            self.flat_fp32_grad[offset:offset + flat.numel()].copy_(flat)
+            offset += flat.numel()
+
+    def copy_params_to_fp16(self):
         """Copy updated params from fp32 weight copy to fp16 model."""
-        for fp16_param, fp32_param in zip(fp16_net.parameters(), fp32_weights):
-            fp16_param.data.copy_(fp32_param.data)
+        offset = 0
+        for flat in self.flat_fp16:
+            flat.copy_(self.flat_fp32[offset:offset + flat.numel()])
+            offset += flat.numel()
 
     def after_train_iter(self, runner):
         # clear grads of last iteration
@@ -64,23 +137,28 @@ class Fp16OptimizerHook(OptimizerHook):
         scaled_loss = runner.outputs['loss'] * self.loss_scale
         scaled_loss.backward()
         # copy fp16 grads in the model to fp32 params in the optimizer
-        fp32_weights = []
-        for param_group in runner.optimizer.param_groups:
-            fp32_weights += param_group['params']
-        self.copy_grads_to_fp32(runner.model, fp32_weights)
+        self.copy_grads_to_fp32()
         # allreduce grads
         if self.distributed:
-            allreduce_grads(fp32_weights, self.coalesce, self.bucket_size_mb)
-        # scale the gradients back
-        for param in fp32_weights:
-            if param.grad is not None:
-                param.grad.div_(self.loss_scale)
-        if self.grad_clip is not None:
-            self.clip_grads(fp32_weights)
-        # update fp32 params
-        runner.optimizer.step()
-        # copy fp32 params to the fp16 model
-        self.copy_params_to_fp16(runner.model, fp32_weights)
+            _, world_size = get_dist_info()
+            dist.all_reduce(self.flat_fp32_grad.div_(world_size))
+        overflow = False
+        if self.loss_scaler.dynamic:
+            overflow = not bool(torch.isfinite(self.flat_fp32_grad).all())
+            runner.log_buffer.update({
+                'loss_scale': self.loss_scale,
+                'grad_overflow': float(overflow)
+            })
+        if not overflow:
+            # scale the gradients back
+            self.flat_fp32_grad.div_(self.loss_scale)
+            if self.grad_clip is not None:
+                self.clip_grads(self.fp32_weights)
+            # update fp32 params
+            runner.optimizer.step()
+            # copy fp32 params to the fp16 model
+            self.copy_params_to_fp16()
+        self.loss_scaler.update_scale(overflow)
 
 
 def wrap_fp16_model(model):
@@ -0,0 +1,63 @@
+class LossScaler(object):
+    """Loss scale of fp16 training, either static or dynamic.
+
+    A dynamic loss scale is divided by ``scale_factor`` on every iteration
+    whose gradients overflow (whose update is then skipped), and multiplied
+    by ``scale_factor`` after every ``scale_window`` iterations without
+    overflow.
+
+    Args:
+        init_scale (float): Initial loss scale.
+        mode (str): "static" or "dynamic".
+        scale_factor (float): Factor to change a dynamic loss scale by.
+        scale_window (int): Number of iterations without overflow after
+            which a dynamic loss scale is increased.
+        min_scale (float): Minimum dynamic loss scale.
+    """
+
+    def __init__(self,
+                 init_scale=2**32,
+                 mode='dynamic',
+                 scale_factor=2.,
+                 scale_window=1000,
+                 min_scale=1.):
+        assert mode in ['static', 'dynamic']
+        self.loss_scale = float(init_scale)
+        self.mode = mode
+        self.scale_factor = scale_factor
+        self.scale_window = scale_window
+        self.min_scale = min_scale
+        self.num_iters = 0
+        self.last_overflow_iter = -1
+
+    @property
+    def dynamic(self):
+        return self.mode == 'dynamic'
+
+    def update_scale(self, overflow):
+        """Update the loss scale after an iteration."""
+        if self.dynamic:
+            if overflow:
+                self.loss_scale = max(self.loss_scale / self.scale_factor,
+                                      self.min_scale)
+                self.last_overflow_iter = self.num_iters
+            elif (self.num_iters -
+                  self.last_overflow_iter) % self.scale_window == 0:
+                self.loss_scale *= self.scale_factor
+        self.num_iters += 1
+
+
+def build_loss_scaler(cfg):
+    """Build a LossScaler from a number (static), "dynamic" or a dict."""
+    if isinstance(cfg, LossScaler):
+        return cfg
+    elif isinstance(cfg, (int, float)):
+        return LossScaler(init_scale=cfg, mode='static')
+    elif cfg == 'dynamic':
+        return LossScaler()
+    elif isinstance(cfg, dict):
+        return LossScaler(**cfg)
+    else:
+        raise TypeError(
+            'loss_scale must be a number, "dynamic" or a dict, but got '
+            '{}'.format(cfg))
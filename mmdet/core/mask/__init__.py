@@ -1,4 +1,8 @@
 from .mask_target import mask_target, mask_bg_target
-from .utils import split_combined_polys
+from .utils import (encode_box_masks, paste_masks_in_boxes,
+                    split_combined_polys)
 
-__all__ = ['split_combined_polys', 'mask_target', 'mask_bg_target']
+__all__ = [
+    'split_combined_polys', 'mask_target', 'mask_bg_target',
+    'paste_masks_in_boxes', 'encode_box_masks'
+]
@@ -3,31 +3,19 @@ import numpy as np
 import torch
 from torch.nn.modules.utils import _pair
 
+
 def mask_bg_target(proposal_list, gt_mask_list, cfg):
-    cfg_list = [cfg for _ in range(len(proposal_list))]
-    mask_bg_targets = map(mask_bg_target_single, proposal_list, gt_mask_list, cfg_list)
-    mask_bg_targets = torch.cat(list(mask_bg_targets))
-    return mask_bg_targets
+    # the background targets are cropped from the last gt mask of each image
+    gt_inds_list = [
+        proposals.new_zeros((proposals.size(0), ), dtype=torch.long)
+        for proposals in proposal_list
+    ]
+    bg_mask_list = [gt_masks[-1:] for gt_masks in gt_mask_list]
+    return mask_target(proposal_list, gt_inds_list, bg_mask_list, cfg)
+
 
 def mask_bg_target_single(proposals, gt_masks, cfg):
-    mask_size = _pair(cfg.mask_size)
-    num = proposals.size(0)
-    mask_bg_targets = []
-    if num > 0:
-        proposals_np = proposals.cpu().numpy()
-        for i in range(num):
-            gt_bg_mask = gt_masks[-1]
-            bbox = proposals_np[i, :].astype(np.int32)
-            x1,y1,x2,y2 = bbox
-            w = np.maximum(x2-x1+1, 1)
-            h = np.maximum(y2-y1+1, 1)
-            target = mmcv.imresize(gt_bg_mask[y1:y1+h, x1:x1+w], mask_size[::-1])
-            mask_bg_targets.append(target)
-        mask_bg_targets = torch.from_numpy(np.stack(mask_bg_targets)).float().to(proposals.device)
-    else:
-        mask_bg_targets = proposals.new_zeros((0. ) + mask_size)
-
-    return mask_bg_targets
+    return mask_bg_target([proposals], [gt_masks], cfg)
 
 
 def mask_target(pos_proposals_list, pos_assigned_gt_inds_list, gt_masks_list,
@@ -40,25 +28,100 @@ def mask_target(pos_proposals_list, pos_assigned_gt_inds_list, gt_masks_list,
 
 
 def mask_target_single(pos_proposals, pos_assigned_gt_inds, gt_masks, cfg):
+    """Crop and resize the gt masks of the positives of an image.
+
+    On GPUs, the gt masks assigned to the positives are copied to the device
+    and the targets of all positives are sampled from them at once by
+    :func:`crop_and_resize_masks`, without a loop over the positives. On CPU
+    the random reads of the full-size masks make that slower than cropping
+    and resizing each positive with ``mmcv.imresize``, which is done instead.
+
+    Args:
+        pos_proposals (Tensor): Positive proposals of shape (n, 4).
+        pos_assigned_gt_inds (Tensor): Assigned gt indices of the positives.
+        gt_masks (ndarray | list[ndarray]): Binary gt masks of shape (h, w).
+        cfg (dict): Config with ``mask_size``.
+
+    Returns:
+        Tensor: Mask targets of shape (n, mask_h, mask_w).
+    """
     mask_size = _pair(cfg.mask_size)
     num_pos = pos_proposals.size(0)
+    if num_pos == 0:
+        return pos_proposals.new_zeros((0, ) + mask_size)
+    if pos_proposals.is_cuda:
+        gt_inds, mask_inds = pos_assigned_gt_inds.unique(return_inverse=True)
+        gt_masks = np.stack([gt_masks[i] for i in gt_inds.tolist()])
+        gt_masks = torch.from_numpy(gt_masks).to(pos_proposals.device)
+        return crop_and_resize_masks(gt_masks, pos_proposals, mask_inds,
+                                     mask_size)
+
     mask_targets = []
-    if num_pos > 0:
-        proposals_np = pos_proposals.cpu().numpy()
-        pos_assigned_gt_inds = pos_assigned_gt_inds.cpu().numpy()
-        for i in range(num_pos):
-            gt_mask = gt_masks[pos_assigned_gt_inds[i]]
-            bbox = proposals_np[i, :].astype(np.int32)
-            x1, y1, x2, y2 = bbox
-            w = np.maximum(x2 - x1 + 1, 1)
-            h = np.maximum(y2 - y1 + 1, 1)
-            # mask is uint8 both before and after resizing
-            # mask_size (h, w) to (w, h)
-            target = mmcv.imresize(gt_mask[y1:y1 + h, x1:x1 + w],
-                                   mask_size[::-1])
-            mask_targets.append(target)
-        mask_targets = torch.from_numpy(np.stack(mask_targets)).float().to(
-            pos_proposals.device)
-    else:
-        mask_targets = pos_proposals.new_zeros((0, ) + mask_size)
-    return mask_targets
+    proposals_np = pos_proposals.numpy().astype(np.int32)
+    pos_assigned_gt_inds = pos_assigned_gt_inds.numpy()
+    for i in range(num_pos):
+        gt_mask = gt_masks[pos_assigned_gt_inds[i]]
+        x1, y1, x2, y2 = proposals_np[i, :]
+        w = np.maximum(x2 - x1 + 1, 1)
+        h = np.maximum(y2 - y1 + 1, 1)
+        # mask is uint8 both before and after resizing
+        # mask_size (h, w) to (w, h)
+        target = mmcv.imresize(gt_mask[y1:y1 + h, x1:x1 + w], mask_size[::-1])
+        mask_targets.append(target)
+    return torch.from_numpy(np.stack(mask_targets)).float()
+
+
+def _sample_coords(starts, ends, size, out_size):
+    """Source coordinates of bilinear resizing like ``cv2.resize``.
+
+    Returns the two neighbouring source indices and the weight of the second
+    one of each output pixel, of shape (n, out_size).
+    """
+    crop_sizes = (ends.clamp(max=size) - starts).clamp(min=1).float()
+    scales = crop_sizes / out_size
+    centers = torch.arange(
+        out_size, dtype=torch.float32, device=starts.device) + 0.5
+    coords = centers[None, :] * scales[:, None] - 0.5
+    coords = torch.min(coords.clamp(min=0), crop_sizes[:, None] - 1)
+    low = coords.floor()
+    weights = coords - low
+    low = low.long()
+    high = torch.min(low + 1, crop_sizes[:, None].long() - 1)
+    return low + starts[:, None], high + starts[:, None], weights
+
+
+def crop_and_resize_masks(masks, bboxes, mask_inds, mask_size):
+    """Crop boxes from masks and resize them, RoIAlign with one sample.
+
+    Args:
+        masks (Tensor): Masks of shape (k, h, w).
+        bboxes (Tensor): Boxes of shape (n, 4), truncated to integers and
+            clipped to the masks like the numpy crop of ``mmcv.imresize``.
+        mask_inds (Tensor): Index of the mask of each box, of shape (n, ).
+        mask_size (tuple[int]): Output size (h, w).
+
+    Returns:
+        Tensor: Resized crops of shape (n, h, w) rounded to integers.
+    """
+    img_h, img_w = masks.shape[-2:]
+    bboxes = bboxes.long()
+    x1 = bboxes[:, 0].clamp(min=0)
+    y1 = bboxes[:, 1].clamp(min=0)
+    x2 = x1 + (bboxes[:, 2] - x1 + 1).clamp(min=1)
+    y2 = y1 + (bboxes[:, 3] - y1 + 1).clamp(min=1)
+    x_low, x_high, x_weights = _sample_coords(x1, x2, img_w, mask_size[1])
+    y_low, y_high, y_weights = _sample_coords(y1, y2, img_h, mask_size[0])
+
+    # take() on the flattened masks is much faster than advanced indexing
+    inds = (mask_inds.long() * (img_h * img_w))[:, None, None] + (
+        y_low * img_w)[:, :, None] + x_low[:, None, :]
+    x_steps = (x_high - x_low)[:, None, :]
+    y_steps = ((y_high - y_low) * img_w)[:, :, None]
+    masks = masks.view(-1)
+    top = masks.take(inds).float()
+    top += (masks.take(inds + x_steps) - top) * x_weights[:, None, :]
+    inds += y_steps
+    bottom = masks.take(inds).float()
+    bottom += (masks.take(inds + x_steps) - bottom) * x_weights[:, None, :]
+    targets = top + (bottom - top) * y_weights[:, :, None]
+    return (targets + 0.5).floor()
@@ -1,4 +1,17 @@
+import inspect
+
 import mmcv
+import numpy as np
+import pycocotools.mask as mask_util
+import torch
+import torch.nn.functional as F
+
+# align_corners is an argument of grid_sample since PyTorch 1.3, corners are
+# always aligned before that
+if 'align_corners' in inspect.signature(F.grid_sample).parameters:
+    _GRID_SAMPLE_KWARGS = dict(align_corners=True)
+else:
+    _GRID_SAMPLE_KWARGS = {}
 
 
 def split_combined_polys(polys, poly_lens, polys_per_mask):
@@ -28,3 +41,109 @@ def split_combined_polys(polys, poly_lens, polys_per_mask):
         mask_polys = mmcv.slice_list(split_polys, polys_per_mask_single)
         mask_polys_list.append(mask_polys)
     return mask_polys_list
+
+
+def paste_masks_in_boxes(masks, bboxes, thr=0.5, max_pixels=2**22):
+    """Resize masks to their boxes and binarize them.
+
+    Masks are resized by ``grid_sample`` in chunks whose outputs have at
+    most ``max_pixels`` pixels, the results are the same as resizing each
+    mask with ``mmcv.imresize`` (bilinear) but only the boxes are allocated
+    instead of the whole images.
+
+    Args:
+        masks (Tensor): Mask probabilities of shape (n, h, w).
+        bboxes (ndarray): Integer boxes (x1, y1, x2, y2) of shape (n, 4).
+        thr (float): Binarization threshold.
+        max_pixels (int): Maximum output pixels of a chunk.
+
+    Returns:
+        list[ndarray]: uint8 masks of shape (y2 - y1 + 1, x2 - x1 + 1).
+    """
+    num_masks = bboxes.shape[0]
+    mask_h, mask_w = masks.shape[-2:]
+    ws = np.maximum(bboxes[:, 2] - bboxes[:, 0] + 1, 1)
+    hs = np.maximum(bboxes[:, 3] - bboxes[:, 1] + 1, 1)
+    # group boxes of similar sizes so that little padding is computed
+    order = np.argsort(-ws * hs, kind='stable')
+    chunks = []
+    start = 0
+    while start < num_masks:
+        end = start + 1
+        max_h, max_w = hs[order[start]], ws[order[start]]
+        while end < num_masks:
+            new_h = max(max_h, hs[order[end]])
+            new_w = max(max_w, ws[order[end]])
+            if (end + 1 - start) * new_h * new_w > max_pixels:
+                break
+            max_h, max_w = new_h, new_w
+            end += 1
+        chunks.append((order[start:end], max_h, max_w))
+        start = end
+
+    box_masks = [None] * num_masks
+    for inds, out_h, out_w in chunks:
+        inds_t = torch.from_numpy(inds).to(masks.device)
+        scale_x = masks.new_tensor(mask_w / ws[inds])[:, None]
+        scale_y = masks.new_tensor(mask_h / hs[inds])[:, None]
+        # source pixels of the output pixels, as in cv2.resize
+        xs = (torch.arange(out_w).to(masks) + 0.5) * scale_x - 0.5
+        ys = (torch.arange(out_h).to(masks) + 0.5) * scale_y - 0.5
+        xs = xs / max(mask_w - 1, 1) * 2 - 1
+        ys = ys / max(mask_h - 1, 1) * 2 - 1
+        grid_x = xs[:, None, :].expand(-1, out_h, -1)
+        grid_y = ys[:, :, None].expand(-1, -1, out_w)
+        grid = torch.stack([grid_x, grid_y], dim=3)
+        out = F.grid_sample(
+            masks[inds_t][:, None],
+            grid,
+            padding_mode='border',
+            **_GRID_SAMPLE_KWARGS)
+        out = (out[:, 0] > thr).to(torch.uint8).cpu().numpy()
+        for j, ind in enumerate(inds):
+            box_masks[ind] = out[j, :hs[ind], :ws[ind]]
+    return box_masks
+
+
+def encode_box_masks(box_masks, bboxes, img_h, img_w):
+    """Encode box masks into RLEs of the whole image.
+
+    The run lengths are computed from the boxes only, so the results are the
+    same as those of ``mask_util.encode`` on full image masks without
+    rasterizing them.
+
+    Args:
+        box_masks (list[ndarray]): Binary masks of the boxes.
+        bboxes (ndarray): Integer boxes (x1, y1, x2, y2) of shape (n, 4).
+        img_h (int): Image height.
+        img_w (int): Image width.
+
+    Returns:
+        list[dict]: Encoded masks.
+    """
+    rles = []
+    for box_mask, bbox in zip(box_masks, bboxes):
+        x1, y1 = int(bbox[0]), int(bbox[1])
+        # clip the mask to the image
+        h, w = box_mask.shape
+        box_mask = box_mask[max(-y1, 0):min(h, img_h - y1),
+                            max(-x1, 0):min(w, img_w - x1)]
+        x1, y1 = max(x1, 0), max(y1, 0)
+        h, w = box_mask.shape
+        # the zero rows above and below the box split the columns of the
+        # box, runs only change inside them in column-major order
+        padded = np.zeros((h + 2, w), dtype=np.uint8)
+        padded[1:-1] = box_mask > 0
+        flat = padded.ravel(order='F')
+        changes = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+        cols, rows = np.divmod(changes, h + 2)
+        starts = (x1 + cols) * img_h + y1 + rows - 1
+        # a run ending at the bottom of a column goes on at the top of the
+        # next one when the box spans the whole image height
+        starts, num = np.unique(starts, return_counts=True)
+        starts = starts[(num == 1) & (starts < img_h * img_w)]
+        counts = np.diff(np.concatenate(([0], starts, [img_h * img_w])))
+        rles.append(dict(size=[img_h, img_w], counts=counts.tolist()))
+    if not rles:
+        return []
+    return mask_util.frPyObjects(rles, img_h, img_w)
@@ -1,8 +1,10 @@
-from .bbox_nms import multiclass_nms
-from .merge_augs import (merge_aug_bboxes, merge_aug_masks,
-                         merge_aug_proposals, merge_aug_scores)
+from .bbox_nms import batched_nms, multiclass_nms
+from .merge_augs import (fuse_bbox_results, merge_aug_bboxes, merge_aug_dets,
+                         merge_aug_masks, merge_aug_proposals,
+                         merge_aug_scores)
 
 __all__ = [
-    'multiclass_nms', 'merge_aug_proposals', 'merge_aug_bboxes',
-    'merge_aug_scores', 'merge_aug_masks'
+    'multiclass_nms', 'batched_nms', 'merge_aug_proposals', 'merge_aug_bboxes',
+    'merge_aug_scores', 'merge_aug_masks', 'merge_aug_dets',
+    'fuse_bbox_results'
 ]
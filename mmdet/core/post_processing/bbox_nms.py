@@ -1,8 +1,22 @@
 import torch
 
 from mmdet.ops.nms import nms_wrapper
+from ..utils.profiler import profiled
 
+# NMS ops that are run once for all classes, others (e.g. the sequential
+# soft_nms which rescans every remaining box) are always run per class.
+BATCHED_NMS_OPS = ('nms', 'wbf')
+# NMS ops that output new boxes (e.g. fused ones) instead of kept inputs.
+FUSION_NMS_OPS = ('wbf', )
+# Above these numbers of boxes a single class-offset NMS call becomes slower
+# than suppressing each class on its own, since the pairwise work of one call
+# grows quadratically with the total box number (much faster on CPU, where
+# the kernel is sequential).
+CPU_SPLIT_THR = 1000
+CUDA_SPLIT_THR = 10000
 
+
+@profiled('multiclass_nms')
 def multiclass_nms(multi_bboxes,
                    multi_scores,
                    score_thr,
@@ -26,40 +40,90 @@ def multiclass_nms(multi_bboxes,
         tuple: (bboxes, labels), tensors of shape (k, 5) and (k, 1). Labels
             are 0-based.
     """
-    num_classes = multi_scores.shape[1]
-    bboxes, labels = [], []
+    num_classes = multi_scores.size(1) - 1
+    # exclude background category
+    if multi_bboxes.shape[1] > 4:
+        bboxes = multi_bboxes.view(multi_scores.size(0), -1, 4)[:, 1:]
+    else:
+        bboxes = multi_bboxes[:, None].expand(-1, num_classes, 4)
+    scores = multi_scores[:, 1:]
+
+    # filter out boxes with low scores of all classes at once
+    valid_mask = scores > score_thr
+    if score_factors is not None:
+        scores = scores * score_factors[:, None]
+    bboxes = bboxes[valid_mask]
+    scores = scores[valid_mask]
+    labels = valid_mask.nonzero()[:, 1]
+
+    if bboxes.numel() == 0:
+        bboxes = multi_bboxes.new_zeros((0, 5))
+        labels = multi_bboxes.new_zeros((0, ), dtype=torch.long)
+        return bboxes, labels
+
+    if nms_cfg.get('type') == 'soft_nms' and max_num > 0:
+        # soft_nms selects boxes in descending score order, boxes of a class
+        # after the first max_num can never be in the top max_num
+        nms_cfg = dict(nms_cfg, max_num=max_num)
+    dets, keep = batched_nms(bboxes, scores, labels, nms_cfg)
+    labels = labels[keep]
+    if max_num > 0:
+        dets = dets[:max_num]
+        labels = labels[:max_num]
+
+    return dets, labels
+
+
+def batched_nms(bboxes, scores, labels, nms_cfg, split_thr=None):
+    """Performs NMS of boxes that belong to different classes.
+
+    Boxes of each class are shifted by an offset so that boxes of different
+    classes never overlap, then all classes are suppressed with a single NMS
+    call. When there are more than ``split_thr`` boxes or the NMS op is not
+    in ``BATCHED_NMS_OPS``, each class is suppressed separately instead.
+
+    Args:
+        bboxes (Tensor): shape (n, 4)
+        scores (Tensor): shape (n, )
+        labels (Tensor): shape (n, ), class index of each box.
+        nms_cfg (dict): NMS config, e.g. ``dict(type='nms', iou_thr=0.5)``.
+        split_thr (int, optional): box number above which classes are
+            suppressed one by one. Defaults to ``CPU_SPLIT_THR`` or
+            ``CUDA_SPLIT_THR`` according to the device of ``bboxes``.
+
+    Returns:
+        tuple: (dets, keep), dets of shape (k, 5) sorted by descending score,
+            and the indices of the kept boxes in the inputs (of the box each
+            cluster is formed around for ops in ``FUSION_NMS_OPS``).
+    """
     nms_cfg_ = nms_cfg.copy()
     nms_type = nms_cfg_.pop('type', 'nms')
     nms_op = getattr(nms_wrapper, nms_type)
-    for i in range(1, num_classes):
-        cls_inds = multi_scores[:, i] > score_thr
-        if not cls_inds.any():
-            continue
-        # get bboxes and scores of this class
-        if multi_bboxes.shape[1] == 4:
-            _bboxes = multi_bboxes[cls_inds, :]
+    if split_thr is None:
+        split_thr = CUDA_SPLIT_THR if bboxes.is_cuda else CPU_SPLIT_THR
+
+    if nms_type in BATCHED_NMS_OPS and bboxes.size(0) <= split_thr:
+        offsets = labels.to(bboxes) * (bboxes.max() - bboxes.min() + 1)
+        bboxes_for_nms = bboxes + offsets[:, None]
+        dets, keep = nms_op(
+            torch.cat([bboxes_for_nms, scores[:, None]], dim=1), **nms_cfg_)
+        if nms_type in FUSION_NMS_OPS:
+            # fused boxes are made of boxes of the same class, shift them back
+            dets[:, :4] -= offsets[keep, None]
         else:
-            _bboxes = multi_bboxes[cls_inds, i * 4:(i + 1) * 4]
-        _scores = multi_scores[cls_inds, i]
-        if score_factors is not None:
-            _scores *= score_factors[cls_inds]
-        cls_dets = torch.cat([_bboxes, _scores[:, None]], dim=1)
-        cls_dets, _ = nms_op(cls_dets, **nms_cfg_)
-        cls_labels = multi_bboxes.new_full((cls_dets.shape[0], ),
-                                           i - 1,
-                                           dtype=torch.long)
-        bboxes.append(cls_dets)
-        labels.append(cls_labels)
-    if bboxes:
-        bboxes = torch.cat(bboxes)
-        labels = torch.cat(labels)
-        if bboxes.shape[0] > max_num:
-            _, inds = bboxes[:, -1].sort(descending=True)
-            inds = inds[:max_num]
-            bboxes = bboxes[inds]
-            labels = labels[inds]
+            # soft_nms may change the scores, so take them from its outputs
+            dets = torch.cat([bboxes[keep], dets[:, -1:]], dim=1)
     else:
-        bboxes = multi_bboxes.new_zeros((0, 5))
-        labels = multi_bboxes.new_zeros((0, ), dtype=torch.long)
+        dets, keep = [], []
+        for cls_id in torch.unique(labels):
+            cls_inds = (labels == cls_id).nonzero().view(-1)
+            cls_dets, cls_keep = nms_op(
+                torch.cat([bboxes[cls_inds], scores[cls_inds, None]], dim=1),
+                **nms_cfg_)
+            dets.append(cls_dets)
+            keep.append(cls_inds[cls_keep])
+        dets = torch.cat(dets)
+        keep = torch.cat(keep)
 
-    return bboxes, labels
+    _, order = dets[:, -1].sort(descending=True)
+    return dets[order], keep[order]
@@ -2,7 +2,8 @@ import numpy as np
 import torch
 
 from mmdet.ops import nms
-from ..bbox import bbox_mapping_back
+from ..bbox import bbox2result, bbox_mapping_back
+from .bbox_nms import batched_nms
 
 
 def merge_aug_proposals(aug_proposals, img_metas, rpn_test_cfg):
@@ -64,6 +65,74 @@ def merge_aug_bboxes(aug_bboxes, aug_scores, img_metas, rcnn_test_cfg):
         return bboxes, scores
 
 
+def merge_aug_dets(aug_dets, aug_labels, fusion_cfg, max_num=-1):
+    """Fuse the detections of several augmentations or models.
+
+    Unlike :func:`merge_aug_bboxes`, the detections need not come from the
+    same proposals. Overlapping boxes of the same class are fused by the
+    fusion op of ``fusion_cfg``, e.g. ``dict(type='wbf', iou_thr=0.55)``.
+
+    Args:
+        aug_dets (list[Tensor]): Detections of shape (n, 5) of each
+            augmentation or model, in the original image scale.
+        aug_labels (list[Tensor]): Labels of shape (n, ) of the detections.
+        fusion_cfg (dict): Config of the fusion op. ``num_models`` defaults
+            to the number of augmentations.
+        max_num (int): Number of fused detections to keep, -1 keeps all.
+
+    Returns:
+        tuple: (dets, labels), fused detections sorted by descending score.
+    """
+    dets = torch.cat(aug_dets)
+    labels = torch.cat(aug_labels)
+    if dets.size(0) == 0:
+        return dets, labels
+    fusion_cfg = dict(fusion_cfg)
+    if fusion_cfg.get('type') == 'wbf':
+        fusion_cfg.setdefault('num_models', len(aug_dets))
+    dets, keep = batched_nms(dets[:, :4], dets[:, 4], labels, fusion_cfg)
+    labels = labels[keep]
+    if max_num > 0:
+        dets = dets[:max_num]
+        labels = labels[:max_num]
+    return dets, labels
+
+
+def fuse_bbox_results(results, fusion_cfg, weights=None, max_num=-1):
+    """Fuse the bbox results of an image of several models.
+
+    Args:
+        results (list): The results of the image of each model, as returned
+            by ``simple_test``, i.e. lists of the (n, 5) arrays of each
+            class or (bbox results, segm results) tuples of mask models, of
+            which only the bboxes are fused.
+        fusion_cfg (dict): Config of the fusion op, see
+            :func:`merge_aug_dets`.
+        weights (list[float], optional): Score weight of each model.
+        max_num (int): Number of fused detections to keep, -1 keeps all.
+
+    Returns:
+        list[ndarray]: The fused bbox results of each class.
+    """
+    bbox_results = [
+        result[0] if isinstance(result, tuple) else result
+        for result in results
+    ]
+    weights = weights or [1.0] * len(results)
+    aug_dets, aug_labels = [], []
+    for result, weight in zip(bbox_results, weights):
+        dets = torch.from_numpy(np.vstack(result)).float()
+        dets[:, 4] *= weight
+        labels = torch.cat([
+            torch.full((len(cls_result), ), i, dtype=torch.long)
+            for i, cls_result in enumerate(result)
+        ])
+        aug_dets.append(dets)
+        aug_labels.append(labels)
+    dets, labels = merge_aug_dets(aug_dets, aug_labels, fusion_cfg, max_num)
+    return bbox2result(dets, labels, len(bbox_results[0]) + 1)
+
+
 def merge_aug_scores(aug_scores):
     """Merge augmented bbox scores."""
     if isinstance(aug_scores[0], torch.Tensor):
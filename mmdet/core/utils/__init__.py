@@ -1,7 +1,11 @@
-from .dist_utils import DistOptimizerHook, allreduce_grads
-from .misc import multi_apply, tensor2imgs, unmap
+from .dist_utils import DistOptimizerHook, allreduce_grads, collect_results
+from .log_buffer import DeviceLogBuffer, SyncCounterHook
+from .misc import multi_apply, normalize_img_tensor, tensor2imgs, unmap
+from .profiler import ProfilerHook, StageProfiler, profile_region, profiled
 
 __all__ = [
-    'allreduce_grads', 'DistOptimizerHook', 'tensor2imgs', 'unmap',
-    'multi_apply'
+    'allreduce_grads', 'DistOptimizerHook', 'collect_results', 'tensor2imgs',
+    'unmap', 'multi_apply', 'DeviceLogBuffer', 'SyncCounterHook',
+    'normalize_img_tensor', 'StageProfiler', 'ProfilerHook', 'profile_region',
+    'profiled'
 ]
@@ -1,7 +1,14 @@
+import os.path as osp
+import pickle
+import shutil
+import tempfile
 from collections import OrderedDict
 
+import mmcv
+import numpy as np
+import torch
 import torch.distributed as dist
-from mmcv.runner import OptimizerHook
+from mmcv.runner import OptimizerHook, get_dist_info
 from torch._utils import (_flatten_dense_tensors, _take_tensors,
                           _unflatten_dense_tensors)
 
@@ -56,3 +63,178 @@ class DistOptimizerHook(OptimizerHook):
         if self.grad_clip is not None:
             self.clip_grads(runner.model.parameters())
         runner.optimizer.step()
+
+
+def _is_bbox_results(results):
+    if len(results) == 0 or not isinstance(results[0], list) or len(
+            results[0]) == 0:
+        return False
+    ref = results[0][0]
+    if not isinstance(ref, np.ndarray) or ref.ndim != 2:
+        return False
+    for result in results:
+        if not isinstance(result, list) or len(result) != len(results[0]):
+            return False
+        for bboxes in result:
+            if not (isinstance(bboxes, np.ndarray) and bboxes.ndim == 2
+                    and bboxes.shape[1] == ref.shape[1]
+                    and bboxes.dtype == ref.dtype):
+                return False
+    return True
+
+
+def serialize_results(results):
+    """Serialize a list of per-image results to a uint8 array.
+
+    Bbox results (a list of per-class arrays of each image) are packed into
+    a (num_imgs, num_classes) count array and a single bbox array, instead of
+    pickling every small array on its own. Results with masks have their bbox
+    part packed in the same way, other results are pickled as they are.
+
+    Args:
+        results (list): Results of images.
+
+    Returns:
+        ndarray: The serialized results.
+    """
+    with_segm = all(
+        isinstance(result, tuple) and len(result) == 2 for result in results)
+    if _is_bbox_results(results):
+        payload = ('bbox', ) + _pack_bbox_results(results)
+    elif with_segm and _is_bbox_results([result[0] for result in results]):
+        bbox_results, segm_results = zip(*results)
+        payload = ('bbox_segm', ) + _pack_bbox_results(bbox_results) + (
+            list(segm_results), )
+    else:
+        payload = ('raw', results)
+    return np.frombuffer(
+        bytearray(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)),
+        dtype=np.uint8)
+
+
+def deserialize_results(buffer):
+    """Restore the results serialized by :func:`serialize_results`."""
+    payload = pickle.loads(buffer.tobytes())
+    if payload[0] == 'bbox':
+        return _unpack_bbox_results(*payload[1:])
+    elif payload[0] == 'bbox_segm':
+        bbox_results = _unpack_bbox_results(*payload[1:3])
+        return list(zip(bbox_results, payload[3]))
+    else:
+        return payload[1]
+
+
+def _pack_bbox_results(bbox_results):
+    counts = np.array([[len(bboxes) for bboxes in result]
+                       for result in bbox_results],
+                      dtype=np.int32)
+    bboxes = np.concatenate(
+        [bboxes for result in bbox_results for bboxes in result])
+    return counts, bboxes
+
+
+def _unpack_bbox_results(counts, bboxes):
+    bbox_list = np.split(bboxes, np.cumsum(counts.reshape(-1))[:-1])
+    num_classes = counts.shape[1]
+    return [
+        bbox_list[i:i + num_classes]
+        for i in range(0, len(bbox_list), num_classes)
+    ]
+
+
+def collect_results(result_part, size, tmpdir=None):
+    """Collect the results of all ranks on rank 0.
+
+    The results of each rank are serialized and gathered in memory with
+    ``torch.distributed`` (on the gpu with nccl and on the cpu with gloo),
+    unless a ``tmpdir`` is given, in which case each rank dumps its results
+    to it and rank 0 loads them back.
+
+    Args:
+        result_part (list): Results of the images of this rank, which are
+            sampled by :class:`DistributedSampler` without shuffling.
+        size (int): Size of the dataset, the padded samples of the sampler
+            are dropped.
+        tmpdir (str, optional): Directory shared by all ranks to pass the
+            results through files.
+
+    Returns:
+        list or None: The ordered results of all images on rank 0, None on
+            the other ranks.
+    """
+    rank, world_size = get_dist_info()
+    if tmpdir is None:
+        part_list = _gather_results_in_memory(result_part)
+    else:
+        part_list = _gather_results_by_files(result_part, tmpdir)
+    if rank != 0:
+        return None
+    # sort the results, the parts may differ in length by 1 if they are not
+    # padded by the sampler
+    ordered_results = []
+    for i in range(max(len(part) for part in part_list)):
+        ordered_results.extend(part[i] for part in part_list if i < len(part))
+    # the dataloader may pad some samples
+    ordered_results = ordered_results[:size]
+    return ordered_results
+
+
+def _gather_results_in_memory(result_part):
+    rank, world_size = get_dist_info()
+    device = 'cuda' if dist.get_backend() == 'nccl' else 'cpu'
+    part_tensor = torch.from_numpy(serialize_results(result_part)).to(device)
+    # gather the sizes of all parts to pad them to the same size
+    part_size = torch.tensor([part_tensor.numel()], device=device)
+    size_list = [part_size.clone() for _ in range(world_size)]
+    dist.all_gather(size_list, part_size)
+    max_size = max(size_list).item()
+    part_send = part_tensor.new_zeros(max_size)
+    part_send[:part_tensor.numel()] = part_tensor
+    part_recv_list = [part_tensor.new_zeros(max_size) for _ in size_list]
+    dist.all_gather(part_recv_list, part_send)
+    if rank != 0:
+        return None
+    return [
+        deserialize_results(recv[:part_size.item()].cpu().numpy())
+        for recv, part_size in zip(part_recv_list, size_list)
+    ]
+
+
+def _gather_results_by_files(result_part, tmpdir):
+    rank, world_size = get_dist_info()
+    mmcv.mkdir_or_exist(tmpdir)
+    # a private subdir avoids clashes with other files in tmpdir
+    if rank == 0:
+        subdir = tempfile.mkdtemp(dir=tmpdir)
+    else:
+        subdir = None
+    subdir = _broadcast_str(subdir)
+    # dump the part result to the dir
+    mmcv.dump(result_part, osp.join(subdir, 'part_{}.pkl'.format(rank)))
+    dist.barrier()
+    # collect all parts
+    if rank != 0:
+        part_list = None
+    else:
+        # load results of all parts from tmp dir
+        part_list = [
+            mmcv.load(osp.join(subdir, 'part_{}.pkl'.format(i)))
+            for i in range(world_size)
+        ]
+        # remove tmp dir
+        shutil.rmtree(subdir)
+    # do not let other ranks reuse tmpdir before rank 0 is done
+    dist.barrier()
+    return part_list
+
+
+def _broadcast_str(string, max_len=512):
+    device = 'cuda' if dist.get_backend() == 'nccl' else 'cpu'
+    # 32 is whitespace
+    str_tensor = torch.full((max_len, ), 32, dtype=torch.uint8, device=device)
+    if string is not None:
+        encoded = torch.tensor(
+            bytearray(string.encode()), dtype=torch.uint8, device=device)
+        str_tensor[:len(encoded)] = encoded
+    dist.broadcast(str_tensor, 0)
+    return str_tensor.cpu().numpy().tobytes().decode().rstrip()
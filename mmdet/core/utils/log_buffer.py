@@ -0,0 +1,93 @@
+import warnings
+
+import torch
+from mmcv.runner import Hook, LogBuffer
+
+
+class DeviceLogBuffer(LogBuffer):
+    """A log buffer that takes tensors without syncing with the device.
+
+    Tensor values (e.g. the losses of each iteration) are kept on their
+    device and only copied to the host, all at once, when the buffer is
+    averaged at the logging interval, instead of syncing with ``.item()`` for
+    every value of every iteration. The averages are the same as those of
+    :class:`LogBuffer`.
+    """
+
+    def __init__(self):
+        super(DeviceLogBuffer, self).__init__()
+        self._pending = []
+
+    def clear(self):
+        super(DeviceLogBuffer, self).clear()
+        self._pending = []
+
+    def update(self, vars, count=1):
+        assert isinstance(vars, dict)
+        host_vars, slots, tensors = {}, [], []
+        for key, var in vars.items():
+            if isinstance(var, torch.Tensor):
+                # a placeholder in the history until it is materialized
+                slots.append((key, len(self.val_history.get(key, []))))
+                tensors.append(var.detach().float().reshape(1))
+                var = None
+            host_vars[key] = var
+        super(DeviceLogBuffer, self).update(host_vars, count)
+        if tensors:
+            device = tensors[0].device
+            self._pending.append(
+                (slots, torch.cat([t.to(device) for t in tensors])))
+
+    def materialize(self):
+        """Copy all pending tensor values to the host with a single sync."""
+        if not self._pending:
+            return
+        device = self._pending[0][1].device
+        values = torch.cat([values.to(device)
+                            for _, values in self._pending]).tolist()
+        slots = [slot for slots, _ in self._pending for slot in slots]
+        for (key, ind), value in zip(slots, values):
+            self.val_history[key][ind] = value
+        self._pending = []
+
+    def average(self, n=0):
+        self.materialize()
+        super(DeviceLogBuffer, self).average(n)
+
+
+class SyncCounterHook(Hook):
+    """Count the host-device syncs of each training iteration.
+
+    The syncs are counted with the sync debug mode of CUDA, which warns on
+    every synchronizing operation, and logged as ``num_syncs``. The count of
+    an iteration includes the syncs of the hooks that run before this one in
+    ``after_train_iter``, e.g. the logging of the losses, so register it with
+    the lowest priority.
+    """
+
+    def __init__(self):
+        self.enabled = (
+            torch.cuda.is_available()
+            and hasattr(torch.cuda, 'set_sync_debug_mode'))
+        if not self.enabled:
+            warnings.warn('Syncs are only counted on GPUs with PyTorch>=1.10')
+        self._catcher = None
+        self._records = None
+
+    def before_train_iter(self, runner):
+        if not self.enabled:
+            return
+        self._catcher = warnings.catch_warnings(record=True)
+        self._records = self._catcher.__enter__()
+        warnings.simplefilter('always')
+        torch.cuda.set_sync_debug_mode('warn')
+
+    def after_train_iter(self, runner):
+        if self._catcher is None:
+            return
+        torch.cuda.set_sync_debug_mode('default')
+        self._catcher.__exit__(None, None, None)
+        num_syncs = sum('synchroniz' in str(record.message)
+                        for record in self._records)
+        self._catcher, self._records = None, None
+        runner.log_buffer.update({'num_syncs': num_syncs})
@@ -12,12 +12,42 @@ def tensor2imgs(tensor, mean=(0, 0, 0), std=(1, 1, 1), to_rgb=True):
     imgs = []
     for img_id in range(num_imgs):
         img = tensor[img_id, ...].cpu().numpy().transpose(1, 2, 0)
-        img = mmcv.imdenormalize(
-            img, mean, std, to_bgr=to_rgb).astype(np.uint8)
+        # uint8 images are not normalized yet, see normalize_img_tensor
+        if img.dtype != np.uint8:
+            img = mmcv.imdenormalize(
+                img, mean, std, to_bgr=to_rgb).astype(np.uint8)
         imgs.append(np.ascontiguousarray(img))
     return imgs
 
 
+def normalize_img_tensor(img, img_metas):
+    """Normalize a batch of uint8 images on their device.
+
+    The images come from a pipeline with ``Normalize(on_device=True)``, they
+    are normalized with the ``img_norm_cfg`` of their meta, and the padding
+    is set to 0, the same as normalizing before padding and collating.
+
+    Args:
+        img (Tensor): uint8 images of shape (N, C, H, W) in BGR order.
+        img_metas (list[dict]): Meta info of the images.
+
+    Returns:
+        Tensor: float32 normalized images.
+    """
+    norm_cfg = img_metas[0]['img_norm_cfg']
+    img = img.float()
+    if norm_cfg['to_rgb']:
+        img = img.flip(1)
+    mean = img.new_tensor(norm_cfg['mean']).view(1, -1, 1, 1)
+    std = img.new_tensor(norm_cfg['std']).view(1, -1, 1, 1)
+    img = (img - mean) / std
+    for img_id, img_meta in enumerate(img_metas):
+        h, w = img_meta['img_shape'][:2]
+        img[img_id, :, h:, :] = 0
+        img[img_id, :, :h, w:] = 0
+    return img
+
+
 def multi_apply(func, *args, **kwargs):
     pfunc = partial(func, **kwargs) if kwargs else func
     map_results = map(pfunc, *args)
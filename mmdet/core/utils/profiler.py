@@ -0,0 +1,313 @@
+import functools
+import os
+import os.path as osp
+import time
+from collections import OrderedDict
+
+import mmcv
+import numpy as np
+import torch
+import torch.nn as nn
+from mmcv.runner import Hook
+
+# The profiler whose regions are being timed, None if profiling is disabled.
+_active_profiler = None
+
+# Methods of the detector timed as regions of the same name.
+DETECTOR_REGIONS = ('forward_train', 'simple_test', 'aug_test', 'extract_feat',
+                    'simple_test_rpn')
+# Submodules of the detector (a ModuleList for each stage of a cascade) and
+# their methods timed as regions, named ``stage{i}.<region>`` for cascades.
+MODULE_REGIONS = (
+    ('rpn_head', 'forward', 'rpn_head'),
+    ('semantic_head', 'forward', 'semantic_head'),
+    ('bbox_roi_extractor', 'forward', 'bbox_roi_extract'),
+    ('bbox_head', 'forward', 'bbox_head'),
+    ('bbox_head', 'regress_by_class', 'regress'),
+    ('mask_roi_extractor', 'forward', 'mask_roi_extract'),
+    ('mask_head', 'forward', 'mask_head'),
+    ('mask_head', 'get_seg_masks', 'get_seg_masks'),
+)
+
+
+class _Region(object):
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = self.profiler.timer()
+        return self
+
+    def __exit__(self, *args):
+        self.profiler.record(self.name, self.start, self.profiler.timer())
+
+
+class _NullRegion(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+_null_region = _NullRegion()
+
+
+def profile_region(name):
+    """Time a block of code as a named region of the active profiler.
+
+    A no-op context manager if profiling is disabled.
+
+    Example:
+        >>> with profile_region('fuse_results'):
+        >>>     results = fuse(results)
+    """
+    if _active_profiler is None:
+        return _null_region
+    return _Region(_active_profiler, name)
+
+
+def profiled(name):
+    """Decorator to time each call of a function as a named region.
+
+    When profiling is disabled the only overhead of a call is a check of a
+    global variable.
+    """
+
+    def decorator(func):
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active_profiler is None:
+                return func(*args, **kwargs)
+            with _Region(_active_profiler, name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class StageProfiler(object):
+    """Time the named regions of a detector, e.g. its stages.
+
+    The methods of a detector and its heads listed in :data:`DETECTOR_REGIONS`
+    and :data:`MODULE_REGIONS` are wrapped on the instances while the profiler
+    is enabled and restored when it is disabled, so a disabled profiler costs
+    nothing. Functions decorated with :func:`profiled` (e.g.
+    ``multiclass_nms``) and blocks in :func:`profile_region` are timed too.
+
+    Since CUDA kernels run asynchronously, the device is synchronized at the
+    start and the end of each region if ``sync`` is True, which makes the
+    timings exact but slows down the profiled model a bit.
+
+    Args:
+        sync (bool): Whether to synchronize the device around regions.
+        trace_file (str, optional): Path to dump the regions to, as a trace
+            in the Chrome trace event format (chrome://tracing, Perfetto).
+        max_trace_events (int): Maximum number of regions in the trace.
+
+    Example:
+        >>> profiler = StageProfiler(trace_file='trace.json')
+        >>> with profiler.profile(model):
+        >>>     for data in data_loader:
+        >>>         model(return_loss=False, rescale=True, **data)
+        >>> print(profiler.format_summary())
+    """
+
+    def __init__(self, sync=True, trace_file=None, max_trace_events=100000):
+        self.sync = sync
+        self.trace_file = trace_file
+        self.max_trace_events = max_trace_events
+        self.durations = OrderedDict()
+        self.trace_events = []
+        self._patched = []
+        self._t0 = time.perf_counter()
+
+    def timer(self):
+        if self.sync and torch.cuda.is_available():
+            torch.cuda.synchronize()
+        return time.perf_counter()
+
+    def record(self, name, start, end):
+        """Record a region, its duration is kept in milliseconds."""
+        self.durations.setdefault(name, []).append((end - start) * 1000)
+        if (self.trace_file is not None
+                and len(self.trace_events) < self.max_trace_events):
+            self.trace_events.append(
+                dict(
+                    name=name,
+                    ph='X',
+                    ts=(start - self._t0) * 1e6,
+                    dur=(end - start) * 1e6,
+                    pid=os.getpid(),
+                    tid=0))
+
+    def _patch(self, obj, method, name):
+        func = getattr(obj, method)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Region(self, name):
+                return func(*args, **kwargs)
+
+        setattr(obj, method, wrapper)
+        self._patched.append((obj, method))
+
+    def _instrument(self, model):
+        if isinstance(model, nn.DataParallel):
+            # replicas would call the wrapped methods of the original model
+            assert len(model.device_ids) == 1, \
+                'models on multiple GPUs of a DataParallel cannot be profiled'
+        model = getattr(model, 'module', model)
+        for method in DETECTOR_REGIONS:
+            if hasattr(model, method):
+                self._patch(model, method, method)
+        for attr, method, region in MODULE_REGIONS:
+            module = getattr(model, attr, None)
+            if module is None:
+                continue
+            if isinstance(module, nn.ModuleList):
+                stages = [(m, 'stage{}.'.format(i))
+                          for i, m in enumerate(module)]
+            else:
+                stages = [(module, '')]
+            for stage_module, prefix in stages:
+                if hasattr(stage_module, method):
+                    self._patch(stage_module, method, prefix + region)
+
+    def enable(self, model=None):
+        """Start timing the regions, including those of ``model``."""
+        global _active_profiler
+        assert _active_profiler is None, 'another profiler is enabled'
+        if model is not None:
+            self._instrument(model)
+        _active_profiler = self
+
+    def disable(self):
+        """Stop timing and restore the wrapped methods."""
+        global _active_profiler
+        if _active_profiler is self:
+            _active_profiler = None
+        for obj, method in self._patched:
+            # the instance attribute shadows the method of the class
+            delattr(obj, method)
+        self._patched = []
+
+    def profile(self, model=None):
+        """Context manager to profile a block of code, see :meth:`enable`."""
+        return _ProfileContext(self, model)
+
+    def reset(self):
+        """Clear the durations recorded so far (the trace is kept)."""
+        self.durations = OrderedDict()
+
+    def summary(self, percentiles=(50, 90, 99)):
+        """Get the percentiles of the durations of each region.
+
+        Returns:
+            OrderedDict: ``{'<region>.p<q>': milliseconds}`` and the number of
+                calls of each region as ``'<region>.count'``.
+        """
+        summary = OrderedDict()
+        for name, durations in self.durations.items():
+            values = np.percentile(durations, percentiles)
+            for q, value in zip(percentiles, values):
+                summary['{}.p{}'.format(name, q)] = float(value)
+            summary['{}.count'.format(name)] = len(durations)
+        return summary
+
+    def format_summary(self, percentiles=(50, 90, 99)):
+        """Format the durations of each region as a table."""
+        header = ['region', 'count', 'total(ms)']
+        header += ['p{}(ms)'.format(q) for q in percentiles]
+        rows = []
+        for name, durations in self.durations.items():
+            row = [name, str(len(durations)), '{:.2f}'.format(sum(durations))]
+            row += [
+                '{:.2f}'.format(value)
+                for value in np.percentile(durations, percentiles)
+            ]
+            rows.append(row)
+        widths = [
+            max(len(row[i]) for row in [header] + rows)
+            for i in range(len(header))
+        ]
+        lines = []
+        for row in [header] + rows:
+            lines.append('  '.join(
+                cell.ljust(width) if i == 0 else cell.rjust(width)
+                for i, (cell, width) in enumerate(zip(row, widths))))
+        return '\n'.join(lines)
+
+    def dump_trace(self, trace_file=None):
+        """Dump the recorded regions as a Chrome trace."""
+        trace_file = trace_file or self.trace_file
+        assert trace_file is not None
+        mmcv.mkdir_or_exist(osp.dirname(osp.abspath(trace_file)))
+        mmcv.dump(
+            dict(traceEvents=self.trace_events, displayTimeUnit='ms'),
+            trace_file,
+            file_format='json')
+
+
+class _ProfileContext(object):
+
+    def __init__(self, profiler, model):
+        self.profiler = profiler
+        self.model = model
+
+    def __enter__(self):
+        self.profiler.enable(self.model)
+        return self.profiler
+
+    def __exit__(self, *args):
+        self.profiler.disable()
+        if self.profiler.trace_file is not None:
+            self.profiler.dump_trace()
+
+
+class ProfilerHook(Hook):
+    """Profile the regions of the detector during training.
+
+    The percentiles of the durations of each region over the iterations of
+    each logging interval are added to the output of the log buffer, as
+    ``prof.<region>.p<q>`` in milliseconds, right before they are logged.
+    Register it with a priority higher than that of the logger hooks. The
+    trace, if any, is dumped at the end of the run, a relative
+    ``trace_file`` being relative to the work dir.
+
+    Args:
+        interval (int): Logging interval, the same as the logger hooks.
+        percentiles (tuple[int]): Percentiles of the durations to log.
+        **kwargs: Arguments of :class:`StageProfiler`.
+    """
+
+    def __init__(self, interval=50, percentiles=(50, 90), **kwargs):
+        self.interval = interval
+        self.percentiles = percentiles
+        self.profiler = StageProfiler(**kwargs)
+
+    def before_run(self, runner):
+        trace_file = self.profiler.trace_file
+        if trace_file is not None and not osp.isabs(trace_file):
+            self.profiler.trace_file = osp.join(runner.work_dir, trace_file)
+        self.profiler.enable(runner.model)
+
+    def after_train_iter(self, runner):
+        if (not self.every_n_inner_iters(runner, self.interval)
+                or not self.profiler.durations):
+            return
+        for key, value in self.profiler.summary(self.percentiles).items():
+            if not key.endswith('.count'):
+                runner.log_buffer.output['prof.' + key] = value
+        self.profiler.reset()
+
+    def after_run(self, runner):
+        self.profiler.disable()
+        if self.profiler.trace_file is not None:
+            self.profiler.dump_trace()
@@ -4,7 +4,10 @@ from .coco import CocoDataset
 from .custom import CustomDataset
 from .dataset_wrappers import ConcatDataset, RepeatDataset
 from .extra_aug import ExtraAugmentation
-from .loader import DistributedGroupSampler, GroupSampler, build_dataloader
+from .loader import (DataWaitHook, DistributedGroupSampler, GroupSampler,
+                     build_dataloader)
+from .packed import PackedDataset, pack_dataset
+from .pipelines import ImageCacheHook, has_image_cache, replace_image_to_tensor
 from .registry import DATASETS
 from .voc import VOCDataset
 from .wider_face import WIDERFaceDataset
@@ -15,5 +18,7 @@ __all__ = [
     'CustomDataset', 'XMLDataset', 'CocoDataset', 'VOCDataset',
     'CityscapesDataset', 'GroupSampler', 'DistributedGroupSampler',
     'build_dataloader', 'ConcatDataset', 'RepeatDataset', 'ExtraAugmentation',
-    'WIDERFaceDataset', 'DATASETS', 'build_dataset', 'UnderseaDataset'
+    'WIDERFaceDataset', 'DATASETS', 'build_dataset', 'UnderseaDataset',
+    'ImageCacheHook', 'has_image_cache', 'PackedDataset', 'pack_dataset',
+    'DataWaitHook', 'replace_image_to_tensor'
 ]
@@ -1,4 +1,10 @@
-from .build_loader import build_dataloader
+from .build_loader import (DataWaitHook, PinnableDataContainer,
+                           TimedDataLoader, build_dataloader, data_nbytes,
+                           pinnable_collate)
 from .sampler import DistributedGroupSampler, GroupSampler
 
-__all__ = ['GroupSampler', 'DistributedGroupSampler', 'build_dataloader']
+__all__ = [
+    'GroupSampler', 'DistributedGroupSampler', 'build_dataloader',
+    'DataWaitHook', 'PinnableDataContainer', 'TimedDataLoader',
+    'pinnable_collate', 'data_nbytes'
+]
@@ -1,9 +1,14 @@
 import platform
+import time
+from collections.abc import Mapping, Sequence
 from functools import partial
 
-from mmcv.parallel import collate
-from mmcv.runner import get_dist_info
+import numpy as np
+import torch
+from mmcv.parallel import DataContainer, collate
+from mmcv.runner import Hook, get_dist_info
 from torch.utils.data import DataLoader
+from torch.utils.data._utils.pin_memory import pin_memory as pin_data
 
 from .sampler import DistributedGroupSampler, DistributedSampler, GroupSampler
 
@@ -14,12 +19,132 @@ if platform.system() != 'Windows':
     resource.setrlimit(resource.RLIMIT_NOFILE, (4096, rlimit[1]))
 
 
+class PinnableDataContainer(DataContainer):
+    """A DataContainer whose tensors are pinned by a pinning DataLoader.
+
+    The pin memory thread of ``DataLoader`` only pins the tensors it can
+    find in tensors, mappings, sequences and objects with a ``pin_memory``
+    method, so the tensors in a plain DataContainer are never pinned.
+    """
+
+    def pin_memory(self):
+        if self.cpu_only:
+            return self
+        return PinnableDataContainer(
+            pin_data(self.data),
+            stack=self.stack,
+            padding_value=self.padding_value,
+            pad_dims=self.pad_dims)
+
+
+def _to_pinnable(data):
+    if isinstance(data, DataContainer):
+        return PinnableDataContainer(
+            data.data,
+            stack=data.stack,
+            padding_value=data.padding_value,
+            cpu_only=data.cpu_only,
+            pad_dims=data.pad_dims)
+    elif isinstance(data, Mapping):
+        return {key: _to_pinnable(value) for key, value in data.items()}
+    elif isinstance(data, Sequence) and not isinstance(data, str):
+        return [_to_pinnable(value) for value in data]
+    return data
+
+
+def pinnable_collate(batch, samples_per_gpu=1):
+    """:func:`mmcv.parallel.collate` whose DataContainers can be pinned."""
+    return _to_pinnable(collate(batch, samples_per_gpu))
+
+
+def data_nbytes(data):
+    """Number of bytes of the tensors and arrays in a (collated) batch."""
+    if isinstance(data, torch.Tensor):
+        return data.numel() * data.element_size()
+    elif isinstance(data, np.ndarray):
+        return data.nbytes
+    elif isinstance(data, DataContainer):
+        return data_nbytes(data.data)
+    elif isinstance(data, Mapping):
+        return sum(data_nbytes(value) for value in data.values())
+    elif isinstance(data, Sequence) and not isinstance(data, str):
+        return sum(data_nbytes(value) for value in data)
+    return 0
+
+
+class TimedDataLoader(DataLoader):
+    """A DataLoader that records how long each batch is waited for.
+
+    ``data_wait`` is the time in seconds the last ``next()`` call on its
+    iterator blocked, i.e. the time the training loop waited for the
+    workers, excluding the time the hooks take between iterations (which
+    the ``data_time`` of ``IterTimerHook`` includes). ``data_bytes`` is the
+    size of the tensors and arrays of the last batch, i.e. the data sent
+    from the workers to the main process.
+    """
+
+    data_wait = None
+    data_bytes = None
+
+    def __iter__(self):
+        iterator = super(TimedDataLoader, self).__iter__()
+        while True:
+            start = time.perf_counter()
+            try:
+                data = next(iterator)
+            except StopIteration:
+                return
+            self.data_wait = time.perf_counter() - start
+            self.data_bytes = data_nbytes(data)
+            yield data
+
+
+class DataWaitHook(Hook):
+    """Log the time waited for the data of each iteration as ``data_wait``,
+    and the size of the batch in MB as ``data_mb``.
+    """
+
+    def after_train_iter(self, runner):
+        data_wait = getattr(runner.data_loader, 'data_wait', None)
+        if data_wait is not None:
+            data_mb = runner.data_loader.data_bytes / 1024**2
+            runner.log_buffer.update({
+                'data_wait': data_wait,
+                'data_mb': data_mb
+            })
+
+
 def build_dataloader(dataset,
                      imgs_per_gpu,
                      workers_per_gpu,
                      num_gpus=1,
                      dist=True,
+                     pin_memory=False,
+                     persistent_workers=False,
+                     prefetch_factor=None,
                      **kwargs):
+    """Build a DataLoader of a dataset.
+
+    Args:
+        dataset (Dataset): A dataset.
+        imgs_per_gpu (int): Number of images of each GPU in a batch.
+        workers_per_gpu (int): Number of loading workers of each GPU.
+        num_gpus (int): Number of GPUs, only used in non-distributed
+            training.
+        dist (bool): Whether it is distributed training.
+        pin_memory (bool): Whether to collate the batches in pinned memory,
+            so that they can be copied to the GPUs asynchronously.
+        persistent_workers (bool): Whether to keep the workers, and their
+            copies of the dataset, alive across epochs instead of forking
+            new ones every epoch. Changes made to the dataset in the main
+            process after the first epoch are then not seen by the workers.
+        prefetch_factor (int, optional): Number of batches loaded in
+            advance by each worker, 2 by default.
+        kwargs: Other arguments of ``DataLoader``.
+
+    Returns:
+        TimedDataLoader: A DataLoader which records its ``data_wait``.
+    """
     shuffle = kwargs.get('shuffle', True)
     if dist:
         rank, world_size = get_dist_info()
@@ -36,13 +161,21 @@ def build_dataloader(dataset,
         batch_size = num_gpus * imgs_per_gpu
         num_workers = num_gpus * workers_per_gpu
 
-    data_loader = DataLoader(
+    if num_workers > 0:
+        # only supported with workers
+        if persistent_workers:
+            kwargs['persistent_workers'] = True
+        if prefetch_factor is not None:
+            kwargs['prefetch_factor'] = prefetch_factor
+    data_loader = TimedDataLoader(
         dataset,
         batch_size=batch_size,
         sampler=sampler,
         num_workers=num_workers,
-        collate_fn=partial(collate, samples_per_gpu=imgs_per_gpu),
-        pin_memory=False,
+        collate_fn=partial(
+            pinnable_collate if pin_memory else collate,
+            samples_per_gpu=imgs_per_gpu),
+        pin_memory=pin_memory,
         **kwargs)
 
     return data_loader
@@ -0,0 +1,236 @@
+import json
+import os.path as osp
+import struct
+
+import mmcv
+import numpy as np
+
+from .registry import DATASETS
+from .Undersea import UnderseaDataset
+
+PACKED_MAGIC = b'MMDETPKD'
+PACKED_VERSION = 1
+# arrays in a packed file start at multiples of this number of bytes
+_ALIGN = 64
+
+
+def _aligned(offset):
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def dump_packed(arrays, meta, out_file):
+    """Write numpy arrays and a json serializable meta into a packed file.
+
+    The file starts with ``PACKED_MAGIC``, the length of a json header and
+    the header itself, which records the meta and the dtype, shape and byte
+    offset of each array. The arrays follow the header, so that they can be
+    memory-mapped by :func:`load_packed` without being parsed.
+
+    Args:
+        arrays (dict[str, ndarray]): Arrays to be written.
+        meta (dict): Extra information to be written in the header.
+        out_file (str): Output filename.
+    """
+    arrays = {
+        name: np.ascontiguousarray(array)
+        for name, array in arrays.items()
+    }
+    array_infos = {}
+    offset = 0
+    for name, array in arrays.items():
+        array_infos[name] = dict(
+            dtype=array.dtype.str, shape=array.shape, offset=offset)
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps(
+        dict(version=PACKED_VERSION, meta=meta,
+             arrays=array_infos)).encode('utf-8')
+    data_start = _aligned(len(PACKED_MAGIC) + 8 + len(header))
+
+    mmcv.mkdir_or_exist(osp.dirname(osp.abspath(out_file)))
+    with open(out_file, 'wb') as f:
+        f.write(PACKED_MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + array_infos[name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+
+
+def load_packed(filename):
+    """Memory-map the arrays of a packed file written by :func:`dump_packed`.
+
+    The arrays are read-only views of a single memory map, so processes that
+    load (or are forked after loading) the same file share its pages.
+
+    Returns:
+        tuple: (arrays, meta)
+    """
+    with open(filename, 'rb') as f:
+        magic = f.read(len(PACKED_MAGIC))
+        if magic != PACKED_MAGIC:
+            raise ValueError(
+                '{} is not a packed dataset file'.format(filename))
+        header_len = struct.unpack('<Q', f.read(8))[0]
+        header = json.loads(f.read(header_len).decode('utf-8'))
+    if header['version'] != PACKED_VERSION:
+        raise ValueError('unsupported packed file version {}'.format(
+            header['version']))
+    data_start = _aligned(len(PACKED_MAGIC) + 8 + header_len)
+    buf = np.memmap(filename, dtype=np.uint8, mode='r')
+    arrays = {}
+    for name, info in header['arrays'].items():
+        dtype = np.dtype(info['dtype'])
+        num_bytes = int(np.prod(info['shape'])) * dtype.itemsize
+        start = data_start + info['offset']
+        arrays[name] = buf[start:start + num_bytes].view(dtype).reshape(
+            info['shape'])
+    return arrays, header['meta']
+
+
+def _concat_with_offsets(items, item_shape, dtype):
+    """Concatenate arrays and return the start offset of each of them."""
+    offsets = np.zeros(len(items) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(item) for item in items])
+    if offsets[-1] > 0:
+        data = np.concatenate(items).astype(dtype)
+    else:
+        data = np.zeros((0, ) + item_shape, dtype=dtype)
+    return data.reshape((-1, ) + item_shape), offsets
+
+
+def pack_dataset(dataset, out_file, with_img=True):
+    """Pack the image infos and annotations of a dataset into a single file.
+
+    Annotations are parsed once by ``dataset.get_ann_info``, so the dataset
+    should be built with ``test_mode=True`` to keep all the images. Only
+    boxes and labels are packed, mask annotations are not supported.
+
+    Args:
+        dataset (:obj:`CustomDataset`): Dataset to be packed, e.g. a
+            :obj:`CocoDataset` or an :obj:`UnderseaDataset`.
+        out_file (str): Output filename.
+        with_img (bool): Whether to pack the encoded image files as well.
+    """
+    num_imgs = len(dataset)
+    img_ids = np.zeros(num_imgs, dtype=np.int64)
+    img_shapes = np.zeros((num_imgs, 2), dtype=np.int32)
+    has_ann = np.zeros(num_imgs, dtype=np.bool_)
+    # images are filtered by all the annotations, including ignored ones
+    coco = getattr(dataset, 'coco', None)
+    if coco is not None:
+        ids_with_ann = set(ann['image_id'] for ann in coco.anns.values())
+    filenames, bboxes, labels, bboxes_ignore, img_bytes = [], [], [], [], []
+    prog_bar = mmcv.ProgressBar(num_imgs)
+    for i, img_info in enumerate(dataset.img_infos):
+        img_ids[i] = img_info.get('id', i)
+        img_shapes[i] = (img_info['height'], img_info['width'])
+        filenames.append(
+            np.frombuffer(img_info['filename'].encode('utf-8'), np.uint8))
+        ann = dataset.get_ann_info(i)
+        bboxes.append(ann['bboxes'])
+        labels.append(ann['labels'])
+        bboxes_ignore.append(ann.get('bboxes_ignore', np.zeros((0, 4))))
+        if coco is not None:
+            has_ann[i] = img_ids[i] in ids_with_ann
+        else:
+            has_ann[i] = len(ann['bboxes']) > 0
+        if with_img:
+            with open(
+                    osp.join(dataset.img_prefix, img_info['filename']),
+                    'rb') as f:
+                img_bytes.append(np.frombuffer(f.read(), np.uint8))
+        prog_bar.update()
+
+    arrays = dict(img_ids=img_ids, img_shapes=img_shapes, has_ann=has_ann)
+    arrays['filenames'], arrays['filename_offsets'] = _concat_with_offsets(
+        filenames, (), np.uint8)
+    arrays['bboxes'], arrays['bbox_offsets'] = _concat_with_offsets(
+        bboxes, (4, ), np.float32)
+    arrays['labels'], _ = _concat_with_offsets(labels, (), np.int64)
+    arrays['bboxes_ignore'], arrays['bbox_ignore_offsets'] = (
+        _concat_with_offsets(bboxes_ignore, (4, ), np.float32))
+    if with_img:
+        arrays['img_bytes'], arrays['img_offsets'] = _concat_with_offsets(
+            img_bytes, (), np.uint8)
+    meta = dict(
+        classes=list(dataset.CLASSES),
+        cat_ids=[int(cat_id) for cat_id in getattr(dataset, 'cat_ids', [])])
+    dump_packed(arrays, meta, out_file)
+
+
+@DATASETS.register_module
+class PackedDataset(UnderseaDataset):
+    """Dataset stored in a packed file written by :func:`pack_dataset`.
+
+    Boxes, labels and optionally the encoded images are memory-mapped from
+    ``ann_file`` (see ``tools/convert_datasets/pack_dataset.py``), so the
+    DataLoader workers share their pages and nothing is parsed per
+    annotation, neither at startup nor when an image is sampled. Packed
+    images are passed to the pipeline as ``results['img_bytes']`` and decoded
+    by ``LoadImageFromFile``. Mixup is supported as in
+    :obj:`UnderseaDataset`.
+
+    Packed files do not contain the original COCO annotations, so
+    evaluations that need ``dataset.coco`` should use the json files.
+    """
+
+    def load_annotations(self, ann_file):
+        self.packed, meta = load_packed(ann_file)
+        self.CLASSES = tuple(meta['classes'])
+        self.cat_ids = meta['cat_ids']
+        self.cat2label = {
+            cat_id: i + 1
+            for i, cat_id in enumerate(self.cat_ids)
+        }
+        self.img_ids = self.packed['img_ids'].tolist()
+        filenames = self.packed['filenames'].tobytes()
+        filename_offsets = self.packed['filename_offsets'].tolist()
+        img_infos = []
+        for i, (height,
+                width) in enumerate(self.packed['img_shapes'].tolist()):
+            filename = filenames[filename_offsets[i]:filename_offsets[i + 1]]
+            img_infos.append(
+                dict(
+                    id=self.img_ids[i],
+                    filename=filename.decode('utf-8'),
+                    width=width,
+                    height=height,
+                    packed_idx=i))
+        return img_infos
+
+    def __getstate__(self):
+        # pickled memory maps are copied, reopen the file instead
+        state = self.__dict__.copy()
+        state['packed'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.packed = load_packed(self.ann_file)[0]
+
+    def _filter_imgs(self, min_size=32):
+        """Filter images too small or without ground truths."""
+        img_shapes = self.packed['img_shapes']
+        valid = self.packed['has_ann'] & (img_shapes.min(axis=1) >= min_size)
+        return np.nonzero(valid)[0].tolist()
+
+    def get_ann_info(self, idx):
+        img_info = self.img_infos[idx]
+        i = img_info['packed_idx']
+        start, end = self.packed['bbox_offsets'][i:i + 2]
+        ignore_start, ignore_end = self.packed['bbox_ignore_offsets'][i:i + 2]
+        # copy the slices so that pipelines never modify the packed file
+        return dict(
+            bboxes=np.array(self.packed['bboxes'][start:end]),
+            labels=np.array(self.packed['labels'][start:end]),
+            bboxes_ignore=np.array(
+                self.packed['bboxes_ignore'][ignore_start:ignore_end]),
+            seg_map=img_info['filename'].replace('jpg', 'png'))
+
+    def pre_pipeline(self, results):
+        super(PackedDataset, self).pre_pipeline(results)
+        if 'img_bytes' in self.packed:
+            i = results['img_info']['packed_idx']
+            start, end = self.packed['img_offsets'][i:i + 2]
+            results['img_bytes'] = self.packed['img_bytes'][start:end]
@@ -1,12 +1,13 @@
 from .compose import Compose
 from .formating import (Collect, ImageToTensor, ToDataContainer, ToTensor,
                         Transpose, to_tensor)
+from .image_cache import ImageCache, ImageCacheHook, has_image_cache
 from .loading import LoadAnnotations, LoadImageFromFile, LoadProposals
 from .mixup import LoadAnnotations_mixup, LoadImageFromFile_mixup, MixUp
-from .test_aug import MultiScaleFlipAug
-from .transforms import (Expand, MinIoURandomCrop, Normalize, Pad,
-                         PhotoMetricDistortion, RandomCrop, RandomFlip, Resize,
-                         SegResizeFlipPadRescale)
+from .test_aug import MultiScaleFlipAug, replace_image_to_tensor
+from .transforms import (Expand, FusedImageTransform, MinIoURandomCrop,
+                         Normalize, Pad, PhotoMetricDistortion, RandomCrop,
+                         RandomFlip, Resize, SegResizeFlipPadRescale)
 from .instaboost import InstaBoost
 
 __all__ = [
@@ -15,5 +16,6 @@ __all__ = [
     'LoadProposals', 'MultiScaleFlipAug', 'Resize', 'RandomFlip', 'Pad',
     'RandomCrop', 'Normalize', 'SegResizeFlipPadRescale', 'MinIoURandomCrop',
     'Expand', 'PhotoMetricDistortion', 'InstaBoost','LoadImageFromFile_mixup',
-    'LoadAnnotations_mixup', 'MixUp'
+    'LoadAnnotations_mixup', 'MixUp', 'ImageCache', 'ImageCacheHook',
+    'has_image_cache', 'FusedImageTransform', 'replace_image_to_tensor'
 ]
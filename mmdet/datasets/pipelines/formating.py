@@ -52,7 +52,9 @@ class ImageToTensor(object):
 
     def __call__(self, results):
         for key in self.keys:
-            results[key] = to_tensor(results[key].transpose(2, 0, 1))
+            # images from FusedImageTransform are already (C, H, W) tensors
+            if not isinstance(results[key], torch.Tensor):
+                results[key] = to_tensor(results[key].transpose(2, 0, 1))
         return results
 
     def __repr__(self):
@@ -103,7 +105,8 @@ class DefaultFormatBundle(object):
     "proposals", "gt_bboxes", "gt_labels", "gt_masks" and "gt_semantic_seg".
     These fields are formatted as follows.
 
-    - img: (1)transpose, (2)to tensor, (3)to DataContainer (stack=True)
+    - img: (1)transpose, (2)to tensor, (3)to DataContainer (stack=True),
+           (1) and (2) are skipped if it is already a tensor
     - proposals: (1)to tensor, (2)to DataContainer
     - gt_bboxes: (1)to tensor, (2)to DataContainer
     - gt_bboxes_ignore: (1)to tensor, (2)to DataContainer
@@ -115,8 +118,10 @@ class DefaultFormatBundle(object):
 
     def __call__(self, results):
         if 'img' in results:
-            img = np.ascontiguousarray(results['img'].transpose(2, 0, 1))
-            results['img'] = DC(to_tensor(img), stack=True)
+            img = results['img']
+            if not isinstance(img, torch.Tensor):
+                img = to_tensor(np.ascontiguousarray(img.transpose(2, 0, 1)))
+            results['img'] = DC(img, stack=True)
         for key in ['proposals', 'gt_bboxes', 'gt_bboxes_ignore', 'gt_labels']:
             if key not in results:
                 continue
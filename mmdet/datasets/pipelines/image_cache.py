@@ -0,0 +1,249 @@
+import atexit
+import hashlib
+import multiprocessing as mp
+import os
+import os.path as osp
+import shutil
+import tempfile
+import time
+import warnings
+import weakref
+
+import mmcv
+import numpy as np
+from mmcv.runner import Hook
+
+# all caches alive in this process, whose stats are logged by ImageCacheHook
+_image_caches = weakref.WeakSet()
+
+
+class ImageCache(object):
+    """An LRU cache of images shared by all DataLoader workers.
+
+    Each cached image is a file in ``cache_dir``, which is a new directory
+    in ``/dev/shm`` (i.e. in shared memory) by default. The byte counter and
+    the hit/miss counters live in shared memory as well, so the cache is
+    shared by all workers forked from the process that built it. When the
+    cached bytes exceed ``max_bytes``, the least recently used images are
+    evicted until ``evict_ratio * max_bytes`` bytes are left.
+
+    Decoded images are stored as ``.npy`` files which are memory-mapped
+    copy-on-write on hits, so the pages of an image are only copied if it is
+    modified in place. Storing the raw file bytes instead saves memory (and
+    I/O) but the images still have to be decoded.
+
+    If an image cannot be written to the cache, e.g. when ``/dev/shm`` is
+    full, the cache is disabled in all workers and the images are read from
+    disk from then on.
+
+    Args:
+        max_bytes (int): Byte budget of the cache.
+        decoded (bool): Whether to store decoded arrays or raw file bytes.
+        cache_dir (str, optional): Directory of the cached files. If not
+            specified, a temporary directory is created and removed at exit.
+        evict_ratio (float): Fraction of ``max_bytes`` to keep on eviction.
+    """
+
+    def __init__(self,
+                 max_bytes=4 * 1024**3,
+                 decoded=True,
+                 cache_dir=None,
+                 evict_ratio=0.9):
+        assert 0 <= evict_ratio <= 1
+        self.max_bytes = int(max_bytes)
+        self.decoded = decoded
+        self.evict_ratio = evict_ratio
+        if cache_dir is None:
+            shm_dir = '/dev/shm' if osp.isdir('/dev/shm') else None
+            self.cache_dir = tempfile.mkdtemp(
+                prefix='mmdet_img_cache_', dir=shm_dir)
+            atexit.register(_remove_dir, self.cache_dir, os.getpid())
+        else:
+            mmcv.mkdir_or_exist(cache_dir)
+            self.cache_dir = cache_dir
+        self._suffix = '.npy' if decoded else '.bin'
+        self._lock = mp.Lock()
+        self._num_bytes = mp.Value('q', self._scan_dir()[1], lock=False)
+        self._hits = mp.Value('q', 0)
+        self._misses = mp.Value('q', 0)
+        self._disabled = mp.Value('b', False, lock=False)
+        _image_caches.add(self)
+
+    def _cache_path(self, filename, flag):
+        key = '{}:{}'.format(filename, flag).encode('utf-8')
+        return osp.join(self.cache_dir,
+                        hashlib.md5(key).hexdigest() + self._suffix)
+
+    def _scan_dir(self):
+        entries = []
+        num_bytes = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self._suffix):
+                continue
+            try:
+                stat = os.stat(osp.join(self.cache_dir, name))
+            except OSError:  # evicted by another worker
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            num_bytes += stat.st_size
+        return entries, num_bytes
+
+    def _get(self, path, flag):
+        try:
+            if self.decoded:
+                img = np.load(path, mmap_mode='c')
+            else:
+                with open(path, 'rb') as f:
+                    img = mmcv.imfrombytes(f.read(), flag)
+            self._touch(path)
+        except (IOError, OSError, ValueError):
+            # not cached, just evicted or being written by another worker
+            return None
+        return img
+
+    def _touch(self, path):
+        # the mtime is used as the last access time of LRU eviction, it is
+        # set explicitly since file timestamps may be as coarse as a jiffy
+        now = time.time()
+        os.utime(path, (now, now))
+
+    def _put(self, path, content):
+        num_bytes = content.nbytes if self.decoded else len(content)
+        if num_bytes > self.max_bytes:
+            return
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+            with os.fdopen(fd, 'wb') as f:
+                if self.decoded:
+                    np.save(f, content)
+                else:
+                    f.write(content)
+            # renaming is atomic, readers never see partially written files
+            os.rename(tmp_path, path)
+        except OSError as e:
+            # e.g. ENOSPC when /dev/shm is full
+            if tmp_path is not None and osp.exists(tmp_path):
+                os.remove(tmp_path)
+            self._disabled.value = True
+            warnings.warn('Disabling the image cache in {}, images are read '
+                          'from disk from now on: {}'.format(
+                              self.cache_dir, e))
+            return
+        try:
+            self._touch(path)
+        except OSError:  # evicted by another worker
+            pass
+        with self._lock:
+            self._num_bytes.value += num_bytes
+            if self._num_bytes.value > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries, num_bytes = self._scan_dir()
+        target_bytes = self.evict_ratio * self.max_bytes
+        for _, size, name in sorted(entries):
+            if num_bytes <= target_bytes:
+                break
+            try:
+                os.remove(osp.join(self.cache_dir, name))
+            except OSError:
+                continue
+            num_bytes -= size
+        self._num_bytes.value = num_bytes
+
+    def load(self, filename, flag='color'):
+        """Load an image from the cache, or read it and cache it."""
+        if self.disabled:
+            return mmcv.imread(filename, flag)
+        path = self._cache_path(filename, flag)
+        img = self._get(path, flag)
+        counter = self._misses if img is None else self._hits
+        with counter.get_lock():
+            counter.value += 1
+        if img is not None:
+            return img
+        if self.decoded:
+            img = mmcv.imread(filename, flag)
+            self._put(path, img)
+        else:
+            with open(filename, 'rb') as f:
+                content = f.read()
+            img = mmcv.imfrombytes(content, flag)
+            self._put(path, content)
+        return img
+
+    @property
+    def disabled(self):
+        return bool(self._disabled.value)
+
+    @property
+    def num_bytes(self):
+        return self._num_bytes.value
+
+    def stats(self):
+        """Return the hit and miss numbers since the cache was built."""
+        return self._hits.value, self._misses.value
+
+    def __repr__(self):
+        return self.__class__.__name__ + (
+            '(max_bytes={}, decoded={}, cache_dir={})'.format(
+                self.max_bytes, self.decoded, self.cache_dir))
+
+
+def _remove_dir(path, pid):
+    # atexit handlers are inherited by forked workers, only the process that
+    # created the directory removes it
+    if os.getpid() == pid:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def build_image_cache(cfg):
+    """Build an :obj:`ImageCache` from a config dict, or return None."""
+    if cfg is None:
+        return None
+    elif isinstance(cfg, ImageCache):
+        return cfg
+    elif isinstance(cfg, dict):
+        return ImageCache(**cfg)
+    else:
+        raise TypeError(
+            'cache must be a dict or an ImageCache, but got {}'.format(
+                type(cfg)))
+
+
+class ImageCacheHook(Hook):
+    """Log the hit rate of the image caches during training.
+
+    The hit rate over each logging interval is added to the log buffer as
+    ``img_cache_hit``, together with the cached size ``img_cache_mb``.
+    """
+
+    def __init__(self):
+        self._last_stats = (0, 0)
+
+    def before_run(self, runner):
+        self._last_stats = self._stats()
+
+    def _stats(self):
+        hits, misses = 0, 0
+        for cache in list(_image_caches):
+            cache_hits, cache_misses = cache.stats()
+            hits += cache_hits
+            misses += cache_misses
+        return hits, misses
+
+    def after_train_iter(self, runner):
+        hits, misses = self._stats()
+        new_hits = hits - self._last_stats[0]
+        new_total = new_hits + misses - self._last_stats[1]
+        self._last_stats = (hits, misses)
+        if new_total > 0:
+            runner.log_buffer.update({'img_cache_hit': new_hits / new_total},
+                                     new_total)
+        num_bytes = sum(cache.num_bytes for cache in list(_image_caches))
+        runner.log_buffer.update({'img_cache_mb': num_bytes / 1024**2})
+
+
+def has_image_cache():
+    return len(_image_caches) > 0
@@ -6,18 +6,39 @@ import numpy as np
 import pycocotools.mask as maskUtils
 
 from ..registry import PIPELINES
+from .image_cache import build_image_cache
 
 
 @PIPELINES.register_module
 class LoadImageFromFile(object):
+    """Load an image from file.
 
-    def __init__(self, to_float32=False):
+    Args:
+        to_float32 (bool): Whether to convert the image to float32.
+        cache (dict | :obj:`ImageCache`, optional): Config of the image cache
+            shared by the DataLoader workers, e.g.
+            ``dict(max_bytes=8 * 1024**3, decoded=True)``. Images are read
+            from disk every time if not specified.
+    """
+
+    def __init__(self, to_float32=False, cache=None):
         self.to_float32 = to_float32
+        self.cache = build_image_cache(cache)
 
     def __call__(self, results):
-        filename = osp.join(results['img_prefix'],
-                            results['img_info']['filename'])
-        img = mmcv.imread(filename)
+        if results['img_prefix'] is not None:
+            filename = osp.join(results['img_prefix'],
+                                results['img_info']['filename'])
+        else:
+            filename = results['img_info']['filename']
+        # images of packed datasets are decoded from the memory-mapped bytes
+        img_bytes = results.pop('img_bytes', None)
+        if img_bytes is not None:
+            img = mmcv.imfrombytes(img_bytes)
+        elif self.cache is not None:
+            img = self.cache.load(filename)
+        else:
+            img = mmcv.imread(filename)
         if self.to_float32:
             img = img.astype(np.float32)
         results['filename'] = filename
@@ -27,8 +48,8 @@ class LoadImageFromFile(object):
         return results
 
     def __repr__(self):
-        return self.__class__.__name__ + '(to_float32={})'.format(
-            self.to_float32)
+        return self.__class__.__name__ + '(to_float32={}, cache={})'.format(
+            self.to_float32, self.cache)
 
 
 @PIPELINES.register_module
@@ -7,44 +7,53 @@ import pycocotools.mask as maskUtils
 import torch.utils.data._utils.collate
 
 from ..registry import PIPELINES
+from .image_cache import build_image_cache
 
 
 @PIPELINES.register_module
 class LoadImageFromFile_mixup(object):
+    """Load the image of a result or of each result in a list.
 
-    def __init__(self, to_float32=False):
+    Args:
+        to_float32 (bool): Whether to convert the images to float32.
+        cache (dict | :obj:`ImageCache`, optional): Config of the image cache
+            shared by the DataLoader workers, see :obj:`LoadImageFromFile`.
+    """
+
+    def __init__(self, to_float32=False, cache=None):
         self.to_float32 = to_float32
+        self.cache = build_image_cache(cache)
 
-    def __call__(self, results):
-        if isinstance(results, list):
-            res = []
-            for result in results:
-                filename = osp.join(result['img_prefix'],
-                                    result['img_info']['filename'])
-                img = mmcv.imread(filename)
-                if self.to_float32:
-                    img = img.astype(np.float32)
-                result['filename'] = filename
-                result['img'] = img
-                result['img_shape'] = img.shape
-                result['ori_shape'] = img.shape
-                res.append(result)
-            return res
-        else:
+    def _load(self, results):
+        if results['img_prefix'] is not None:
             filename = osp.join(results['img_prefix'],
                                 results['img_info']['filename'])
+        else:
+            filename = results['img_info']['filename']
+        # images of packed datasets are decoded from the memory-mapped bytes
+        img_bytes = results.pop('img_bytes', None)
+        if img_bytes is not None:
+            img = mmcv.imfrombytes(img_bytes)
+        elif self.cache is not None:
+            img = self.cache.load(filename)
+        else:
             img = mmcv.imread(filename)
-            if self.to_float32:
-                img = img.astype(np.float32)
-            results['filename'] = filename
-            results['img'] = img
-            results['img_shape'] = img.shape
-            results['ori_shape'] = img.shape
+        if self.to_float32:
+            img = img.astype(np.float32)
+        results['filename'] = filename
+        results['img'] = img
+        results['img_shape'] = img.shape
+        results['ori_shape'] = img.shape
         return results
 
+    def __call__(self, results):
+        if isinstance(results, list):
+            return [self._load(result) for result in results]
+        return self._load(results)
+
     def __repr__(self):
-        return self.__class__.__name__ + '(to_float32={})'.format(
-            self.to_float32)
+        return self.__class__.__name__ + '(to_float32={}, cache={})'.format(
+            self.to_float32, self.cache)
 
 
 @PIPELINES.register_module
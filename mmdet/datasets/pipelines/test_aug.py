@@ -1,3 +1,5 @@
+import copy
+
 import mmcv
 
 from ..registry import PIPELINES
@@ -36,3 +38,17 @@ class MultiScaleFlipAug(object):
         repr_str += '(transforms={}, img_scale={}, flip={})'.format(
             self.transforms, self.img_scale, self.flip)
         return repr_str
+
+
+def replace_image_to_tensor(pipeline):
+    """Replace the ImageToTensor of images in a test pipeline with
+    DefaultFormatBundle, so that images of different sizes are padded to the
+    same size when they are collated into a batch."""
+    pipeline = copy.deepcopy(pipeline)
+    for i, transform in enumerate(pipeline):
+        if transform['type'] == 'MultiScaleFlipAug':
+            transform['transforms'] = replace_image_to_tensor(
+                transform['transforms'])
+        elif transform == dict(type='ImageToTensor', keys=['img']):
+            pipeline[i] = dict(type='DefaultFormatBundle')
+    return pipeline
@@ -5,6 +5,7 @@ from numpy import random
 
 from mmdet.core.evaluation.bbox_overlaps import bbox_overlaps
 from ..registry import PIPELINES
+from .formating import to_tensor
 
 
 @PIPELINES.register_module
@@ -277,24 +278,31 @@ class Normalize(object):
         std (sequence): Std values of 3 channels.
         to_rgb (bool): Whether to convert the image from BGR to RGB,
             default is true.
+        on_device (bool): Whether to leave the image as uint8 and only record
+            the ``img_norm_cfg``, so that the detector normalizes the images
+            on its device (see :func:`normalize_img_tensor`). The uint8
+            images are a quarter of the size of the float ones to send from
+            the loader workers and to collate. The padding value must be 0.
     """
 
-    def __init__(self, mean, std, to_rgb=True):
+    def __init__(self, mean, std, to_rgb=True, on_device=False):
         self.mean = np.array(mean, dtype=np.float32)
         self.std = np.array(std, dtype=np.float32)
         self.to_rgb = to_rgb
+        self.on_device = on_device
 
     def __call__(self, results):
-        results['img'] = mmcv.imnormalize(results['img'], self.mean, self.std,
-                                          self.to_rgb)
+        if not self.on_device:
+            results['img'] = mmcv.imnormalize(results['img'], self.mean,
+                                              self.std, self.to_rgb)
         results['img_norm_cfg'] = dict(
             mean=self.mean, std=self.std, to_rgb=self.to_rgb)
         return results
 
     def __repr__(self):
         repr_str = self.__class__.__name__
-        repr_str += '(mean={}, std={}, to_rgb={})'.format(
-            self.mean, self.std, self.to_rgb)
+        repr_str += '(mean={}, std={}, to_rgb={}, on_device={})'.format(
+            self.mean, self.std, self.to_rgb, self.on_device)
         return repr_str
 
 
@@ -405,6 +413,142 @@ class SegResizeFlipPadRescale(object):
             self.scale_factor)
 
 
+@PIPELINES.register_module
+class FusedImageTransform(object):
+    """Resize, flip, normalize, pad and transpose images in a single step.
+
+    Equivalent to the chain ``Resize`` -> ``RandomFlip`` -> ``Normalize`` ->
+    ``Pad`` -> ``ImageToTensor``, with the same results and image meta, but
+    the image is only resized once and then written channel by channel into a
+    preallocated padded (C, H, W) float32 buffer, where it is normalized in
+    place, instead of allocating a full-size copy in every transform (with
+    ``on_device`` normalization, the buffer is uint8 and only filled). Bboxes
+    and masks are processed as in the chained transforms.
+
+    The output image is a tensor which ``DefaultFormatBundle`` and
+    ``ImageToTensor`` keep as it is, so this must be the last transform
+    before the formatting ones.
+
+    Args:
+        resize (dict): Args of ``Resize``.
+        normalize (dict): Args of ``Normalize``.
+        flip (dict, optional): Args of ``RandomFlip``, images are not flipped
+            if not given (unless "flip" is set in the results).
+        pad (dict, optional): Args of ``Pad``, images are not padded if not
+            given.
+    """
+
+    def __init__(self, resize, normalize, flip=None, pad=None):
+        self.resize = Resize(**resize)
+        self.normalize = Normalize(**normalize)
+        self.flip = RandomFlip(**(flip or dict(flip_ratio=0)))
+        self.pad = Pad(**pad) if pad is not None else None
+
+    def _target_size(self, results):
+        h, w = results['img'].shape[:2]
+        scale = results['scale']
+        if self.resize.keep_ratio:
+            # the same as mmcv.imrescale
+            if isinstance(scale, (float, int)):
+                scale_factor = scale
+            else:
+                scale_factor = min(
+                    max(scale) / max(h, w),
+                    min(scale) / min(h, w))
+            size = (int(w * float(scale_factor) + 0.5),
+                    int(h * float(scale_factor) + 0.5))
+        else:
+            size = scale
+            scale_factor = np.array(
+                [size[0] / w, size[1] / h, size[0] / w, size[1] / h],
+                dtype=np.float32)
+        return size, scale_factor
+
+    def _pad_shape(self, img_shape):
+        if self.pad is None:
+            return img_shape
+        if self.pad.size is not None:
+            pad_h, pad_w = self.pad.size
+        else:
+            divisor = self.pad.size_divisor
+            pad_h = int(np.ceil(img_shape[0] / divisor)) * divisor
+            pad_w = int(np.ceil(img_shape[1] / divisor)) * divisor
+        return (pad_h, pad_w, img_shape[2])
+
+    def _transform_img(self, results):
+        img = results['img']
+        size, scale_factor = self._target_size(results)
+        if size != (img.shape[1], img.shape[0]):
+            img = mmcv.imresize(img, size)
+        img_shape = img.shape
+        pad_shape = self._pad_shape(img_shape)
+        h, w = img_shape[:2]
+        if results['flip']:
+            img = img[:, ::-1]
+
+        on_device = self.normalize.on_device
+        out = np.empty(
+            (pad_shape[2], ) + pad_shape[:2],
+            dtype=img.dtype if on_device else np.float32)
+        # Pad only passes pad_val to mmcv.impad with size_divisor
+        pad_val = self.pad.pad_val if (self.pad is not None
+                                       and self.pad.size is None) else 0
+        out[:, h:, :] = pad_val
+        out[:, :h, w:] = pad_val
+        mean, std = self.normalize.mean, self.normalize.std
+        num_channels = img_shape[2]
+        for c in range(num_channels):
+            if on_device:
+                out[c, :h, :w] = img[..., c]
+                continue
+            src_c = num_channels - 1 - c if self.normalize.to_rgb else c
+            channel = out[c, :h, :w]
+            channel[...] = img[..., src_c]
+            channel -= mean[c]
+            channel /= std[c]
+
+        results['img'] = to_tensor(out)
+        results['img_shape'] = img_shape
+        results['pad_shape'] = pad_shape
+        results['scale_factor'] = scale_factor
+        results['keep_ratio'] = self.resize.keep_ratio
+        results['img_norm_cfg'] = dict(
+            mean=self.normalize.mean,
+            std=self.normalize.std,
+            to_rgb=self.normalize.to_rgb)
+        if self.pad is not None:
+            results['pad_fixed_size'] = self.pad.size
+            results['pad_size_divisor'] = self.pad.size_divisor
+
+    def _flip_annotations(self, results):
+        for key in results.get('bbox_fields', []):
+            results[key] = self.flip.bbox_flip(results[key],
+                                               results['img_shape'])
+        for key in results.get('mask_fields', []):
+            results[key] = [mask[:, ::-1] for mask in results[key]]
+
+    def __call__(self, results):
+        if 'scale' not in results:
+            self.resize._random_scale(results)
+        if 'flip' not in results:
+            flip = True if np.random.rand() < self.flip.flip_ratio else False
+            results['flip'] = flip
+        self._transform_img(results)
+        self.resize._resize_bboxes(results)
+        self.resize._resize_masks(results)
+        if results['flip']:
+            self._flip_annotations(results)
+        if self.pad is not None:
+            self.pad._pad_masks(results)
+        return results
+
+    def __repr__(self):
+        repr_str = self.__class__.__name__
+        repr_str += '(resize={}, flip={}, normalize={}, pad={})'.format(
+            self.resize, self.flip, self.normalize, self.pad)
+        return repr_str
+
+
 @PIPELINES.register_module
 class PhotoMetricDistortion(object):
     """Apply photometric distortion to image sequentially, every transformation
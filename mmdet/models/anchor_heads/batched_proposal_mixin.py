@@ -0,0 +1,154 @@
+import torch
+
+from mmdet.core import batched_nms, delta2bbox
+from mmdet.ops import nms
+
+
+class BatchedProposalMixin(object):
+    """Generate RPN proposals of all levels and images at once.
+
+    Used instead of ``get_bboxes_single`` when ``batched_nms=True`` in the
+    proposal config. Boxes of all levels and images are decoded by a single
+    ``delta2bbox`` call and suppressed by a single :func:`batched_nms` call,
+    in which each (image, level) pair is a group, so the proposals are the
+    same as those of the per-level loop with ``nms_across_levels=False``
+    (only the order of proposals with equal scores may differ).
+    ``batched_nms`` falls back to suppressing the groups one by one when
+    there are too many boxes for a single call to be faster.
+    """
+
+    def get_bboxes_batched(self,
+                           cls_scores,
+                           bbox_preds,
+                           img_metas,
+                           cfg,
+                           mlvl_extras=None):
+        """Get the proposals of a batch.
+
+        Args:
+            cls_scores (list[Tensor]): Multi-level scores of shape
+                (N, A * C, H, W).
+            bbox_preds (list[Tensor]): Multi-level deltas of shape
+                (N, A * 4, H, W).
+            img_metas (list[dict]): Image meta info.
+            cfg (dict): Proposal config.
+            mlvl_extras (list[Tensor], optional): Multi-level predictions of
+                shape (N, A * K, H, W) that are kept along with the proposals,
+                e.g. mask coefficients.
+
+        Returns:
+            list[Tensor] | tuple: Proposals of shape (n, 5) of each image, and
+                the kept extra predictions of shape (n, K) of each image if
+                ``mlvl_extras`` is given.
+        """
+        num_imgs = len(img_metas)
+        num_levels = len(cls_scores)
+        device = cls_scores[0].device
+        img_inds = torch.arange(num_imgs, device=device)[:, None]
+
+        mlvl_scores, mlvl_deltas, mlvl_anchors, mlvl_ids = [], [], [], []
+        mlvl_kept_extras = []
+        for lvl in range(num_levels):
+            cls_score = cls_scores[lvl].detach().permute(0, 2, 3, 1)
+            if self.use_sigmoid_cls:
+                scores = cls_score.reshape(num_imgs, -1).sigmoid()
+            else:
+                scores = cls_score.reshape(num_imgs, -1, 2).softmax(dim=2)
+                scores = scores[..., 1]
+            deltas = bbox_preds[lvl].detach().permute(0, 2, 3, 1).reshape(
+                num_imgs, -1, 4)
+            anchors = self.anchor_generators[lvl].grid_anchors(
+                cls_scores[lvl].size()[-2:],
+                self.anchor_strides[lvl],
+                device=device)
+            anchors = anchors[None].expand(num_imgs, -1, -1)
+            if mlvl_extras is not None:
+                extras = mlvl_extras[lvl].permute(0, 2, 3, 1)
+                extras = extras.reshape(num_imgs, scores.size(1), -1)
+            if cfg.nms_pre > 0 and scores.size(1) > cfg.nms_pre:
+                scores, topk_inds = scores.topk(cfg.nms_pre, dim=1)
+                deltas = deltas[img_inds, topk_inds]
+                anchors = anchors[img_inds, topk_inds]
+                if mlvl_extras is not None:
+                    extras = extras[img_inds, topk_inds]
+            mlvl_scores.append(scores)
+            mlvl_deltas.append(deltas)
+            mlvl_anchors.append(anchors)
+            mlvl_ids.append(img_inds * num_levels + lvl +
+                            scores.new_zeros(scores.shape, dtype=torch.long))
+            if mlvl_extras is not None:
+                mlvl_kept_extras.append(extras)
+
+        scores = torch.cat(mlvl_scores, dim=1).reshape(-1)
+        group_ids = torch.cat(mlvl_ids, dim=1).reshape(-1)
+        proposals = delta2bbox(
+            torch.cat(mlvl_anchors, dim=1).reshape(-1, 4),
+            torch.cat(mlvl_deltas, dim=1).reshape(-1, 4), self.target_means,
+            self.target_stds)
+        # clip the boxes to the image shape of each image
+        max_shapes = proposals.new_tensor(
+            [[meta['img_shape'][1] - 1, meta['img_shape'][0] - 1] * 2
+             for meta in img_metas])
+        num_per_img = scores.size(0) // num_imgs
+        proposals = torch.min(
+            proposals.clamp(min=0).view(num_imgs, num_per_img, 4),
+            max_shapes[:, None, :]).view(-1, 4)
+        keep = torch.arange(scores.size(0), device=device)
+        if cfg.min_bbox_size > 0:
+            w = proposals[:, 2] - proposals[:, 0] + 1
+            h = proposals[:, 3] - proposals[:, 1] + 1
+            keep = torch.nonzero((w >= cfg.min_bbox_size)
+                                 & (h >= cfg.min_bbox_size)).view(-1)
+
+        if keep.numel() > 0:
+            dets, nms_keep = batched_nms(proposals[keep], scores[keep],
+                                         group_ids[keep],
+                                         dict(type='nms', iou_thr=cfg.nms_thr))
+            keep = keep[nms_keep]
+            # dets are sorted by scores, keep the top nms_post of each group
+            group_ids = group_ids[keep]
+            valid = self._rank_in_group(group_ids,
+                                        num_imgs * num_levels) < cfg.nms_post
+            dets, keep, group_ids = dets[valid], keep[valid], group_ids[valid]
+        else:
+            dets = proposals.new_zeros((0, 5))
+            group_ids = group_ids.new_zeros((0, ))
+        if mlvl_extras is not None:
+            extras = torch.cat(mlvl_kept_extras, dim=1)
+            extras = extras.reshape(-1, extras.size(-1))
+
+        result_list, extra_list = [], []
+        for img_id in range(num_imgs):
+            img_keep = torch.nonzero(group_ids //
+                                     num_levels == img_id).view(-1)
+            if cfg.nms_across_levels:
+                # nms returns the kept boxes in the input order, put them in
+                # the order of levels as the per-level loop does
+                _, order = (group_ids[img_keep] * dets.size(0) +
+                            img_keep).sort()
+                img_dets, nms_keep = nms(dets[img_keep[order]], cfg.nms_thr)
+                img_keep = img_keep[order[nms_keep]]
+            else:
+                img_dets = dets[img_keep]
+            result_list.append(img_dets[:cfg.max_num])
+            if mlvl_extras is not None:
+                extra_list.append(extras[keep[img_keep[:cfg.max_num]]])
+        if mlvl_extras is not None:
+            return result_list, extra_list
+        return result_list
+
+    @staticmethod
+    def _rank_in_group(group_ids, num_groups):
+        """Rank of each element among the elements of the same group.
+
+        Elements of a group are ranked in the order they appear, e.g. the
+        ranks of ``[1, 0, 1, 1, 0]`` are ``[0, 0, 1, 2, 1]``.
+        """
+        num = group_ids.numel()
+        order = torch.arange(num, device=group_ids.device)
+        _, perm = (group_ids * num + order).sort()
+        counts = torch.bincount(group_ids, minlength=num_groups)
+        starts = torch.cumsum(counts, dim=0) - counts
+        ranks = torch.empty_like(order)
+        ranks[perm] = order - starts[group_ids[perm]]
+        return ranks
@@ -2,7 +2,8 @@ import torch
 import torch.nn as nn
 from mmcv.cnn import normal_init
 
-from mmdet.core import distance2bbox, force_fp32, multi_apply, multiclass_nms
+from mmdet.core import (distance2bbox, force_fp32, grid_cache, grid_cache_key,
+                        multi_apply, multiclass_nms)
 from ..builder import build_loss
 from ..registry import HEADS
 from ..utils import ConvModule, Scale, bias_init_with_prob
@@ -288,6 +289,13 @@ class FCOSHead(nn.Module):
         return mlvl_points
 
     def get_points_single(self, featmap_size, stride, dtype, device):
+        key = grid_cache_key(
+            'fcos_points', featmap_size, stride, dtype, device=device)
+        return grid_cache.get(
+            key, lambda: self._get_points_single(featmap_size, stride, dtype,
+                                                 device))
+
+    def _get_points_single(self, featmap_size, stride, dtype, device):
         h, w = featmap_size
         x_range = torch.arange(
             0, w * stride, stride, dtype=dtype, device=device)
@@ -3,14 +3,15 @@ import torch.nn as nn
 import torch.nn.functional as F
 from mmcv.cnn import normal_init
 
-from mmdet.core import delta2bbox
+from mmdet.core import delta2bbox, force_fp32
 from mmdet.ops import nms
 from ..registry import HEADS
 from .anchor_head import AnchorHead
+from .batched_proposal_mixin import BatchedProposalMixin
 
 
 @HEADS.register_module
-class RPNHead(AnchorHead):
+class RPNHead(AnchorHead, BatchedProposalMixin):
 
     def __init__(self, in_channels, **kwargs):
         super(RPNHead, self).__init__(2, in_channels, **kwargs)
@@ -52,6 +53,15 @@ class RPNHead(AnchorHead):
         return dict(
             loss_rpn_cls=losses['loss_cls'], loss_rpn_bbox=losses['loss_bbox'])
 
+    @force_fp32(apply_to=('cls_scores', 'bbox_preds'))
+    def get_bboxes(self, cls_scores, bbox_preds, img_metas, cfg,
+                   rescale=False):
+        if cfg.get('batched_nms', False):
+            return self.get_bboxes_batched(cls_scores, bbox_preds, img_metas,
+                                           cfg)
+        return super(RPNHead, self).get_bboxes(cls_scores, bbox_preds,
+                                               img_metas, cfg, rescale)
+
     def get_bboxes_single(self,
                           cls_scores,
                           bbox_preds,
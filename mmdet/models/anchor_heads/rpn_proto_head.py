@@ -8,10 +8,11 @@ from mmdet.ops import nms
 from ..utils import ConvModule
 from ..registry import HEADS
 from .anchor_head import AnchorHead
+from .batched_proposal_mixin import BatchedProposalMixin
 
 
 @HEADS.register_module
-class RPNProtoHead(AnchorHead):
+class RPNProtoHead(AnchorHead, BatchedProposalMixin):
 
     def __init__(self,
                  in_channels,
@@ -68,6 +69,9 @@ class RPNProtoHead(AnchorHead):
     def get_bboxes(self, cls_scores, bbox_preds, rpn_coef, img_metas, cfg,
                    rescale=False):
         assert len(cls_scores) == len(bbox_preds)
+        if cfg.get('batched_nms', False):
+            return self.get_bboxes_batched(
+                cls_scores, bbox_preds, img_metas, cfg, mlvl_extras=rpn_coef)
         num_levels = len(cls_scores)
 
         mlvl_anchors = [
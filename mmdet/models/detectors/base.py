@@ -4,9 +4,11 @@ from abc import ABCMeta, abstractmethod
 import mmcv
 import numpy as np
 import pycocotools.mask as maskUtils
+import torch
 import torch.nn as nn
 
-from mmdet.core import auto_fp16, get_classes, tensor2imgs
+from mmdet.core import (auto_fp16, get_classes, normalize_img_tensor,
+                        tensor2imgs)
 
 
 class BaseDetector(nn.Module):
@@ -14,6 +16,11 @@ class BaseDetector(nn.Module):
 
     __metaclass__ = ABCMeta
 
+    # Whether simple_test takes a batch of several images and returns a list
+    # of the results of each image. Subclasses overriding simple_test must
+    # opt in again.
+    supports_batch_test = False
+
     def __init__(self):
         super(BaseDetector, self).__init__()
         self.fp16_enabled = False
@@ -71,17 +78,30 @@ class BaseDetector(nn.Module):
             raise ValueError(
                 'num of augmentations ({}) != num of image meta ({})'.format(
                     len(imgs), len(img_metas)))
-        # TODO: remove the restriction of imgs_per_gpu == 1 when prepared
         imgs_per_gpu = imgs[0].size(0)
-        assert imgs_per_gpu == 1
-
         if num_augs == 1:
+            assert imgs_per_gpu == 1 or self.supports_batch_test, \
+                '{} cannot be tested with more than 1 image per gpu'.format(
+                    self.__class__.__name__)
             return self.simple_test(imgs[0], img_metas[0], **kwargs)
         else:
+            # TODO: remove the restriction of imgs_per_gpu == 1 when prepared
+            assert imgs_per_gpu == 1
             return self.aug_test(imgs, img_metas, **kwargs)
 
-    @auto_fp16(apply_to=('img', ))
     def forward(self, img, img_meta, return_loss=True, **kwargs):
+        # uint8 images are normalized here, on the device of the model
+        if return_loss and img.dtype == torch.uint8:
+            img = normalize_img_tensor(img, img_meta)
+        elif not return_loss and img[0].dtype == torch.uint8:
+            img = [
+                normalize_img_tensor(aug_img, aug_meta)
+                for aug_img, aug_meta in zip(img, img_meta)
+            ]
+        return self._forward(img, img_meta, return_loss, **kwargs)
+
+    @auto_fp16(apply_to=('img', ))
+    def _forward(self, img, img_meta, return_loss=True, **kwargs):
         if return_loss:
             return self.forward_train(img, img_meta, **kwargs)
         else:
@@ -16,6 +16,8 @@ from .test_mixins import RPNTestMixin
 @DETECTORS.register_module
 class CascadeRCNN(BaseDetector, RPNTestMixin):
 
+    supports_batch_test = True
+
     def __init__(self,
                  num_stages,
                  backbone,
@@ -271,19 +273,21 @@ class CascadeRCNN(BaseDetector, RPNTestMixin):
         return losses
 
     def simple_test(self, img, img_meta, proposals=None, rescale=False):
+        """Test without augmentation.
+
+        The RoIs of all images in the batch go through each stage at once. If
+        there are several images, a list of the results of each image is
+        returned.
+        """
         x = self.extract_feat(img)
         proposal_list = self.simple_test_rpn(
             x, img_meta, self.test_cfg.rpn) if proposals is None else proposals
-
-        img_shape = img_meta[0]['img_shape']
-        ori_shape = img_meta[0]['ori_shape']
-        scale_factor = img_meta[0]['scale_factor']
+        num_rois = [len(proposals) for proposals in proposal_list]
 
         # "ms" in variable names means multi-stage
-        ms_bbox_result = {}
-        ms_segm_result = {}
+        ms_rois = []
         ms_scores = []
-        rcnn_test_cfg = self.test_cfg.rcnn
+        ms_bbox_preds = []
 
         rois = bbox2roi(proposal_list)
         for i in range(self.num_stages):
@@ -296,13 +300,57 @@ class CascadeRCNN(BaseDetector, RPNTestMixin):
                 bbox_feats = self.shared_head(bbox_feats)
 
             cls_score, bbox_pred = bbox_head(bbox_feats)
-            ms_scores.append(cls_score)
+            ms_rois.append(rois.split(num_rois))
+            ms_scores.append(cls_score.split(num_rois))
+            ms_bbox_preds.append(bbox_pred.split(num_rois))
+
+            if i < self.num_stages - 1:
+                # the refined rois are clipped by the shape of their own image
+                bbox_label = cls_score.argmax(dim=1)
+                rois = torch.cat([
+                    bbox_head.regress_by_class(img_rois, img_label,
+                                               img_bbox_pred, img_info)
+                    for img_rois, img_label, img_bbox_pred, img_info in zip(
+                        ms_rois[-1], bbox_label.split(num_rois),
+                        ms_bbox_preds[-1], img_meta)
+                ])
+
+        results = []
+        for j in range(len(img_meta)):
+            img_x = tuple(feat[j:j + 1] for feat in x)
+            img_ms_rois = [rois[j] for rois in ms_rois]
+            img_ms_scores = [scores[j] for scores in ms_scores]
+            img_ms_bbox_preds = [preds[j] for preds in ms_bbox_preds]
+            results.append(
+                self.simple_test_single(img_x, [img_meta[j]], img_ms_rois,
+                                        img_ms_scores, img_ms_bbox_preds,
+                                        rescale))
+        return results[0] if len(results) == 1 else results
+
+    def simple_test_single(self,
+                           x,
+                           img_meta,
+                           ms_rois,
+                           ms_scores,
+                           ms_bbox_preds,
+                           rescale=False):
+        """Get the bbox and mask results of one image from the outputs of all
+        stages."""
+        img_shape = img_meta[0]['img_shape']
+        ori_shape = img_meta[0]['ori_shape']
+        scale_factor = img_meta[0]['scale_factor']
+
+        ms_bbox_result = {}
+        ms_segm_result = {}
+        rcnn_test_cfg = self.test_cfg.rcnn
 
-            if self.test_cfg.keep_all_stages:
+        if self.test_cfg.keep_all_stages:
+            for i in range(self.num_stages):
+                bbox_head = self.bbox_head[i]
                 det_bboxes, det_labels = bbox_head.get_det_bboxes(
-                    rois,
-                    cls_score,
-                    bbox_pred,
+                    ms_rois[i],
+                    ms_scores[i],
+                    ms_bbox_preds[i],
                     img_shape,
                     scale_factor,
                     rescale=rescale,
@@ -333,16 +381,11 @@ class CascadeRCNN(BaseDetector, RPNTestMixin):
                             ori_shape, scale_factor, rescale)
                     ms_segm_result['stage{}'.format(i)] = segm_result
 
-            if i < self.num_stages - 1:
-                bbox_label = cls_score.argmax(dim=1)
-                rois = bbox_head.regress_by_class(rois, bbox_label, bbox_pred,
-                                                  img_meta[0])
-
         cls_score = sum(ms_scores) / self.num_stages
         det_bboxes, det_labels = self.bbox_head[-1].get_det_bboxes(
-            rois,
+            ms_rois[-1],
             cls_score,
-            bbox_pred,
+            ms_bbox_preds[-1],
             img_shape,
             scale_factor,
             rescale=rescale,
@@ -3,8 +3,9 @@ from __future__ import division
 import torch
 import torch.nn as nn
 
-from mmdet.core import (bbox2result, bbox2roi, build_assigner, build_sampler,
-                        merge_aug_masks)
+from mmdet.core import (bbox2result, bbox2roi, bbox_mapping, build_assigner,
+                        build_sampler, merge_aug_bboxes, merge_aug_masks,
+                        multiclass_nms)
 from .. import builder
 from ..registry import DETECTORS
 from .base import BaseDetector
@@ -12,7 +13,7 @@ from .test_mixins import RPNTestMixin
 
 
 @DETECTORS.register_module
-class CascadeRCNN(BaseDetector, RPNTestMixin):
+class CascadeRCNN_US(BaseDetector, RPNTestMixin):
 
     def __init__(self,
                  num_stages,
@@ -29,7 +30,7 @@ class CascadeRCNN(BaseDetector, RPNTestMixin):
                  pretrained=None):
         assert bbox_roi_extractor is not None
         assert bbox_head is not None
-        super(CascadeRCNN, self).__init__()
+        super(CascadeRCNN_US, self).__init__()
 
         self.num_stages = num_stages
         self.backbone = builder.build_backbone(backbone)
@@ -90,7 +91,7 @@ class CascadeRCNN(BaseDetector, RPNTestMixin):
         return hasattr(self, 'rpn_head') and self.rpn_head is not None
 
     def init_weights(self, pretrained=None):
-        super(CascadeRCNN, self).init_weights(pretrained)
+        super(CascadeRCNN_US, self).init_weights(pretrained)
         self.backbone.init_weights(pretrained=pretrained)
         if self.with_neck:
             if isinstance(self.neck, nn.Sequential):
@@ -399,8 +400,130 @@ class CascadeRCNN(BaseDetector, RPNTestMixin):
 
         return results
 
-    def aug_test(self, img, img_meta, proposals=None, rescale=False):
-        raise NotImplementedError
+    def aug_test(self, imgs, img_metas, proposals=None, rescale=False):
+        """Test with augmentations.
+
+        The feature maps of each augmentation are extracted only once, shared
+        by the RPN and all the cascade stages, and released as soon as they
+        are consumed. Only the ensemble results are returned. If rescale is
+        False, then returned bboxes will fit the scale of imgs[0].
+        """
+        rcnn_test_cfg = self.test_cfg.rcnn
+        feats = list(self.extract_feats(imgs))
+        if proposals is None:
+            proposal_list = self.aug_test_rpn(feats, img_metas,
+                                              self.test_cfg.rpn)
+        else:
+            # precomputed proposals are of the original image scale
+            proposal_list = proposals
+
+        aug_bboxes = []
+        aug_scores = []
+        for i, img_meta in enumerate(img_metas):
+            x = feats[i]
+            if not self.with_mask:
+                feats[i] = None
+            # only one image in the batch
+            img_shape = img_meta[0]['img_shape']
+            scale_factor = img_meta[0]['scale_factor']
+            flip = img_meta[0]['flip']
+            proposals = bbox_mapping(proposal_list[0][:, :4], img_shape,
+                                     scale_factor, flip)
+            rois = bbox2roi([proposals])
+            ms_scores = []
+            for j in range(self.num_stages):
+                bbox_roi_extractor = self.bbox_roi_extractor[j]
+                bbox_head = self.bbox_head[j]
+
+                bbox_feats = bbox_roi_extractor(
+                    x[:len(bbox_roi_extractor.featmap_strides)], rois)
+                if self.with_shared_head:
+                    bbox_feats = self.shared_head(bbox_feats)
+
+                cls_score, bbox_pred = bbox_head(bbox_feats)
+                ms_scores.append(cls_score)
+
+                if j < self.num_stages - 1:
+                    bbox_label = cls_score.argmax(dim=1)
+                    rois = bbox_head.regress_by_class(rois, bbox_label,
+                                                      bbox_pred, img_meta[0])
+            del x, bbox_feats
+
+            cls_score = sum(ms_scores) / self.num_stages
+            bboxes, scores = self.bbox_head[-1].get_det_bboxes(
+                rois,
+                cls_score,
+                bbox_pred,
+                img_shape,
+                scale_factor,
+                rescale=False,
+                cfg=None)
+            aug_bboxes.append(bboxes)
+            aug_scores.append(scores)
+
+        # after merging, bboxes will be rescaled to the original image size
+        merged_bboxes, merged_scores = merge_aug_bboxes(
+            aug_bboxes, aug_scores, img_metas, rcnn_test_cfg)
+        det_bboxes, det_labels = multiclass_nms(merged_bboxes, merged_scores,
+                                                rcnn_test_cfg.score_thr,
+                                                rcnn_test_cfg.nms,
+                                                rcnn_test_cfg.max_per_img)
+
+        if rescale:
+            _det_bboxes = det_bboxes
+        else:
+            _det_bboxes = det_bboxes.clone()
+            scale_factor = img_metas[0][0]['scale_factor']
+            if isinstance(scale_factor, float):  # aspect ratio fixed
+                _det_bboxes[:, :4] *= scale_factor
+            else:
+                _det_bboxes[:, :4] *= torch.from_numpy(scale_factor).to(
+                    det_bboxes.device)
+        bbox_result = bbox2result(_det_bboxes, det_labels,
+                                  self.bbox_head[-1].num_classes)
+
+        if not self.with_mask:
+            return bbox_result
+
+        # det_bboxes always keep the original scale
+        if det_bboxes.shape[0] == 0:
+            mask_classes = self.mask_head[-1].num_classes - 1
+            segm_result = [[] for _ in range(mask_classes)]
+        else:
+            aug_masks = []
+            aug_img_metas = []
+            for i, img_meta in enumerate(img_metas):
+                x = feats[i]
+                feats[i] = None
+                img_shape = img_meta[0]['img_shape']
+                scale_factor = img_meta[0]['scale_factor']
+                flip = img_meta[0]['flip']
+                _bboxes = bbox_mapping(det_bboxes[:, :4], img_shape,
+                                       scale_factor, flip)
+                mask_rois = bbox2roi([_bboxes])
+                for j in range(self.num_stages):
+                    mask_roi_extractor = self.mask_roi_extractor[j]
+                    mask_feats = mask_roi_extractor(
+                        x[:len(mask_roi_extractor.featmap_strides)], mask_rois)
+                    if self.with_shared_head:
+                        mask_feats = self.shared_head(mask_feats)
+                    mask_pred = self.mask_head[j](mask_feats)
+                    # convert to numpy array to save memory
+                    aug_masks.append(mask_pred.sigmoid().cpu().numpy())
+                    aug_img_metas.append(img_meta)
+                del x, mask_feats
+            merged_masks = merge_aug_masks(aug_masks, aug_img_metas,
+                                           rcnn_test_cfg)
+            ori_shape = img_metas[0][0]['ori_shape']
+            segm_result = self.mask_head[-1].get_seg_masks(
+                merged_masks,
+                det_bboxes,
+                det_labels,
+                rcnn_test_cfg,
+                ori_shape,
+                scale_factor=1.0,
+                rescale=False)
+        return bbox_result, segm_result
 
     def show_result(self, data, result, **kwargs):
         if self.with_mask:
@@ -411,4 +534,4 @@ class CascadeRCNN(BaseDetector, RPNTestMixin):
         else:
             if isinstance(result, dict):
                 result = result['ensemble']
-        super(CascadeRCNN, self).show_result(data, result, **kwargs)
+        super(CascadeRCNN_US, self).show_result(data, result, **kwargs)
@@ -147,13 +147,13 @@ class DoubleHeadRCNN(TwoStageDetector):
 
         return losses
 
-    def simple_test_bboxes(self,
-                           x,
-                           img_meta,
-                           proposals,
-                           rcnn_test_cfg,
-                           rescale=False):
-        """Test only det bboxes without augmentation."""
+    def batch_test_bboxes(self,
+                          x,
+                          img_meta,
+                          proposals,
+                          rcnn_test_cfg,
+                          rescale=False):
+        """Test only det bboxes of a batch of images without augmentation."""
         rois = bbox2roi(proposals)
         bbox_cls_feats = self.bbox_roi_extractor(
             x[:self.bbox_roi_extractor.num_inputs], rois)
@@ -165,14 +165,6 @@ class DoubleHeadRCNN(TwoStageDetector):
             bbox_cls_feats = self.shared_head(bbox_cls_feats)
             bbox_reg_feats = self.shared_head(bbox_reg_feats)
         cls_score, bbox_pred = self.bbox_head(bbox_cls_feats, bbox_reg_feats)
-        img_shape = img_meta[0]['img_shape']
-        scale_factor = img_meta[0]['scale_factor']
-        det_bboxes, det_labels = self.bbox_head.get_det_bboxes(
-            rois,
-            cls_score,
-            bbox_pred,
-            img_shape,
-            scale_factor,
-            rescale=rescale,
-            cfg=rcnn_test_cfg)
-        return det_bboxes, det_labels
+        return self.get_batch_det_bboxes(rois, cls_score, bbox_pred, img_meta,
+                                         [len(p) for p in proposals],
+                                         rcnn_test_cfg, rescale)
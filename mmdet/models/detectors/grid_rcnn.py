@@ -15,6 +15,9 @@ class GridRCNN(TwoStageDetector):
     - Grid R-CNN Plus: Faster and Better (https://arxiv.org/abs/1906.05688)
     """
 
+    # simple_test only tests the first image of a batch
+    supports_batch_test = False
+
     def __init__(self,
                  backbone,
                  rpn_head,
@@ -11,6 +11,9 @@ from .cascade_rcnn import CascadeRCNN
 @DETECTORS.register_module
 class HybridTaskCascade(CascadeRCNN):
 
+    # simple_test only tests the first image of a batch
+    supports_batch_test = False
+
     def __init__(self,
                  num_stages,
                  backbone,
@@ -14,6 +14,9 @@ class MaskHintRCNN(TwoStageDetector):
     https://arxiv.org/abs/1903.00241
     """
 
+    # simple_test only tests the first image of a batch
+    supports_batch_test = False
+
     def __init__(self,
                  backbone,
                  rpn_head,
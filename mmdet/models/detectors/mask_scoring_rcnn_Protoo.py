@@ -13,6 +13,10 @@ class ProtoRCNN(TwoStageDetector):
 
     https://arxiv.org/abs/1903.00241
     """
+
+    # simple_test only tests the first image of a batch
+    supports_batch_test = False
+
     #TODO: add semantic backgorund predict into the scope to improve the map
     def __init__(self,
                  backbone,
@@ -9,6 +9,8 @@ from .base import BaseDetector
 @DETECTORS.register_module
 class SingleStageDetector(BaseDetector):
 
+    supports_batch_test = True
+
     def __init__(self,
                  backbone,
                  neck=None,
@@ -61,6 +63,11 @@ class SingleStageDetector(BaseDetector):
         return losses
 
     def simple_test(self, img, img_meta, rescale=False):
+        """Test without augmentation.
+
+        If there are several images in the batch, a list of the results of
+        each image is returned.
+        """
         x = self.extract_feat(img)
         outs = self.bbox_head(x)
         bbox_inputs = outs + (img_meta, self.test_cfg, rescale)
@@ -69,7 +76,7 @@ class SingleStageDetector(BaseDetector):
             bbox2result(det_bboxes, det_labels, self.bbox_head.num_classes)
             for det_bboxes, det_labels in bbox_list
         ]
-        return bbox_results[0]
+        return bbox_results[0] if len(bbox_results) == 1 else bbox_results
 
     def aug_test(self, imgs, img_metas, rescale=False):
         raise NotImplementedError
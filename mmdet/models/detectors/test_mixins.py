@@ -1,5 +1,6 @@
-from mmdet.core import (bbox2roi, bbox_mapping, merge_aug_bboxes,
-                        merge_aug_masks, merge_aug_proposals, multiclass_nms)
+from mmdet.core import (bbox2roi, bbox_mapping, bbox_mapping_back,
+                        merge_aug_bboxes, merge_aug_dets, merge_aug_masks,
+                        merge_aug_proposals, multiclass_nms)
 
 
 class RPNTestMixin(object):
@@ -42,22 +43,57 @@ class BBoxTestMixin(object):
                            rcnn_test_cfg,
                            rescale=False):
         """Test only det bboxes without augmentation."""
+        det_bboxes, det_labels = self.batch_test_bboxes(
+            x, img_meta, proposals, rcnn_test_cfg, rescale=rescale)
+        return det_bboxes[0], det_labels[0]
+
+    def batch_test_bboxes(self,
+                          x,
+                          img_meta,
+                          proposals,
+                          rcnn_test_cfg,
+                          rescale=False):
+        """Test only det bboxes of a batch of images without augmentation.
+
+        The RoIs of all images go through the bbox head at once, then the
+        NMS is done image by image.
+
+        Returns:
+            tuple: (det_bboxes, det_labels), lists of the det bboxes and det
+                labels of each image.
+        """
         rois = bbox2roi(proposals)
         roi_feats = self.bbox_roi_extractor(
             x[:len(self.bbox_roi_extractor.featmap_strides)], rois)
         if self.with_shared_head:
             roi_feats = self.shared_head(roi_feats)
         cls_score, bbox_pred = self.bbox_head(roi_feats)
-        img_shape = img_meta[0]['img_shape']
-        scale_factor = img_meta[0]['scale_factor']
-        det_bboxes, det_labels = self.bbox_head.get_det_bboxes(
-            rois,
-            cls_score,
-            bbox_pred,
-            img_shape,
-            scale_factor,
-            rescale=rescale,
-            cfg=rcnn_test_cfg)
+        return self.get_batch_det_bboxes(rois, cls_score, bbox_pred, img_meta,
+                                         [len(p) for p in proposals],
+                                         rcnn_test_cfg, rescale)
+
+    def get_batch_det_bboxes(self, rois, cls_score, bbox_pred, img_meta,
+                             num_rois, rcnn_test_cfg, rescale):
+        """Split the bbox head outputs of a batch by images and do the NMS
+        of each image."""
+        det_bboxes = []
+        det_labels = []
+        # heads without regression (e.g. that of Grid R-CNN) predict None
+        bbox_preds = [None] * len(num_rois) if bbox_pred is None else \
+            bbox_pred.split(num_rois)
+        for img_rois, img_cls_score, img_bbox_pred, img_info in zip(
+                rois.split(num_rois), cls_score.split(num_rois), bbox_preds,
+                img_meta):
+            img_det_bboxes, img_det_labels = self.bbox_head.get_det_bboxes(
+                img_rois,
+                img_cls_score,
+                img_bbox_pred,
+                img_info['img_shape'],
+                img_info['scale_factor'],
+                rescale=rescale,
+                cfg=rcnn_test_cfg)
+            det_bboxes.append(img_det_bboxes)
+            det_labels.append(img_det_labels)
         return det_bboxes, det_labels
 
     def aug_test_bboxes(self, feats, img_metas, proposal_list, rcnn_test_cfg):
@@ -88,6 +124,23 @@ class BBoxTestMixin(object):
                 cfg=None)
             aug_bboxes.append(bboxes)
             aug_scores.append(scores)
+        if rcnn_test_cfg.get('fusion') is not None:
+            # suppress the detections of each augmentation on its own, then
+            # fuse the detections of all augmentations
+            aug_dets, aug_labels = [], []
+            for bboxes, scores, img_meta in zip(aug_bboxes, aug_scores,
+                                                img_metas):
+                bboxes = bbox_mapping_back(bboxes, img_meta[0]['img_shape'],
+                                           img_meta[0]['scale_factor'],
+                                           img_meta[0]['flip'])
+                dets, labels = multiclass_nms(bboxes, scores,
+                                              rcnn_test_cfg.score_thr,
+                                              rcnn_test_cfg.nms,
+                                              rcnn_test_cfg.max_per_img)
+                aug_dets.append(dets)
+                aug_labels.append(labels)
+            return merge_aug_dets(aug_dets, aug_labels, rcnn_test_cfg.fusion,
+                                  rcnn_test_cfg.max_per_img)
         # after merging, bboxes will be rescaled to the original image size
         merged_bboxes, merged_scores = merge_aug_bboxes(
             aug_bboxes, aug_scores, img_metas, rcnn_test_cfg)
@@ -12,6 +12,8 @@ from .test_mixins import BBoxTestMixin, MaskTestMixin, RPNTestMixin
 class TwoStageDetector(BaseDetector, RPNTestMixin, BBoxTestMixin,
                        MaskTestMixin):
 
+    supports_batch_test = True
+
     def __init__(self,
                  backbone,
                  neck=None,
@@ -222,7 +224,11 @@ class TwoStageDetector(BaseDetector, RPNTestMixin, BBoxTestMixin,
         return losses
 
     def simple_test(self, img, img_meta, proposals=None, rescale=False):
-        """Test without augmentation."""
+        """Test without augmentation.
+
+        If there are several images in the batch, a list of the results of
+        each image is returned.
+        """
         assert self.with_bbox, "Bbox head must be implemented."
 
         x = self.extract_feat(img)
@@ -230,17 +236,24 @@ class TwoStageDetector(BaseDetector, RPNTestMixin, BBoxTestMixin,
         proposal_list = self.simple_test_rpn(
             x, img_meta, self.test_cfg.rpn) if proposals is None else proposals
 
-        det_bboxes, det_labels = self.simple_test_bboxes(
+        det_bboxes, det_labels = self.batch_test_bboxes(
             x, img_meta, proposal_list, self.test_cfg.rcnn, rescale=rescale)
-        bbox_results = bbox2result(det_bboxes, det_labels,
-                                   self.bbox_head.num_classes)
 
-        if not self.with_mask:
-            return bbox_results
-        else:
-            segm_results = self.simple_test_mask(
-                x, img_meta, det_bboxes, det_labels, rescale=rescale)
-            return bbox_results, segm_results
+        results = []
+        for i in range(len(img_meta)):
+            bbox_results = bbox2result(det_bboxes[i], det_labels[i],
+                                       self.bbox_head.num_classes)
+            if not self.with_mask:
+                results.append(bbox_results)
+            else:
+                img_x = tuple(feat[i:i + 1] for feat in x)
+                segm_results = self.simple_test_mask(
+                    img_x, [img_meta[i]],
+                    det_bboxes[i],
+                    det_labels[i],
+                    rescale=rescale)
+                results.append((bbox_results, segm_results))
+        return results[0] if len(results) == 1 else results
 
     def aug_test(self, imgs, img_metas, rescale=False):
         """Test with augmentations.
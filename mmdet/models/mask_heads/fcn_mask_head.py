@@ -1,11 +1,10 @@
-import mmcv
 import numpy as np
-import pycocotools.mask as mask_util
 import torch
 import torch.nn as nn
 from torch.nn.modules.utils import _pair
 
-from mmdet.core import auto_fp16, force_fp32, mask_target
+from mmdet.core import (auto_fp16, encode_box_masks, force_fp32, mask_target,
+                        paste_masks_in_boxes)
 from ..builder import build_loss
 from ..registry import HEADS
 from ..utils import ConvModule
@@ -134,22 +133,27 @@ class FCNMaskHead(nn.Module):
             det_bboxes (Tensor): shape (n, 4/5)
             det_labels (Tensor): shape (n, )
             img_shape (Tensor): shape (3, )
-            rcnn_test_cfg (dict): rcnn testing config
+            rcnn_test_cfg (dict): rcnn testing config, masks are returned as
+                dicts of the box (x1, y1, x2, y2) and the binary mask inside
+                the box instead of being encoded if ``box_local_masks`` is
+                True.
             ori_shape: original image size
 
         Returns:
             list[list]: encoded masks
         """
-        if isinstance(mask_pred, torch.Tensor):
-            mask_pred = mask_pred.sigmoid().cpu().numpy()
-        assert isinstance(mask_pred, np.ndarray)
-        # when enabling mixed precision training, mask_pred may be float16
-        # numpy array
-        mask_pred = mask_pred.astype(np.float32)
+        # direct outputs of the model are logits while merged multi-scale
+        # results are probabilities
+        is_logits = isinstance(mask_pred, torch.Tensor)
+        if not is_logits:
+            assert isinstance(mask_pred, np.ndarray)
+            mask_pred = torch.from_numpy(mask_pred)
 
         cls_segms = [[] for _ in range(self.num_classes - 1)]
         bboxes = det_bboxes.cpu().numpy()[:, :4]
         labels = det_labels.cpu().numpy() + 1
+        if bboxes.shape[0] == 0:
+            return cls_segms
 
         if rescale:
             img_h, img_w = ori_shape[:2]
@@ -157,25 +161,27 @@ class FCNMaskHead(nn.Module):
             img_h = np.round(ori_shape[0] * scale_factor).astype(np.int32)
             img_w = np.round(ori_shape[1] * scale_factor).astype(np.int32)
             scale_factor = 1.0
+        bboxes = (bboxes / scale_factor).astype(np.int32)
 
-        for i in range(bboxes.shape[0]):
-            bbox = (bboxes[i, :] / scale_factor).astype(np.int32)
-            label = labels[i]
-            w = max(bbox[2] - bbox[0] + 1, 1)
-            h = max(bbox[3] - bbox[1] + 1, 1)
-
-            if not self.class_agnostic:
-                mask_pred_ = mask_pred[i, label, :, :]
-            else:
-                mask_pred_ = mask_pred[i, 0, :, :]
-            im_mask = np.zeros((img_h, img_w), dtype=np.uint8)
-
-            bbox_mask = mmcv.imresize(mask_pred_, (w, h))
-            bbox_mask = (bbox_mask > rcnn_test_cfg.mask_thr_binary).astype(
-                np.uint8)
-            im_mask[bbox[1]:bbox[1] + h, bbox[0]:bbox[0] + w] = bbox_mask
-            rle = mask_util.encode(
-                np.array(im_mask[:, :, np.newaxis], order='F'))[0]
-            cls_segms[label - 1].append(rle)
-
+        if self.class_agnostic:
+            mask_pred = mask_pred[:, 0]
+        else:
+            mask_pred = mask_pred[torch.arange(bboxes.shape[0]),
+                                  torch.from_numpy(labels).long()]
+        # when enabling mixed precision training, mask_pred may be float16
+        mask_pred = mask_pred.float()
+        if is_logits:
+            mask_pred = mask_pred.sigmoid()
+        box_masks = paste_masks_in_boxes(
+            mask_pred, bboxes, thr=rcnn_test_cfg.mask_thr_binary)
+
+        if rcnn_test_cfg.get('box_local_masks', False):
+            segms = [
+                dict(bbox=bbox, mask=box_mask)
+                for bbox, box_mask in zip(bboxes, box_masks)
+            ]
+        else:
+            segms = encode_box_masks(box_masks, bboxes, img_h, img_w)
+        for segm, label in zip(segms, labels):
+            cls_segms[label - 1].append(segm)
         return cls_segms
@@ -4,13 +4,13 @@ from .dcn import (DeformConv, DeformConvPack, DeformRoIPooling,
                   ModulatedDeformConvPack, ModulatedDeformRoIPoolingPack,
                   deform_conv, deform_roi_pooling, modulated_deform_conv)
 from .masked_conv import MaskedConv2d
-from .nms import nms, soft_nms
+from .nms import nms, soft_nms, wbf
 from .roi_align import RoIAlign, roi_align
 from .roi_pool import RoIPool, roi_pool
 from .sigmoid_focal_loss import SigmoidFocalLoss, sigmoid_focal_loss
 
 __all__ = [
-    'nms', 'soft_nms', 'RoIAlign', 'roi_align', 'RoIPool', 'roi_pool',
+    'nms', 'soft_nms', 'wbf', 'RoIAlign', 'roi_align', 'RoIPool', 'roi_pool',
     'DeformConv', 'DeformConvPack', 'DeformRoIPooling', 'DeformRoIPoolingPack',
     'ModulatedDeformRoIPoolingPack', 'ModulatedDeformConv',
     'ModulatedDeformConvPack', 'deform_conv', 'modulated_deform_conv',
@@ -3,7 +3,7 @@ import torch.nn as nn
 from torch.autograd import Function
 from torch.autograd.function import once_differentiable
 
-from . import deform_pool_cuda
+from . import deform_pool_cpu, deform_pool_cuda
 
 
 class DeformRoIPoolingFunction(Function):
@@ -31,16 +31,18 @@ class DeformRoIPoolingFunction(Function):
         ctx.trans_std = trans_std
 
         assert 0.0 <= ctx.trans_std <= 1.0
-        if not data.is_cuda:
-            raise NotImplementedError
+        if data.is_cuda:
+            forward_func = deform_pool_cuda.deform_psroi_pooling_cuda_forward
+        else:
+            forward_func = deform_pool_cpu.deform_psroi_pooling_cpu_forward
 
         n = rois.shape[0]
         output = data.new_empty(n, out_channels, out_size, out_size)
         output_count = data.new_empty(n, out_channels, out_size, out_size)
-        deform_pool_cuda.deform_psroi_pooling_cuda_forward(
-            data, rois, offset, output, output_count, ctx.no_trans,
-            ctx.spatial_scale, ctx.out_channels, ctx.group_size, ctx.out_size,
-            ctx.part_size, ctx.sample_per_part, ctx.trans_std)
+        forward_func(data, rois, offset, output, output_count, ctx.no_trans,
+                     ctx.spatial_scale, ctx.out_channels, ctx.group_size,
+                     ctx.out_size, ctx.part_size, ctx.sample_per_part,
+                     ctx.trans_std)
 
         if data.requires_grad or rois.requires_grad or offset.requires_grad:
             ctx.save_for_backward(data, rois, offset)
@@ -51,8 +53,10 @@ class DeformRoIPoolingFunction(Function):
     @staticmethod
     @once_differentiable
     def backward(ctx, grad_output):
-        if not grad_output.is_cuda:
-            raise NotImplementedError
+        if grad_output.is_cuda:
+            backward_func = deform_pool_cuda.deform_psroi_pooling_cuda_backward
+        else:
+            backward_func = deform_pool_cpu.deform_psroi_pooling_cpu_backward
 
         data, rois, offset = ctx.saved_tensors
         output_count = ctx.output_count
@@ -60,11 +64,10 @@ class DeformRoIPoolingFunction(Function):
         grad_rois = None
         grad_offset = torch.zeros_like(offset)
 
-        deform_pool_cuda.deform_psroi_pooling_cuda_backward(
-            grad_output, data, rois, offset, output_count, grad_input,
-            grad_offset, ctx.no_trans, ctx.spatial_scale, ctx.out_channels,
-            ctx.group_size, ctx.out_size, ctx.part_size, ctx.sample_per_part,
-            ctx.trans_std)
+        backward_func(grad_output, data, rois, offset, output_count,
+                      grad_input, grad_offset, ctx.no_trans, ctx.spatial_scale,
+                      ctx.out_channels, ctx.group_size, ctx.out_size,
+                      ctx.part_size, ctx.sample_per_part, ctx.trans_std)
         return (grad_input, grad_rois, grad_offset, None, None, None, None,
                 None, None, None, None)
 
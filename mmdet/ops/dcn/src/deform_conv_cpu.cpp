@@ -0,0 +1,956 @@
+// CPU counterpart of deform_conv_cuda.cpp and deform_conv_cuda_kernel.cu.
+// The im2col/col2im kernels compute the same values as the CUDA kernels, and
+// the host functions keep the same signatures and im2col_step semantics, so
+// that DeformConv and ModulatedDeformConv produce the same results on both
+// devices.
+
+#include <ATen/Parallel.h>
+#include <torch/extension.h>
+
+#include <cmath>
+#include <vector>
+
+template <typename scalar_t>
+scalar_t deformable_im2col_bilinear(const scalar_t *bottom_data,
+                                    const int data_width, const int height,
+                                    const int width, scalar_t h, scalar_t w) {
+  int h_low = floor(h);
+  int w_low = floor(w);
+  int h_high = h_low + 1;
+  int w_high = w_low + 1;
+
+  scalar_t lh = h - h_low;
+  scalar_t lw = w - w_low;
+  scalar_t hh = 1 - lh, hw = 1 - lw;
+
+  scalar_t v1 = 0;
+  if (h_low >= 0 && w_low >= 0) v1 = bottom_data[h_low * data_width + w_low];
+  scalar_t v2 = 0;
+  if (h_low >= 0 && w_high <= width - 1)
+    v2 = bottom_data[h_low * data_width + w_high];
+  scalar_t v3 = 0;
+  if (h_high <= height - 1 && w_low >= 0)
+    v3 = bottom_data[h_high * data_width + w_low];
+  scalar_t v4 = 0;
+  if (h_high <= height - 1 && w_high <= width - 1)
+    v4 = bottom_data[h_high * data_width + w_high];
+
+  scalar_t w1 = hh * hw, w2 = hh * lw, w3 = lh * hw, w4 = lh * lw;
+
+  return (w1 * v1 + w2 * v2 + w3 * v3 + w4 * v4);
+}
+
+template <typename scalar_t>
+scalar_t get_gradient_weight(scalar_t argmax_h, scalar_t argmax_w, const int h,
+                             const int w, const int height, const int width) {
+  if (argmax_h <= -1 || argmax_h >= height || argmax_w <= -1 ||
+      argmax_w >= width) {
+    // empty
+    return 0;
+  }
+
+  int argmax_h_low = floor(argmax_h);
+  int argmax_w_low = floor(argmax_w);
+  int argmax_h_high = argmax_h_low + 1;
+  int argmax_w_high = argmax_w_low + 1;
+
+  scalar_t weight = 0;
+  if (h == argmax_h_low && w == argmax_w_low)
+    weight = (h + 1 - argmax_h) * (w + 1 - argmax_w);
+  if (h == argmax_h_low && w == argmax_w_high)
+    weight = (h + 1 - argmax_h) * (argmax_w + 1 - w);
+  if (h == argmax_h_high && w == argmax_w_low)
+    weight = (argmax_h + 1 - h) * (w + 1 - argmax_w);
+  if (h == argmax_h_high && w == argmax_w_high)
+    weight = (argmax_h + 1 - h) * (argmax_w + 1 - w);
+  return weight;
+}
+
+template <typename scalar_t>
+scalar_t get_coordinate_weight(scalar_t argmax_h, scalar_t argmax_w,
+                               const int height, const int width,
+                               const scalar_t *im_data, const int data_width,
+                               const int bp_dir) {
+  if (argmax_h <= -1 || argmax_h >= height || argmax_w <= -1 ||
+      argmax_w >= width) {
+    // empty
+    return 0;
+  }
+
+  int argmax_h_low = floor(argmax_h);
+  int argmax_w_low = floor(argmax_w);
+  int argmax_h_high = argmax_h_low + 1;
+  int argmax_w_high = argmax_w_low + 1;
+
+  scalar_t weight = 0;
+
+  if (bp_dir == 0) {
+    if (argmax_h_low >= 0 && argmax_w_low >= 0)
+      weight += -1 * (argmax_w_low + 1 - argmax_w) *
+                im_data[argmax_h_low * data_width + argmax_w_low];
+    if (argmax_h_low >= 0 && argmax_w_high <= width - 1)
+      weight += -1 * (argmax_w - argmax_w_low) *
+                im_data[argmax_h_low * data_width + argmax_w_high];
+    if (argmax_h_high <= height - 1 && argmax_w_low >= 0)
+      weight += (argmax_w_low + 1 - argmax_w) *
+                im_data[argmax_h_high * data_width + argmax_w_low];
+    if (argmax_h_high <= height - 1 && argmax_w_high <= width - 1)
+      weight += (argmax_w - argmax_w_low) *
+                im_data[argmax_h_high * data_width + argmax_w_high];
+  } else if (bp_dir == 1) {
+    if (argmax_h_low >= 0 && argmax_w_low >= 0)
+      weight += -1 * (argmax_h_low + 1 - argmax_h) *
+                im_data[argmax_h_low * data_width + argmax_w_low];
+    if (argmax_h_low >= 0 && argmax_w_high <= width - 1)
+      weight += (argmax_h_low + 1 - argmax_h) *
+                im_data[argmax_h_low * data_width + argmax_w_high];
+    if (argmax_h_high <= height - 1 && argmax_w_low >= 0)
+      weight += -1 * (argmax_h - argmax_h_low) *
+                im_data[argmax_h_high * data_width + argmax_w_low];
+    if (argmax_h_high <= height - 1 && argmax_w_high <= width - 1)
+      weight += (argmax_h - argmax_h_low) *
+                im_data[argmax_h_high * data_width + argmax_w_high];
+  }
+
+  return weight;
+}
+
+// The kernels below serve both DeformConv and ModulatedDeformConv, data_mask
+// (and grad_mask) being NULL for the former.
+
+// Bilinear interpolation weights and positions of one sampling point, which
+// are shared by all channels of a deformable group.
+template <typename scalar_t>
+struct PreCalc {
+  int pos1;
+  int pos2;
+  int pos3;
+  int pos4;
+  scalar_t w1;
+  scalar_t w2;
+  scalar_t w3;
+  scalar_t w4;
+};
+
+template <typename scalar_t>
+void pre_calc_for_bilinear_interpolate(
+    const scalar_t *offset_h_ptr, const scalar_t *offset_w_ptr,
+    const scalar_t *mask_ptr, const int height, const int width,
+    const int h_off, const int w_off, const int stride_h, const int stride_w,
+    const int pad_h, const int pad_w, const int height_col,
+    const int width_col, PreCalc<scalar_t> *pre_calc) {
+  for (int h_col = 0; h_col < height_col; h_col++) {
+    for (int w_col = 0; w_col < width_col; w_col++) {
+      const int pos = h_col * width_col + w_col;
+      PreCalc<scalar_t> &pc = pre_calc[pos];
+      pc.pos1 = pc.pos2 = pc.pos3 = pc.pos4 = 0;
+      pc.w1 = pc.w2 = pc.w3 = pc.w4 = 0;
+      const scalar_t h_im =
+          h_col * stride_h - pad_h + h_off + offset_h_ptr[pos];
+      const scalar_t w_im =
+          w_col * stride_w - pad_w + w_off + offset_w_ptr[pos];
+      if (h_im <= -1 || w_im <= -1 || h_im >= height || w_im >= width) {
+        continue;
+      }
+      // same as deformable_im2col_bilinear, out of boundary corners get
+      // zero weights
+      const int h_low = floor(h_im);
+      const int w_low = floor(w_im);
+      const int h_high = h_low + 1;
+      const int w_high = w_low + 1;
+      const scalar_t lh = h_im - h_low;
+      const scalar_t lw = w_im - w_low;
+      const scalar_t hh = 1 - lh, hw = 1 - lw;
+      const scalar_t mask = mask_ptr == NULL ? 1 : mask_ptr[pos];
+      if (h_low >= 0 && w_low >= 0) {
+        pc.pos1 = h_low * width + w_low;
+        pc.w1 = hh * hw * mask;
+      }
+      if (h_low >= 0 && w_high <= width - 1) {
+        pc.pos2 = h_low * width + w_high;
+        pc.w2 = hh * lw * mask;
+      }
+      if (h_high <= height - 1 && w_low >= 0) {
+        pc.pos3 = h_high * width + w_low;
+        pc.w3 = lh * hw * mask;
+      }
+      if (h_high <= height - 1 && w_high <= width - 1) {
+        pc.pos4 = h_high * width + w_high;
+        pc.w4 = lh * lw * mask;
+      }
+    }
+  }
+}
+
+template <typename scalar_t>
+void deformable_im2col_cpu_kernel(
+    const scalar_t *data_im, const scalar_t *data_offset,
+    const scalar_t *data_mask, const int height, const int width,
+    const int kernel_h, const int kernel_w, const int pad_h, const int pad_w,
+    const int stride_h, const int stride_w, const int dilation_h,
+    const int dilation_w, const int channel_per_deformable_group,
+    const int batch_size, const int num_channels, const int deformable_group,
+    const int height_col, const int width_col, scalar_t *data_col) {
+  // The sampling points only depend on the offsets, so they are computed once
+  // per image and deformable group, then every input channel of the group
+  // fills its own kernel_h * kernel_w rows of data_col in parallel.
+  const int col_size = height_col * width_col;
+  const int kernel_size = kernel_h * kernel_w;
+  std::vector<PreCalc<scalar_t>> pre_calc(kernel_size * col_size);
+  for (int b_col = 0; b_col < batch_size; b_col++) {
+    for (int g = 0; g < deformable_group; g++) {
+      const scalar_t *data_offset_ptr =
+          data_offset + (b_col * deformable_group + g) * 2 * kernel_size *
+                            col_size;
+      const scalar_t *data_mask_ptr =
+          data_mask == NULL
+              ? NULL
+              : data_mask + (b_col * deformable_group + g) * kernel_size *
+                                col_size;
+      at::parallel_for(0, kernel_size, 1, [&](int64_t begin, int64_t end) {
+        for (int64_t k = begin; k < end; k++) {
+          pre_calc_for_bilinear_interpolate(
+              data_offset_ptr + 2 * k * col_size,
+              data_offset_ptr + (2 * k + 1) * col_size,
+              data_mask_ptr == NULL ? NULL : data_mask_ptr + k * col_size,
+              height, width, (k / kernel_w) * dilation_h,
+              (k % kernel_w) * dilation_w, stride_h, stride_w, pad_h, pad_w,
+              height_col, width_col, pre_calc.data() + k * col_size);
+        }
+      });
+
+      at::parallel_for(
+          g * channel_per_deformable_group,
+          (g + 1) * channel_per_deformable_group, 1,
+          [&](int64_t begin, int64_t end) {
+            for (int64_t c_im = begin; c_im < end; c_im++) {
+              const scalar_t *data_im_ptr =
+                  data_im + (b_col * num_channels + c_im) * height * width;
+              for (int k = 0; k < kernel_size; k++) {
+                const PreCalc<scalar_t> *pc = pre_calc.data() + k * col_size;
+                scalar_t *data_col_ptr =
+                    data_col + ((c_im * kernel_size + k) * batch_size + b_col) *
+                                   col_size;
+                for (int pos = 0; pos < col_size; pos++, pc++) {
+                  data_col_ptr[pos] = pc->w1 * data_im_ptr[pc->pos1] +
+                                      pc->w2 * data_im_ptr[pc->pos2] +
+                                      pc->w3 * data_im_ptr[pc->pos3] +
+                                      pc->w4 * data_im_ptr[pc->pos4];
+                }
+              }
+            }
+          });
+    }
+  }
+}
+
+template <typename scalar_t>
+void deformable_col2im_cpu_kernel(
+    const scalar_t *data_col, const scalar_t *data_offset,
+    const scalar_t *data_mask, const int channels, const int height,
+    const int width, const int kernel_h, const int kernel_w, const int pad_h,
+    const int pad_w, const int stride_h, const int stride_w,
+    const int dilation_h, const int dilation_w,
+    const int channel_per_deformable_group, const int batch_size,
+    const int deformable_group, const int height_col, const int width_col,
+    scalar_t *grad_im) {
+  // channels are processed in parallel since the gradients scattered from
+  // data_col rows of a channel never leave that channel
+  at::parallel_for(0, channels, 1, [&](int64_t begin, int64_t end) {
+    for (int64_t c = begin; c < end; c++) {
+      const int deformable_group_index = c / channel_per_deformable_group;
+      int index = c * kernel_h * kernel_w * batch_size * height_col * width_col;
+      for (int i = 0; i < kernel_h; i++) {
+        for (int j = 0; j < kernel_w; j++) {
+          for (int b = 0; b < batch_size; b++) {
+            const scalar_t *data_offset_ptr =
+                data_offset + (b * deformable_group + deformable_group_index) *
+                                  2 * kernel_h * kernel_w * height_col *
+                                  width_col;
+            const scalar_t *data_mask_ptr =
+                data_mask == NULL
+                    ? NULL
+                    : data_mask +
+                          (b * deformable_group + deformable_group_index) *
+                              kernel_h * kernel_w * height_col * width_col;
+            for (int h_out = 0; h_out < height_col; h_out++) {
+              for (int w_out = 0; w_out < width_col; w_out++, index++) {
+                int w_in = w_out * stride_w - pad_w;
+                int h_in = h_out * stride_h - pad_h;
+                const int data_offset_h_ptr =
+                    ((2 * (i * kernel_w + j)) * height_col + h_out) *
+                        width_col +
+                    w_out;
+                const int data_offset_w_ptr =
+                    ((2 * (i * kernel_w + j) + 1) * height_col + h_out) *
+                        width_col +
+                    w_out;
+                const scalar_t offset_h = data_offset_ptr[data_offset_h_ptr];
+                const scalar_t offset_w = data_offset_ptr[data_offset_w_ptr];
+                const scalar_t cur_inv_h_data =
+                    h_in + i * dilation_h + offset_h;
+                const scalar_t cur_inv_w_data =
+                    w_in + j * dilation_w + offset_w;
+
+                scalar_t cur_top_grad = data_col[index];
+                if (data_mask_ptr != NULL) {
+                  cur_top_grad *=
+                      data_mask_ptr[((i * kernel_w + j) * height_col + h_out) *
+                                        width_col +
+                                    w_out];
+                }
+                const int cur_h = (int)cur_inv_h_data;
+                const int cur_w = (int)cur_inv_w_data;
+                for (int dy = -2; dy <= 2; dy++) {
+                  for (int dx = -2; dx <= 2; dx++) {
+                    if (cur_h + dy >= 0 && cur_h + dy < height &&
+                        cur_w + dx >= 0 && cur_w + dx < width &&
+                        std::abs(cur_inv_h_data - (cur_h + dy)) < 1 &&
+                        std::abs(cur_inv_w_data - (cur_w + dx)) < 1) {
+                      int cur_bottom_grad_pos =
+                          ((b * channels + c) * height + cur_h + dy) * width +
+                          cur_w + dx;
+                      scalar_t weight = get_gradient_weight(
+                          cur_inv_h_data, cur_inv_w_data, cur_h + dy,
+                          cur_w + dx, height, width);
+                      grad_im[cur_bottom_grad_pos] += weight * cur_top_grad;
+                    }
+                  }
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+  });
+}
+
+template <typename scalar_t>
+void deformable_col2im_coord_cpu_kernel(
+    const int n, const scalar_t *data_col, const scalar_t *data_im,
+    const scalar_t *data_offset, const scalar_t *data_mask,
+    const int channels, const int height, const int width, const int kernel_h,
+    const int kernel_w, const int pad_h, const int pad_w, const int stride_h,
+    const int stride_w, const int dilation_h, const int dilation_w,
+    const int channel_per_deformable_group, const int batch_size,
+    const int offset_channels, const int deformable_group,
+    const int height_col, const int width_col, scalar_t *grad_offset,
+    scalar_t *grad_mask) {
+  // every element of grad_offset (and grad_mask) is written exactly once
+  at::parallel_for(0, n, 1024, [&](int64_t begin, int64_t end) {
+    for (int64_t index = begin; index < end; index++) {
+      scalar_t val = 0, mval = 0;
+      int w = index % width_col;
+      int h = (index / width_col) % height_col;
+      int c = (index / width_col / height_col) % offset_channels;
+      int b = (index / width_col / height_col) / offset_channels;
+      // compute the start and end of the output
+
+      const int deformable_group_index = c / (2 * kernel_h * kernel_w);
+      const int col_step = kernel_h * kernel_w;
+      int cnt = 0;
+      const scalar_t *data_col_ptr =
+          data_col + deformable_group_index * channel_per_deformable_group *
+                         batch_size * width_col * height_col;
+      const scalar_t *data_im_ptr =
+          data_im + (b * deformable_group + deformable_group_index) *
+                        channel_per_deformable_group / kernel_h / kernel_w *
+                        height * width;
+      const scalar_t *data_offset_ptr =
+          data_offset + (b * deformable_group + deformable_group_index) * 2 *
+                            kernel_h * kernel_w * height_col * width_col;
+      const scalar_t *data_mask_ptr =
+          data_mask == NULL
+              ? NULL
+              : data_mask + (b * deformable_group + deformable_group_index) *
+                                kernel_h * kernel_w * height_col * width_col;
+
+      const int offset_c = c - deformable_group_index * 2 * kernel_h * kernel_w;
+
+      for (int col_c = (offset_c / 2); col_c < channel_per_deformable_group;
+           col_c += col_step) {
+        const int col_pos =
+            (((col_c * batch_size + b) * height_col) + h) * width_col + w;
+        const int bp_dir = offset_c % 2;
+
+        int j = (col_pos / width_col / height_col / batch_size) % kernel_w;
+        int i =
+            (col_pos / width_col / height_col / batch_size / kernel_w) %
+            kernel_h;
+        int w_out = col_pos % width_col;
+        int h_out = (col_pos / width_col) % height_col;
+        int w_in = w_out * stride_w - pad_w;
+        int h_in = h_out * stride_h - pad_h;
+        const int data_offset_h_ptr =
+            (((2 * (i * kernel_w + j)) * height_col + h_out) * width_col +
+             w_out);
+        const int data_offset_w_ptr =
+            (((2 * (i * kernel_w + j) + 1) * height_col + h_out) * width_col +
+             w_out);
+        const scalar_t offset_h = data_offset_ptr[data_offset_h_ptr];
+        const scalar_t offset_w = data_offset_ptr[data_offset_w_ptr];
+        scalar_t mask = 1;
+        if (data_mask_ptr != NULL) {
+          mask = data_mask_ptr[((i * kernel_w + j) * height_col + h_out) *
+                                   width_col +
+                               w_out];
+        }
+        scalar_t inv_h = h_in + i * dilation_h + offset_h;
+        scalar_t inv_w = w_in + j * dilation_w + offset_w;
+        if (inv_h <= -1 || inv_w <= -1 || inv_h >= height || inv_w >= width) {
+          inv_h = inv_w = -2;
+        } else if (grad_mask != NULL) {
+          mval += data_col_ptr[col_pos] *
+                  deformable_im2col_bilinear(data_im_ptr + cnt * height * width,
+                                             width, height, width, inv_h,
+                                             inv_w);
+        }
+        const scalar_t weight = get_coordinate_weight(
+            inv_h, inv_w, height, width, data_im_ptr + cnt * height * width,
+            width, bp_dir);
+        val += weight * data_col_ptr[col_pos] * mask;
+        cnt += 1;
+      }
+
+      grad_offset[index] = val;
+      if (grad_mask != NULL && offset_c % 2 == 0)
+        grad_mask[(((b * deformable_group + deformable_group_index) *
+                         kernel_h * kernel_w +
+                     offset_c / 2) *
+                        height_col +
+                    h) *
+                       width_col +
+                   w] = mval;
+    }
+  });
+}
+
+void deformable_im2col_cpu(const at::Tensor data_im,
+                           const at::Tensor data_offset,
+                           const at::Tensor data_mask, const int channels,
+                           const int height, const int width,
+                           const int ksize_h, const int ksize_w,
+                           const int pad_h, const int pad_w,
+                           const int stride_h, const int stride_w,
+                           const int dilation_h, const int dilation_w,
+                           const int parallel_imgs, const int deformable_group,
+                           at::Tensor data_col) {
+  int height_col =
+      (height + 2 * pad_h - (dilation_h * (ksize_h - 1) + 1)) / stride_h + 1;
+  int width_col =
+      (width + 2 * pad_w - (dilation_w * (ksize_w - 1) + 1)) / stride_w + 1;
+  int channel_per_deformable_group = channels / deformable_group;
+
+  AT_DISPATCH_FLOATING_TYPES(
+      data_im.scalar_type(), "deformable_im2col_cpu", ([&] {
+        deformable_im2col_cpu_kernel<scalar_t>(
+            data_im.data<scalar_t>(), data_offset.data<scalar_t>(),
+            data_mask.defined() ? data_mask.data<scalar_t>() : NULL, height,
+            width, ksize_h, ksize_w, pad_h, pad_w, stride_h, stride_w,
+            dilation_h, dilation_w, channel_per_deformable_group,
+            parallel_imgs, channels, deformable_group, height_col, width_col,
+            data_col.data<scalar_t>());
+      }));
+}
+
+void deformable_col2im_cpu(const at::Tensor data_col,
+                           const at::Tensor data_offset,
+                           const at::Tensor data_mask, const int channels,
+                           const int height, const int width,
+                           const int ksize_h, const int ksize_w,
+                           const int pad_h, const int pad_w,
+                           const int stride_h, const int stride_w,
+                           const int dilation_h, const int dilation_w,
+                           const int parallel_imgs, const int deformable_group,
+                           at::Tensor grad_im) {
+  int height_col =
+      (height + 2 * pad_h - (dilation_h * (ksize_h - 1) + 1)) / stride_h + 1;
+  int width_col =
+      (width + 2 * pad_w - (dilation_w * (ksize_w - 1) + 1)) / stride_w + 1;
+  int channel_per_deformable_group = channels / deformable_group;
+
+  AT_DISPATCH_FLOATING_TYPES(
+      data_col.scalar_type(), "deformable_col2im_cpu", ([&] {
+        deformable_col2im_cpu_kernel<scalar_t>(
+            data_col.data<scalar_t>(), data_offset.data<scalar_t>(),
+            data_mask.defined() ? data_mask.data<scalar_t>() : NULL, channels,
+            height, width, ksize_h, ksize_w, pad_h, pad_w, stride_h, stride_w,
+            dilation_h, dilation_w, channel_per_deformable_group,
+            parallel_imgs, deformable_group, height_col, width_col,
+            grad_im.data<scalar_t>());
+      }));
+}
+
+void deformable_col2im_coord_cpu(
+    const at::Tensor data_col, const at::Tensor data_im,
+    const at::Tensor data_offset, const at::Tensor data_mask,
+    const int channels, const int height, const int width, const int ksize_h,
+    const int ksize_w, const int pad_h, const int pad_w, const int stride_h,
+    const int stride_w, const int dilation_h, const int dilation_w,
+    const int parallel_imgs, const int deformable_group,
+    at::Tensor grad_offset, at::Tensor grad_mask) {
+  int height_col =
+      (height + 2 * pad_h - (dilation_h * (ksize_h - 1) + 1)) / stride_h + 1;
+  int width_col =
+      (width + 2 * pad_w - (dilation_w * (ksize_w - 1) + 1)) / stride_w + 1;
+  int num_kernels = height_col * width_col * 2 * ksize_h * ksize_w *
+                    deformable_group * parallel_imgs;
+  int channel_per_deformable_group =
+      channels * ksize_h * ksize_w / deformable_group;
+
+  AT_DISPATCH_FLOATING_TYPES(
+      data_col.scalar_type(), "deformable_col2im_coord_cpu", ([&] {
+        deformable_col2im_coord_cpu_kernel<scalar_t>(
+            num_kernels, data_col.data<scalar_t>(), data_im.data<scalar_t>(),
+            data_offset.data<scalar_t>(),
+            data_mask.defined() ? data_mask.data<scalar_t>() : NULL, channels,
+            height, width, ksize_h, ksize_w, pad_h, pad_w, stride_h, stride_w,
+            dilation_h, dilation_w, channel_per_deformable_group,
+            parallel_imgs, 2 * ksize_h * ksize_w * deformable_group,
+            deformable_group, height_col, width_col,
+            grad_offset.data<scalar_t>(),
+            grad_mask.defined() ? grad_mask.data<scalar_t>() : NULL);
+      }));
+}
+
+void shape_check(at::Tensor input, at::Tensor offset, at::Tensor *gradOutput,
+                 at::Tensor weight, int kH, int kW, int dH, int dW, int padH,
+                 int padW, int dilationH, int dilationW, int group,
+                 int deformable_group) {
+  AT_CHECK(weight.ndimension() == 4,
+           "4D weight tensor (nOutputPlane,nInputPlane,kH,kW) expected, "
+           "but got: %s",
+           weight.ndimension());
+
+  AT_CHECK(weight.is_contiguous(), "weight tensor has to be contiguous");
+
+  AT_CHECK(kW > 0 && kH > 0,
+           "kernel size should be greater than zero, but got kH: %d kW: %d", kH,
+           kW);
+
+  AT_CHECK((weight.size(2) == kH && weight.size(3) == kW),
+           "kernel size should be consistent with weight, ",
+           "but got kH: %d kW: %d weight.size(2): %d, weight.size(3): %d", kH,
+           kW, weight.size(2), weight.size(3));
+
+  AT_CHECK(dW > 0 && dH > 0,
+           "stride should be greater than zero, but got dH: %d dW: %d", dH, dW);
+
+  AT_CHECK(
+      dilationW > 0 && dilationH > 0,
+      "dilation should be greater than 0, but got dilationH: %d dilationW: %d",
+      dilationH, dilationW);
+
+  AT_CHECK(input.ndimension() == 4, "4D input tensor expected but got: %s",
+           input.ndimension());
+
+  long nInputPlane = weight.size(1) * group;
+  long inputHeight = input.size(2);
+  long inputWidth = input.size(3);
+  long nOutputPlane = weight.size(0);
+  long outputHeight =
+      (inputHeight + 2 * padH - (dilationH * (kH - 1) + 1)) / dH + 1;
+  long outputWidth =
+      (inputWidth + 2 * padW - (dilationW * (kW - 1) + 1)) / dW + 1;
+
+  AT_CHECK(nInputPlane % deformable_group == 0,
+           "input channels must divide deformable group size");
+
+  if (outputWidth < 1 || outputHeight < 1)
+    AT_ERROR(
+        "Given input size: (%ld x %ld x %ld). "
+        "Calculated output size: (%ld x %ld x %ld). Output size is too small",
+        nInputPlane, inputHeight, inputWidth, nOutputPlane, outputHeight,
+        outputWidth);
+
+  AT_CHECK(input.size(1) == nInputPlane,
+           "invalid number of input planes, expected: %d, but got: %d",
+           nInputPlane, input.size(1));
+
+  AT_CHECK((inputHeight >= kH && inputWidth >= kW),
+           "input image is smaller than kernel");
+
+  AT_CHECK((offset.size(2) == outputHeight && offset.size(3) == outputWidth),
+           "invalid spatial size of offset, expected height: %d width: %d, but "
+           "got height: %d width: %d",
+           outputHeight, outputWidth, offset.size(2), offset.size(3));
+
+  AT_CHECK((offset.size(1) == deformable_group * 2 * kH * kW),
+           "invalid number of channels of offset");
+
+  if (gradOutput != NULL) {
+    AT_CHECK(gradOutput->size(1) == nOutputPlane,
+             "invalid number of gradOutput planes, expected: %d, but got: %d",
+             nOutputPlane, gradOutput->size(1));
+
+    AT_CHECK((gradOutput->size(2) == outputHeight &&
+              gradOutput->size(3) == outputWidth),
+             "invalid size of gradOutput, expected height: %d width: %d , but "
+             "got height: %d width: %d",
+             outputHeight, outputWidth, gradOutput->size(2),
+             gradOutput->size(3));
+  }
+}
+
+int deform_conv_forward_cpu(at::Tensor input, at::Tensor weight,
+                            at::Tensor offset, at::Tensor output,
+                            at::Tensor columns, at::Tensor ones, int kW,
+                            int kH, int dW, int dH, int padW, int padH,
+                            int dilationW, int dilationH, int group,
+                            int deformable_group, int im2col_step) {
+  shape_check(input, offset, NULL, weight, kH, kW, dH, dW, padH, padW,
+              dilationH, dilationW, group, deformable_group);
+
+  input = input.contiguous();
+  offset = offset.contiguous();
+  weight = weight.contiguous();
+
+  long batchSize = input.size(0);
+  long nInputPlane = input.size(1);
+  long inputHeight = input.size(2);
+  long inputWidth = input.size(3);
+
+  long nOutputPlane = weight.size(0);
+
+  long outputWidth =
+      (inputWidth + 2 * padW - (dilationW * (kW - 1) + 1)) / dW + 1;
+  long outputHeight =
+      (inputHeight + 2 * padH - (dilationH * (kH - 1) + 1)) / dH + 1;
+
+  AT_CHECK((offset.size(0) == batchSize), "invalid batch size of offset");
+
+  // columns are fully overwritten by im2col (or by addmm with beta = 0 in
+  // the backward passes), so they are not zeroed
+  columns = at::empty(
+      {nInputPlane * kW * kH, im2col_step * outputHeight * outputWidth},
+      input.options());
+
+  input = input.view({batchSize / im2col_step, im2col_step, nInputPlane,
+                      inputHeight, inputWidth});
+  offset =
+      offset.view({batchSize / im2col_step, im2col_step,
+                   deformable_group * 2 * kH * kW, outputHeight, outputWidth});
+
+  // (step, nOutputPlane, im2col_step * outputHeight * outputWidth), i.e. the
+  // images of a step are interleaved as in columns
+  at::Tensor output_buffer =
+      at::zeros({batchSize / im2col_step, nOutputPlane,
+                 im2col_step * outputHeight * outputWidth},
+                output.options());
+
+  at::Tensor weight_g = weight.view({group, nOutputPlane / group, -1});
+  for (int elt = 0; elt < batchSize / im2col_step; elt++) {
+    deformable_im2col_cpu(input[elt], offset[elt], at::Tensor(), nInputPlane,
+                          inputHeight, inputWidth, kH, kW, padH, padW, dH, dW,
+                          dilationH, dilationW, im2col_step, deformable_group,
+                          columns);
+
+    at::Tensor columns_g = columns.view({group, -1, columns.size(1)});
+    at::Tensor output_g =
+        output_buffer[elt].view({group, nOutputPlane / group, -1});
+    for (int g = 0; g < group; g++) {
+      output_g[g].addmm_(weight_g[g], columns_g[g]);
+    }
+  }
+
+  output_buffer = output_buffer.view({batchSize / im2col_step, nOutputPlane,
+                                      im2col_step, outputHeight, outputWidth});
+  output.view({batchSize / im2col_step, im2col_step, nOutputPlane,
+               outputHeight, outputWidth})
+      .copy_(output_buffer.transpose(1, 2));
+
+  return 1;
+}
+
+int deform_conv_backward_input_cpu(at::Tensor input, at::Tensor offset,
+                                   at::Tensor gradOutput, at::Tensor gradInput,
+                                   at::Tensor gradOffset, at::Tensor weight,
+                                   at::Tensor columns, int kW, int kH, int dW,
+                                   int dH, int padW, int padH, int dilationW,
+                                   int dilationH, int group,
+                                   int deformable_group, int im2col_step) {
+  shape_check(input, offset, &gradOutput, weight, kH, kW, dH, dW, padH, padW,
+              dilationH, dilationW, group, deformable_group);
+
+  input = input.contiguous();
+  offset = offset.contiguous();
+  weight = weight.contiguous();
+
+  long batchSize = input.size(0);
+  long nInputPlane = input.size(1);
+  long inputHeight = input.size(2);
+  long inputWidth = input.size(3);
+
+  long nOutputPlane = weight.size(0);
+
+  long outputWidth =
+      (inputWidth + 2 * padW - (dilationW * (kW - 1) + 1)) / dW + 1;
+  long outputHeight =
+      (inputHeight + 2 * padH - (dilationH * (kH - 1) + 1)) / dH + 1;
+
+  AT_CHECK((offset.size(0) == batchSize), "invalid batch size of offset");
+  columns = at::empty(
+      {nInputPlane * kW * kH, im2col_step * outputHeight * outputWidth},
+      input.options());
+
+  // change order of grad output to match columns
+  at::Tensor gradOutputBuffer =
+      gradOutput
+          .view({batchSize / im2col_step, im2col_step, nOutputPlane,
+                 outputHeight, outputWidth})
+          .transpose(1, 2)
+          .contiguous()
+          .view({batchSize / im2col_step, group, nOutputPlane / group,
+                 im2col_step * outputHeight * outputWidth});
+
+  gradInput = gradInput.view({batchSize / im2col_step, im2col_step, nInputPlane,
+                              inputHeight, inputWidth});
+  input = input.view({batchSize / im2col_step, im2col_step, nInputPlane,
+                      inputHeight, inputWidth});
+  gradOffset = gradOffset.view({batchSize / im2col_step, im2col_step,
+                                deformable_group * 2 * kH * kW, outputHeight,
+                                outputWidth});
+  offset =
+      offset.view({batchSize / im2col_step, im2col_step,
+                   deformable_group * 2 * kH * kW, outputHeight, outputWidth});
+
+  at::Tensor weight_g = weight.view({group, nOutputPlane / group, -1});
+  at::Tensor columns_g = columns.view({group, -1, columns.size(1)});
+  for (int elt = 0; elt < batchSize / im2col_step; elt++) {
+    for (int g = 0; g < group; g++) {
+      columns_g[g].addmm_(weight_g[g].transpose(0, 1), gradOutputBuffer[elt][g],
+                          0.0f, 1.0f);
+    }
+
+    deformable_col2im_coord_cpu(columns, input[elt], offset[elt], at::Tensor(),
+                                nInputPlane, inputHeight, inputWidth, kH, kW,
+                                padH, padW, dH, dW, dilationH, dilationW,
+                                im2col_step, deformable_group, gradOffset[elt],
+                                at::Tensor());
+
+    deformable_col2im_cpu(columns, offset[elt], at::Tensor(), nInputPlane,
+                          inputHeight, inputWidth, kH, kW, padH, padW, dH, dW,
+                          dilationH, dilationW, im2col_step, deformable_group,
+                          gradInput[elt]);
+  }
+
+  return 1;
+}
+
+int deform_conv_backward_parameters_cpu(
+    at::Tensor input, at::Tensor offset, at::Tensor gradOutput,
+    at::Tensor gradWeight,  // at::Tensor gradBias,
+    at::Tensor columns, at::Tensor ones, int kW, int kH, int dW, int dH,
+    int padW, int padH, int dilationW, int dilationH, int group,
+    int deformable_group, float scale, int im2col_step) {
+  shape_check(input, offset, &gradOutput, gradWeight, kH, kW, dH, dW, padH,
+              padW, dilationH, dilationW, group, deformable_group);
+
+  input = input.contiguous();
+  offset = offset.contiguous();
+
+  long batchSize = input.size(0);
+  long nInputPlane = input.size(1);
+  long inputHeight = input.size(2);
+  long inputWidth = input.size(3);
+
+  long nOutputPlane = gradWeight.size(0);
+
+  long outputWidth =
+      (inputWidth + 2 * padW - (dilationW * (kW - 1) + 1)) / dW + 1;
+  long outputHeight =
+      (inputHeight + 2 * padH - (dilationH * (kH - 1) + 1)) / dH + 1;
+
+  AT_CHECK((offset.size(0) == batchSize), "invalid batch size of offset");
+
+  columns = at::empty(
+      {nInputPlane * kW * kH, im2col_step * outputHeight * outputWidth},
+      input.options());
+
+  at::Tensor gradOutputBuffer =
+      gradOutput
+          .view({batchSize / im2col_step, im2col_step, nOutputPlane,
+                 outputHeight, outputWidth})
+          .transpose(1, 2)
+          .contiguous()
+          .view({batchSize / im2col_step, group, nOutputPlane / group,
+                 im2col_step * outputHeight * outputWidth});
+
+  input = input.view({batchSize / im2col_step, im2col_step, nInputPlane,
+                      inputHeight, inputWidth});
+  offset =
+      offset.view({batchSize / im2col_step, im2col_step,
+                   deformable_group * 2 * kH * kW, outputHeight, outputWidth});
+
+  at::Tensor gradWeight_g = gradWeight.view({group, nOutputPlane / group, -1});
+  at::Tensor columns_g = columns.view({group, -1, columns.size(1)});
+  for (int elt = 0; elt < batchSize / im2col_step; elt++) {
+    deformable_im2col_cpu(input[elt], offset[elt], at::Tensor(), nInputPlane,
+                          inputHeight, inputWidth, kH, kW, padH, padW, dH, dW,
+                          dilationH, dilationW, im2col_step, deformable_group,
+                          columns);
+
+    for (int g = 0; g < group; g++) {
+      gradWeight_g[g].addmm_(gradOutputBuffer[elt][g],
+                             columns_g[g].transpose(1, 0), 1.0, scale);
+    }
+  }
+
+  return 1;
+}
+
+void modulated_deform_conv_cpu_forward(
+    at::Tensor input, at::Tensor weight, at::Tensor bias, at::Tensor ones,
+    at::Tensor offset, at::Tensor mask, at::Tensor output, at::Tensor columns,
+    int kernel_h, int kernel_w, const int stride_h, const int stride_w,
+    const int pad_h, const int pad_w, const int dilation_h,
+    const int dilation_w, const int group, const int deformable_group,
+    const bool with_bias) {
+  AT_CHECK(input.is_contiguous(), "input tensor has to be contiguous");
+  AT_CHECK(weight.is_contiguous(), "weight tensor has to be contiguous");
+
+  const int batch = input.size(0);
+  const int channels = input.size(1);
+  const int height = input.size(2);
+  const int width = input.size(3);
+
+  const int channels_out = weight.size(0);
+  const int channels_kernel = weight.size(1);
+  const int kernel_h_ = weight.size(2);
+  const int kernel_w_ = weight.size(3);
+
+  if (kernel_h_ != kernel_h || kernel_w_ != kernel_w)
+    AT_ERROR("Input shape and kernel shape wont match: (%d x %d vs %d x %d).",
+             kernel_h_, kernel_w, kernel_h_, kernel_w_);
+  if (channels != channels_kernel * group)
+    AT_ERROR("Input shape and kernel channels wont match: (%d vs %d).",
+             channels, channels_kernel * group);
+
+  const int height_out =
+      (height + 2 * pad_h - (dilation_h * (kernel_h - 1) + 1)) / stride_h + 1;
+  const int width_out =
+      (width + 2 * pad_w - (dilation_w * (kernel_w - 1) + 1)) / stride_w + 1;
+
+  offset = offset.contiguous();
+  mask = mask.contiguous();
+
+  // resize output
+  output = output.view({batch, channels_out, height_out, width_out}).zero_();
+  // resize temporary columns
+  columns =
+      at::empty({channels * kernel_h * kernel_w, 1 * height_out * width_out},
+                input.options());
+
+  at::Tensor weight_g = weight.view({group, channels_out / group, -1});
+  at::Tensor columns_g = columns.view({group, -1, columns.size(1)});
+  for (int b = 0; b < batch; b++) {
+    deformable_im2col_cpu(input[b], offset[b], mask[b], channels, height,
+                          width, kernel_h, kernel_w, pad_h, pad_w, stride_h,
+                          stride_w, dilation_h, dilation_w, 1,
+                          deformable_group, columns);
+
+    at::Tensor output_g = output[b].view({group, channels_out / group, -1});
+    for (int g = 0; g < group; g++) {
+      output_g[g].addmm_(weight_g[g], columns_g[g]);
+    }
+  }
+
+  if (with_bias) {
+    output += bias.view({1, bias.size(0), 1, 1});
+  }
+}
+
+void modulated_deform_conv_cpu_backward(
+    at::Tensor input, at::Tensor weight, at::Tensor bias, at::Tensor ones,
+    at::Tensor offset, at::Tensor mask, at::Tensor columns,
+    at::Tensor grad_input, at::Tensor grad_weight, at::Tensor grad_bias,
+    at::Tensor grad_offset, at::Tensor grad_mask, at::Tensor grad_output,
+    int kernel_h, int kernel_w, int stride_h, int stride_w, int pad_h,
+    int pad_w, int dilation_h, int dilation_w, int group, int deformable_group,
+    const bool with_bias) {
+  AT_CHECK(input.is_contiguous(), "input tensor has to be contiguous");
+  AT_CHECK(weight.is_contiguous(), "weight tensor has to be contiguous");
+
+  const int batch = input.size(0);
+  const int channels = input.size(1);
+  const int height = input.size(2);
+  const int width = input.size(3);
+
+  const int channels_out = weight.size(0);
+  const int channels_kernel = weight.size(1);
+  const int kernel_h_ = weight.size(2);
+  const int kernel_w_ = weight.size(3);
+  if (kernel_h_ != kernel_h || kernel_w_ != kernel_w)
+    AT_ERROR("Input shape and kernel shape wont match: (%d x %d vs %d x %d).",
+             kernel_h_, kernel_w, kernel_h_, kernel_w_);
+  if (channels != channels_kernel * group)
+    AT_ERROR("Input shape and kernel channels wont match: (%d vs %d).",
+             channels, channels_kernel * group);
+
+  const int height_out =
+      (height + 2 * pad_h - (dilation_h * (kernel_h - 1) + 1)) / stride_h + 1;
+  const int width_out =
+      (width + 2 * pad_w - (dilation_w * (kernel_w - 1) + 1)) / stride_w + 1;
+
+  offset = offset.contiguous();
+  mask = mask.contiguous();
+  grad_output = grad_output.contiguous().view(
+      {batch, group, channels_out / group, height_out * width_out});
+
+  columns = at::empty({channels * kernel_h * kernel_w, height_out * width_out},
+                      input.options());
+
+  at::Tensor weight_g = weight.view({group, channels_out / group, -1});
+  at::Tensor grad_weight_g =
+      grad_weight.view({group, channels_out / group, -1});
+  at::Tensor columns_g = columns.view({group, -1, columns.size(1)});
+  for (int b = 0; b < batch; b++) {
+    for (int g = 0; g < group; g++) {
+      columns_g[g].addmm_(weight_g[g].transpose(0, 1), grad_output[b][g],
+                          0.0f, 1.0f);
+    }
+
+    // gradient w.r.t. input coordinate data
+    deformable_col2im_coord_cpu(columns, input[b], offset[b], mask[b],
+                                channels, height, width, kernel_h, kernel_w,
+                                pad_h, pad_w, stride_h, stride_w, dilation_h,
+                                dilation_w, 1, deformable_group,
+                                grad_offset[b], grad_mask[b]);
+    // gradient w.r.t. input data
+    deformable_col2im_cpu(columns, offset[b], mask[b], channels, height, width,
+                          kernel_h, kernel_w, pad_h, pad_w, stride_h,
+                          stride_w, dilation_h, dilation_w, 1,
+                          deformable_group, grad_input[b]);
+
+    // gradient w.r.t. weight, dWeight should accumulate across the batch and
+    // group
+    deformable_im2col_cpu(input[b], offset[b], mask[b], channels, height,
+                          width, kernel_h, kernel_w, pad_h, pad_w, stride_h,
+                          stride_w, dilation_h, dilation_w, 1,
+                          deformable_group, columns);
+
+    for (int g = 0; g < group; g++) {
+      grad_weight_g[g].addmm_(grad_output[b][g], columns_g[g].transpose(0, 1));
+    }
+    if (with_bias) {
+      grad_bias += grad_output[b].sum(-1).view(-1);
+    }
+  }
+}
+
+PYBIND11_MODULE(TORCH_EXTENSION_NAME, m) {
+  m.def("deform_conv_forward_cpu", &deform_conv_forward_cpu,
+        "deform forward (CPU)");
+  m.def("deform_conv_backward_input_cpu", &deform_conv_backward_input_cpu,
+        "deform_conv_backward_input (CPU)");
+  m.def("deform_conv_backward_parameters_cpu",
+        &deform_conv_backward_parameters_cpu,
+        "deform_conv_backward_parameters (CPU)");
+  m.def("modulated_deform_conv_cpu_forward",
+        &modulated_deform_conv_cpu_forward,
+        "modulated deform conv forward (CPU)");
+  m.def("modulated_deform_conv_cpu_backward",
+        &modulated_deform_conv_cpu_backward,
+        "modulated deform conv backward (CPU)");
+}
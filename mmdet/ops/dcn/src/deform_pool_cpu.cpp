@@ -0,0 +1,376 @@
+// CPU counterpart of deform_pool_cuda.cpp and deform_pool_cuda_kernel.cu,
+// which follows the CUDA kernels so that DeformRoIPooling produces the same
+// results on both devices.
+
+#include <ATen/Parallel.h>
+#include <torch/extension.h>
+
+#include <algorithm>
+#include <cmath>
+#include <vector>
+
+template <typename scalar_t>
+scalar_t bilinear_interp(const scalar_t *data, const scalar_t x,
+                         const scalar_t y, const int width, const int height) {
+  int x1 = floor(x);
+  int x2 = ceil(x);
+  int y1 = floor(y);
+  int y2 = ceil(y);
+  scalar_t dist_x = (scalar_t)(x - x1);
+  scalar_t dist_y = (scalar_t)(y - y1);
+  scalar_t value11 = data[y1 * width + x1];
+  scalar_t value12 = data[y2 * width + x1];
+  scalar_t value21 = data[y1 * width + x2];
+  scalar_t value22 = data[y2 * width + x2];
+  scalar_t value = (1 - dist_x) * (1 - dist_y) * value11 +
+                   (1 - dist_x) * dist_y * value12 +
+                   dist_x * (1 - dist_y) * value21 + dist_x * dist_y * value22;
+  return value;
+}
+
+// Sampling geometry of the output bin (n, ctop, ph, pw), shared by the
+// forward and backward passes.
+template <typename scalar_t>
+struct PSROIBin {
+  int roi_batch_ind;
+  int class_id;
+  int part_h;
+  int part_w;
+  int c;
+  scalar_t roi_width;
+  scalar_t roi_height;
+  scalar_t wstart;
+  scalar_t hstart;
+  scalar_t sub_bin_size_w;
+  scalar_t sub_bin_size_h;
+};
+
+template <typename scalar_t>
+PSROIBin<scalar_t> get_psroi_bin(
+    const int n, const int ctop, const int ph, const int pw,
+    const scalar_t *bottom_rois, const scalar_t *bottom_trans,
+    const int no_trans, const scalar_t spatial_scale, const scalar_t trans_std,
+    const int pooled_height, const int pooled_width, const int sample_per_part,
+    const int group_size, const int part_size, const int num_classes,
+    const int channels_each_class) {
+  PSROIBin<scalar_t> bin;
+  const scalar_t *offset_bottom_rois = bottom_rois + n * 5;
+  bin.roi_batch_ind = offset_bottom_rois[0];
+  scalar_t roi_start_w =
+      (scalar_t)(round(offset_bottom_rois[1])) * spatial_scale - 0.5;
+  scalar_t roi_start_h =
+      (scalar_t)(round(offset_bottom_rois[2])) * spatial_scale - 0.5;
+  scalar_t roi_end_w =
+      (scalar_t)(round(offset_bottom_rois[3]) + 1.) * spatial_scale - 0.5;
+  scalar_t roi_end_h =
+      (scalar_t)(round(offset_bottom_rois[4]) + 1.) * spatial_scale - 0.5;
+  // Force too small ROIs to be 1x1
+  bin.roi_width = std::max(roi_end_w - roi_start_w, (scalar_t)0.1);  // avoid 0
+  bin.roi_height = std::max(roi_end_h - roi_start_h, (scalar_t)0.1);
+
+  // Compute w and h at bottom
+  scalar_t bin_size_h = bin.roi_height / (scalar_t)(pooled_height);
+  scalar_t bin_size_w = bin.roi_width / (scalar_t)(pooled_width);
+
+  bin.sub_bin_size_h = bin_size_h / (scalar_t)(sample_per_part);
+  bin.sub_bin_size_w = bin_size_w / (scalar_t)(sample_per_part);
+
+  bin.part_h = floor((scalar_t)(ph) / pooled_height * part_size);
+  bin.part_w = floor((scalar_t)(pw) / pooled_width * part_size);
+  bin.class_id = ctop / channels_each_class;
+  scalar_t trans_x =
+      no_trans ? (scalar_t)(0)
+               : bottom_trans[(((n * num_classes + bin.class_id) * 2) *
+                                   part_size +
+                               bin.part_h) *
+                                  part_size +
+                              bin.part_w] *
+                     trans_std;
+  scalar_t trans_y =
+      no_trans ? (scalar_t)(0)
+               : bottom_trans[(((n * num_classes + bin.class_id) * 2 + 1) *
+                                   part_size +
+                               bin.part_h) *
+                                  part_size +
+                              bin.part_w] *
+                     trans_std;
+
+  bin.wstart = (scalar_t)(pw)*bin_size_w + roi_start_w;
+  bin.wstart += trans_x * bin.roi_width;
+  bin.hstart = (scalar_t)(ph)*bin_size_h + roi_start_h;
+  bin.hstart += trans_y * bin.roi_height;
+
+  int gw = floor((scalar_t)(pw)*group_size / pooled_width);
+  int gh = floor((scalar_t)(ph)*group_size / pooled_height);
+  gw = std::min(std::max(gw, 0), group_size - 1);
+  gh = std::min(std::max(gh, 0), group_size - 1);
+  bin.c = (ctop * group_size + gh) * group_size + gw;
+  return bin;
+}
+
+template <typename scalar_t>
+void DeformablePSROIPoolForwardCPU(
+    const int count, const scalar_t *bottom_data,
+    const scalar_t spatial_scale, const int channels, const int height,
+    const int width, const int pooled_height, const int pooled_width,
+    const scalar_t *bottom_rois, const scalar_t *bottom_trans,
+    const int no_trans, const scalar_t trans_std, const int sample_per_part,
+    const int output_dim, const int group_size, const int part_size,
+    const int num_classes, const int channels_each_class, scalar_t *top_data,
+    scalar_t *top_count) {
+  at::parallel_for(0, count, 256, [&](int64_t begin, int64_t end) {
+    for (int64_t index = begin; index < end; index++) {
+      // The output is in order (n, ctop, ph, pw)
+      int pw = index % pooled_width;
+      int ph = (index / pooled_width) % pooled_height;
+      int ctop = (index / pooled_width / pooled_height) % output_dim;
+      int n = index / pooled_width / pooled_height / output_dim;
+
+      const PSROIBin<scalar_t> bin = get_psroi_bin(
+          n, ctop, ph, pw, bottom_rois, bottom_trans, no_trans, spatial_scale,
+          trans_std, pooled_height, pooled_width, sample_per_part, group_size,
+          part_size, num_classes, channels_each_class);
+      const scalar_t *offset_bottom_data =
+          bottom_data + ((bin.roi_batch_ind * channels) + bin.c) * height *
+                            width;
+
+      scalar_t sum = 0;
+      int num = 0;
+      for (int ih = 0; ih < sample_per_part; ih++) {
+        for (int iw = 0; iw < sample_per_part; iw++) {
+          scalar_t w = bin.wstart + iw * bin.sub_bin_size_w;
+          scalar_t h = bin.hstart + ih * bin.sub_bin_size_h;
+          // bilinear interpolation
+          if (w < -0.5 || w > width - 0.5 || h < -0.5 || h > height - 0.5) {
+            continue;
+          }
+          w = std::min(std::max(w, (scalar_t)0.), (scalar_t)(width - 1.));
+          h = std::min(std::max(h, (scalar_t)0.), (scalar_t)(height - 1.));
+          sum += bilinear_interp(offset_bottom_data, w, h, width, height);
+          num++;
+        }
+      }
+      top_data[index] = num == 0 ? (scalar_t)(0) : sum / num;
+      top_count[index] = num;
+    }
+  });
+}
+
+template <typename scalar_t>
+void DeformablePSROIPoolBackwardAccCPU(
+    const scalar_t *top_diff, const scalar_t *top_count, const int num_rois,
+    const scalar_t spatial_scale, const int channels, const int height,
+    const int width, const int pooled_height, const int pooled_width,
+    const int output_dim, scalar_t *bottom_data_diff,
+    scalar_t *bottom_trans_diff, const scalar_t *bottom_data,
+    const scalar_t *bottom_rois, const scalar_t *bottom_trans,
+    const int no_trans, const scalar_t trans_std, const int sample_per_part,
+    const int group_size, const int part_size, const int num_classes,
+    const int channels_each_class) {
+  // The gradient of the features is accumulated with output channels in
+  // parallel, as each of them reads its own input channels. The gradient of
+  // the offsets, which is shared by all channels of a class, is accumulated
+  // in a second pass with RoIs in parallel instead, so no atomics are needed.
+  at::parallel_for(0, output_dim, 1, [&](int64_t begin, int64_t end) {
+    for (int64_t ctop = begin; ctop < end; ctop++) {
+      for (int n = 0; n < num_rois; n++) {
+        for (int ph = 0; ph < pooled_height; ph++) {
+          for (int pw = 0; pw < pooled_width; pw++) {
+            const int index =
+                ((n * output_dim + ctop) * pooled_height + ph) * pooled_width +
+                pw;
+            if (top_count[index] <= 0) {
+              continue;
+            }
+            const scalar_t diff_val = top_diff[index] / top_count[index];
+            const PSROIBin<scalar_t> bin = get_psroi_bin(
+                n, ctop, ph, pw, bottom_rois, bottom_trans, no_trans,
+                spatial_scale, trans_std, pooled_height, pooled_width,
+                sample_per_part, group_size, part_size, num_classes,
+                channels_each_class);
+            scalar_t *offset_bottom_data_diff =
+                bottom_data_diff +
+                ((bin.roi_batch_ind * channels) + bin.c) * height * width;
+            for (int ih = 0; ih < sample_per_part; ih++) {
+              for (int iw = 0; iw < sample_per_part; iw++) {
+                scalar_t w = bin.wstart + iw * bin.sub_bin_size_w;
+                scalar_t h = bin.hstart + ih * bin.sub_bin_size_h;
+                // bilinear interpolation
+                if (w < -0.5 || w > width - 0.5 || h < -0.5 ||
+                    h > height - 0.5) {
+                  continue;
+                }
+                w = std::min(std::max(w, (scalar_t)0.),
+                             (scalar_t)(width - 1.));
+                h = std::min(std::max(h, (scalar_t)0.),
+                             (scalar_t)(height - 1.));
+                int x0 = floor(w);
+                int x1 = ceil(w);
+                int y0 = floor(h);
+                int y1 = ceil(h);
+                scalar_t dist_x = w - x0, dist_y = h - y0;
+                offset_bottom_data_diff[y0 * width + x0] +=
+                    (1 - dist_x) * (1 - dist_y) * diff_val;
+                offset_bottom_data_diff[y1 * width + x0] +=
+                    (1 - dist_x) * dist_y * diff_val;
+                offset_bottom_data_diff[y0 * width + x1] +=
+                    dist_x * (1 - dist_y) * diff_val;
+                offset_bottom_data_diff[y1 * width + x1] +=
+                    dist_x * dist_y * diff_val;
+              }
+            }
+          }
+        }
+      }
+    }
+  });
+
+  if (no_trans) {
+    return;
+  }
+
+  at::parallel_for(0, num_rois, 1, [&](int64_t begin, int64_t end) {
+    for (int64_t n = begin; n < end; n++) {
+      for (int ctop = 0; ctop < output_dim; ctop++) {
+        for (int ph = 0; ph < pooled_height; ph++) {
+          for (int pw = 0; pw < pooled_width; pw++) {
+            const int index =
+                ((n * output_dim + ctop) * pooled_height + ph) * pooled_width +
+                pw;
+            if (top_count[index] <= 0) {
+              continue;
+            }
+            const scalar_t diff_val = top_diff[index] / top_count[index];
+            const PSROIBin<scalar_t> bin = get_psroi_bin(
+                n, ctop, ph, pw, bottom_rois, bottom_trans, no_trans,
+                spatial_scale, trans_std, pooled_height, pooled_width,
+                sample_per_part, group_size, part_size, num_classes,
+                channels_each_class);
+            const scalar_t *offset_bottom_data =
+                bottom_data +
+                ((bin.roi_batch_ind * channels) + bin.c) * height * width;
+            scalar_t *trans_diff_x =
+                bottom_trans_diff +
+                (((n * num_classes + bin.class_id) * 2) * part_size +
+                 bin.part_h) *
+                    part_size +
+                bin.part_w;
+            scalar_t *trans_diff_y =
+                trans_diff_x + part_size * part_size;
+            for (int ih = 0; ih < sample_per_part; ih++) {
+              for (int iw = 0; iw < sample_per_part; iw++) {
+                scalar_t w = bin.wstart + iw * bin.sub_bin_size_w;
+                scalar_t h = bin.hstart + ih * bin.sub_bin_size_h;
+                if (w < -0.5 || w > width - 0.5 || h < -0.5 ||
+                    h > height - 0.5) {
+                  continue;
+                }
+                w = std::min(std::max(w, (scalar_t)0.),
+                             (scalar_t)(width - 1.));
+                h = std::min(std::max(h, (scalar_t)0.),
+                             (scalar_t)(height - 1.));
+                int x0 = floor(w);
+                int x1 = ceil(w);
+                int y0 = floor(h);
+                int y1 = ceil(h);
+                scalar_t dist_x = w - x0, dist_y = h - y0;
+                scalar_t U00 = offset_bottom_data[y0 * width + x0];
+                scalar_t U01 = offset_bottom_data[y1 * width + x0];
+                scalar_t U10 = offset_bottom_data[y0 * width + x1];
+                scalar_t U11 = offset_bottom_data[y1 * width + x1];
+                scalar_t diff_x = (U11 * dist_y + U10 * (1 - dist_y) -
+                                   U01 * dist_y - U00 * (1 - dist_y)) *
+                                  trans_std * diff_val;
+                scalar_t diff_y = (U11 * dist_x + U01 * (1 - dist_x) -
+                                   U10 * dist_x - U00 * (1 - dist_x)) *
+                                  trans_std * diff_val;
+                *trans_diff_x += diff_x * bin.roi_width;
+                *trans_diff_y += diff_y * bin.roi_height;
+              }
+            }
+          }
+        }
+      }
+    }
+  });
+}
+
+void deform_psroi_pooling_cpu_forward(
+    at::Tensor input, at::Tensor bbox, at::Tensor trans, at::Tensor out,
+    at::Tensor top_count, const int no_trans, const float spatial_scale,
+    const int output_dim, const int group_size, const int pooled_size,
+    const int part_size, const int sample_per_part, const float trans_std) {
+  AT_CHECK(input.is_contiguous(), "input tensor has to be contiguous");
+
+  const int channels = input.size(1);
+  const int height = input.size(2);
+  const int width = input.size(3);
+  const int channels_trans = no_trans ? 2 : trans.size(1);
+
+  const int num_bbox = bbox.size(0);
+  if (num_bbox != out.size(0))
+    AT_ERROR("Output shape and bbox number wont match: (%d vs %d).",
+             out.size(0), num_bbox);
+
+  const int count = num_bbox * output_dim * pooled_size * pooled_size;
+  const int num_classes = no_trans ? 1 : channels_trans / 2;
+  const int channels_each_class =
+      no_trans ? output_dim : output_dim / num_classes;
+
+  AT_DISPATCH_FLOATING_TYPES(
+      input.scalar_type(), "deformable_psroi_pool_forward_cpu", ([&] {
+        DeformablePSROIPoolForwardCPU<scalar_t>(
+            count, input.data<scalar_t>(), (scalar_t)spatial_scale, channels,
+            height, width, pooled_size, pooled_size,
+            bbox.contiguous().data<scalar_t>(),
+            no_trans ? NULL : trans.contiguous().data<scalar_t>(), no_trans,
+            (scalar_t)trans_std, sample_per_part, output_dim, group_size,
+            part_size, num_classes, channels_each_class,
+            out.data<scalar_t>(), top_count.data<scalar_t>());
+      }));
+}
+
+void deform_psroi_pooling_cpu_backward(
+    at::Tensor out_grad, at::Tensor input, at::Tensor bbox, at::Tensor trans,
+    at::Tensor top_count, at::Tensor input_grad, at::Tensor trans_grad,
+    const int no_trans, const float spatial_scale, const int output_dim,
+    const int group_size, const int pooled_size, const int part_size,
+    const int sample_per_part, const float trans_std) {
+  AT_CHECK(out_grad.is_contiguous(), "out_grad tensor has to be contiguous");
+  AT_CHECK(input.is_contiguous(), "input tensor has to be contiguous");
+
+  const int channels = input.size(1);
+  const int height = input.size(2);
+  const int width = input.size(3);
+  const int channels_trans = no_trans ? 2 : trans.size(1);
+
+  const int num_bbox = bbox.size(0);
+  if (num_bbox != out_grad.size(0))
+    AT_ERROR("Output shape and bbox number wont match: (%d vs %d).",
+             out_grad.size(0), num_bbox);
+
+  const int num_classes = no_trans ? 1 : channels_trans / 2;
+  const int channels_each_class =
+      no_trans ? output_dim : output_dim / num_classes;
+
+  AT_DISPATCH_FLOATING_TYPES(
+      out_grad.scalar_type(), "deformable_psroi_pool_backward_acc_cpu", ([&] {
+        DeformablePSROIPoolBackwardAccCPU<scalar_t>(
+            out_grad.data<scalar_t>(), top_count.data<scalar_t>(), num_bbox,
+            (scalar_t)spatial_scale, channels, height, width, pooled_size,
+            pooled_size, output_dim, input_grad.data<scalar_t>(),
+            no_trans ? NULL : trans_grad.data<scalar_t>(),
+            input.data<scalar_t>(), bbox.contiguous().data<scalar_t>(),
+            no_trans ? NULL : trans.contiguous().data<scalar_t>(), no_trans,
+            (scalar_t)trans_std, sample_per_part, group_size, part_size,
+            num_classes, channels_each_class);
+      }));
+}
+
+PYBIND11_MODULE(TORCH_EXTENSION_NAME, m) {
+  m.def("deform_psroi_pooling_cpu_forward", &deform_psroi_pooling_cpu_forward,
+        "deform psroi pooling forward(CPU)");
+  m.def("deform_psroi_pooling_cpu_backward",
+        &deform_psroi_pooling_cpu_backward,
+        "deform psroi pooling backward(CPU)");
+}
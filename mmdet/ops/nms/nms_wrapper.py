@@ -49,30 +49,191 @@ def nms(dets, iou_thr, device_id=None):
     return dets[inds, :], inds
 
 
-def soft_nms(dets, iou_thr, method='linear', sigma=0.5, min_score=1e-3):
+# Above this number of boxes the IoU matrix of soft_nms is not precomputed,
+# the IoUs with each selected box are computed in its step instead.
+SOFT_NMS_MAX_IOU_BOXES = 4096
+
+
+def soft_nms(dets,
+             iou_thr,
+             method='linear',
+             sigma=0.5,
+             min_score=1e-3,
+             max_num=-1):
+    """Dispatch to either the tensor or the Cython Soft-NMS implementation.
+
+    Tensors are suppressed on their own device by :func:`soft_nms_tensor`,
+    numpy arrays by the sequential Cython ``soft_nms_cpu``.
+
+    Arguments:
+        dets (torch.Tensor or np.ndarray): bboxes with scores.
+        iou_thr (float): IoU threshold of the linear method.
+        method (str): 'linear' or 'gaussian'.
+        sigma (float): Sigma of the gaussian method.
+        min_score (float): Boxes whose scores decay below it are discarded.
+        max_num (int): Stop after selecting this number of boxes, -1 means
+            no limit. Only supported for tensors.
+
+    Returns:
+        tuple: kept bboxes with decayed scores in the order of selection and
+            indice, which is always the same data type as the input.
+    """
+    method_codes = {'linear': 1, 'gaussian': 2}
+    if method not in method_codes:
+        raise ValueError('Invalid method for SoftNMS: {}'.format(method))
     if isinstance(dets, torch.Tensor):
-        is_tensor = True
-        dets_np = dets.detach().cpu().numpy()
-    elif isinstance(dets, np.ndarray):
-        is_tensor = False
-        dets_np = dets
-    else:
+        return soft_nms_tensor(
+            dets.detach(),
+            iou_thr,
+            method=method,
+            sigma=sigma,
+            min_score=min_score,
+            max_num=max_num)
+    elif not isinstance(dets, np.ndarray):
         raise TypeError(
             'dets must be either a Tensor or numpy array, but got {}'.format(
                 type(dets)))
 
-    method_codes = {'linear': 1, 'gaussian': 2}
-    if method not in method_codes:
-        raise ValueError('Invalid method for SoftNMS: {}'.format(method))
     new_dets, inds = soft_nms_cpu(
-        dets_np,
+        dets,
         iou_thr,
         method=method_codes[method],
         sigma=sigma,
         min_score=min_score)
+    return new_dets.astype(np.float32), inds.astype(np.int64)
+
 
-    if is_tensor:
-        return dets.new_tensor(new_dets), dets.new_tensor(
-            inds, dtype=torch.long)
+def _box_ious(bboxes, others):
+    """IoUs between two sets of boxes, as computed by the NMS kernels."""
+    lt = torch.max(bboxes[:, None, :2], others[None, :, :2])
+    rb = torch.min(bboxes[:, None, 2:], others[None, :, 2:])
+    wh = (rb - lt + 1).clamp(min=0)
+    overlaps = wh[..., 0] * wh[..., 1]
+    areas = (bboxes[:, 2] - bboxes[:, 0] + 1) * (
+        bboxes[:, 3] - bboxes[:, 1] + 1)
+    other_areas = (others[:, 2] - others[:, 0] + 1) * (
+        others[:, 3] - others[:, 1] + 1)
+    return overlaps / (areas[:, None] + other_areas[None, :] - overlaps)
+
+
+def soft_nms_tensor(dets,
+                    iou_thr,
+                    method='linear',
+                    sigma=0.5,
+                    min_score=1e-3,
+                    max_num=-1,
+                    block_size=512):
+    """Soft-NMS on tensors.
+
+    Gives the same results as ``soft_nms_cpu`` (up to the order of boxes
+    with equal scores), but each step selects the box with the highest score
+    and decays the scores of all other boxes at once. The IoU matrix is
+    precomputed in blocks of ``block_size`` rows unless there are more than
+    ``SOFT_NMS_MAX_IOU_BOXES`` boxes. The loop stops once no remaining box
+    scores at least ``min_score``, so unlike ``soft_nms_cpu``, input boxes
+    below ``min_score`` are discarded even if they overlap no kept box.
+    """
+    num_boxes = dets.size(0)
+    bboxes = dets[:, :4]
+    scores = dets[:, 4].clone()
+    if num_boxes <= SOFT_NMS_MAX_IOU_BOXES:
+        ious = dets.new_empty((num_boxes, num_boxes))
+        for start in range(0, num_boxes, block_size):
+            ious[start:start + block_size] = _box_ious(
+                bboxes[start:start + block_size], bboxes)
     else:
-        return new_dets.astype(np.float32), inds.astype(np.int64)
+        ious = None
+
+    max_num = num_boxes if max_num < 0 else min(max_num, num_boxes)
+    keep = dets.new_zeros(max_num, dtype=torch.long)
+    keep_scores = dets.new_zeros(max_num)
+    valid = scores.new_ones(num_boxes, dtype=torch.bool)
+    num_keep = 0
+    while num_keep < max_num:
+        max_score, ind = scores.masked_fill(~valid, float('-inf')).max(dim=0)
+        if max_score.item() < min_score:
+            break
+        keep[num_keep] = ind
+        keep_scores[num_keep] = max_score
+        num_keep += 1
+        if ious is not None:
+            box_ious = ious[ind]
+        else:
+            box_ious = _box_ious(bboxes[ind][None], bboxes)[0]
+        if method == 'linear':
+            weights = torch.where(box_ious > iou_thr, 1 - box_ious,
+                                  torch.ones_like(box_ious))
+        else:
+            weights = torch.exp(-box_ious * box_ious / sigma)
+        scores *= weights
+        # the selected box and the boxes overlapping it whose scores fall
+        # below min_score are discarded
+        valid &= ~((box_ious > 0) & (scores < min_score))
+        valid[ind] = False
+
+    keep = keep[:num_keep]
+    return torch.cat([bboxes[keep], keep_scores[:num_keep, None]], dim=1), keep
+
+
+def wbf(dets, iou_thr, num_models=1, score_type='avg'):
+    """Weighted box fusion of overlapping boxes.
+
+    Boxes are clustered around the boxes kept by NMS with ``iou_thr``, each
+    box joining the kept box it overlaps most. Each cluster is fused into a
+    box whose coordinates are the score-weighted average of its members, so
+    detections of several models or augmentations (with different proposals)
+    are merged instead of suppressed. With ``score_type='max'`` the fused box
+    keeps the score of the kept box, which is score voting.
+
+    Arguments:
+        dets (torch.Tensor or np.ndarray): bboxes with scores.
+        iou_thr (float): IoU threshold of the clusters.
+        num_models (int): Number of models or augmentations the boxes come
+            from. With ``score_type='avg'``, the mean score of a cluster is
+            scaled by ``min(cluster size, num_models) / num_models``, so that
+            boxes found by few models are down-weighted.
+        score_type (str): 'avg' or 'max'.
+
+    Returns:
+        tuple: fused bboxes with scores and the indice of the kept boxes of
+            the clusters, which is always the same data type as the input.
+    """
+    if score_type not in ('avg', 'max'):
+        raise ValueError('Invalid score type for WBF: {}'.format(score_type))
+    if isinstance(dets, torch.Tensor):
+        dets_th = dets.detach()
+    elif isinstance(dets, np.ndarray):
+        dets_th = torch.from_numpy(dets)
+    else:
+        raise TypeError(
+            'dets must be either a Tensor or numpy array, but got {}'.format(
+                type(dets)))
+
+    _, inds = nms(dets_th, iou_thr)
+    if inds.numel() > 0:
+        # kept boxes never overlap each other by more than iou_thr and every
+        # suppressed box overlaps the box that suppressed it by more
+        cluster_ids = _box_ious(dets_th[:, :4],
+                                dets_th[inds, :4]).argmax(dim=1)
+        num_clusters = inds.size(0)
+        scores = dets_th[:, 4]
+        weights = scores.new_zeros(num_clusters).index_add_(
+            0, cluster_ids, scores)
+        weighted_bboxes = dets_th[:, :4] * scores[:, None]
+        fused = scores.new_zeros(
+            (num_clusters, 4)).index_add_(0, cluster_ids, weighted_bboxes)
+        fused /= weights[:, None]
+        if score_type == 'avg':
+            sizes = scores.new_zeros(num_clusters).index_add_(
+                0, cluster_ids, torch.ones_like(scores))
+            fused_scores = weights / sizes * sizes.clamp(
+                max=num_models) / num_models
+        else:
+            fused_scores = scores[inds]
+        dets_th = torch.cat([fused, fused_scores[:, None]], dim=1)
+    else:
+        dets_th = dets_th.new_zeros((0, 5))
+
+    if isinstance(dets, np.ndarray):
+        return dets_th.numpy(), inds.numpy()
+    return dets_th, inds
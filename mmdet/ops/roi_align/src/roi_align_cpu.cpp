@@ -0,0 +1,296 @@
+#include <ATen/Parallel.h>
+#include <torch/extension.h>
+
+#include <cmath>
+#include <vector>
+
+// Bilinear interpolation weights and positions of one sampling point, which
+// are shared by all channels of a RoI.
+template <typename scalar_t>
+struct PreCalc {
+  int pos1;
+  int pos2;
+  int pos3;
+  int pos4;
+  scalar_t w1;
+  scalar_t w2;
+  scalar_t w3;
+  scalar_t w4;
+};
+
+template <typename scalar_t>
+void pre_calc_for_bilinear_interpolate(
+    const int height, const int width, const int pooled_height,
+    const int pooled_width, const int sample_num_h, const int sample_num_w,
+    const scalar_t roi_start_h, const scalar_t roi_start_w,
+    const scalar_t bin_size_h, const scalar_t bin_size_w,
+    std::vector<PreCalc<scalar_t>> &pre_calc) {
+  int pre_calc_index = 0;
+  for (int ph = 0; ph < pooled_height; ph++) {
+    for (int pw = 0; pw < pooled_width; pw++) {
+      for (int iy = 0; iy < sample_num_h; iy++) {
+        const scalar_t yy =
+            roi_start_h + ph * bin_size_h +
+            (scalar_t)(iy + .5f) * bin_size_h / (scalar_t)(sample_num_h);
+        for (int ix = 0; ix < sample_num_w; ix++) {
+          const scalar_t xx =
+              roi_start_w + pw * bin_size_w +
+              (scalar_t)(ix + .5f) * bin_size_w / (scalar_t)(sample_num_w);
+          scalar_t x = xx;
+          scalar_t y = yy;
+          PreCalc<scalar_t> &pc = pre_calc[pre_calc_index++];
+          // deal with cases that inverse elements are out of feature map
+          // boundary
+          if (y < -1.0 || y > height || x < -1.0 || x > width) {
+            pc.pos1 = pc.pos2 = pc.pos3 = pc.pos4 = 0;
+            pc.w1 = pc.w2 = pc.w3 = pc.w4 = 0;
+            continue;
+          }
+
+          if (y <= 0) y = 0;
+          if (x <= 0) x = 0;
+
+          int y_low = (int)y;
+          int x_low = (int)x;
+          int y_high;
+          int x_high;
+
+          if (y_low >= height - 1) {
+            y_high = y_low = height - 1;
+            y = (scalar_t)y_low;
+          } else {
+            y_high = y_low + 1;
+          }
+
+          if (x_low >= width - 1) {
+            x_high = x_low = width - 1;
+            x = (scalar_t)x_low;
+          } else {
+            x_high = x_low + 1;
+          }
+
+          scalar_t ly = y - y_low;
+          scalar_t lx = x - x_low;
+          scalar_t hy = 1. - ly;
+          scalar_t hx = 1. - lx;
+
+          pc.pos1 = y_low * width + x_low;
+          pc.pos2 = y_low * width + x_high;
+          pc.pos3 = y_high * width + x_low;
+          pc.pos4 = y_high * width + x_high;
+          pc.w1 = hy * hx;
+          pc.w2 = hy * lx;
+          pc.w3 = ly * hx;
+          pc.w4 = ly * lx;
+        }
+      }
+    }
+  }
+}
+
+// Same RoI geometry as ROIAlignForward/ROIAlignBackward in
+// roi_align_kernel.cu, so that CPU and CUDA results match.
+template <typename scalar_t>
+void get_roi_geometry(const scalar_t *offset_bottom_rois,
+                      const scalar_t spatial_scale, const int sample_num,
+                      const int pooled_height, const int pooled_width,
+                      scalar_t &roi_start_h, scalar_t &roi_start_w,
+                      scalar_t &bin_size_h, scalar_t &bin_size_w,
+                      int &sample_num_h, int &sample_num_w) {
+  roi_start_w = offset_bottom_rois[1] * spatial_scale;
+  roi_start_h = offset_bottom_rois[2] * spatial_scale;
+  scalar_t roi_end_w = (offset_bottom_rois[3] + 1) * spatial_scale;
+  scalar_t roi_end_h = (offset_bottom_rois[4] + 1) * spatial_scale;
+
+  // Force malformed ROIs to be 1x1
+  scalar_t roi_width = std::max(roi_end_w - roi_start_w, (scalar_t)0.);
+  scalar_t roi_height = std::max(roi_end_h - roi_start_h, (scalar_t)0.);
+
+  bin_size_h = roi_height / pooled_height;
+  bin_size_w = roi_width / pooled_width;
+
+  sample_num_h =
+      (sample_num > 0) ? sample_num : ceil(roi_height / pooled_height);
+  sample_num_w = (sample_num > 0) ? sample_num : ceil(roi_width / pooled_width);
+}
+
+template <typename scalar_t>
+void ROIAlignForwardCPU(const scalar_t *bottom_data,
+                        const scalar_t *bottom_rois,
+                        const scalar_t spatial_scale, const int sample_num,
+                        const int num_rois, const int channels,
+                        const int height, const int width,
+                        const int pooled_height, const int pooled_width,
+                        scalar_t *top_data) {
+  // RoIs are processed in parallel, the sampling points of a RoI are
+  // computed once and reused by all of its channels
+  at::parallel_for(0, num_rois, 1, [&](int64_t begin, int64_t end) {
+    for (int64_t n = begin; n < end; n++) {
+      const scalar_t *offset_bottom_rois = bottom_rois + n * 5;
+      int roi_batch_ind = offset_bottom_rois[0];
+      scalar_t roi_start_h, roi_start_w, bin_size_h, bin_size_w;
+      int sample_num_h, sample_num_w;
+      get_roi_geometry(offset_bottom_rois, spatial_scale, sample_num,
+                       pooled_height, pooled_width, roi_start_h, roi_start_w,
+                       bin_size_h, bin_size_w, sample_num_h, sample_num_w);
+      const scalar_t count = (scalar_t)(sample_num_h * sample_num_w);
+
+      std::vector<PreCalc<scalar_t>> pre_calc(
+          sample_num_h * sample_num_w * pooled_height * pooled_width);
+      pre_calc_for_bilinear_interpolate(
+          height, width, pooled_height, pooled_width, sample_num_h,
+          sample_num_w, roi_start_h, roi_start_w, bin_size_h, bin_size_w,
+          pre_calc);
+
+      for (int c = 0; c < channels; c++) {
+        const scalar_t *offset_bottom_data =
+            bottom_data + (roi_batch_ind * channels + c) * height * width;
+        scalar_t *offset_top_data =
+            top_data + (n * channels + c) * pooled_height * pooled_width;
+        int pre_calc_index = 0;
+        for (int ph = 0; ph < pooled_height; ph++) {
+          for (int pw = 0; pw < pooled_width; pw++) {
+            scalar_t output_val = 0;
+            for (int i = 0; i < sample_num_h * sample_num_w; i++) {
+              const PreCalc<scalar_t> &pc = pre_calc[pre_calc_index++];
+              output_val += pc.w1 * offset_bottom_data[pc.pos1] +
+                            pc.w2 * offset_bottom_data[pc.pos2] +
+                            pc.w3 * offset_bottom_data[pc.pos3] +
+                            pc.w4 * offset_bottom_data[pc.pos4];
+            }
+            offset_top_data[ph * pooled_width + pw] = output_val / count;
+          }
+        }
+      }
+    }
+  });
+}
+
+template <typename scalar_t>
+void ROIAlignBackwardCPU(const scalar_t *top_diff, const scalar_t *bottom_rois,
+                         const scalar_t spatial_scale, const int sample_num,
+                         const int num_rois, const int channels,
+                         const int height, const int width,
+                         const int pooled_height, const int pooled_width,
+                         scalar_t *bottom_diff) {
+  // RoIs of the same image may overlap, so channels instead of RoIs are
+  // processed in parallel to keep the accumulation free of atomics
+  at::parallel_for(0, channels, 1, [&](int64_t begin, int64_t end) {
+    std::vector<PreCalc<scalar_t>> pre_calc;
+    for (int n = 0; n < num_rois; n++) {
+      const scalar_t *offset_bottom_rois = bottom_rois + n * 5;
+      int roi_batch_ind = offset_bottom_rois[0];
+      scalar_t roi_start_h, roi_start_w, bin_size_h, bin_size_w;
+      int sample_num_h, sample_num_w;
+      get_roi_geometry(offset_bottom_rois, spatial_scale, sample_num,
+                       pooled_height, pooled_width, roi_start_h, roi_start_w,
+                       bin_size_h, bin_size_w, sample_num_h, sample_num_w);
+      const scalar_t count = (scalar_t)(sample_num_h * sample_num_w);
+
+      pre_calc.resize(sample_num_h * sample_num_w * pooled_height *
+                      pooled_width);
+      pre_calc_for_bilinear_interpolate(
+          height, width, pooled_height, pooled_width, sample_num_h,
+          sample_num_w, roi_start_h, roi_start_w, bin_size_h, bin_size_w,
+          pre_calc);
+
+      for (int64_t c = begin; c < end; c++) {
+        scalar_t *offset_bottom_diff =
+            bottom_diff + (roi_batch_ind * channels + c) * height * width;
+        const scalar_t *offset_top_diff =
+            top_diff + (n * channels + c) * pooled_height * pooled_width;
+        int pre_calc_index = 0;
+        for (int ph = 0; ph < pooled_height; ph++) {
+          for (int pw = 0; pw < pooled_width; pw++) {
+            const scalar_t grad = offset_top_diff[ph * pooled_width + pw] /
+                                  count;
+            for (int i = 0; i < sample_num_h * sample_num_w; i++) {
+              const PreCalc<scalar_t> &pc = pre_calc[pre_calc_index++];
+              // out of boundary samples have all-zero weights
+              offset_bottom_diff[pc.pos1] += grad * pc.w1;
+              offset_bottom_diff[pc.pos2] += grad * pc.w2;
+              offset_bottom_diff[pc.pos3] += grad * pc.w3;
+              offset_bottom_diff[pc.pos4] += grad * pc.w4;
+            }
+          }
+        }
+      }
+    }
+  });
+}
+
+#define CHECK_CPU(x) AT_ASSERTM(!x.type().is_cuda(), #x " must be a CPU tensor")
+#define CHECK_CONTIGUOUS(x) \
+  AT_ASSERTM(x.is_contiguous(), #x " must be contiguous")
+#define CHECK_INPUT(x) \
+  CHECK_CPU(x);        \
+  CHECK_CONTIGUOUS(x)
+
+int roi_align_forward_cpu(at::Tensor features, at::Tensor rois,
+                          int pooled_height, int pooled_width,
+                          float spatial_scale, int sample_num,
+                          at::Tensor output) {
+  CHECK_INPUT(features);
+  CHECK_INPUT(rois);
+  CHECK_INPUT(output);
+
+  // Number of ROIs
+  int num_rois = rois.size(0);
+  int size_rois = rois.size(1);
+
+  if (size_rois != 5) {
+    printf("wrong roi size\n");
+    return 0;
+  }
+
+  int num_channels = features.size(1);
+  int data_height = features.size(2);
+  int data_width = features.size(3);
+
+  AT_DISPATCH_FLOATING_TYPES(features.scalar_type(), "ROIAlignForwardCPU", [&] {
+    ROIAlignForwardCPU<scalar_t>(
+        features.data<scalar_t>(), rois.data<scalar_t>(),
+        scalar_t(spatial_scale), sample_num, num_rois, num_channels,
+        data_height, data_width, pooled_height, pooled_width,
+        output.data<scalar_t>());
+  });
+
+  return 1;
+}
+
+int roi_align_backward_cpu(at::Tensor top_grad, at::Tensor rois,
+                           int pooled_height, int pooled_width,
+                           float spatial_scale, int sample_num,
+                           at::Tensor bottom_grad) {
+  CHECK_INPUT(top_grad);
+  CHECK_INPUT(rois);
+  CHECK_INPUT(bottom_grad);
+
+  // Number of ROIs
+  int num_rois = rois.size(0);
+  int size_rois = rois.size(1);
+  if (size_rois != 5) {
+    printf("wrong roi size\n");
+    return 0;
+  }
+
+  int num_channels = bottom_grad.size(1);
+  int data_height = bottom_grad.size(2);
+  int data_width = bottom_grad.size(3);
+
+  AT_DISPATCH_FLOATING_TYPES(
+      top_grad.scalar_type(), "ROIAlignBackwardCPU", [&] {
+        ROIAlignBackwardCPU<scalar_t>(
+            top_grad.data<scalar_t>(), rois.data<scalar_t>(),
+            scalar_t(spatial_scale), sample_num, num_rois, num_channels,
+            data_height, data_width, pooled_height, pooled_width,
+            bottom_grad.data<scalar_t>());
+      });
+
+  return 1;
+}
+
+PYBIND11_MODULE(TORCH_EXTENSION_NAME, m) {
+  m.def("forward", &roi_align_forward_cpu, "Roi_Align forward (CPU)");
+  m.def("backward", &roi_align_backward_cpu, "Roi_Align backward (CPU)");
+}
@@ -167,6 +167,10 @@ if __name__ == '__main__':
                 name='nms_cuda',
                 module='mmdet.ops.nms',
                 sources=['src/nms_cuda.cpp', 'src/nms_kernel.cu']),
+            make_cuda_ext(
+                name='roi_align_cpu',
+                module='mmdet.ops.roi_align',
+                sources=['src/roi_align_cpu.cpp']),
             make_cuda_ext(
                 name='roi_align_cuda',
                 module='mmdet.ops.roi_align',
@@ -175,6 +179,10 @@ if __name__ == '__main__':
                 name='roi_pool_cuda',
                 module='mmdet.ops.roi_pool',
                 sources=['src/roi_pool_cuda.cpp', 'src/roi_pool_kernel.cu']),
+            make_cuda_ext(
+                name='deform_conv_cpu',
+                module='mmdet.ops.dcn',
+                sources=['src/deform_conv_cpu.cpp']),
             make_cuda_ext(
                 name='deform_conv_cuda',
                 module='mmdet.ops.dcn',
@@ -182,6 +190,10 @@ if __name__ == '__main__':
                     'src/deform_conv_cuda.cpp',
                     'src/deform_conv_cuda_kernel.cu'
                 ]),
+            make_cuda_ext(
+                name='deform_pool_cpu',
+                module='mmdet.ops.dcn',
+                sources=['src/deform_pool_cpu.cpp']),
             make_cuda_ext(
                 name='deform_pool_cuda',
                 module='mmdet.ops.dcn',
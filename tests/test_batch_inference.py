@@ -0,0 +1,85 @@
+import os.path as osp
+
+import mmcv
+import numpy.testing as npt
+import pycocotools.mask as mask_util
+import pytest
+import torch
+
+from mmdet.models import build_detector
+
+CONFIG_DIR = osp.join(osp.dirname(__file__), '..', 'configs')
+
+
+def _build_detector(config):
+    cfg = mmcv.Config.fromfile(osp.join(CONFIG_DIR, config))
+    cfg.model.pretrained = None
+    cfg.model.backbone.depth = 18
+    cfg.model.neck.in_channels = [64, 128, 256, 512]
+    cfg.test_cfg.rpn.nms_post = 100
+    cfg.test_cfg.rpn.max_num = 100
+    # keep the dets of a randomly initialized model
+    cfg.test_cfg.rcnn.score_thr = 0
+    torch.manual_seed(0)
+    model = build_detector(
+        cfg.model, train_cfg=None, test_cfg=cfg.test_cfg).eval()
+    return model
+
+
+def _assert_results_equal(result, expected):
+    if isinstance(result, (list, tuple)):
+        assert len(result) == len(expected)
+        for res, exp in zip(result, expected):
+            _assert_results_equal(res, exp)
+    elif isinstance(result, dict):
+        # RLE encoded masks may differ at a few pixels on the threshold
+        assert (mask_util.decode(result) !=
+                mask_util.decode(expected)).mean() < 1e-3
+    else:
+        npt.assert_allclose(result, expected, rtol=1e-4, atol=1e-3)
+
+
+@pytest.mark.parametrize('config', [
+    'faster_rcnn_r50_fpn_1x.py', 'mask_rcnn_r50_fpn_1x.py',
+    'cascade_mask_rcnn_r50_fpn_1x.py'
+])
+def test_batch_simple_test(config):
+    model = _build_detector(config)
+    imgs = torch.randn(3, 3, 64, 96)
+    img_metas = [
+        dict(
+            img_shape=img_shape + (3, ),
+            ori_shape=(64, 96, 3),
+            pad_shape=(64, 96, 3),
+            scale_factor=1.0,
+            flip=False) for img_shape in [(64, 96), (60, 80), (50, 96)]
+    ]
+    with torch.no_grad():
+        results = model.simple_test(imgs, img_metas, rescale=True)
+        assert len(results) == len(img_metas)
+        for i, result in enumerate(results):
+            expected = model.simple_test(
+                imgs[i:i + 1], img_metas[i:i + 1], rescale=True)
+            _assert_results_equal(result, expected)
+
+
+def test_batch_test_unsupported():
+    model = _build_detector('grid_rcnn/grid_rcnn_gn_head_r50_fpn_2x.py')
+    assert not model.supports_batch_test
+    imgs = torch.randn(2, 3, 64, 96)
+    img_metas = [
+        dict(
+            img_shape=(64, 96, 3),
+            ori_shape=(64, 96, 3),
+            pad_shape=(64, 96, 3),
+            scale_factor=1.0,
+            flip=False) for _ in range(2)
+    ]
+    with torch.no_grad():
+        with pytest.raises(AssertionError):
+            model([imgs], [img_metas], return_loss=False, rescale=True)
+        # a single image is still tested
+        result = model([imgs[:1]], [img_metas[:1]],
+                       return_loss=False,
+                       rescale=True)
+    assert len(result) == model.bbox_head.num_classes - 1
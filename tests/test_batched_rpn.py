@@ -0,0 +1,57 @@
+import mmcv
+import pytest
+import torch
+
+from mmdet.models.anchor_heads import RPNHead
+
+
+def _sort_by_score(proposals):
+    _, order = proposals[:, 4].sort(descending=True)
+    return proposals[order]
+
+
+@pytest.mark.parametrize('use_sigmoid', [True, False])
+@pytest.mark.parametrize('nms_across_levels', [False, True])
+def test_batched_rpn_proposals(use_sigmoid, nms_across_levels):
+    torch.manual_seed(0)
+    strides = [4, 8, 16, 32, 64]
+    head = RPNHead(
+        8,
+        anchor_scales=[8],
+        anchor_strides=strides,
+        loss_cls=dict(
+            type='CrossEntropyLoss', use_sigmoid=use_sigmoid, loss_weight=1.0))
+    img_metas = [
+        dict(img_shape=(200, 250, 3), scale_factor=1.0),
+        dict(img_shape=(256, 180, 3), scale_factor=1.0)
+    ]
+    cls_channels = head.num_anchors * head.cls_out_channels
+    cls_scores = [
+        torch.randn(2, cls_channels, 256 // s, 256 // s) for s in strides
+    ]
+    bbox_preds = [
+        torch.randn(2, head.num_anchors * 4, 256 // s, 256 // s) * 0.5
+        for s in strides
+    ]
+    cfg = mmcv.Config(
+        dict(
+            nms_across_levels=nms_across_levels,
+            nms_pre=300,
+            nms_post=100,
+            max_num=200,
+            nms_thr=0.7,
+            min_bbox_size=4))
+    expected = head.get_bboxes(cls_scores, bbox_preds, img_metas, cfg)
+    cfg.batched_nms = True
+    results = head.get_bboxes(cls_scores, bbox_preds, img_metas, cfg)
+    assert len(results) == len(expected)
+    for proposals, expected_proposals in zip(results, expected):
+        assert proposals.shape == expected_proposals.shape
+        assert torch.equal(
+            _sort_by_score(proposals), _sort_by_score(expected_proposals))
+
+
+def test_rank_in_group():
+    group_ids = torch.tensor([1, 0, 1, 1, 0, 3])
+    ranks = RPNHead._rank_in_group(group_ids, 4)
+    assert ranks.tolist() == [0, 0, 1, 2, 1, 0]
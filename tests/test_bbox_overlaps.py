@@ -0,0 +1,48 @@
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+from mmdet.core.evaluation.bbox_overlaps import bbox_overlaps
+
+
+def _bbox_overlaps_reference(bboxes1, bboxes2, mode='iou'):
+    ious = np.zeros((bboxes1.shape[0], bboxes2.shape[0]))
+    for i, b1 in enumerate(bboxes1.astype(np.float64)):
+        for j, b2 in enumerate(bboxes2.astype(np.float64)):
+            w = max(min(b1[2], b2[2]) - max(b1[0], b2[0]) + 1, 0)
+            h = max(min(b1[3], b2[3]) - max(b1[1], b2[1]) + 1, 0)
+            area1 = (b1[2] - b1[0] + 1) * (b1[3] - b1[1] + 1)
+            area2 = (b2[2] - b2[0] + 1) * (b2[3] - b2[1] + 1)
+            union = area1 + area2 - w * h if mode == 'iou' else area1
+            ious[i, j] = w * h / union
+    return ious
+
+
+def _random_bboxes(num, rng):
+    xy = rng.rand(num, 2) * 100
+    return np.hstack([xy, xy + rng.rand(num, 2) * 50])
+
+
+@pytest.mark.parametrize('mode', ['iou', 'iof'])
+@pytest.mark.parametrize('shape', [(7, 13), (13, 7), (2, 3)])
+@pytest.mark.parametrize('max_elems', [1, 20, 2**16])
+def test_bbox_overlaps(mode, shape, max_elems):
+    rng = np.random.RandomState(0)
+    bboxes1 = _random_bboxes(shape[0], rng)
+    bboxes2 = np.vstack([bboxes1[:2], _random_bboxes(shape[1] - 2, rng)])
+    expected = _bbox_overlaps_reference(bboxes1, bboxes2, mode)
+
+    ious = bbox_overlaps(bboxes1, bboxes2, mode, max_elems=max_elems)
+    assert ious.dtype == np.float32
+    npt.assert_allclose(ious, expected, rtol=1e-5, atol=1e-6)
+
+    ious = bbox_overlaps(
+        bboxes1, bboxes2, mode, dtype=np.float64, max_elems=max_elems)
+    assert ious.dtype == np.float64
+    npt.assert_allclose(ious, expected, rtol=1e-12)
+
+
+def test_bbox_overlaps_empty():
+    bboxes = np.array([[0, 0, 10, 10]])
+    assert bbox_overlaps(bboxes, np.zeros((0, 4))).shape == (1, 0)
+    assert bbox_overlaps(np.zeros((0, 4)), bboxes).shape == (0, 1)
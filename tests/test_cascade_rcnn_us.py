@@ -0,0 +1,67 @@
+import os.path as osp
+
+import mmcv
+import numpy as np
+import pytest
+import torch
+
+from mmdet.models import build_detector
+
+CONFIG_DIR = osp.join(osp.dirname(__file__), '..', 'configs')
+
+
+def _build_detector(config):
+    cfg = mmcv.Config.fromfile(osp.join(CONFIG_DIR, config))
+    cfg.model.type = 'CascadeRCNN_US'
+    cfg.model.pretrained = None
+    cfg.model.backbone.depth = 18
+    cfg.model.neck.in_channels = [64, 128, 256, 512]
+    cfg.test_cfg.rpn.nms_post = 100
+    cfg.test_cfg.rpn.max_num = 100
+    # keep the dets of a randomly initialized model
+    cfg.test_cfg.rcnn.score_thr = 0
+    torch.manual_seed(0)
+    return build_detector(
+        cfg.model, train_cfg=None, test_cfg=cfg.test_cfg).eval()
+
+
+@pytest.mark.parametrize('with_mask', [True, False])
+def test_cascade_rcnn_us_aug_test(with_mask):
+    model = _build_detector('cascade_mask_rcnn_r50_fpn_1x.py')
+    if not with_mask:
+        model.mask_head = None
+    extract_feat = model.extract_feat
+    extracted = []
+
+    def count_extract_feat(img):
+        extracted.append(img)
+        return extract_feat(img)
+
+    model.extract_feat = count_extract_feat
+
+    imgs = torch.randn(1, 3, 64, 96)
+    img_metas = [
+        dict(
+            img_shape=(64, 96, 3),
+            ori_shape=(64, 96, 3),
+            pad_shape=(64, 96, 3),
+            scale_factor=1.0,
+            flip=flip) for flip in [False, True]
+    ]
+    with torch.no_grad():
+        result = model([imgs, imgs.flip(3)], [[img_metas[0]], [img_metas[1]]],
+                       return_loss=False,
+                       rescale=True)
+    # the features of each augmentation are extracted once, shared by the
+    # RPN, the cascade stages and the mask heads
+    assert len(extracted) == 2
+
+    num_classes = model.bbox_head[-1].num_classes - 1
+    bbox_result, segm_result = result if with_mask else (result, None)
+    assert len(bbox_result) == num_classes
+    bboxes = np.vstack(bbox_result)
+    assert len(bboxes) > 0
+    assert (bboxes[:, [0, 2]] <= 96).all() and (bboxes[:, [1, 3]] <= 64).all()
+    if with_mask:
+        assert [len(segms) for segms in segm_result
+                ] == [len(cls_bboxes) for cls_bboxes in bbox_result]
@@ -0,0 +1,96 @@
+import collections
+import os
+
+import pytest
+import torch
+from mmcv.parallel import DataContainer as DC
+from mmcv.parallel import collate
+from torch.utils.data import Dataset
+
+from mmdet.datasets import build_dataloader
+from mmdet.datasets.loader import PinnableDataContainer, pinnable_collate
+
+# collate of mmcv<0.2.15 uses the aliases removed from collections in 3.10
+requires_collate = pytest.mark.skipif(
+    not hasattr(collections, 'Sequence'),
+    reason='mmcv.parallel.collate is not supported by this Python')
+
+
+class ToyDataset(Dataset):
+
+    def __init__(self, num=8):
+        self.num = num
+        self.flag = torch.zeros(num, dtype=torch.uint8).numpy()
+
+    def __len__(self):
+        return self.num
+
+    def __getitem__(self, idx):
+        return DC(dict(idx=idx, pid=os.getpid()), cpu_only=True)
+
+
+def _toy_sample(idx):
+    return dict(
+        img=DC(torch.full((3, 4 + idx % 2, 5), float(idx)), stack=True),
+        img_meta=DC(dict(idx=idx), cpu_only=True),
+        gt_bboxes=DC(torch.rand(idx + 1, 4)))
+
+
+def _equal(a, b):
+    if isinstance(a, torch.Tensor):
+        return torch.equal(a, b)
+    elif isinstance(a, list):
+        return len(a) == len(b) and all(map(_equal, a, b))
+    return a == b
+
+
+@requires_collate
+def test_pinnable_collate():
+    samples = [_toy_sample(i) for i in range(4)]
+    expected, data = {}, {}
+    for key in samples[0]:
+        batch = [sample[key] for sample in samples]
+        expected[key] = collate(batch, samples_per_gpu=2)
+        data[key] = pinnable_collate(batch, samples_per_gpu=2)
+    assert set(data) == set(expected)
+    for key, value in expected.items():
+        assert isinstance(data[key], PinnableDataContainer)
+        assert data[key].stack == value.stack
+        assert data[key].cpu_only == value.cpu_only
+        assert _equal(data[key].data, value.data)
+
+    if not torch.cuda.is_available():
+        return
+    pinned = data['img'].pin_memory()
+    assert all(img.is_pinned() for img in pinned.data)
+    assert _equal(pinned.data, expected['img'].data)
+    assert pinned.stack
+    assert data['img_meta'].pin_memory() is data['img_meta']
+
+
+@requires_collate
+@pytest.mark.parametrize('num_workers', [0, 2])
+def test_build_dataloader(num_workers):
+    data_loader = build_dataloader(
+        ToyDataset(),
+        2,
+        num_workers,
+        dist=False,
+        shuffle=False,
+        persistent_workers=True,
+        prefetch_factor=3)
+    assert data_loader.data_wait is None
+    epoch_pids = []
+    for _ in range(2):
+        pids, idxs = set(), []
+        for data in data_loader:
+            assert data_loader.data_wait >= 0
+            metas = data.data[0]
+            pids.update(meta['pid'] for meta in metas)
+            idxs.extend(meta['idx'] for meta in metas)
+        assert idxs == list(range(8))
+        epoch_pids.append(pids)
+    # the same workers load the data of every epoch
+    assert epoch_pids[0] == epoch_pids[1]
+    if num_workers == 0:
+        assert epoch_pids[0] == {os.getpid()}
@@ -0,0 +1,64 @@
+import numpy.testing as npt
+import pytest
+import torch
+import torch.nn.functional as F
+from torch.autograd import gradcheck
+
+from mmdet.ops.dcn import (deform_conv, deform_roi_pooling,
+                           modulated_deform_conv)
+
+
+@pytest.mark.parametrize('stride,padding,dilation', [(1, 1, 1), (2, 1, 1),
+                                                     (1, 2, 2)])
+def test_deform_conv_cpu_zero_offset(stride, padding, dilation):
+    torch.manual_seed(0)
+    x = torch.randn(4, 8, 9, 11)
+    weight = torch.randn(6, 4, 3, 3)
+    expected = F.conv2d(x, weight, None, stride, padding, dilation, 2)
+    offset = x.new_zeros(4, 2 * 2 * 9, *expected.shape[2:])
+    output = deform_conv(x, offset, weight, stride, padding, dilation, 2, 2, 2)
+    npt.assert_allclose(output.numpy(), expected.numpy(), atol=1e-4)
+
+    mask = x.new_ones(4, 2 * 9, *expected.shape[2:])
+    bias = torch.randn(6)
+    output = modulated_deform_conv(x, offset, mask, weight, bias, stride,
+                                   padding, dilation, 2, 2)
+    npt.assert_allclose(
+        output.numpy(), (expected + bias[:, None, None]).numpy(), atol=1e-4)
+
+
+def test_deform_conv_cpu_backward():
+    torch.manual_seed(0)
+    x = torch.randn(2, 4, 5, 6, dtype=torch.double, requires_grad=True)
+    weight = torch.randn(4, 2, 3, 3, dtype=torch.double, requires_grad=True)
+    # offsets are kept away from integers where the gradient is undefined
+    offset = torch.rand(2, 2 * 2 * 9, 5, 6, dtype=torch.double) * 0.8 + 0.1
+    offset = (offset + torch.randint_like(offset, -2, 2)).requires_grad_()
+    mask = torch.rand(2, 2 * 9, 5, 6, dtype=torch.double, requires_grad=True)
+    bias = torch.randn(4, dtype=torch.double, requires_grad=True)
+    assert gradcheck(
+        lambda x, offset, weight: deform_conv(x, offset, weight, 1, 1, 1, 2, 2,
+                                              1), (x, offset, weight))
+    assert gradcheck(
+        lambda x, offset, mask, weight, bias: modulated_deform_conv(
+            x, offset, mask, weight, bias, 1, 1, 1, 2, 2),
+        (x, offset, mask, weight, bias))
+
+
+@pytest.mark.parametrize('no_trans', [True, False])
+def test_deform_roi_pooling_cpu_backward(no_trans):
+    torch.manual_seed(0)
+    data = torch.randn(
+        2, 2 * 9, 12, 12, dtype=torch.double, requires_grad=True)
+    rois = data.new_tensor([[0, 1, 1, 9, 7], [1, 0, 2, 11, 11],
+                            [0, 3, 3, 5, 10]])
+    if no_trans:
+        offset = data.new_empty(0)
+    else:
+        offset = data.new_empty(3, 2, 3, 3).uniform_(-0.1, 0.1)
+        offset.requires_grad_()
+    assert gradcheck(
+        lambda data, offset: deform_roi_pooling(data, rois, offset, 1., 3, 2,
+                                                no_trans, 3, 3, 2, 0.1),
+        (data, offset),
+        atol=1e-4)
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+import torch
+import torch.nn.functional as F
+from mmcv.parallel import DataContainer as DC
+
+from mmdet.core import normalize_img_tensor, tensor2imgs
+from mmdet.datasets.loader import data_nbytes
+from mmdet.datasets.pipelines import Compose
+from mmdet.models.detectors.base import BaseDetector
+
+IMG_NORM_CFG = dict(
+    mean=[123.675, 116.28, 103.53], std=[58.395, 57.12, 57.375], to_rgb=True)
+
+
+def _pipeline(on_device, fused=False):
+    resize = dict(img_scale=(150, 60), keep_ratio=True)
+    normalize = dict(IMG_NORM_CFG, on_device=on_device)
+    if fused:
+        transforms = [
+            dict(
+                type='FusedImageTransform',
+                resize=resize,
+                flip=dict(flip_ratio=1.),
+                normalize=normalize,
+                pad=dict(size_divisor=32))
+        ]
+    else:
+        transforms = [
+            dict(type='Resize', **resize),
+            dict(type='RandomFlip', flip_ratio=1.),
+            dict(type='Normalize', **normalize),
+            dict(type='Pad', size_divisor=32)
+        ]
+    return Compose(
+        transforms +
+        [dict(type='DefaultFormatBundle'),
+         dict(type='Collect', keys=['img'])])
+
+
+def _batch(samples):
+    """Stack the images of samples like mmcv.parallel.collate."""
+    max_h = max(sample['img'].data.size(1) for sample in samples)
+    max_w = max(sample['img'].data.size(2) for sample in samples)
+    img = torch.stack([
+        F.pad(sample['img'].data, (0, max_w - sample['img'].data.size(2), 0,
+                                   max_h - sample['img'].data.size(1)))
+        for sample in samples
+    ])
+    return img, [sample['img_meta'].data for sample in samples]
+
+
+def _samples(pipeline):
+    rng = np.random.RandomState(0)
+    samples = []
+    for h, w in [(83, 121), (120, 70)]:
+        img = rng.randint(0, 256, (h, w, 3), dtype=np.uint8)
+        samples.append(
+            pipeline(dict(img=img, ori_shape=img.shape, filename='toy.jpg')))
+    return samples
+
+
+class ToyDetector(BaseDetector):
+    supports_batch_test = True
+
+    def extract_feat(self, img):
+        return img
+
+    def forward_train(self, img, img_metas, **kwargs):
+        return img
+
+    def simple_test(self, img, img_meta, **kwargs):
+        return img
+
+    def aug_test(self, imgs, img_metas, **kwargs):
+        return imgs
+
+
+@pytest.mark.parametrize('fused', [False, True])
+def test_normalize_img_tensor(fused):
+    expected_img, expected_metas = _batch(_samples(_pipeline(False, fused)))
+    img, img_metas = _batch(_samples(_pipeline(True, fused)))
+    assert img.dtype == torch.uint8
+    assert data_nbytes(img) * 4 == data_nbytes(expected_img)
+    assert img_metas[1]['pad_shape'] == expected_metas[1]['pad_shape']
+    assert torch.equal(normalize_img_tensor(img, img_metas), expected_img)
+
+    detector = ToyDetector()
+    assert torch.equal(detector(img, img_metas), expected_img)
+    test_imgs = detector([img], [img_metas], return_loss=False)
+    assert torch.equal(test_imgs, expected_img)
+    # float images are left as they are
+    assert detector(expected_img, expected_metas) is expected_img
+
+
+def test_tensor2imgs_uint8():
+    img, img_metas = _batch(_samples(_pipeline(True)))
+    float_img, _ = _batch(_samples(_pipeline(False)))
+    imgs = tensor2imgs(img, **img_metas[0]['img_norm_cfg'])
+    float_imgs = tensor2imgs(float_img, **img_metas[0]['img_norm_cfg'])
+    for img_, float_img_, img_meta in zip(imgs, float_imgs, img_metas):
+        h, w = img_meta['img_shape'][:2]
+        assert img_.dtype == np.uint8
+        # denormalizing truncates the float pixels
+        assert np.abs(img_[:h, :w].astype(int) - float_img_[:h, :w]).max() <= 1
+
+
+def test_data_nbytes():
+    data = dict(
+        img=DC([torch.zeros(2, 3, 4, 5)], stack=True),
+        img_meta=DC([[dict(scale_factor=np.ones(4, dtype=np.float32))]],
+                    cpu_only=True),
+        gt_labels=DC([[torch.zeros(7, dtype=torch.long)]]))
+    assert data_nbytes(data) == 2 * 3 * 4 * 5 * 4 + 16 + 56
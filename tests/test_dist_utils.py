@@ -0,0 +1,83 @@
+import os.path as osp
+import tempfile
+
+import numpy as np
+import pytest
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+from mmdet.core.utils.dist_utils import (collect_results, deserialize_results,
+                                         serialize_results)
+
+
+def _bbox_results(num_imgs, num_classes=3, seed=0):
+    rng = np.random.RandomState(seed)
+    return [[
+        rng.rand(rng.randint(3), 5).astype(np.float32)
+        for _ in range(num_classes)
+    ] for _ in range(num_imgs)]
+
+
+def _assert_results_equal(results, expected):
+    assert type(results) is type(expected)
+    if isinstance(expected, dict):
+        assert results.keys() == expected.keys()
+        for key in expected:
+            _assert_results_equal(results[key], expected[key])
+    elif isinstance(expected, (list, tuple)):
+        assert len(results) == len(expected)
+        for res, exp in zip(results, expected):
+            _assert_results_equal(res, exp)
+    elif isinstance(expected, np.ndarray):
+        assert results.dtype == expected.dtype
+        np.testing.assert_array_equal(results, expected)
+    else:
+        assert results == expected
+
+
+@pytest.mark.parametrize('with_segm', [False, True])
+def test_serialize_results(with_segm):
+    results = _bbox_results(5)
+    if with_segm:
+        rle = {'size': [4, 4], 'counts': b'abc'}
+        segm_results = [[[rle] * len(bboxes) for bboxes in result]
+                        for result in results]
+        results = list(zip(results, segm_results))
+    buffer = serialize_results(results)
+    assert buffer.dtype == np.uint8
+    _assert_results_equal(deserialize_results(buffer), results)
+
+
+def test_serialize_raw_results():
+    # e.g. the results of all stages of a cascade detector
+    results = [{'ensemble': res} for res in _bbox_results(3)] + [[]]
+    buffer = serialize_results(results)
+    _assert_results_equal(deserialize_results(buffer), results)
+
+
+def _collect_results_worker(rank, world_size, init_file, tmpdir, size):
+    dist.init_process_group(
+        'gloo',
+        init_method='file://' + init_file,
+        rank=rank,
+        world_size=world_size)
+    results = _bbox_results(size)
+    # images are sampled by ranks in turn, without padding here
+    result_part = results[rank::world_size]
+    collected = collect_results(result_part, size, tmpdir)
+    if rank == 0:
+        _assert_results_equal(collected, results)
+    else:
+        assert collected is None
+
+
+@pytest.mark.parametrize('use_tmpdir', [False, True])
+def test_collect_results(use_tmpdir):
+    world_size = 2
+    with tempfile.TemporaryDirectory() as workdir:
+        init_file = osp.join(workdir, 'dist_init')
+        tmpdir = osp.join(workdir, 'results') if use_tmpdir else None
+        mp.spawn(
+            _collect_results_worker,
+            args=(world_size, init_file, tmpdir, 7),
+            nprocs=world_size)
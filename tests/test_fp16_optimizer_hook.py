@@ -0,0 +1,126 @@
+import copy
+
+import torch
+import torch.nn as nn
+from mmcv.runner import LogBuffer
+
+from mmdet.core import Fp16OptimizerHook, LossScaler, wrap_fp16_model
+
+
+class ToyModel(nn.Module):
+
+    def __init__(self):
+        super(ToyModel, self).__init__()
+        self.fc1 = nn.Linear(4, 8)
+        self.bn = nn.BatchNorm1d(8)
+        self.fc2 = nn.Linear(8, 2)
+        self.unused = nn.Linear(2, 2)
+        self.fc1.bias.requires_grad = False
+
+    def forward(self, x):
+        return self.fc2(self.bn(self.fc1(x.half())).relu()).float()
+
+
+class ToyRunner(object):
+
+    def __init__(self, model):
+        self.model = model
+        self.optimizer = torch.optim.SGD(
+            model.parameters(), lr=0.1, momentum=0.9, weight_decay=1e-4)
+        self.log_buffer = LogBuffer()
+        self.outputs = None
+
+
+def _reference_step(runner, loss_scale):
+    """The per-parameter loop of the static loss scale hook."""
+    runner.model.zero_grad()
+    runner.optimizer.zero_grad()
+    (runner.outputs['loss'] * loss_scale).backward()
+    fp32_weights = []
+    for param_group in runner.optimizer.param_groups:
+        fp32_weights += param_group['params']
+    for fp32_param, fp16_param in zip(fp32_weights, runner.model.parameters()):
+        if fp16_param.grad is not None:
+            if fp32_param.grad is None:
+                fp32_param.grad = fp32_param.data.new(fp32_param.size())
+            fp32_param.grad.copy_(fp16_param.grad)
+    for param in fp32_weights:
+        if param.grad is not None:
+            param.grad.div_(loss_scale)
+    runner.optimizer.step()
+    for fp16_param, fp32_param in zip(runner.model.parameters(), fp32_weights):
+        fp16_param.data.copy_(fp32_param.data)
+
+
+def _train(hook=None, steps=3, loss_factor=1.):
+    """Train a toy model with the hook, or with the reference loop."""
+    torch.manual_seed(0)
+    runner = ToyRunner(ToyModel())
+    if hook is not None:
+        hook.before_run(runner)
+    else:
+        runner.optimizer.param_groups = copy.deepcopy(
+            runner.optimizer.param_groups)
+        wrap_fp16_model(runner.model)
+    for _ in range(steps):
+        x = torch.randn(16, 4)
+        runner.outputs = dict(loss=runner.model(x).pow(2).mean() * loss_factor)
+        if hook is not None:
+            hook.after_train_iter(runner)
+        else:
+            _reference_step(runner, 512.)
+    return runner
+
+
+def test_fp16_optimizer_hook_static():
+    runner = _train(Fp16OptimizerHook(loss_scale=512., distributed=False))
+    expected = _train()
+    assert runner.model.fc1.weight.dtype == torch.half
+    assert runner.model.bn.weight.dtype == torch.float
+    for param, expected_param in zip(runner.model.parameters(),
+                                     expected.model.parameters()):
+        assert torch.equal(param, expected_param)
+    for group, expected_group in zip(runner.optimizer.param_groups,
+                                     expected.optimizer.param_groups):
+        for param, expected_param in zip(group['params'],
+                                         expected_group['params']):
+            assert torch.equal(param, expected_param)
+    # params without gradients are not updated
+    torch.manual_seed(0)
+    assert torch.equal(runner.model.unused.weight,
+                       ToyModel().unused.weight.half())
+    assert 'loss_scale' not in runner.log_buffer.val_history
+
+
+def test_fp16_optimizer_hook_dynamic():
+    hook = Fp16OptimizerHook(
+        loss_scale=dict(init_scale=2.**20, scale_window=2), distributed=False)
+    init_params = list(_train(steps=0).model.parameters())
+    # the gradients of the scaled loss overflow in fp16
+    runner = _train(hook, steps=1, loss_factor=1e3)
+    assert runner.log_buffer.val_history['grad_overflow'] == [1.]
+    assert runner.log_buffer.val_history['loss_scale'] == [2.**20]
+    assert hook.loss_scale == 2.**19
+    for param, init_param in zip(runner.model.parameters(), init_params):
+        assert torch.equal(param, init_param)
+
+    hook = Fp16OptimizerHook(
+        loss_scale=dict(init_scale=64., scale_window=2), distributed=False)
+    runner = _train(hook, steps=4)
+    assert runner.log_buffer.val_history['grad_overflow'] == [0.] * 4
+    assert runner.log_buffer.val_history['loss_scale'] == [
+        64., 64., 128., 128.
+    ]
+    assert not torch.equal(runner.model.fc1.weight, init_params[0])
+
+
+def test_loss_scaler():
+    scaler = LossScaler(init_scale=8., scale_window=3)
+    scales = []
+    for overflow in [False, True, False, False, False, True, True]:
+        scaler.update_scale(overflow)
+        scales.append(scaler.loss_scale)
+    assert scales == [8., 4., 4., 4., 8., 4., 2.]
+    scaler = LossScaler(init_scale=4., mode='static')
+    scaler.update_scale(True)
+    assert scaler.loss_scale == 4.
@@ -0,0 +1,124 @@
+import copy
+
+import numpy as np
+import pytest
+import torch
+
+from mmdet.datasets.pipelines import Compose
+
+IMG_NORM_CFG = dict(
+    mean=[123.675, 116.28, 103.53], std=[58.395, 57.12, 57.375], to_rgb=True)
+
+
+def _results(h=83, w=121, num_gts=4):
+    rng = np.random.RandomState(0)
+    xy = rng.randint(0, min(h, w) // 2, (num_gts, 2))
+    wh = rng.randint(1, min(h, w) // 2, (num_gts, 2))
+    gt_masks = [(rng.rand(h, w) > 0.5).astype(np.uint8)
+                for _ in range(num_gts)]
+    return dict(
+        filename='toy.jpg',
+        img=rng.randint(0, 256, (h, w, 3), dtype=np.uint8),
+        ori_shape=(h, w, 3),
+        gt_bboxes=np.hstack([xy, xy + wh]).astype(np.float32),
+        gt_masks=gt_masks,
+        bbox_fields=['gt_bboxes'],
+        mask_fields=['gt_masks'])
+
+
+def _chained_and_fused(resize, flip, normalize, pad):
+    chained = [
+        dict(type='Resize', **resize),
+        dict(type='RandomFlip', **flip),
+        dict(type='Normalize', **normalize)
+    ]
+    if pad is not None:
+        chained.append(dict(type='Pad', **pad))
+    fused = [
+        dict(
+            type='FusedImageTransform',
+            resize=resize,
+            flip=flip,
+            normalize=normalize,
+            pad=pad)
+    ]
+    formatting = [
+        dict(type='DefaultFormatBundle'),
+        dict(
+            type='Collect',
+            keys=['img', 'gt_bboxes', 'gt_masks'],
+            meta_keys=('filename', 'ori_shape', 'img_shape', 'pad_shape',
+                       'scale_factor', 'flip', 'img_norm_cfg', 'keep_ratio',
+                       'scale', 'scale_idx'))
+    ]
+    return Compose(chained + formatting), Compose(fused + formatting)
+
+
+@pytest.mark.parametrize('keep_ratio', [True, False])
+@pytest.mark.parametrize('flip_ratio', [0., 1.])
+@pytest.mark.parametrize('to_rgb', [True, False])
+@pytest.mark.parametrize(
+    'pad',
+    [dict(size_divisor=32), dict(size=(96, 160)), None])
+def test_fused_image_transform(keep_ratio, flip_ratio, to_rgb, pad):
+    chained, fused = _chained_and_fused(
+        dict(
+            img_scale=[(150, 60), (160, 90)],
+            multiscale_mode='range',
+            keep_ratio=keep_ratio), dict(flip_ratio=flip_ratio),
+        dict(IMG_NORM_CFG, to_rgb=to_rgb), pad)
+    results = _results()
+    np.random.seed(1)
+    expected = chained(copy.deepcopy(results))
+    np.random.seed(1)
+    data = fused(copy.deepcopy(results))
+
+    img, expected_img = data['img'].data, expected['img'].data
+    assert img.dtype == torch.float32 and img.is_contiguous()
+    assert torch.equal(img, expected_img)
+    meta, expected_meta = data['img_meta'].data, expected['img_meta'].data
+    assert set(meta) == set(expected_meta)
+    for key, value in expected_meta.items():
+        if key == 'img_norm_cfg':
+            for name in ('mean', 'std'):
+                np.testing.assert_array_equal(meta[key][name], value[name])
+            assert meta[key]['to_rgb'] == value['to_rgb']
+        else:
+            np.testing.assert_array_equal(meta[key], value)
+            assert type(meta[key]) is type(value)
+    assert torch.equal(data['gt_bboxes'].data, expected['gt_bboxes'].data)
+    np.testing.assert_array_equal(
+        np.asarray(data['gt_masks'].data),
+        np.asarray(expected['gt_masks'].data))
+
+
+def test_fused_image_transform_aug():
+    transforms = [
+        dict(type='Resize', keep_ratio=True),
+        dict(type='RandomFlip'),
+        dict(type='Normalize', **IMG_NORM_CFG),
+        dict(type='Pad', size_divisor=32),
+        dict(type='ImageToTensor', keys=['img']),
+        dict(type='Collect', keys=['img'])
+    ]
+    fused_transforms = [
+        dict(
+            type='FusedImageTransform',
+            resize=dict(keep_ratio=True),
+            normalize=IMG_NORM_CFG,
+            pad=dict(size_divisor=32))
+    ] + transforms[-2:]
+    aug = dict(type='MultiScaleFlipAug', img_scale=[(150, 60)], flip=True)
+    chained = Compose([dict(aug, transforms=transforms)])
+    fused = Compose([dict(aug, transforms=fused_transforms)])
+    results = _results()
+    results.pop('gt_masks')
+    results['mask_fields'] = []
+    expected = chained(copy.deepcopy(results))
+    data = fused(copy.deepcopy(results))
+    assert len(data['img']) == 2
+    for img, expected_img in zip(data['img'], expected['img']):
+        assert torch.equal(img, expected_img)
+    for meta, expected_meta in zip(data['img_meta'], expected['img_meta']):
+        assert meta.data['flip'] == expected_meta.data['flip']
+        assert meta.data['pad_shape'] == expected_meta.data['pad_shape']
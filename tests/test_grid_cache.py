@@ -0,0 +1,92 @@
+import threading
+
+import torch
+
+from mmdet.core import (AnchorGenerator, GridCache, PointGenerator, grid_cache,
+                        grid_cache_key)
+
+
+def test_anchor_generator_cache():
+    grid_cache.clear()
+    generator = AnchorGenerator(8, [8], [0.5, 1.0, 2.0])
+    anchors = generator.grid_anchors((5, 7), 8, device='cpu')
+    flags = generator.valid_flags((5, 7), (4, 6), device='cpu')
+    assert grid_cache.misses == 2 and grid_cache.hits == 0
+    assert torch.equal(anchors, generator._grid_anchors((5, 7), 8, 'cpu'))
+    assert torch.equal(flags, generator._valid_flags((5, 7), (4, 6), 'cpu'))
+
+    # generators with the same base anchors share the grids
+    same_generator = AnchorGenerator(8, [8], [0.5, 1.0, 2.0])
+    assert same_generator.grid_anchors(
+        torch.Size([5, 7]), 8, device='cpu') is anchors
+    assert same_generator.valid_flags((5, 7), (4, 6), device='cpu') is flags
+    assert grid_cache.hits == 2
+
+    other_generator = AnchorGenerator(16, [8], [0.5, 1.0, 2.0])
+    assert other_generator.grid_anchors((5, 7), 8, device='cpu') is not anchors
+    assert generator.grid_anchors((5, 7), 16, device='cpu') is not anchors
+    assert generator.grid_anchors((5, 8), 8, device='cpu') is not anchors
+    assert grid_cache.misses == 5
+
+
+def test_point_generator_cache():
+    grid_cache.clear()
+    generator = PointGenerator()
+    points = generator.grid_points((5, 7), 8, device='cpu')
+    flags = generator.valid_flags((5, 7), (4, 6), device='cpu')
+    assert torch.equal(points, generator._grid_points((5, 7), 8, 'cpu'))
+    assert torch.equal(flags, generator._valid_flags((5, 7), (4, 6), 'cpu'))
+    assert generator.grid_points((5, 7), 8, device='cpu') is points
+    assert generator.valid_flags((5, 7), (4, 6), device='cpu') is flags
+    assert grid_cache.misses == 2 and grid_cache.hits == 2
+
+
+def test_grid_cache_lru():
+    cache = GridCache(max_size=2)
+    cache.get('a', lambda: 1)
+    cache.get('b', lambda: 2)
+    assert cache.get('a', lambda: 0) == 1
+    cache.get('c', lambda: 3)  # evicts b
+    assert len(cache) == 2
+    assert cache.get('a', lambda: 0) == 1
+    assert cache.get('b', lambda: 0) == 0
+    assert (cache.hits, cache.misses) == (2, 4)
+
+    cache = GridCache(max_size=0)
+    cache.get('a', lambda: 1)
+    assert cache.get('a', lambda: 0) == 0
+    assert len(cache) == 0
+
+
+def test_grid_cache_threads():
+    cache = GridCache(max_size=4)
+    errors = []
+
+    def worker(offset):
+        try:
+            for i in range(200):
+                key = (i + offset) % 8
+                assert cache.get(key, lambda: key * 2) == key * 2
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i, )) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(cache) == 4
+    assert cache.hits + cache.misses == 800
+
+
+def test_grid_cache_key_device(monkeypatch):
+    key = grid_cache_key('anchors', (5, 7), 8, device='cpu')
+    assert key == ('anchors', (5, 7), 8, torch.device('cpu'))
+    # a bare cuda device is resolved to the current device of the thread
+    monkeypatch.setattr(torch.cuda, 'current_device', lambda: 1)
+    key = grid_cache_key('anchors', (5, 7), 8, device='cuda')
+    assert key[-1] == torch.device('cuda', 1)
+    assert key != grid_cache_key('anchors', (5, 7), 8, device='cuda:0')
+    assert key == grid_cache_key(
+        'anchors', (5, 7), 8, device=torch.device('cuda', 1))
@@ -0,0 +1,122 @@
+import errno
+import os
+import os.path as osp
+
+import mmcv
+import numpy as np
+import pytest
+from torch.utils.data import DataLoader, Dataset
+
+from mmdet.datasets.pipelines import ImageCache, LoadImageFromFile
+
+
+def _write_images(img_dir, num_imgs=4, shape=(20, 30, 3)):
+    rng = np.random.RandomState(0)
+    filenames = []
+    for i in range(num_imgs):
+        filename = osp.join(str(img_dir), '{}.png'.format(i))
+        mmcv.imwrite(rng.randint(256, size=shape).astype(np.uint8), filename)
+        filenames.append(filename)
+    return filenames
+
+
+class _LoadingDataset(Dataset):
+
+    def __init__(self, filenames, cache):
+        self.filenames = filenames
+        self.cache = cache
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def __getitem__(self, idx):
+        return self.cache.load(self.filenames[idx])
+
+
+@pytest.mark.parametrize('decoded', [True, False])
+def test_image_cache_load(tmpdir, decoded):
+    filenames = _write_images(tmpdir)
+    cache = ImageCache(decoded=decoded)
+    for _ in range(3):
+        for filename in filenames:
+            img = cache.load(filename)
+            np.testing.assert_array_equal(img, mmcv.imread(filename))
+            assert img.flags.writeable
+    assert cache.stats() == (8, 4)
+    assert cache.num_bytes > 0
+
+
+def test_image_cache_mmap(tmpdir):
+    filenames = _write_images(tmpdir, num_imgs=1)
+    cache = ImageCache()
+    cache.load(filenames[0])
+    img = cache.load(filenames[0])
+    assert isinstance(img, np.memmap)
+    # writes are copied on write and do not reach the cached file
+    img[...] = 0
+    np.testing.assert_array_equal(
+        cache.load(filenames[0]), mmcv.imread(filenames[0]))
+
+
+def test_image_cache_full(tmpdir, monkeypatch):
+    filenames = _write_images(tmpdir)
+    cache = ImageCache()
+    cache.load(filenames[0])
+
+    def save(*args, **kwargs):
+        raise OSError(errno.ENOSPC, 'No space left on device')
+
+    monkeypatch.setattr(np, 'save', save)
+    with pytest.warns(UserWarning, match='Disabling the image cache'):
+        img = cache.load(filenames[1])
+    np.testing.assert_array_equal(img, mmcv.imread(filenames[1]))
+    assert cache.disabled
+    assert not any(
+        name.endswith('.tmp') for name in os.listdir(cache.cache_dir))
+    # images are read from disk, including those cached before
+    for filename in filenames:
+        np.testing.assert_array_equal(
+            cache.load(filename), mmcv.imread(filename))
+    assert cache.stats() == (0, 2)
+
+
+def test_image_cache_eviction(tmpdir):
+    filenames = _write_images(tmpdir)
+    img_bytes = 20 * 30 * 3
+    # room for 2 images (plus the npy headers)
+    cache = ImageCache(max_bytes=2.5 * img_bytes)
+    cache.load(filenames[0])
+    cache.load(filenames[1])
+    cache.load(filenames[0])  # 0 is now more recently used than 1
+    cache.load(filenames[2])  # evicts 1
+    assert cache.num_bytes <= 2.5 * img_bytes
+    assert cache.stats() == (1, 3)
+    cache.load(filenames[2])
+    cache.load(filenames[0])
+    assert cache.stats() == (3, 3)
+    cache.load(filenames[1])
+    assert cache.stats() == (3, 4)
+
+
+def test_image_cache_shared_by_workers(tmpdir):
+    filenames = _write_images(tmpdir)
+    cache = ImageCache()
+    loader = DataLoader(
+        _LoadingDataset(filenames, cache), batch_size=1, num_workers=2)
+    for _ in range(2):
+        for img, filename in zip(loader, filenames):
+            np.testing.assert_array_equal(img[0].numpy(),
+                                          mmcv.imread(filename))
+    # the second epoch hits the images cached by the workers of the first one
+    assert cache.stats() == (4, 4)
+
+
+def test_load_image_from_file_cache(tmpdir):
+    filenames = _write_images(tmpdir, num_imgs=1)
+    results = dict(
+        img_prefix=str(tmpdir),
+        img_info=dict(filename=osp.basename(filenames[0])))
+    transform = LoadImageFromFile(cache=dict(decoded=False))
+    img = transform(dict(results))['img']
+    np.testing.assert_array_equal(transform(dict(results))['img'], img)
+    assert transform.cache.stats() == (1, 1)
@@ -0,0 +1,98 @@
+import logging
+
+import pytest
+import torch
+import torch.nn as nn
+from mmcv.runner import (LogBuffer, LoggerHook, OptimizerHook, Runner,
+                         TextLoggerHook)
+
+from mmdet.apis.train import parse_losses
+from mmdet.core import DeviceLogBuffer
+
+
+def test_device_log_buffer():
+    buffer, expected = DeviceLogBuffer(), LogBuffer()
+    for i in range(7):
+        tensor_vars = dict(
+            loss_a=torch.tensor(i * 0.5),
+            loss_b=torch.tensor(float(i)**2),
+            time=0.1 * i)
+        if i % 2 == 0:
+            tensor_vars['acc'] = torch.tensor(i / 7.)
+        float_vars = {
+            key: (var.item() if isinstance(var, torch.Tensor) else var)
+            for key, var in tensor_vars.items()
+        }
+        buffer.update(tensor_vars, count=i + 1)
+        expected.update(float_vars, count=i + 1)
+        if i in (3, 6):
+            buffer.average(3)
+            expected.average(3)
+            assert list(buffer.output) == list(expected.output)
+            for key, value in expected.output.items():
+                assert buffer.output[key] == pytest.approx(value)
+    buffer.average()
+    expected.average()
+    for key, value in expected.output.items():
+        assert buffer.output[key] == pytest.approx(value)
+    assert all(
+        isinstance(value, float) for values in buffer.val_history.values()
+        for value in values)
+    buffer.clear()
+    buffer.update(dict(loss_a=torch.tensor(2.)))
+    buffer.average()
+    assert buffer.output['loss_a'] == 2.
+
+
+def test_parse_losses():
+    losses = dict(
+        loss_cls=torch.tensor([1., 2.], requires_grad=True),
+        loss_bbox=[torch.tensor(0.5),
+                   torch.tensor([1., 3.])],
+        acc=torch.tensor(80.))
+    loss, log_vars = parse_losses(losses)
+    loss_dev, log_vars_dev = parse_losses(losses, sync=False)
+    assert torch.equal(loss, loss_dev)
+    assert list(log_vars) == list(log_vars_dev)
+    for key, value in log_vars.items():
+        assert not log_vars_dev[key].requires_grad
+        assert log_vars_dev[key].item() == value
+    assert log_vars['loss'] == 4.
+
+
+class _OutputLoggerHook(LoggerHook):
+
+    def __init__(self, *args, **kwargs):
+        super(_OutputLoggerHook, self).__init__(*args, **kwargs)
+        self.outputs = []
+
+    def log(self, runner):
+        self.outputs.append(dict(runner.log_buffer.output))
+
+
+def test_device_log_buffer_runner(tmpdir):
+    model = nn.Linear(2, 1)
+
+    def batch_processor(model, data, train_mode):
+        losses = dict(loss_l2=model(data).pow(2).mean())
+        loss, log_vars = parse_losses(losses, sync=False)
+        return dict(loss=loss, log_vars=log_vars, num_samples=len(data))
+
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.01)
+    runner = Runner(
+        model,
+        batch_processor,
+        optimizer,
+        str(tmpdir),
+        logger=logging.getLogger('test_log_buffer'))
+    runner.log_buffer = DeviceLogBuffer()
+    runner.register_hook(OptimizerHook())
+    runner.register_hook(TextLoggerHook(interval=2), priority='VERY_LOW')
+    logger_hook = _OutputLoggerHook(interval=2)
+    runner.register_hook(logger_hook, priority='VERY_LOW')
+    data = [torch.randn(4, 2) for _ in range(5)]
+    runner.run([data], [('train', 1)], 1)
+    assert len(logger_hook.outputs) == 2
+    for output in logger_hook.outputs:
+        assert isinstance(output['loss_l2'], float)
+        assert isinstance(output['loss'], float)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+import torch
+
+from mmdet.core import mask_overlaps
+
+
+def _mask_overlaps_reference(pos_proposals, pos_assigned_gt_inds, gt_masks):
+    """The per-proposal loop of mask_overlaps before vectorizing."""
+    gt_areas = gt_masks.sum((-1, -2))
+    ratios = []
+    for bbox, gt_ind in zip(pos_proposals.numpy().astype(np.int32),
+                            pos_assigned_gt_inds.numpy()):
+        x1, y1, x2, y2 = bbox
+        area = gt_masks[gt_ind][y1:y2 + 1, x1:x2 + 1].sum()
+        ratios.append(area / (gt_areas[gt_ind] + 1e-7))
+    return torch.tensor(ratios, dtype=torch.float32)
+
+
+@pytest.mark.parametrize('dtype', [np.uint8, np.bool_])
+def test_mask_overlaps(dtype):
+    rng = np.random.RandomState(0)
+    img_h, img_w = 40, 60
+    gt_masks = (rng.rand(4, img_h, img_w) > 0.3).astype(dtype)
+    gt_masks[3] = 0
+    x1 = rng.uniform(0, img_w - 1, size=200)
+    y1 = rng.uniform(0, img_h - 1, size=200)
+    # boxes may be empty or exceed the image
+    x2 = x1 + rng.uniform(-3, img_w / 2, size=200)
+    y2 = y1 + rng.uniform(-3, img_h / 2, size=200)
+    proposals = torch.from_numpy(np.stack([x1, y1, x2, y2], axis=1)).float()
+    gt_inds = torch.from_numpy(rng.randint(4, size=200))
+
+    ratios = mask_overlaps(proposals, gt_inds, gt_masks)
+    expected = _mask_overlaps_reference(proposals, gt_inds, gt_masks)
+    assert torch.allclose(ratios, expected)
+    assert torch.equal(
+        mask_overlaps(proposals[0], gt_inds[:1], gt_masks), ratios[:1])
+    assert mask_overlaps(proposals[:0], gt_inds[:0], gt_masks).shape == (0, )
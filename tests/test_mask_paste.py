@@ -0,0 +1,105 @@
+import mmcv
+import numpy as np
+import pycocotools.mask as mask_util
+import pytest
+import torch
+
+from mmdet.core import encode_box_masks, paste_masks_in_boxes
+from mmdet.models.mask_heads import FCNMaskHead
+
+
+def _random_bboxes(num, img_h, img_w, rng):
+    x1 = rng.randint(0, img_w - 1, size=num)
+    y1 = rng.randint(0, img_h - 1, size=num)
+    x2 = np.minimum(x1 + rng.randint(0, 120, size=num), img_w - 1)
+    y2 = np.minimum(y1 + rng.randint(0, 120, size=num), img_h - 1)
+    return np.stack([x1, y1, x2, y2], axis=1).astype(np.int32)
+
+
+def test_encode_box_masks():
+    rng = np.random.RandomState(0)
+    img_h, img_w = 60, 80
+    bboxes = _random_bboxes(20, img_h, img_w, rng)
+    # touch the image borders
+    bboxes[0] = [0, 0, img_w - 1, img_h - 1]
+    bboxes[1] = [img_w - 5, img_h - 3, img_w - 1, img_h - 1]
+    box_masks = [(rng.rand(y2 - y1 + 1, x2 - x1 + 1) > 0.5).astype(np.uint8)
+                 for x1, y1, x2, y2 in bboxes]
+    box_masks[2][:] = 0
+    box_masks[3][:] = 1
+    rles = encode_box_masks(box_masks, bboxes, img_h, img_w)
+    for rle, box_mask, (x1, y1, x2, y2) in zip(rles, box_masks, bboxes):
+        im_mask = np.zeros((img_h, img_w), dtype=np.uint8)
+        im_mask[y1:y2 + 1, x1:x2 + 1] = box_mask
+        assert rle == mask_util.encode(np.asfortranarray(im_mask))
+    assert encode_box_masks([], np.zeros((0, 4)), img_h, img_w) == []
+
+
+@pytest.mark.parametrize('max_pixels', [2**22, 1000])
+def test_paste_masks_in_boxes(max_pixels):
+    rng = np.random.RandomState(0)
+    bboxes = _random_bboxes(30, 100, 150, rng)
+    masks = rng.rand(30, 28, 28).astype(np.float32)
+    box_masks = paste_masks_in_boxes(
+        torch.from_numpy(masks), bboxes, thr=0.5, max_pixels=max_pixels)
+    for mask, box_mask, (x1, y1, x2, y2) in zip(masks, box_masks, bboxes):
+        w, h = max(x2 - x1 + 1, 1), max(y2 - y1 + 1, 1)
+        expected = mmcv.imresize(mask, (w, h))
+        assert box_mask.shape == expected.shape
+        # values at the threshold may be rounded to either side
+        diff = box_mask != (expected > 0.5)
+        assert np.all(np.abs(expected[diff] - 0.5) < 1e-5)
+
+
+def _get_seg_masks_reference(mask_pred, bboxes, labels, img_h, img_w, thr):
+    """The per-box loop of FCNMaskHead.get_seg_masks before batching."""
+    segms = []
+    for i in range(bboxes.shape[0]):
+        bbox = bboxes[i].astype(np.int32)
+        w = max(bbox[2] - bbox[0] + 1, 1)
+        h = max(bbox[3] - bbox[1] + 1, 1)
+        im_mask = np.zeros((img_h, img_w), dtype=np.uint8)
+        bbox_mask = mmcv.imresize(mask_pred[i, labels[i] + 1], (w, h))
+        im_mask[bbox[1]:bbox[1] + h, bbox[0]:bbox[0] +
+                w] = (bbox_mask > thr).astype(np.uint8)
+        segms.append(
+            mask_util.encode(np.array(im_mask[:, :, np.newaxis],
+                                      order='F'))[0])
+    return segms
+
+
+def test_fcn_mask_head_get_seg_masks():
+    rng = np.random.RandomState(0)
+    num_classes = 5
+    img_h, img_w = 100, 150
+    head = FCNMaskHead(num_classes=num_classes)
+    bboxes = _random_bboxes(30, img_h, img_w, rng).astype(np.float32)
+    labels = rng.randint(num_classes - 1, size=30)
+    mask_pred = torch.randn(30, num_classes, 28, 28)
+    rcnn_test_cfg = mmcv.Config(dict(mask_thr_binary=0.5))
+    det_bboxes = torch.from_numpy(np.hstack([bboxes, np.ones((30, 1))]))
+    cls_segms = head.get_seg_masks(mask_pred, det_bboxes,
+                                   torch.from_numpy(labels), rcnn_test_cfg,
+                                   (img_h, img_w, 3), 1.0, True)
+    expected = _get_seg_masks_reference(mask_pred.sigmoid().numpy(), bboxes,
+                                        labels, img_h, img_w, 0.5)
+    for label in range(num_classes - 1):
+        expected_segms = [
+            segm for segm, segm_label in zip(expected, labels)
+            if segm_label == label
+        ]
+        assert len(cls_segms[label]) == len(expected_segms)
+        for segm, expected_segm in zip(cls_segms[label], expected_segms):
+            assert mask_util.iou([segm], [expected_segm], [0])[0, 0] > 0.99
+
+    rcnn_test_cfg.box_local_masks = True
+    cls_masks = head.get_seg_masks(mask_pred.sigmoid().numpy(), det_bboxes,
+                                   torch.from_numpy(labels), rcnn_test_cfg,
+                                   (img_h, img_w, 3), 1.0, True)
+    for label in range(num_classes - 1):
+        for segm, box_mask in zip(cls_segms[label], cls_masks[label]):
+            x1, y1, x2, y2 = box_mask['bbox']
+            assert box_mask['mask'].shape == (y2 - y1 + 1, x2 - x1 + 1)
+            im_mask = mask_util.decode(segm)
+            np.testing.assert_array_equal(im_mask[y1:y2 + 1, x1:x2 + 1],
+                                          box_mask['mask'])
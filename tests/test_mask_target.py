@@ -0,0 +1,108 @@
+import mmcv
+import numpy as np
+import pytest
+import torch
+
+from mmdet.core import mask_bg_target, mask_target
+from mmdet.core.mask.mask_target import crop_and_resize_masks
+
+
+def _mask_target_reference(pos_proposals,
+                           pos_assigned_gt_inds,
+                           gt_masks,
+                           mask_size,
+                           as_float=False):
+    """The per-positive loop of mask_target_single.
+
+    With ``as_float`` the crops are resized as float and rounded, which is
+    what resizing uint8 masks does up to the fixed point weights of cv2.
+    """
+    targets = []
+    for bbox, gt_ind in zip(pos_proposals.numpy().astype(np.int32),
+                            pos_assigned_gt_inds.numpy()):
+        x1, y1, x2, y2 = bbox
+        w = np.maximum(x2 - x1 + 1, 1)
+        h = np.maximum(y2 - y1 + 1, 1)
+        crop = gt_masks[gt_ind][y1:y1 + h, x1:x1 + w]
+        if as_float:
+            crop = crop.astype(np.float32)
+        targets.append(mmcv.imresize(crop, mask_size[::-1]))
+    targets = torch.from_numpy(np.stack(targets)).float()
+    return targets.add(0.5).floor() if as_float else targets
+
+
+def _random_inputs(num_pos, num_gts, img_h, img_w, rng):
+    gt_masks = (rng.rand(num_gts, img_h // 8 + 1, img_w // 8 + 1) > 0.5)
+    # blocky masks like real objects, plus single pixel details
+    gt_masks = gt_masks.repeat(8, axis=1).repeat(8, axis=2)[:, :img_h, :img_w]
+    pixels = rng.randint(img_h, size=20), rng.randint(img_w, size=20)
+    gt_masks[:, pixels[0], pixels[1]] ^= True
+    x1 = rng.uniform(0, img_w - 1, size=num_pos)
+    y1 = rng.uniform(0, img_h - 1, size=num_pos)
+    # boxes may be tiny or exceed the image
+    x2 = x1 + rng.uniform(-2, img_w / 2, size=num_pos)
+    y2 = y1 + rng.uniform(-2, img_h / 2, size=num_pos)
+    proposals = torch.from_numpy(np.stack([x1, y1, x2, y2], axis=1)).float()
+    gt_inds = torch.from_numpy(rng.randint(num_gts, size=num_pos))
+    return proposals, gt_inds, gt_masks.astype(np.uint8)
+
+
+@pytest.mark.parametrize('mask_size', [28, (14, 21)])
+def test_mask_target(mask_size):
+    rng = np.random.RandomState(0)
+    cfg = mmcv.Config(dict(mask_size=mask_size))
+    inputs = [
+        _random_inputs(100, 3, 60, 80, rng),
+        _random_inputs(0, 2, 70, 50, rng),
+        _random_inputs(50, 5, 40, 90, rng)
+    ]
+    proposals, gt_inds, gt_masks = zip(*inputs)
+    targets = mask_target(proposals, gt_inds, gt_masks, cfg)
+    mask_size = targets.shape[1:]
+    expected = torch.cat([
+        _mask_target_reference(*inp, mask_size) for inp in inputs
+        if len(inp[0])
+    ])
+    assert torch.equal(targets, expected)
+
+    bg_targets = mask_bg_target(proposals, gt_masks, cfg)
+    expected = torch.cat([
+        _mask_target_reference(inp[0], torch.full_like(inp[1],
+                                                       len(inp[2]) - 1),
+                               inp[2], mask_size) for inp in inputs
+        if len(inp[0])
+    ])
+    assert torch.equal(bg_targets, expected)
+
+    empty_targets = mask_target(proposals[1:2], gt_inds[1:2], gt_masks[1:2],
+                                cfg)
+    assert empty_targets.shape == (0, ) + mask_size
+
+
+@pytest.mark.parametrize('mask_size', [(28, 28), (14, 21)])
+def test_crop_and_resize_masks(mask_size):
+    rng = np.random.RandomState(0)
+    proposals, gt_inds, gt_masks = _random_inputs(100, 3, 60, 80, rng)
+    targets = crop_and_resize_masks(
+        torch.from_numpy(gt_masks), proposals, gt_inds, mask_size)
+    expected = _mask_target_reference(
+        proposals, gt_inds, gt_masks, mask_size, as_float=True)
+    assert targets.shape == expected.shape
+    # values at 0.5 may be rounded to either side
+    assert (targets != expected).float().mean() < 2e-3
+
+
+@pytest.mark.skipif(
+    not torch.cuda.is_available(), reason='requires CUDA support')
+def test_mask_target_cuda():
+    rng = np.random.RandomState(0)
+    cfg = mmcv.Config(dict(mask_size=28))
+    # only some of the gts are assigned
+    proposals, gt_inds, gt_masks = _random_inputs(100, 6, 60, 80, rng)
+    gt_inds = gt_inds % 3 * 2
+    targets = mask_target([proposals.cuda()], [gt_inds.cuda()], [gt_masks],
+                          cfg)
+    expected = mask_target([proposals], [gt_inds], [gt_masks], cfg)
+    assert targets.is_cuda
+    # the fixed point weights of cv2 round some values near 0.5 differently
+    assert (targets.cpu() != expected).float().mean() < 2e-2
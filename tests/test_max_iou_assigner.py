@@ -0,0 +1,88 @@
+import pytest
+import torch
+
+from mmdet.core.bbox import MaxIoUAssigner, MaxIoUUDAssigner, bbox_overlaps
+from mmdet.core.bbox.assigners.max_iou_mask_assigner import \
+    MaxIoUAssigner as MaxIoUMaskAssigner
+
+
+def _random_boxes(num, size=100, max_wh=60):
+    xy = torch.randint(0, size, (num, 2)).float()
+    wh = torch.randint(1, max_wh, (num, 2)).float()
+    return torch.cat([xy, xy + wh], dim=1)
+
+
+def _loop_assign(assigner, bboxes, gt_bboxes, gt_bboxes_ignore):
+    """The per-gt loop of the assigners on the full overlaps."""
+    overlaps = bbox_overlaps(gt_bboxes, bboxes)
+    if gt_bboxes_ignore is not None:
+        ignore_overlaps = bbox_overlaps(bboxes, gt_bboxes_ignore, mode='iof')
+        ignore_max_overlaps, _ = ignore_overlaps.max(dim=1)
+        overlaps[:, ignore_max_overlaps > assigner.ignore_iof_thr] = -1
+    assigned_gt_inds = overlaps.new_full((overlaps.size(1), ),
+                                         -1,
+                                         dtype=torch.long)
+    max_overlaps, argmax_overlaps = overlaps.max(dim=0)
+    gt_max_overlaps, gt_argmax_overlaps = overlaps.max(dim=1)
+    assigned_gt_inds[(max_overlaps >= 0)
+                     & (max_overlaps < assigner.neg_iou_thr)] = 0
+    pos_inds = max_overlaps >= assigner.pos_iou_thr
+    assigned_gt_inds[pos_inds] = argmax_overlaps[pos_inds] + 1
+    for i in range(overlaps.size(0)):
+        if gt_max_overlaps[i] >= assigner.min_pos_iou:
+            if assigner.gt_max_assign_all:
+                max_iou_inds = overlaps[i, :] == gt_max_overlaps[i]
+                assigned_gt_inds[max_iou_inds] = i + 1
+            else:
+                assigned_gt_inds[gt_argmax_overlaps[i]] = i + 1
+    return assigned_gt_inds, max_overlaps, argmax_overlaps
+
+
+@pytest.mark.parametrize('gt_max_assign_all', [True, False])
+@pytest.mark.parametrize('chunk_size', [7, 100, 10000])
+@pytest.mark.parametrize('min_pos_iou', [0., 0.3])
+def test_max_iou_assigner_chunked(gt_max_assign_all, chunk_size, min_pos_iou):
+    torch.manual_seed(0)
+    # repeated boxes make ties of the max overlaps across chunks
+    bboxes = _random_boxes(150).repeat(3, 1)
+    gt_bboxes = torch.cat([_random_boxes(20), bboxes[[3, 3, 40]]])
+    gt_labels = torch.randint(1, 5, (gt_bboxes.size(0), ))
+    gt_bboxes_ignore = _random_boxes(3)
+    kwargs = dict(
+        pos_iou_thr=0.5,
+        neg_iou_thr=0.4,
+        min_pos_iou=min_pos_iou,
+        gt_max_assign_all=gt_max_assign_all,
+        ignore_iof_thr=0.5,
+        chunk_size=chunk_size)
+    assigner = MaxIoUAssigner(**kwargs)
+    expected_inds, max_overlaps, argmax_overlaps = _loop_assign(
+        assigner, bboxes, gt_bboxes, gt_bboxes_ignore)
+    assert (expected_inds > 0).any() and (expected_inds == -1).any()
+
+    result = assigner.assign(bboxes, gt_bboxes, gt_bboxes_ignore, gt_labels)
+    assert torch.equal(result.gt_inds, expected_inds)
+    assert torch.equal(result.max_overlaps, argmax_overlaps)
+    pos = expected_inds > 0
+    assert torch.equal(result.labels[pos], gt_labels[expected_inds[pos] - 1])
+    neg = expected_inds == 0
+    assert torch.equal(result.labels[neg], gt_labels[argmax_overlaps[neg]])
+
+    overlaps = bbox_overlaps(gt_bboxes, bboxes)
+    result = assigner.assign_wrt_overlaps(overlaps)
+    expected_inds, _, _ = _loop_assign(assigner, bboxes, gt_bboxes, None)
+    assert torch.equal(result.gt_inds, expected_inds)
+
+    result = MaxIoUMaskAssigner(**kwargs).assign(bboxes, gt_bboxes,
+                                                 gt_bboxes_ignore)
+    expected_inds, max_overlaps, _ = _loop_assign(assigner, bboxes, gt_bboxes,
+                                                  gt_bboxes_ignore)
+    assert torch.equal(result.gt_inds, expected_inds)
+    assert torch.equal(result.max_overlaps, max_overlaps)
+
+    ud_result = MaxIoUUDAssigner(**kwargs).assign(bboxes, gt_bboxes,
+                                                  gt_bboxes_ignore)
+    full_ud_result = MaxIoUUDAssigner(**dict(kwargs, chunk_size=10000)).assign(
+        bboxes, gt_bboxes, gt_bboxes_ignore)
+    assert torch.equal(ud_result.gt_inds, full_ud_result.gt_inds)
+    assert (ud_result.gt_inds == -2).any()
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from mmdet.core import MeanAPEvaluator, eval_map
+from mmdet.core.evaluation.mean_ap import tpfp_default, tpfp_imagenet
+
+
+def _random_results(num_imgs=20, num_classes=3, seed=0):
+    rng = np.random.RandomState(seed)
+    det_results, gt_bboxes, gt_labels, gt_ignore = [], [], [], []
+    for _ in range(num_imgs):
+        num_gts = rng.randint(1, 8)
+        xy = rng.rand(num_gts, 2) * 200
+        gts = np.hstack([xy, xy + rng.rand(num_gts, 2) * 100 + 4])
+        gt_bboxes.append(gts.astype(np.float32))
+        gt_labels.append(rng.randint(1, num_classes + 1, size=num_gts))
+        gt_ignore.append(rng.rand(num_gts) < 0.2)
+        det_result = []
+        for _ in range(num_classes):
+            num_dets = rng.randint(0, 15)
+            dets = gts[rng.randint(num_gts, size=num_dets)]
+            dets = dets + rng.randn(num_dets, 4) * 5
+            # rounded scores so that some of them tie
+            scores = np.round(rng.rand(num_dets, 1), 1)
+            det_result.append(np.hstack([dets, scores]).astype(np.float32))
+        det_results.append(det_result)
+    return det_results, gt_bboxes, gt_labels, gt_ignore
+
+
+def test_tpfp_default():
+    gts = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], dtype=np.float32)
+    dets = np.array([[0, 0, 10, 10, 0.5], [0, 0, 10, 9, 0.9],
+                     [20, 20, 30, 30, 0.8], [50, 50, 60, 60, 0.7]],
+                    dtype=np.float32)
+    tp, fp = tpfp_default(dets, gts, np.array([0, 0]), 0.5)
+    np.testing.assert_array_equal(tp, [[0, 1, 1, 0]])
+    np.testing.assert_array_equal(fp, [[1, 0, 0, 1]])
+    # det bboxes matched to ignored gts are neither tp nor fp
+    tp, fp = tpfp_default(dets, gts, np.array([1, 0]), 0.5)
+    np.testing.assert_array_equal(tp, [[0, 0, 1, 0]])
+    np.testing.assert_array_equal(fp, [[0, 0, 0, 1]])
+
+
+def test_tpfp_imagenet():
+    gts = np.array([[0, 0, 10, 10], [0, 0, 10, 11]], dtype=np.float32)
+    dets = np.array(
+        [[0, 0, 10, 10, 0.9], [0, 0, 10, 10, 0.8], [0, 0, 10, 10, 0.7]],
+        dtype=np.float32)
+    # the second det bbox takes the other gt once the best one is covered
+    tp, fp = tpfp_imagenet(dets, gts, np.array([0, 0]), 0.5)
+    np.testing.assert_array_equal(tp, [[1, 1, 0]])
+    np.testing.assert_array_equal(fp, [[0, 0, 1]])
+
+
+@pytest.mark.parametrize('dataset', [None, 'det'])
+@pytest.mark.parametrize('scale_ranges', [None, [(0, 32), (32, 1e5)]])
+def test_mean_ap_evaluator(dataset, scale_ranges):
+    det_results, gt_bboxes, gt_labels, gt_ignore = _random_results()
+    mean_ap, eval_results = eval_map(
+        det_results,
+        gt_bboxes,
+        gt_labels,
+        gt_ignore,
+        scale_ranges,
+        dataset=dataset,
+        print_summary=False,
+        nproc=2)
+    evaluator = MeanAPEvaluator(3, scale_ranges, dataset=dataset, nproc=2)
+    for i in range(len(det_results)):
+        evaluator.add(det_results[i], gt_bboxes[i], gt_labels[i], gt_ignore[i])
+    assert len(evaluator) == len(det_results)
+    mean_ap_, eval_results_ = evaluator.evaluate(print_summary=False)
+    np.testing.assert_allclose(mean_ap, mean_ap_)
+    for cls_result, cls_result_ in zip(eval_results, eval_results_):
+        for key in cls_result:
+            np.testing.assert_allclose(cls_result[key], cls_result_[key])
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+import torch
+
+from mmdet.core import multiclass_nms
+from mmdet.core.post_processing import bbox_nms
+from mmdet.ops.nms import nms_wrapper
+
+
+def _multiclass_nms_reference(multi_bboxes,
+                              multi_scores,
+                              score_thr,
+                              nms_cfg,
+                              max_num=-1,
+                              score_factors=None):
+    """Suppress the boxes of each class on its own, sort the kept boxes of
+    all classes by score and keep the top ``max_num``."""
+    dets, labels = [], []
+    for i in range(1, multi_scores.size(1)):
+        cls_inds = multi_scores[:, i] > score_thr
+        if not cls_inds.any():
+            continue
+        if multi_bboxes.size(1) == 4:
+            cls_bboxes = multi_bboxes[cls_inds]
+        else:
+            cls_bboxes = multi_bboxes[cls_inds, i * 4:(i + 1) * 4]
+        cls_scores = multi_scores[cls_inds, i]
+        if score_factors is not None:
+            cls_scores = cls_scores * score_factors[cls_inds]
+        cls_dets, _ = nms_wrapper.nms(
+            torch.cat([cls_bboxes, cls_scores[:, None]], dim=1),
+            nms_cfg['iou_thr'])
+        dets.append(cls_dets)
+        labels.append(cls_dets.new_full((len(cls_dets), ), i - 1).long())
+    dets = torch.cat(dets)
+    labels = torch.cat(labels)
+    _, order = dets[:, -1].sort(descending=True)
+    if max_num > 0:
+        order = order[:max_num]
+    return dets[order], labels[order]
+
+
+def _random_inputs(num, num_classes, class_agnostic, rng):
+    # clustered boxes so that many of them overlap
+    centers = rng.uniform(0, 200, size=(num // 10 + 1, 2))
+    xy = centers[rng.randint(len(centers), size=num)]
+    num_boxes = 1 if class_agnostic else num_classes + 1
+    xy = xy[:, None] + rng.normal(0, 8, size=(num, num_boxes, 2))
+    wh = rng.uniform(10, 60, size=(num, num_boxes, 2))
+    bboxes = np.concatenate([xy, xy + wh], axis=2).reshape(num, -1)
+    scores = rng.uniform(0, 1, size=(num, num_classes + 1))
+    return (torch.from_numpy(bboxes).float(), torch.from_numpy(scores).float())
+
+
+# with 3 classes, 200 boxes go through a single class-offset NMS call and
+# 2000 boxes are above CPU_SPLIT_THR and suppressed class by class
+@pytest.mark.parametrize('num', [200, 2000])
+@pytest.mark.parametrize('class_agnostic', [True, False])
+@pytest.mark.parametrize('max_num', [-1, 50])
+@pytest.mark.parametrize('with_score_factors', [False, True])
+def test_multiclass_nms(num, class_agnostic, max_num, with_score_factors):
+    rng = np.random.RandomState(0)
+    multi_bboxes, multi_scores = _random_inputs(num, 3, class_agnostic, rng)
+    score_factors = None
+    if with_score_factors:
+        score_factors = torch.from_numpy(rng.uniform(0.5, 1, num)).float()
+    nms_cfg = dict(type='nms', iou_thr=0.5)
+    expected_dets, expected_labels = _multiclass_nms_reference(
+        multi_bboxes, multi_scores, 0.05, nms_cfg, max_num, score_factors)
+    dets, labels = multiclass_nms(multi_bboxes, multi_scores, 0.05, nms_cfg,
+                                  max_num, score_factors)
+    assert torch.equal(dets, expected_dets)
+    assert torch.equal(labels, expected_labels)
+
+
+def test_batched_nms_split():
+    rng = np.random.RandomState(0)
+    multi_bboxes, multi_scores = _random_inputs(800, 4, True, rng)
+    bboxes = multi_bboxes[:, None].expand(-1, 4, 4).reshape(-1, 4)
+    scores = multi_scores[:, 1:].reshape(-1)
+    labels = torch.arange(4).repeat(800)
+    assert len(bboxes) > bbox_nms.CPU_SPLIT_THR
+    nms_cfg = dict(type='nms', iou_thr=0.5)
+    # the same boxes are kept in the same order with or without splitting
+    dets, keep = bbox_nms.batched_nms(bboxes, scores, labels, nms_cfg)
+    batched_dets, batched_keep = bbox_nms.batched_nms(
+        bboxes, scores, labels, nms_cfg, split_thr=len(bboxes))
+    assert torch.equal(keep, batched_keep)
+    assert torch.equal(dets, batched_dets)
@@ -0,0 +1,85 @@
+import os.path as osp
+import pickle
+
+import mmcv
+import numpy as np
+import pytest
+
+from mmdet.datasets import PackedDataset, UnderseaDataset, pack_dataset
+
+PIPELINE = [
+    dict(type='LoadImageFromFile'),
+    dict(type='LoadAnnotations', with_bbox=True)
+]
+
+
+def _make_coco_dataset(root):
+    rng = np.random.RandomState(0)
+    # the last 2 images are filtered out, one is too small and the other one
+    # has no annotation
+    img_shapes = [(40, 50), (60, 40), (50, 50), (20, 50), (40, 40)]
+    images, annotations = [], []
+    for i, (height, width) in enumerate(img_shapes):
+        filename = '{:06d}.jpg'.format(i)
+        img = rng.randint(256, size=(height, width, 3)).astype(np.uint8)
+        mmcv.imwrite(img, osp.join(root, filename))
+        images.append(
+            dict(id=i + 1, file_name=filename, height=height, width=width))
+        if i == len(img_shapes) - 1:
+            continue
+        for j in range(i + 1):
+            x, y = rng.randint(20, size=2).tolist()
+            annotations.append(
+                dict(
+                    id=len(annotations) + 1,
+                    image_id=i + 1,
+                    category_id=j % 4 + 1,
+                    bbox=[x, y, 10 + j, 12],
+                    area=120.0,
+                    iscrowd=int(j == 2)))
+    categories = [
+        dict(id=i + 1, name=name)
+        for i, name in enumerate(UnderseaDataset.CLASSES)
+    ]
+    ann_file = osp.join(root, 'ann.json')
+    mmcv.dump(
+        dict(images=images, annotations=annotations, categories=categories),
+        ann_file)
+    return ann_file
+
+
+@pytest.mark.parametrize('with_img', [True, False])
+def test_packed_dataset(tmpdir, with_img):
+    root = str(tmpdir)
+    ann_file = _make_coco_dataset(root)
+    packed_file = osp.join(root, 'ann.pkd')
+    pack_dataset(
+        UnderseaDataset(
+            ann_file=ann_file, pipeline=[], img_prefix=root, test_mode=True),
+        packed_file,
+        with_img=with_img)
+
+    dataset = UnderseaDataset(
+        ann_file=ann_file, pipeline=PIPELINE, img_prefix=root)
+    # packed images are read without img_prefix
+    packed_dataset = PackedDataset(
+        ann_file=packed_file,
+        pipeline=PIPELINE,
+        img_prefix=None if with_img else root)
+    assert packed_dataset.CLASSES == dataset.CLASSES
+    assert packed_dataset.cat_ids == dataset.cat_ids
+    assert packed_dataset.img_ids == dataset.img_ids
+    assert len(packed_dataset) == len(dataset) == 3
+    np.testing.assert_array_equal(packed_dataset.flag, dataset.flag)
+
+    for dset in (packed_dataset, pickle.loads(pickle.dumps(packed_dataset))):
+        for i in range(len(dataset)):
+            for key in ('id', 'filename', 'width', 'height'):
+                assert dset.img_infos[i][key] == dataset.img_infos[i][key]
+            results = dset.prepare_train_img(i)
+            expected = dataset.prepare_train_img(i)
+            for key in ('img', 'gt_bboxes', 'gt_labels', 'gt_bboxes_ignore'):
+                np.testing.assert_array_equal(results[key], expected[key])
+            assert results['img_shape'] == expected['img_shape']
+            assert osp.basename(results['filename']) == osp.basename(
+                expected['filename'])
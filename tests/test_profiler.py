@@ -0,0 +1,123 @@
+import os.path as osp
+import tempfile
+
+import mmcv
+import torch
+from mmcv.runner import LogBuffer
+
+from mmdet.core import (ProfilerHook, StageProfiler, multiclass_nms,
+                        profile_region)
+from mmdet.models import build_detector
+
+CONFIG_DIR = osp.join(osp.dirname(__file__), '..', 'configs')
+
+
+def _build_detector(config):
+    cfg = mmcv.Config.fromfile(osp.join(CONFIG_DIR, config))
+    cfg.model.pretrained = None
+    cfg.model.backbone.depth = 18
+    cfg.model.neck.in_channels = [64, 128, 256, 512]
+    cfg.test_cfg.rpn.nms_post = 100
+    cfg.test_cfg.rpn.max_num = 100
+    cfg.test_cfg.rcnn.score_thr = 0
+    torch.manual_seed(0)
+    return build_detector(
+        cfg.model, train_cfg=None, test_cfg=cfg.test_cfg).eval()
+
+
+def _simple_test(model):
+    img_meta = dict(
+        img_shape=(64, 96, 3),
+        ori_shape=(64, 96, 3),
+        pad_shape=(64, 96, 3),
+        scale_factor=1.0,
+        flip=False)
+    torch.manual_seed(1)
+    with torch.no_grad():
+        return model.simple_test(
+            torch.randn(1, 3, 64, 96), [img_meta], rescale=True)
+
+
+def test_stage_profiler():
+    model = _build_detector('cascade_mask_rcnn_r50_fpn_1x.py')
+    expected = _simple_test(model)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        trace_file = osp.join(tmpdir, 'trace.json')
+        profiler = StageProfiler(trace_file=trace_file)
+        with profiler.profile(model):
+            for _ in range(2):
+                bbox_result, segm_result = _simple_test(model)
+        trace = mmcv.load(trace_file)
+    assert [len(r) for r in bbox_result] == [len(r) for r in expected[0]]
+
+    for region in [
+            'simple_test', 'extract_feat', 'simple_test_rpn', 'rpn_head',
+            'stage0.bbox_roi_extract', 'stage2.bbox_head', 'stage1.regress',
+            'multiclass_nms', 'stage2.mask_head', 'stage2.get_seg_masks'
+    ]:
+        assert len(profiler.durations[region]) == 2
+    summary = profiler.summary(percentiles=(50, 90))
+    assert summary['extract_feat.count'] == 2
+    assert 0 < summary['extract_feat.p50'] <= summary['extract_feat.p90']
+    assert summary['simple_test.p50'] > summary['extract_feat.p50']
+    assert 'stage2.get_seg_masks' in profiler.format_summary()
+
+    events = trace['traceEvents']
+    assert len(events) == sum(len(d) for d in profiler.durations.values())
+    assert all(event['ph'] == 'X' and event['dur'] > 0 for event in events)
+
+    # the methods are restored and nothing is timed once disabled
+    assert 'forward' not in vars(model.bbox_head[0])
+    assert 'extract_feat' not in vars(model)
+    profiler.reset()
+    _simple_test(model)
+    with profile_region('noop'):
+        pass
+    assert not profiler.durations
+
+
+def test_profiled_function():
+    profiler = StageProfiler()
+    bboxes = torch.rand(10, 4) * 50
+    bboxes[:, 2:] += bboxes[:, :2]
+    scores = torch.rand(10, 2)
+    with profiler.profile():
+        with profile_region('nms_twice'):
+            for _ in range(2):
+                multiclass_nms(bboxes, scores, 0.05,
+                               dict(type='nms', iou_thr=0.5))
+    assert len(profiler.durations['multiclass_nms']) == 2
+    assert len(profiler.durations['nms_twice']) == 1
+    assert not profiler.trace_events
+
+
+class ToyRunner(object):
+
+    def __init__(self, model, work_dir):
+        self.model = model
+        self.work_dir = work_dir
+        self.log_buffer = LogBuffer()
+        self.inner_iter = 0
+
+
+def test_profiler_hook():
+    model = _build_detector('faster_rcnn_r50_fpn_1x.py')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        runner = ToyRunner(model, tmpdir)
+        hook = ProfilerHook(interval=2, trace_file='trace.json')
+        hook.before_run(runner)
+        for i in range(3):
+            runner.inner_iter = i
+            _simple_test(model)
+            hook.after_train_iter(runner)
+            if i == 0:
+                assert not runner.log_buffer.output
+        hook.after_run(runner)
+        assert osp.isfile(osp.join(tmpdir, 'trace.json'))
+    output = runner.log_buffer.output
+    assert 'prof.extract_feat.p50' in output
+    assert 'prof.multiclass_nms.p90' in output
+    assert 'prof.extract_feat.count' not in output
+    # the durations of the logged interval are cleared
+    assert len(hook.profiler.durations['extract_feat']) == 1
+    assert 'simple_test' not in vars(model)
@@ -0,0 +1,115 @@
+import math
+
+import numpy as np
+import numpy.testing as npt
+import pytest
+import torch
+from torch.autograd import gradcheck
+
+from mmdet.ops import RoIAlign
+
+
+def _bilinear_interpolate(feat, y, x):
+    height, width = feat.shape[-2:]
+    if y < -1.0 or y > height or x < -1.0 or x > width:
+        return np.zeros(feat.shape[0])
+    y, x = max(y, 0), max(x, 0)
+    y_low, x_low = int(y), int(x)
+    if y_low >= height - 1:
+        y_high = y_low = height - 1
+        y = y_low
+    else:
+        y_high = y_low + 1
+    if x_low >= width - 1:
+        x_high = x_low = width - 1
+        x = x_low
+    else:
+        x_high = x_low + 1
+    ly, lx = y - y_low, x - x_low
+    hy, hx = 1 - ly, 1 - lx
+    return (hy * hx * feat[:, y_low, x_low] +
+            hy * lx * feat[:, y_low, x_high] +
+            ly * hx * feat[:, y_high, x_low] +
+            ly * lx * feat[:, y_high, x_high])
+
+
+def _roi_align_reference(feats, rois, out_size, spatial_scale, sample_num):
+    """Straightforward port of ``ROIAlignForward`` in roi_align_kernel.cu."""
+    output = np.zeros((rois.shape[0], feats.shape[1], out_size, out_size))
+    for n, roi in enumerate(rois):
+        feat = feats[int(roi[0])]
+        start_w, start_h = roi[1] * spatial_scale, roi[2] * spatial_scale
+        roi_w = max((roi[3] + 1) * spatial_scale - start_w, 0)
+        roi_h = max((roi[4] + 1) * spatial_scale - start_h, 0)
+        bin_h, bin_w = roi_h / out_size, roi_w / out_size
+        num_h = sample_num if sample_num > 0 else math.ceil(bin_h)
+        num_w = sample_num if sample_num > 0 else math.ceil(bin_w)
+        for ph in range(out_size):
+            for pw in range(out_size):
+                val = 0
+                for iy in range(num_h):
+                    y = start_h + ph * bin_h + (iy + .5) * bin_h / num_h
+                    for ix in range(num_w):
+                        x = start_w + pw * bin_w + (ix + .5) * bin_w / num_w
+                        val = val + _bilinear_interpolate(feat, y, x)
+                output[n, :, ph, pw] = val / (num_h * num_w)
+    return output
+
+
+def _random_inputs(dtype=torch.float,
+                   num_imgs=2,
+                   channels=4,
+                   feat_size=10,
+                   spatial_scale=0.5,
+                   num_rois=8):
+    rng = np.random.RandomState(0)
+    img_size = feat_size / spatial_scale
+    # boxes partially outside the feature map are included on purpose
+    rois = rng.rand(num_rois, 4) * img_size * 0.6 - img_size * 0.05
+    rois[:, 2:] += img_size * 0.5
+    batch_ind = rng.randint(num_imgs, size=(num_rois, 1))
+    rois = np.hstack((batch_ind, rois))
+    feats = rng.randn(num_imgs, channels, feat_size, feat_size)
+    return (torch.tensor(feats, dtype=dtype), torch.tensor(rois, dtype=dtype))
+
+
+@pytest.mark.parametrize('sample_num', [0, 2])
+@pytest.mark.parametrize('spatial_scale', [0.5, 0.25])
+def test_roi_align_cpu_forward(sample_num, spatial_scale):
+    feats, rois = _random_inputs(spatial_scale=spatial_scale)
+    output = RoIAlign(3, spatial_scale, sample_num)(feats, rois)
+    expected = _roi_align_reference(feats.double().numpy(),
+                                    rois.double().numpy(), 3, spatial_scale,
+                                    sample_num)
+    npt.assert_allclose(output.numpy(), expected, rtol=1e-4, atol=1e-5)
+
+
+@pytest.mark.parametrize('sample_num', [0, 2])
+def test_roi_align_cpu_backward(sample_num):
+    feats, rois = _random_inputs(dtype=torch.double, feat_size=6, num_rois=4)
+    feats.requires_grad_()
+    assert gradcheck(RoIAlign(2, 0.5, sample_num), (feats, rois))
+
+
+@pytest.mark.skipif(
+    not torch.cuda.is_available(), reason='requires CUDA support')
+@pytest.mark.parametrize('sample_num', [0, 2])
+def test_roi_align_cpu_cuda_parity(sample_num):
+    feats, rois = _random_inputs(channels=16, feat_size=20, num_rois=32)
+    roi_align = RoIAlign(7, 0.5, sample_num)
+    feats_cpu = feats.clone().requires_grad_()
+    feats_cuda = feats.cuda().requires_grad_()
+    output_cpu = roi_align(feats_cpu, rois)
+    output_cuda = roi_align(feats_cuda, rois.cuda())
+    npt.assert_allclose(
+        output_cpu.detach().numpy(),
+        output_cuda.detach().cpu().numpy(),
+        rtol=1e-4,
+        atol=1e-5)
+    output_cpu.sum().backward()
+    output_cuda.sum().backward()
+    npt.assert_allclose(
+        feats_cpu.grad.numpy(),
+        feats_cuda.grad.cpu().numpy(),
+        rtol=1e-4,
+        atol=1e-5)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+import torch
+
+from mmdet.core import multiclass_nms
+from mmdet.ops import soft_nms
+from mmdet.ops.nms import nms_wrapper, soft_nms_tensor
+
+
+def _random_dets(num, rng):
+    # clustered boxes so that many of them overlap
+    centers = rng.uniform(0, 200, size=(num // 10 + 1, 2))
+    xy = centers[rng.randint(len(centers), size=num)] + rng.normal(
+        0, 8, size=(num, 2))
+    wh = rng.uniform(10, 60, size=(num, 2))
+    scores = rng.uniform(0.01, 1, size=(num, 1))
+    return np.hstack([xy, xy + wh, scores]).astype(np.float32)
+
+
+@pytest.mark.parametrize('method', ['linear', 'gaussian'])
+@pytest.mark.parametrize('max_iou_boxes', [4096, 0])
+def test_soft_nms_tensor(method, max_iou_boxes, monkeypatch):
+    monkeypatch.setattr(nms_wrapper, 'SOFT_NMS_MAX_IOU_BOXES', max_iou_boxes)
+    rng = np.random.RandomState(0)
+    dets = _random_dets(300, rng)
+    expected_dets, expected_inds = soft_nms(
+        dets, 0.3, method=method, min_score=0.01)
+    new_dets, inds = soft_nms(
+        torch.from_numpy(dets), 0.3, method=method, min_score=0.01)
+    assert isinstance(new_dets, torch.Tensor)
+    assert inds.dtype == torch.long
+    # both select boxes in descending score order
+    assert inds.tolist() == expected_inds.tolist()
+    np.testing.assert_allclose(new_dets.numpy(), expected_dets, rtol=1e-5)
+
+    # the first max_num selected boxes are the same
+    new_dets, inds = soft_nms_tensor(
+        torch.from_numpy(dets), 0.3, method=method, min_score=0.01, max_num=20)
+    assert inds.tolist() == expected_inds[:20].tolist()
+
+    empty_dets, empty_inds = soft_nms(torch.zeros((0, 5)), 0.3)
+    assert empty_dets.shape == (0, 5) and empty_inds.shape == (0, )
+
+
+def test_multiclass_soft_nms():
+    rng = np.random.RandomState(0)
+    dets = torch.from_numpy(_random_dets(500, rng))
+    scores = torch.from_numpy(rng.uniform(0, 1, size=(500, 4))).float()
+    nms_cfg = dict(type='soft_nms', iou_thr=0.5, min_score=0.05)
+    det_bboxes, det_labels = multiclass_nms(dets[:, :4], scores, 0.05, nms_cfg,
+                                            50)
+    assert det_bboxes.shape == (50, 5)
+    all_bboxes, all_labels = multiclass_nms(dets[:, :4], scores, 0.05, nms_cfg)
+    assert torch.equal(det_bboxes, all_bboxes[:50])
+    assert torch.equal(det_labels, all_labels[:50])
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+import torch
+
+from mmdet.core import batched_nms, fuse_bbox_results, merge_aug_dets
+from mmdet.ops import wbf
+
+
+def test_wbf():
+    dets = torch.tensor([[10, 10, 50, 50, 0.9], [12, 10, 52, 50, 0.6],
+                         [100, 100, 150, 150, 0.8], [11, 12, 49, 51, 0.3]])
+    fused, inds = wbf(dets, 0.5, num_models=2)
+    assert inds.tolist() == [0, 2]
+    cluster = dets[[0, 1, 3]]
+    expected_box = (cluster[:, :4] *
+                    cluster[:, 4:]).sum(0) / cluster[:, 4].sum()
+    assert torch.allclose(fused[0, :4], expected_box)
+    assert fused[0, 4].item() == pytest.approx(0.6)
+    # a box found by one of 2 models is down-weighted
+    assert torch.allclose(fused[1], torch.tensor([100, 100, 150, 150, 0.4]))
+
+    fused, _ = wbf(dets, 0.5, score_type='max')
+    assert torch.allclose(fused[:, 4], torch.tensor([0.9, 0.8]))
+
+    fused_np, inds_np = wbf(dets.numpy(), 0.5, score_type='max')
+    assert isinstance(fused_np, np.ndarray)
+    np.testing.assert_allclose(fused_np, fused.numpy())
+    assert inds_np.tolist() == [0, 2]
+
+    fused, inds = wbf(dets[:0], 0.5)
+    assert fused.shape == (0, 5) and inds.shape == (0, )
+
+
+@pytest.mark.parametrize('split_thr', [1000, 0])
+def test_batched_wbf(split_thr):
+    rng = np.random.RandomState(0)
+    xy = rng.uniform(0, 300, size=(50, 2))
+    boxes = np.hstack([xy, xy + rng.uniform(20, 80, size=(50, 2))])
+    bboxes = torch.from_numpy(np.vstack([boxes, boxes + 2])).float()
+    scores = torch.from_numpy(rng.uniform(0.1, 1, size=100)).float()
+    labels = torch.from_numpy(rng.randint(3, size=100))
+    fusion_cfg = dict(type='wbf', iou_thr=0.5)
+    dets, keep = batched_nms(
+        bboxes, scores, labels, fusion_cfg, split_thr=split_thr)
+
+    expected = []
+    for cls_id in range(3):
+        cls_inds = (labels == cls_id).nonzero().view(-1)
+        cls_dets, _ = wbf(
+            torch.cat([bboxes[cls_inds], scores[cls_inds, None]], dim=1), 0.5)
+        expected.append(cls_dets)
+    expected = torch.cat(expected)
+    expected = expected[expected[:, 4].argsort(descending=True)]
+    assert torch.allclose(dets, expected, atol=1e-2)
+
+
+def test_merge_aug_dets():
+    dets = torch.tensor([[10, 10, 50, 50, 0.9], [100, 100, 150, 150, 0.8]])
+    labels = torch.tensor([0, 1])
+    aug_dets = [dets, dets + torch.tensor([2., 2, 2, 2, -0.2])]
+    aug_labels = [labels, labels]
+    fused, fused_labels = merge_aug_dets(aug_dets, aug_labels,
+                                         dict(type='wbf', iou_thr=0.55))
+    assert fused_labels.tolist() == [0, 1]
+    assert torch.allclose(fused[:, 4], torch.tensor([0.8, 0.7]))
+    fused, fused_labels = merge_aug_dets(aug_dets, [labels, 1 - labels],
+                                         dict(type='wbf', iou_thr=0.55), 3)
+    # boxes of different classes are not fused, and scaled by 1 / 2 models
+    assert fused.shape == (3, 5) and fused_labels.tolist() == [0, 1, 1]
+    assert torch.allclose(fused[:, 4], torch.tensor([0.45, 0.4, 0.35]))
+
+
+def test_fuse_bbox_results():
+    empty = np.zeros((0, 5), dtype=np.float32)
+    box = np.array([[10, 10, 50, 50, 0.9]], dtype=np.float32)
+    # 4 classes, with boxes of the 1st and the last class
+    bbox_result = [box, empty, empty, box + [100, 100, 100, 100, -0.5]]
+    fused = fuse_bbox_results([bbox_result, bbox_result],
+                              dict(type='wbf', iou_thr=0.55))
+    assert len(fused) == 4
+    for cls_fused, cls_result in zip(fused, bbox_result):
+        np.testing.assert_allclose(cls_fused, cls_result, rtol=1e-6)
+
+    # only the bboxes of mask results are fused, the classes are kept
+    segm_result = [[] for _ in range(4)]
+    fused = fuse_bbox_results([(bbox_result, segm_result), bbox_result],
+                              dict(type='wbf', iou_thr=0.55),
+                              weights=[1.0, 0.5])
+    assert len(fused) == 4
+    assert len(fused[3]) == 1
+    np.testing.assert_allclose(fused[3][0, :4], bbox_result[3][0, :4])
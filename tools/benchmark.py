@@ -0,0 +1,297 @@
+import argparse
+import os.path as osp
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import mmcv
+import numpy as np
+import torch
+from mmcv.parallel import DataContainer
+from mmcv.runner import load_checkpoint
+
+from mmdet.core import StageProfiler, wrap_fp16_model
+from mmdet.datasets import (build_dataloader, build_dataset,
+                            replace_image_to_tensor)
+from mmdet.models import build_detector
+
+if platform.system() != 'Windows':
+    import resource
+
+# Regions of the StageProfiler counted as post-processing, the rest of the
+# time of a forward pass being counted as the forward time.
+POSTPROCESS_REGIONS = ('multiclass_nms', 'get_seg_masks')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the inference speed of a detector')
+    parser.add_argument('config', help='test config file path')
+    parser.add_argument(
+        '--checkpoint',
+        help='checkpoint file, the model is randomly initialized if not '
+        'given, which may change the time of the post-processing')
+    parser.add_argument(
+        '--warmup', type=int, default=5, help='number of warm-up iterations')
+    parser.add_argument(
+        '--iters', type=int, default=50, help='number of timed iterations')
+    parser.add_argument(
+        '--batch-size', type=int, default=1, help='number of images per batch')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        help='number of data loading workers, with 0 the pipeline time is '
+        'the time the pipeline takes in the main process, otherwise it is '
+        'the time waited for the workers')
+    parser.add_argument(
+        '--synthetic',
+        action='store_true',
+        help='use random inputs instead of the test dataset, which are also '
+        'used if the test dataset cannot be built')
+    parser.add_argument(
+        '--shape',
+        type=int,
+        nargs=2,
+        default=[800, 1333],
+        help='(height, width) of the synthetic inputs')
+    parser.add_argument(
+        '--device',
+        default='cuda' if torch.cuda.is_available() else 'cpu',
+        help='device to run the model on')
+    parser.add_argument(
+        '--threads',
+        type=int,
+        nargs='+',
+        help='numbers of CPU threads to benchmark with, one after another, '
+        'each in its own process on CPU so that the peak memory of a run '
+        'does not include that of the runs before it')
+    parser.add_argument('--out', help='output json file of the results')
+    args = parser.parse_args()
+    return args
+
+
+def to_device(data, device):
+    """Unwrap the DataContainers of a collated batch of a single device and
+    move its tensors to the device."""
+    if isinstance(data, DataContainer):
+        data = data.data[0]
+    if isinstance(data, torch.Tensor):
+        return data.to(device)
+    elif isinstance(data, dict):
+        return {key: to_device(value, device) for key, value in data.items()}
+    elif isinstance(data, list):
+        return [to_device(value, device) for value in data]
+    return data
+
+
+def synthetic_batch(batch_size, shape):
+    """Get a batch of random inputs with the metas of a test pipeline."""
+    h, w = shape
+    pad_h, pad_w = int(np.ceil(h / 32)) * 32, int(np.ceil(w / 32)) * 32
+    img_meta = dict(
+        ori_shape=(h, w, 3),
+        img_shape=(h, w, 3),
+        pad_shape=(pad_h, pad_w, 3),
+        scale_factor=1.0,
+        flip=False)
+    img = torch.zeros(batch_size, 3, pad_h, pad_w)
+    img[..., :h, :w] = torch.randn(batch_size, 3, h, w)
+    return dict(img=[img], img_meta=[[img_meta] * batch_size])
+
+
+def build_data_loader(cfg, args):
+    """Build a loader of the test dataset, None if it cannot be built."""
+    if args.batch_size > 1:
+        cfg.data.test.pipeline = replace_image_to_tensor(
+            cfg.data.test.pipeline)
+    try:
+        dataset = build_dataset(cfg.data.test)
+    except (IOError, OSError) as e:
+        print('The test dataset cannot be built ({}), using synthetic '
+              'inputs instead.'.format(e))
+        return None
+    return build_dataloader(
+        dataset,
+        imgs_per_gpu=args.batch_size,
+        workers_per_gpu=args.workers,
+        dist=False,
+        shuffle=False)
+
+
+def iter_batches(data_loader, args):
+    """Yield the batches of the benchmark and the time each one took to load,
+    restarting the loader whenever it is exhausted."""
+    if data_loader is None:
+        data = synthetic_batch(args.batch_size, args.shape)
+        while True:
+            yield data, 0.
+    while True:
+        for data in data_loader:
+            yield data, data_loader.data_wait
+
+
+def peak_memory_mb(device):
+    """The peak memory allocated on a GPU since the benchmark started, or
+    the peak resident set size of the process on CPU, which is the peak
+    since the process started (including building the model)."""
+    if device.type == 'cuda':
+        return torch.cuda.max_memory_allocated(device) / 1024**2
+    elif platform.system() != 'Windows':
+        # the max resident set size of the process, in KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return None
+
+
+def benchmark_in_subprocesses(args):
+    """Run the benchmark of each number of threads in a new process.
+
+    The max resident set size of a process never decreases, so the runs of
+    several numbers of threads cannot share a process to measure their peak
+    memory on CPU.
+
+    Returns:
+        dict: The results dumped by the last process, with the runs of all
+            processes.
+    """
+    runs = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        out_file = osp.join(tmpdir, 'result.json')
+        for num_threads in args.threads:
+            # the last occurrences of the options override the first ones
+            subprocess.check_call(
+                [sys.executable, osp.abspath(__file__)] + sys.argv[1:] +
+                ['--threads', str(num_threads), '--out', out_file])
+            result = mmcv.load(out_file)
+            runs += result['runs']
+    result['runs'] = runs
+    return result
+
+
+def print_result(result, device):
+    print('threads: {}, {:.2f} img/s'.format(result['threads'],
+                                             result['imgs_per_sec']))
+    print('  latency: ' +
+          ', '.join('{}: {:.1f} ms'.format(q, latency)
+                    for q, latency in result['latency_ms'].items()))
+    print('  pipeline: {pipeline_ms:.1f} ms, forward: {forward_ms:.1f} '
+          'ms, post-processing: {postprocess_ms:.1f} ms'.format(**result))
+    if result['peak_memory_mb'] is not None:
+        print('  peak memory: {:.0f} MB{}'.format(
+            result['peak_memory_mb'],
+            '' if device.type == 'cuda' else ' (max RSS of the process)'))
+
+
+def synchronize(device):
+    if device.type == 'cuda':
+        torch.cuda.synchronize(device)
+
+
+def benchmark(model, data_loader, args, device):
+    """Run the warm-up and timed iterations of a benchmark.
+
+    Returns:
+        dict: The throughput, the percentiles of the latency of a batch
+            (of an image with a batch size of 1) and the mean pipeline,
+            forward and post-processing time of a batch.
+    """
+    if device.type == 'cuda':
+        torch.cuda.reset_peak_memory_stats(device)
+    # the device is synced around the regions so that the post-processing
+    # does not include the kernels queued before it, at the cost of a few
+    # more syncs per forward pass
+    profiler = StageProfiler()
+    batches = iter_batches(data_loader, args)
+    pipeline_times, forward_times, postprocess_times = [], [], []
+    num_imgs = 0
+    with profiler.profile(model), torch.no_grad():
+        for i in range(args.warmup + args.iters):
+            data, pipeline_time = next(batches)
+            data = to_device(data, device)
+            profiler.reset()
+            synchronize(device)
+            start = time.perf_counter()
+            model(return_loss=False, rescale=True, **data)
+            synchronize(device)
+            model_time = time.perf_counter() - start
+            if i < args.warmup:
+                continue
+            postprocess_time = sum(
+                sum(durations) / 1000
+                for name, durations in profiler.durations.items()
+                if name.split('.')[-1] in POSTPROCESS_REGIONS)
+            pipeline_times.append(pipeline_time)
+            forward_times.append(model_time - postprocess_time)
+            postprocess_times.append(postprocess_time)
+            num_imgs += data['img'][0].size(0)
+
+    latencies = (np.array(pipeline_times) + np.array(forward_times) +
+                 np.array(postprocess_times)) * 1000
+    result = dict(
+        imgs_per_sec=num_imgs / (latencies.sum() / 1000),
+        latency_ms={
+            'p{}'.format(q): float(np.percentile(latencies, q))
+            for q in (50, 90, 99)
+        },
+        pipeline_ms=float(np.mean(pipeline_times) * 1000),
+        forward_ms=float(np.mean(forward_times) * 1000),
+        postprocess_ms=float(np.mean(postprocess_times) * 1000),
+        peak_memory_mb=peak_memory_mb(device))
+    return result
+
+
+def main():
+    args = parse_args()
+    assert args.iters > 0, 'at least one iteration must be timed'
+    device = torch.device(args.device)
+    if args.threads and len(args.threads) > 1 and device.type != 'cuda':
+        result = benchmark_in_subprocesses(args)
+        if args.out:
+            mmcv.dump(result, args.out)
+        return
+
+    cfg = mmcv.Config.fromfile(args.config)
+    # set cudnn_benchmark
+    if cfg.get('cudnn_benchmark', False):
+        torch.backends.cudnn.benchmark = True
+    cfg.model.pretrained = None
+    cfg.data.test.test_mode = True
+
+    data_loader = None
+    if not args.synthetic:
+        data_loader = build_data_loader(cfg, args)
+
+    model = build_detector(cfg.model, train_cfg=None, test_cfg=cfg.test_cfg)
+    fp16_cfg = cfg.get('fp16', None)
+    if fp16_cfg is not None:
+        wrap_fp16_model(model)
+    if args.checkpoint is not None:
+        load_checkpoint(model, args.checkpoint, map_location='cpu')
+    model = model.to(device).eval()
+
+    runs = []
+    for num_threads in args.threads or [torch.get_num_threads()]:
+        torch.set_num_threads(num_threads)
+        result = benchmark(model, data_loader, args, device)
+        result['threads'] = num_threads
+        runs.append(result)
+        print_result(result, device)
+
+    if args.out:
+        mmcv.dump(
+            dict(
+                config=osp.abspath(args.config),
+                checkpoint=args.checkpoint,
+                device=str(device),
+                torch_version=torch.__version__,
+                inputs='synthetic' if data_loader is None else 'dataset',
+                batch_size=args.batch_size,
+                warmup=args.warmup,
+                iters=args.iters,
+                runs=runs), args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+import argparse
+
+from mmdet.datasets import DATASETS, pack_dataset
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Pack a dataset into a single memory-mapped file')
+    parser.add_argument('ann_file', help='annotation file')
+    parser.add_argument('img_prefix', help='image directory')
+    parser.add_argument('out_file', help='output packed file')
+    parser.add_argument(
+        '--dataset-type',
+        default='UnderseaDataset',
+        help='dataset type to parse the annotations, e.g. CocoDataset')
+    parser.add_argument(
+        '--no-img',
+        action='store_true',
+        help='do not pack the images, they are read from img_prefix')
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = parse_args()
+    dataset = DATASETS.get(args.dataset_type)(
+        ann_file=args.ann_file,
+        pipeline=[],
+        img_prefix=args.img_prefix,
+        test_mode=True)
+    pack_dataset(dataset, args.out_file, with_img=not args.no_img)
+    print('\n{} images are packed into {}'.format(len(dataset), args.out_file))
+
+
+if __name__ == '__main__':
+    main()
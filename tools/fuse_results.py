@@ -0,0 +1,79 @@
+import argparse
+from functools import partial
+
+import mmcv
+import torch
+
+from mmdet.core import fuse_bbox_results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Fuse the detections of several models (the pkl outputs '
+        'of tools/test.py) with weighted box fusion')
+    parser.add_argument('results', nargs='+', help='result files to fuse')
+    parser.add_argument('--out', required=True, help='output result file')
+    parser.add_argument(
+        '--iou-thr', type=float, default=0.55, help='IoU threshold of WBF')
+    parser.add_argument(
+        '--score-type',
+        choices=['avg', 'max'],
+        default='avg',
+        help='score of the fused boxes, "max" keeps the score of the best '
+        'box of each cluster (score voting)')
+    parser.add_argument(
+        '--weights',
+        type=float,
+        nargs='+',
+        help='score weight of each result file, 1 by default')
+    parser.add_argument(
+        '--max-per-img',
+        type=int,
+        default=100,
+        help='number of fused detections to keep per image, -1 keeps all')
+    parser.add_argument(
+        '--nproc', type=int, default=4, help='number of processes')
+    args = parser.parse_args()
+    return args
+
+
+def _init_worker():
+    # the images are already fused in parallel
+    torch.set_num_threads(1)
+
+
+def main():
+    args = parse_args()
+    if len(args.results) < 2:
+        raise ValueError('At least 2 result files are needed to fuse')
+    if not args.out.endswith(('.pkl', '.pickle')):
+        raise ValueError('The output file must be a pkl file.')
+    weights = args.weights or [1.0] * len(args.results)
+    if len(weights) != len(args.results):
+        raise ValueError('There must be a weight for each result file')
+
+    results = [mmcv.load(filename) for filename in args.results]
+    if len(set(len(result) for result in results)) != 1:
+        raise ValueError('The result files have different image numbers')
+    if any(isinstance(result[0], tuple) for result in results):
+        print('Only the bboxes of mask results are fused')
+
+    fusion_cfg = dict(
+        type='wbf', iou_thr=args.iou_thr, score_type=args.score_type)
+    fuse_fn = partial(
+        fuse_bbox_results,
+        fusion_cfg=fusion_cfg,
+        weights=weights,
+        max_num=args.max_per_img)
+    tasks = list(zip(*results))
+    if args.nproc > 1:
+        fused_results = mmcv.track_parallel_progress(
+            fuse_fn, tasks, args.nproc, initializer=_init_worker)
+    else:
+        fused_results = mmcv.track_progress(fuse_fn, tasks)
+    print('\nwriting results to {}'.format(args.out))
+    mmcv.dump(fused_results, args.out)
+
+
+if __name__ == '__main__':
+    main()
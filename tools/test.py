@@ -1,36 +1,72 @@
 import argparse
 import os
-import os.path as osp
-import shutil
-import tempfile
 
 import mmcv
+import numpy as np
 import torch
-import torch.distributed as dist
 from mmcv.parallel import MMDataParallel, MMDistributedDataParallel
 from mmcv.runner import get_dist_info, load_checkpoint
 
 from mmdet.apis import init_dist
-from mmdet.core import coco_eval, results2json, wrap_fp16_model
-from mmdet.datasets import build_dataloader, build_dataset
+from mmdet.core import (MeanAPEvaluator, StageProfiler, coco_eval,
+                        collect_results, eval_map, results2json,
+                        wrap_fp16_model)
+from mmdet.datasets import (build_dataloader, build_dataset,
+                            replace_image_to_tensor)
 from mmdet.models import build_detector
 
 
-def single_gpu_test(model, data_loader, show=False):
+def get_map_gts(dataset, idx):
+    """Get gt bboxes, labels and ignore indicators of an image for mAP."""
+    ann = dataset.get_ann_info(idx)
+    bboxes = ann['bboxes']
+    labels = ann['labels']
+    ignore = None
+    # ignored bboxes without labels (e.g. crowd ones of Undersea) cannot be
+    # assigned to a class, so they are left out
+    if 'bboxes_ignore' in ann and 'labels_ignore' in ann:
+        ignore = np.concatenate([
+            np.zeros(bboxes.shape[0], dtype=bool),
+            np.ones(ann['bboxes_ignore'].shape[0], dtype=bool)
+        ])
+        bboxes = np.vstack([bboxes, ann['bboxes_ignore']])
+        labels = np.concatenate([labels, ann['labels_ignore']])
+    return bboxes, labels, ignore
+
+
+def get_map_dataset_name(dataset):
+    # If the dataset is VOC2007, then use 11 points mAP evaluation.
+    if hasattr(dataset, 'year') and dataset.year == 2007:
+        return 'voc07'
+    return dataset.CLASSES
+
+
+def single_gpu_test(model, data_loader, show=False, evaluator=None):
+    """Test a model with a single gpu.
+
+    If an evaluator (e.g. :obj:`MeanAPEvaluator`) is given, the result of each
+    image is added to it as soon as it is available.
+    """
     model.eval()
     results = []
     dataset = data_loader.dataset
     prog_bar = mmcv.ProgressBar(len(dataset))
-    for i, data in enumerate(data_loader):
+    for data in data_loader:
         with torch.no_grad():
             result = model(return_loss=False, rescale=not show, **data)
-        results.append(result)
 
         if show:
             model.module.show_result(data, result)
 
         batch_size = data['img'][0].size(0)
-        for _ in range(batch_size):
+        if batch_size == 1:
+            result = [result]
+        for img_result in result:
+            if evaluator is not None:
+                bbox_result = img_result[0] if isinstance(
+                    img_result, tuple) else img_result
+                evaluator.add(bbox_result, *get_map_gts(dataset, len(results)))
+            results.append(img_result)
             prog_bar.update()
     return results
 
@@ -45,10 +81,13 @@ def multi_gpu_test(model, data_loader, tmpdir=None):
     for i, data in enumerate(data_loader):
         with torch.no_grad():
             result = model(return_loss=False, rescale=True, **data)
-        results.append(result)
+        batch_size = data['img'][0].size(0)
+        if batch_size == 1:
+            results.append(result)
+        else:
+            results.extend(result)
 
         if rank == 0:
-            batch_size = data['img'][0].size(0)
             for _ in range(batch_size * world_size):
                 prog_bar.update()
 
@@ -58,48 +97,6 @@ def multi_gpu_test(model, data_loader, tmpdir=None):
     return results
 
 
-def collect_results(result_part, size, tmpdir=None):
-    rank, world_size = get_dist_info()
-    # create a tmp dir if it is not specified
-    if tmpdir is None:
-        MAX_LEN = 512
-        # 32 is whitespace
-        dir_tensor = torch.full((MAX_LEN, ),
-                                32,
-                                dtype=torch.uint8,
-                                device='cuda')
-        if rank == 0:
-            tmpdir = tempfile.mkdtemp()
-            tmpdir = torch.tensor(
-                bytearray(tmpdir.encode()), dtype=torch.uint8, device='cuda')
-            dir_tensor[:len(tmpdir)] = tmpdir
-        dist.broadcast(dir_tensor, 0)
-        tmpdir = dir_tensor.cpu().numpy().tobytes().decode().rstrip()
-    else:
-        mmcv.mkdir_or_exist(tmpdir)
-    # dump the part result to the dir
-    mmcv.dump(result_part, osp.join(tmpdir, 'part_{}.pkl'.format(rank)))
-    dist.barrier()
-    # collect all parts
-    if rank != 0:
-        return None
-    else:
-        # load results of all parts from tmp dir
-        part_list = []
-        for i in range(world_size):
-            part_file = osp.join(tmpdir, 'part_{}.pkl'.format(i))
-            part_list.append(mmcv.load(part_file))
-        # sort the results
-        ordered_results = []
-        for res in zip(*part_list):
-            ordered_results.extend(list(res))
-        # the dataloader may pad some samples
-        ordered_results = ordered_results[:size]
-        # remove tmp dir
-        shutil.rmtree(tmpdir)
-        return ordered_results
-
-
 def parse_args():
     parser = argparse.ArgumentParser(description='MMDet test detector')
     parser.add_argument('config', help='test config file path')
@@ -113,10 +110,28 @@ def parse_args():
         '--eval',
         type=str,
         nargs='+',
-        choices=['proposal', 'proposal_fast', 'bbox', 'segm', 'keypoints'],
-        help='eval types')
+        choices=[
+            'proposal', 'proposal_fast', 'bbox', 'segm', 'keypoints', 'mAP'
+        ],
+        help='eval types, "mAP" is the VOC style bbox mAP, which is evaluated '
+        'as results come in when testing with a single gpu')
+    parser.add_argument(
+        '--nproc',
+        type=int,
+        default=4,
+        help='number of processes for mAP evaluation')
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=1,
+        help='number of images per gpu, only detectors whose simple_test '
+        'supports a batch of images (e.g. two-stage and cascade ones) can be '
+        'tested with more than 1')
     parser.add_argument('--show', action='store_true', help='show results')
-    parser.add_argument('--tmpdir', help='tmp dir for writing some results')
+    parser.add_argument(
+        '--tmpdir',
+        help='tmp dir shared by all ranks to collect the results through '
+        'files, they are gathered in memory if it is not given')
     parser.add_argument(
         '--launcher',
         choices=['none', 'pytorch', 'slurm', 'mpi'],
@@ -132,9 +147,14 @@ def parse_args():
 def main():
     args = parse_args()
 
-    assert args.out or args.show or args.json_out, \
-        ('Please specify at least one operation (save or show the results) '
-         'with the argument "--out" or "--show" or "--json_out"')
+    eval_types = args.eval or []
+    assert args.out or args.show or args.json_out or 'mAP' in eval_types, \
+        ('Please specify at least one operation (save, show or evaluate the '
+         'results) with the argument "--out", "--show", "--json_out" or '
+         '"--eval mAP"')
+
+    if args.show and args.batch_size > 1:
+        raise ValueError('Results can only be shown with "--batch-size 1".')
 
     if args.out is not None and not args.out.endswith(('.pkl', '.pickle')):
         raise ValueError('The output file must be a pkl file.')
@@ -157,11 +177,13 @@ def main():
         init_dist(args.launcher, **cfg.dist_params)
 
     # build the dataloader
-    # TODO: support multiple images per gpu (only minor changes are needed)
+    if args.batch_size > 1:
+        cfg.data.test.pipeline = replace_image_to_tensor(
+            cfg.data.test.pipeline)
     dataset = build_dataset(cfg.data.test)
     data_loader = build_dataloader(
         dataset,
-        imgs_per_gpu=1,
+        imgs_per_gpu=args.batch_size,
         workers_per_gpu=cfg.data.workers_per_gpu,
         dist=distributed,
         shuffle=False)
@@ -179,18 +201,56 @@ def main():
     else:
         model.CLASSES = dataset.CLASSES
 
+    if args.batch_size > 1 and not model.supports_batch_test:
+        raise ValueError('{} cannot be tested with "--batch-size" > 1.'.format(
+            model.__class__.__name__))
+
     if not distributed:
         model = MMDataParallel(model, device_ids=[0])
-        outputs = single_gpu_test(model, data_loader, args.show)
+        evaluator = None
+        if 'mAP' in eval_types:
+            evaluator = MeanAPEvaluator(
+                len(dataset.CLASSES),
+                dataset=get_map_dataset_name(dataset),
+                nproc=args.nproc)
+        if cfg.get('profiler', None) is not None:
+            # the interval is only used to log the profile of training
+            profiler_cfg = cfg.profiler.copy()
+            profiler_cfg.pop('interval', None)
+            percentiles = profiler_cfg.pop('percentiles', (50, 90, 99))
+            profiler = StageProfiler(**profiler_cfg)
+            with profiler.profile(model):
+                outputs = single_gpu_test(model, data_loader, args.show,
+                                          evaluator)
+            print('\n' + profiler.format_summary(percentiles))
+        else:
+            outputs = single_gpu_test(model, data_loader, args.show, evaluator)
     else:
         model = MMDistributedDataParallel(model.cuda())
         outputs = multi_gpu_test(model, data_loader, args.tmpdir)
 
     rank, _ = get_dist_info()
+    if 'mAP' in eval_types and rank == 0:
+        print('\nEvaluating mAP')
+        if not distributed:
+            evaluator.evaluate()
+        else:
+            gts = [get_map_gts(dataset, i) for i in range(len(dataset))]
+            gt_bboxes, gt_labels, gt_ignore = zip(*gts)
+            eval_map(
+                [out[0] if isinstance(out, tuple) else out for out in outputs],
+                gt_bboxes,
+                gt_labels,
+                gt_ignore=None if gt_ignore[0] is None else gt_ignore,
+                dataset=get_map_dataset_name(dataset),
+                nproc=args.nproc)
+        eval_types = [
+            eval_type for eval_type in eval_types if eval_type != 'mAP'
+        ]
+
     if args.out and rank == 0:
         print('\nwriting results to {}'.format(args.out))
         mmcv.dump(outputs, args.out)
-        eval_types = args.eval
         if eval_types:
             print('Starting evaluate {}'.format(' and '.join(eval_types)))
             if eval_types == ['proposal_fast']: